@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Compares the compact AST layout (32-bit child indices, the default) with the
+pointer layout (keccc built with -DKECCC_POINTER_AST).
+
+Both compilers translate the same expression-heavy program; the best
+wall-clock time, the peak AST memory reported by --stats and the peak RSS
+are printed for each layout.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+# "AST arena: peak 1173 live nodes (27 KiB), 1 allocator calls"
+PEAK_PATTERN = re.compile(r"peak (\d+) live nodes \((\d+) KiB\)")
+
+
+@dataclass(frozen=True)
+class LayoutResult:
+    layout: str
+    run_seconds: List[float]
+    peak_nodes: int
+    peak_ast_kib: int
+    max_rss_kib: int
+
+    @property
+    def best_seconds(self) -> float:
+        return min(self.run_seconds)
+
+
+def generate_expression(terms: int, seed: int) -> str:
+    """
+    Builds a long arithmetic expression of `terms` terms over a, b, c, i and
+    small constants. Products are only nested one level deep so the
+    expression fits the backends' register pool.
+    """
+    leaves = ["a", "b", "c", "3", "7", "i"]
+    parts: List[str] = []
+    for term in range(terms):
+        value = seed * 7 + term * 13
+        leaf = leaves[value % len(leaves)]
+        if value % 3 == 0:
+            leaf = f"{leaf} * {leaves[(value // 3) % len(leaves)]}"
+        if term:
+            parts.append("+" if value % 2 else "-")
+        parts.append(leaf)
+    return " ".join(parts)
+
+
+def generate_program(functions: int, statements: int, terms: int) -> str:
+    parts: List[str] = []
+    for index in range(functions):
+        parts.append(
+            f"int f{index}() {{\n"
+            "    int a;\n    int b;\n    int c;\n    int i;\n"
+            f"    a = {index};\n    b = 2;\n    c = 5;\n    i = 1;\n"
+        )
+        for statement in range(statements):
+            target = "abc"[statement % 3]
+            expression = generate_expression(terms, index * 131 + statement)
+            parts.append(f"    {target} = {expression};\n")
+        parts.append("    return (a);\n}\n\n")
+    parts.append("int main() {\n    printint(f0(1));\n    return (0);\n}\n")
+    return "".join(parts)
+
+
+def run_once(command: Sequence[str]) -> Tuple[float, str, int]:
+    """
+    Runs keccc once and returns (seconds, stderr, peak RSS in KiB).
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+    )
+    assert process.stderr is not None
+    stderr = process.stderr.read()
+    # wait4() reports the resource usage of this child alone
+    _, status, usage = os.wait4(process.pid, 0)
+    elapsed = time.perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+    if process.returncode != 0:
+        print(f"[FAIL] {' '.join(command)}", file=sys.stderr)
+        print(stderr, file=sys.stderr)
+        raise SystemExit(1)
+    return elapsed, stderr, usage.ru_maxrss
+
+
+def measure(
+    layout: str, keccc: Path, source: Path, work_dir: Path, runs: int
+) -> LayoutResult:
+    command = [
+        str(keccc),
+        "--stats",
+        "--emit",
+        "asm",
+        "-o",
+        str(work_dir / f"out.{layout}.s"),
+        str(source),
+    ]
+    run_seconds: List[float] = []
+    stats: Optional[re.Match[str]] = None
+    max_rss = 0
+    for _ in range(runs):
+        seconds, stderr, max_rss = run_once(command)
+        run_seconds.append(seconds)
+        stats = PEAK_PATTERN.search(stderr)
+
+    if stats is None:
+        print(f"[FATAL] no --stats output from {keccc}", file=sys.stderr)
+        raise SystemExit(1)
+    return LayoutResult(
+        layout, run_seconds, int(stats.group(1)), int(stats.group(2)), max_rss
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--functions", type=int, default=4, help="functions to generate"
+    )
+    parser.add_argument(
+        "--statements", type=int, default=2000, help="statements per function"
+    )
+    parser.add_argument(
+        "--terms", type=int, default=100, help="terms per expression"
+    )
+    parser.add_argument("--runs", type=int, default=5, help="runs per layout")
+    parser.add_argument("build_root", type=Path)
+    args = parser.parse_args()
+
+    compilers = {
+        "compact": args.build_root / "src" / "keccc",
+        "pointer": args.build_root / "benchmarks" / "keccc-pointer-ast",
+    }
+    for keccc in compilers.values():
+        if not os.access(keccc, os.X_OK):
+            print(f"[FATAL] keccc not found at {keccc}")
+            return 1
+
+    with tempfile.TemporaryDirectory(prefix="keccc-bench-") as tmp:
+        work_dir = Path(tmp)
+        source = work_dir / "expressions.c"
+        source.write_text(
+            generate_program(args.functions, args.statements, args.terms)
+        )
+        print(
+            f"Input: {args.functions} functions x {args.statements} statements, "
+            f"{args.terms} terms per expression, "
+            f"{source.stat().st_size / 1e6:.2f} MB, best of {args.runs} runs"
+        )
+
+        for layout in ("compact", "pointer"):
+            result = measure(
+                layout, compilers[layout], source, work_dir, args.runs
+            )
+            print(
+                f"{layout:8} best {result.best_seconds * 1e3:7.1f} ms  "
+                f"peak AST {result.peak_nodes} nodes = "
+                f"{result.peak_ast_kib:6} KiB  max RSS {result.max_rss_kib} KiB"
+            )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
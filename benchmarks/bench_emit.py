@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Measures how fast keccc emits assembly.
+
+A large synthetic program is generated, compiled with --emit asm a few times
+per target, and the emitted bytes per second (best run) are reported.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Sequence
+
+# Statement block repeated in every generated function
+FUNCTION_BODY_BLOCK = """\
+    for (i = 0; i < 10; i = i + 1) {
+        a = a + b * i - a / 3;
+        if (a > 1000) {
+            a = a - 1000;
+        } else {
+            b = b + 1;
+        }
+    }
+    while (b > 0) {
+        b = b - 2;
+    }
+"""
+
+
+@dataclass(frozen=True)
+class BenchmarkResult:
+    target: str
+    output_bytes: int
+    run_seconds: List[float]
+
+    @property
+    def best_seconds(self) -> float:
+        return min(self.run_seconds)
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.output_bytes / self.best_seconds
+
+
+def generate_program(functions: int, blocks: int) -> str:
+    """
+    Generates a program with `functions` functions, each made of `blocks`
+    copies of FUNCTION_BODY_BLOCK.
+    """
+    parts: List[str] = []
+    for index in range(functions):
+        parts.append(
+            f"int f{index}() {{\n"
+            "    int a;\n"
+            "    int b;\n"
+            "    int i;\n"
+            f"    a = {index};\n"
+            "    b = 3;\n"
+        )
+        parts.append(FUNCTION_BODY_BLOCK * blocks)
+        parts.append("    return (a);\n}\n\n")
+    parts.append("int main() {\n    printint(f0(1));\n    return (0);\n}\n")
+    return "".join(parts)
+
+
+def run_benchmark(
+    keccc: Path, target: str, source: Path, work_dir: Path, runs: int
+) -> BenchmarkResult:
+    """
+    Compiles `source` `runs` times and records the wall-clock time of each run.
+    """
+    output = work_dir / f"out.{target}.s"
+    command: Sequence[str] = [
+        str(keccc),
+        "--target",
+        target,
+        "--emit",
+        "asm",
+        "-o",
+        str(output),
+        str(source),
+    ]
+
+    run_seconds: List[float] = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        process = subprocess.run(command, capture_output=True, text=True)
+        elapsed = time.perf_counter() - start
+        if process.returncode != 0:
+            print(f"[FAIL] keccc --target {target}", file=sys.stderr)
+            print(process.stderr, file=sys.stderr)
+            raise SystemExit(1)
+        run_seconds.append(elapsed)
+
+    return BenchmarkResult(target, output.stat().st_size, run_seconds)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--target",
+        action="append",
+        choices=["nasm", "aarch64"],
+        help="backend to measure (repeatable; default: all)",
+    )
+    parser.add_argument(
+        "--functions", type=int, default=300, help="functions to generate"
+    )
+    parser.add_argument(
+        "--blocks", type=int, default=20, help="statement blocks per function"
+    )
+    parser.add_argument("--runs", type=int, default=5, help="runs per target")
+    parser.add_argument("build_root", type=Path)
+    args = parser.parse_args()
+
+    keccc = args.build_root / "src" / "keccc"
+    if not os.access(keccc, os.X_OK):
+        print(f"[FATAL] keccc not found at {keccc}")
+        return 1
+
+    with tempfile.TemporaryDirectory(prefix="keccc-bench-") as tmp:
+        work_dir = Path(tmp)
+        source = work_dir / "bench.c"
+        source.write_text(generate_program(args.functions, args.blocks))
+        source_bytes = source.stat().st_size
+
+        print(
+            f"Input: {args.functions} functions, {source_bytes / 1e6:.2f} MB "
+            f"of source, best of {args.runs} runs"
+        )
+        for target in args.target or ["nasm", "aarch64"]:
+            result = run_benchmark(keccc, target, source, work_dir, args.runs)
+            print(
+                f"{target:8} {result.output_bytes / 1e6:7.2f} MB emitted  "
+                f"best {result.best_seconds * 1e3:7.1f} ms  "
+                f"median {statistics.median(result.run_seconds) * 1e3:7.1f} ms  "
+                f"{result.bytes_per_second / 1e6:7.1f} MB/s"
+            )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Counts the instructions executed per iteration of the innermost loops of a
+loop-heavy program at -O0 and -O1.
+
+Every loop body is straight-line code, so an iteration runs exactly the
+instructions from the loop's label to the branch back to it. -O0 keeps the
+test at the top of the loop and jumps back after the body (a conditional
+branch plus a jump per iteration); -O1 rotates the loop so that an
+iteration ends with the test and a single backward branch, and moves the
+computations that do not change in the loop (array addresses, loads of
+globals it does not store to, the row offset of nested array loops) in
+front of it, and steps a pointer through the arrays indexed by the loop
+counter instead of scaling the counter on every iteration. A final peephole
+pass uses constants as immediate operands and drops redundant moves.
+"""
+from __future__ import annotations
+
+import argparse
+import re
+import subprocess
+import sys
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+PROGRAM = """\
+int  a[64];
+int  grid[256];
+long scale;
+long total;
+
+int main() {
+  int  i;
+  int  j;
+  long s;
+
+  s = 0;
+  i = 0;
+  while (i < 64) {
+    a[i] = i * 3;
+    i = i + 1;
+  }
+  for (i = 0; i < 64; i = i + 1) {
+    s = s + a[i];
+  }
+  for (i = 0; i < 8; i = i + 1) {
+    for (j = 0; j < 8; j = j + 1) {
+      s = s + i * j;
+    }
+  }
+  scale = 3;
+  for (i = 0; i < 16; i = i + 1) {
+    for (j = 0; j < 16; j = j + 1) {
+      grid[i * 16 + j] = i + j;
+    }
+  }
+  for (i = 0; i < 16; i = i + 1) {
+    for (j = 0; j < 16; j = j + 1) {
+      s = s + grid[i * 16 + j] * scale;
+    }
+  }
+  total = 100;
+  while (total > 0) {
+    total = total - 7;
+  }
+  printint(s);
+  return (0);
+}
+"""
+
+# Assembler directives, which are not counted as instructions (NASM spells
+# them without a leading '.')
+NASM_DIRECTIVES = {
+    "extern", "global", "section", "align",
+    "db", "dw", "dd", "dq",
+    "resb", "resw", "resd", "resq",
+}
+
+# Branches to a label: every NASM jump, and B, B<cond>, CBZ and CBNZ
+BRANCH_PATTERNS = {
+    "nasm": re.compile(r"^j[a-z]+$"),
+    "aarch64": re.compile(r"^(b|b\.?(eq|ne|lt|gt|le|ge)|cbn?z)$"),
+}
+LABEL_PATTERN = re.compile(r"^(L\d+):")
+
+
+@dataclass(frozen=True)
+class Loop:
+    instructions: int  # Per iteration
+    branches: int  # Branches and jumps per iteration
+
+
+def find_innermost_loops(assembly: str, target: str) -> List[Loop]:
+    """
+    Finds the backward branches of a listing and measures the innermost
+    loops they close.
+    """
+    branch = BRANCH_PATTERNS[target]
+    labels: Dict[str, int] = {}
+    instructions: List[str] = []  # Mnemonic and operands
+    ranges: List[range] = []
+
+    for line in assembly.splitlines():
+        label = LABEL_PATTERN.match(line)
+        if label:
+            labels[label.group(1)] = len(instructions)
+            continue
+        if not line.startswith("\t"):
+            continue
+        fields = line.split()
+        if fields[0].startswith(".") or fields[0] in NASM_DIRECTIVES:
+            continue
+        instructions.append(line.strip())
+        target_label = fields[-1]
+        if branch.match(fields[0]) and labels.get(target_label) is not None:
+            ranges.append(range(labels[target_label], len(instructions)))
+
+    loops: List[Loop] = []
+    for loop in ranges:
+        if any(
+            inner != loop and inner.start >= loop.start
+            and inner.stop <= loop.stop
+            for inner in ranges
+        ):
+            continue  # Not innermost
+        branches = sum(
+            1
+            for k in loop
+            if branch.match(instructions[k].split()[0])
+        )
+        loops.append(Loop(len(loop), branches))
+    return loops
+
+
+def compile_to_assembly(
+    keccc: Path, target: str, level: str, source: Path, output: Path
+) -> Optional[str]:
+    command = [
+        str(keccc),
+        f"-O{level}",
+        "--target", target,
+        "--emit", "asm",
+        "--output", str(output),
+        str(source),
+    ]
+    process = subprocess.run(command, capture_output=True, text=True)
+    if process.returncode != 0:
+        print(f"[FAIL] {' '.join(command)}", file=sys.stderr)
+        print(process.stderr, file=sys.stderr)
+        return None
+    return output.read_text()
+
+
+def main(argv: Sequence[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("build_root", type=Path)
+    args = parser.parse_args(list(argv))
+
+    keccc = args.build_root / "src" / "keccc"
+    if not keccc.exists():
+        print(f"[FATAL] keccc not found at {keccc}")
+        return 1
+
+    with tempfile.TemporaryDirectory(prefix="keccc-bench-") as tmp:
+        source = Path(tmp) / "loops.c"
+        output = Path(tmp) / "out.s"
+        source.write_text(PROGRAM)
+        for target in ("nasm", "aarch64"):
+            loops = {}
+            for level in ("0", "1"):
+                listing = compile_to_assembly(
+                    keccc, target, level, source, output
+                )
+                if listing is None:
+                    return 1
+                loops[level] = find_innermost_loops(listing, target)
+            if len(loops["0"]) != len(loops["1"]):
+                print(f"[FAIL] {target}: loops differ between -O0 and -O1")
+                return 1
+
+            print(f"{target}: instructions (branches) per iteration")
+            for index, (before, after) in enumerate(
+                zip(loops["0"], loops["1"])
+            ):
+                print(
+                    f"  loop {index + 1}: -O0 {before.instructions:3} "
+                    f"({before.branches}) -> -O1 {after.instructions:3} "
+                    f"({after.branches}), "
+                    f"{before.instructions - after.instructions} fewer"
+                )
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,109 @@
+// benchmarks/bench_scan.c
+
+// Scanner microbenchmark: tokenises a large, identifier-heavy source text
+// held in memory and reports tokens and bytes per second.
+// Usage: bench_scan [megabytes] [runs]
+
+#define extern_
+#include "data.h"
+#undef extern_
+#include "decl.h"
+
+#include <time.h>
+
+// Mix of keywords and identifiers that share their length and first or last
+// character with a keyword, so the keyword lookup sees both hits and misses.
+static const char *Words[] = {
+    "int",     "integer",     "intValue",  "char", "chars",    "character",
+    "long",    "longest",     "lung",      "void", "voids",    "vector",
+    "if",      "iff",         "is",        "else", "elsewise", "ease",
+    "while",   "whilst",      "whale",     "for",  "form",     "far",
+    "return",  "returned",    "retina",    "x",    "_tmp",     "counter",
+    "index_2", "symbolTable", "nextToken", "i",    "rn",       "wide",
+};
+
+/**
+ * generateSource - Build `size` bytes of identifier-heavy source text.
+ *
+ * @param size Approximate size of the text in bytes.
+ * @param length Receives the exact length.
+ *
+ * @return The text (malloc'd).
+ */
+static char *generateSource(size_t size, size_t *length) {
+    size_t wordCount = sizeof(Words) / sizeof(Words[0]);
+    size_t capacity = size + 64;
+    char *text = malloc(capacity);
+    size_t used = 0;
+    unsigned int seed = 12345;
+
+    if (text == NULL) {
+        fprintf(stderr, "out of memory\n");
+        exit(1);
+    }
+
+    while (used + 32 < size) {
+        // Small LCG, so every run tokenises the same text
+        seed = seed * 1103515245u + 12345u;
+        const char *word = Words[(seed >> 16) % wordCount];
+        size_t wordLength = strlen(word);
+
+        memcpy(text + used, word, wordLength);
+        used += wordLength;
+        text[used++] = (seed >> 8) % 8 == 0 ? '\n' : ' ';
+        if ((seed >> 12) % 6 == 0) {
+            memcpy(text + used, "= 42;\n", 6);
+            used += 6;
+        }
+    }
+
+    *length = used;
+    return text;
+}
+
+/**
+ * nowSeconds - Monotonic clock in seconds.
+ */
+static double nowSeconds(void) {
+    struct timespec ts;
+
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return ts.tv_sec + ts.tv_nsec / 1e9;
+}
+
+int main(int argc, char **argv) {
+    size_t megabytes = argc > 1 ? strtoul(argv[1], NULL, 10) : 16;
+    int runs = argc > 2 ? atoi(argv[2]) : 5;
+    size_t length;
+    char *text = generateSource(megabytes << 20, &length);
+    double best = 0;
+    long tokens = 0;
+    long keywords = 0;
+
+    for (int run = 0; run < runs; run++) {
+        struct token t;
+
+        InputCursor = text;
+        InputEnd = text + length;
+        Line = 1;
+        tokens = keywords = 0;
+
+        double start = nowSeconds();
+        while (scan(&t)) {
+            tokens++;
+            keywords += t.token >= T_VOID && t.token <= T_RETURN;
+        }
+        double elapsed = nowSeconds() - start;
+
+        if (run == 0 || elapsed < best)
+            best = elapsed;
+    }
+
+    printf("Input: %.2f MB, %ld tokens (%ld keywords), best of %d runs\n",
+           length / 1e6, tokens, keywords, runs);
+    printf("scan     best %7.1f ms  %7.1f Mtokens/s  %7.1f MB/s\n", best * 1e3,
+           tokens / best / 1e6, length / best / 1e6);
+
+    free(text);
+    return 0;
+}
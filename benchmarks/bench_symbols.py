@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Symbol table stress benchmark.
+
+Compiles generated programs with many globals and many locals per function
+at growing sizes and reports the compile time per symbol. With O(1) symbol
+insertion and lookup, the time per symbol stays flat as the program grows.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List
+
+
+@dataclass(frozen=True)
+class StressResult:
+    scale: float
+    symbols: int
+    seconds: float
+
+    @property
+    def microseconds_per_symbol(self) -> float:
+        return self.seconds * 1e6 / self.symbols
+
+
+def generate_program(globals_count: int, functions: int, locals_count: int) -> str:
+    """
+    Generates `globals_count` globals and `functions` functions with
+    `locals_count` locals each. Every symbol is declared once and referenced
+    at least once.
+    """
+    parts: List[str] = [f"int g{index};\n" for index in range(globals_count)]
+
+    for function in range(functions):
+        parts.append(f"int f{function}() {{\n")
+        parts.extend(f"    int l{index};\n" for index in range(locals_count))
+        for index in range(locals_count):
+            source = (function * locals_count + index) % globals_count
+            parts.append(f"    l{index} = g{source} + {index};\n")
+        parts.append(f"    return (l{locals_count - 1});\n}}\n\n")
+
+    parts.append("int main() {\n")
+    parts.extend(
+        f"    g{index} = g{(index * 7) % globals_count} + 1;\n"
+        for index in range(globals_count)
+    )
+    parts.append("    return (0);\n}\n")
+    return "".join(parts)
+
+
+def run_once(keccc: Path, target: str, source: Path, output: Path) -> float:
+    command = [
+        str(keccc),
+        "--target",
+        target,
+        "--emit",
+        "asm",
+        "-o",
+        str(output),
+        str(source),
+    ]
+    start = time.perf_counter()
+    process = subprocess.run(command, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if process.returncode != 0:
+        print(f"[FAIL] keccc --target {target} {source}", file=sys.stderr)
+        print(process.stderr, file=sys.stderr)
+        raise SystemExit(1)
+    return elapsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--target", choices=["nasm", "aarch64"], default="nasm")
+    parser.add_argument(
+        "--globals", type=int, default=100_000, help="globals at full scale"
+    )
+    parser.add_argument(
+        "--functions", type=int, default=10, help="functions at full scale"
+    )
+    parser.add_argument(
+        "--locals", type=int, default=10_000, help="locals per function"
+    )
+    parser.add_argument("--runs", type=int, default=3, help="runs per size")
+    parser.add_argument("build_root", type=Path)
+    args = parser.parse_args()
+
+    keccc = args.build_root / "src" / "keccc"
+    if not os.access(keccc, os.X_OK):
+        print(f"[FATAL] keccc not found at {keccc}")
+        return 1
+
+    results: List[StressResult] = []
+    with tempfile.TemporaryDirectory(prefix="keccc-bench-") as tmp:
+        work_dir = Path(tmp)
+        for scale in (0.25, 0.5, 1.0):
+            globals_count = max(1, int(args.globals * scale))
+            functions = max(1, int(args.functions * scale))
+            source = work_dir / f"stress-{scale}.c"
+            source.write_text(
+                generate_program(globals_count, functions, args.locals)
+            )
+
+            seconds = min(
+                run_once(keccc, args.target, source, work_dir / "out.s")
+                for _ in range(args.runs)
+            )
+            symbols = globals_count + functions * args.locals
+            results.append(StressResult(scale, symbols, seconds))
+            print(
+                f"{globals_count:8} globals {functions:4} x {args.locals} locals  "
+                f"best {seconds * 1e3:8.1f} ms  "
+                f"{results[-1].microseconds_per_symbol:6.2f} us/symbol"
+            )
+
+    growth = (
+        results[-1].microseconds_per_symbol / results[0].microseconds_per_symbol
+    )
+    print(f"Time per symbol, full vs quarter size: x{growth:.2f} (1.0 = linear)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
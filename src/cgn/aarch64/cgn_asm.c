@@ -0,0 +1,1384 @@
+// src/cgn/aarch64/cgn_asm.c
+
+#include "data.h"
+#include "decl.h"
+#include "elf.h"
+
+#include <stdint.h>
+#include <strings.h>
+
+/**
+ * NOTE:
+ * Built-in assembler for the AArch64 backend (--emit obj).
+ * (Target-specific layer)
+ *
+ * It reads back the GNU as text the aarch64* routines produce and encodes the
+ * fixed-width A64 instructions straight into an ELF64 relocatable object, so
+ * neither aarch64-linux-gnu-as nor a re-parse of out.s is needed.
+ * Only the subset keccc emits is understood:
+ * - directives: .text/.data/.bss/.section, .global/.globl/.extern,
+ *   .p2align/.align, .zero/.skip, .ascii/.asciz/.string,
+ *   .byte/.hword/.short/.word/.long/.quad/.xword
+ * - operands: x/w registers (sp, xzr, fp, lr), #immediates, labels,
+ *   :lo12:symbol, [xn], [xn, #imm], [xn, #imm]!, [xn], #imm, [xn, xm]
+ * - the integer instructions listed in assembleInstruction()
+ *
+ * Every instruction is 4 bytes, so labels are known after a single pass;
+ * branches to labels in the same section are patched at the end, and
+ * everything else becomes an R_AARCH64_* relocation.
+ */
+
+#define R_AARCH64_CONDBR19 280
+
+enum {
+    OPERAND_NONE,
+    OPERAND_REGISTER,
+    OPERAND_IMMEDIATE,
+    OPERAND_SYMBOL,   // Label (branch target)
+    OPERAND_LO12,     // :lo12:symbol
+    OPERAND_MEMORY,   // [xn, ...]
+    OPERAND_SHIFT,    // lsl #n (add/sub immediate, movz/movk)
+    OPERAND_CONDITION // eq, ne, ... (cset, csel)
+};
+
+enum {
+    ADDRESSING_OFFSET,    // [xn, #imm]
+    ADDRESSING_PRE_INDEX, // [xn, #imm]!
+    ADDRESSING_REGISTER,  // [xn, xm{, lsl #s}]
+};
+
+struct operand {
+    int kind;
+    int reg;       // Register number (31: sp or zr, depending on context)
+    bool is64;     // x register (vs w register)
+    bool isSP;     // sp/wsp rather than xzr/wzr
+    int64_t value; // Immediate, shift amount, condition, or offset
+    int symbol;    // OPERAND_SYMBOL / OPERAND_LO12 / memory :lo12:, or -1
+    int base;      // OPERAND_MEMORY: base register
+    int index;     // OPERAND_MEMORY: index register (ADDRESSING_REGISTER)
+    int addressing;
+};
+
+// Symbol reference resolved once all labels are known
+struct fixup {
+    int section;
+    uint64_t offset;
+    int symbol;
+    int64_t addend;
+    uint32_t type; // R_AARCH64_*
+};
+
+static struct elfObject Object;
+static int CurrentSection;
+static struct fixup *Fixups;
+static int FixupCount;
+static int FixupCapacity;
+static int AsmLine; // Line of the assembly text being assembled
+static char **Operands; // Operand texts of the current line
+static int OperandCapacity;
+
+static const char *conditionNames[] = {"eq", "ne", "cs", "cc", "mi", "pl",
+                                       "vs", "vc", "hi", "ls", "ge", "lt",
+                                       "gt", "le", "al", "nv"};
+
+/**
+ * asmError - Report an error in the assembly text and exit.
+ *
+ * @param message The error message.
+ * @param detail Additional detail (e.g. the offending token), or NULL.
+ */
+static void asmError(const char *message, const char *detail) {
+    fprintf(stderr, "Assembler error: %s%s%s, line %d\n", message,
+            detail ? ": " : "", detail ? detail : "", AsmLine);
+    exit(1);
+}
+
+/**
+ * NOTE:
+ * Lexical helpers
+ */
+static const char *skipSpaces(const char *p) {
+    while (*p == ' ' || *p == '\t') {
+        p++;
+    }
+    return p;
+}
+
+static bool isIdentifierChar(int c) {
+    return isalnum(c) || c == '_' || c == '.' || c == '$';
+}
+
+/**
+ * findCondition - Look up a condition code name (hs/lo are accepted too).
+ *
+ * @return The condition code (0-15), or -1.
+ */
+static int findCondition(const char *p, size_t length) {
+    if (length != 2)
+        return -1;
+    for (int i = 0; i < 16; i++) {
+        if (strncasecmp(p, conditionNames[i], 2) == 0)
+            return i;
+    }
+    if (strncasecmp(p, "hs", 2) == 0)
+        return 2;
+    if (strncasecmp(p, "lo", 2) == 0)
+        return 3;
+    return -1;
+}
+
+/**
+ * parseRegister - Parse a register name.
+ *
+ * @return true (filling reg/is64/isSP) if the word names a register.
+ */
+static bool parseRegister(const char *p, size_t length, struct operand *op) {
+    char name[8];
+    if (length == 0 || length >= sizeof(name))
+        return false;
+    for (size_t i = 0; i < length; i++) {
+        name[i] = (char)tolower((unsigned char)p[i]);
+    }
+    name[length] = '\0';
+
+    op->isSP = false;
+    if (strcmp(name, "sp") == 0 || strcmp(name, "wsp") == 0) {
+        op->reg = 31;
+        op->is64 = name[0] == 's';
+        op->isSP = true;
+        return true;
+    }
+    if (strcmp(name, "xzr") == 0 || strcmp(name, "wzr") == 0) {
+        op->reg = 31;
+        op->is64 = name[0] == 'x';
+        return true;
+    }
+    if (strcmp(name, "fp") == 0 || strcmp(name, "lr") == 0) {
+        op->reg = name[0] == 'f' ? 29 : 30;
+        op->is64 = true;
+        return true;
+    }
+    if ((name[0] == 'x' || name[0] == 'w') && isdigit((unsigned char)name[1])) {
+        char *end;
+        long n = strtol(name + 1, &end, 10);
+        if (*end != '\0' || n > 30)
+            return false;
+        op->reg = (int)n;
+        op->is64 = name[0] == 'x';
+        return true;
+    }
+    return false;
+}
+
+/**
+ * parseNumber - Parse an optionally '#'-prefixed, signed decimal or
+ * 0x-prefixed hexadecimal number.
+ *
+ * @param p Start of the number.
+ * @param end Receives the first character after the number.
+ *
+ * @return The value.
+ */
+static int64_t parseNumber(const char *p, const char **end) {
+    p = skipSpaces(p);
+    if (*p == '#')
+        p = skipSpaces(p + 1);
+
+    int sign = 1;
+    if (*p == '-' || *p == '+') {
+        sign = *p == '-' ? -1 : 1;
+        p++;
+    }
+
+    char *e;
+    bool hex = p[0] == '0' && (p[1] == 'x' || p[1] == 'X');
+    unsigned long long value = strtoull(p, &e, hex ? 16 : 10);
+    if (e == p)
+        asmError("expected a number", p);
+    *end = e;
+    return sign * (int64_t)value;
+}
+
+/**
+ * parseSymbolName - Parse a symbol name (e.g. after a ":lo12:" prefix).
+ *
+ * @return The symbol index.
+ */
+static int parseSymbolName(const char *p, const char **end) {
+    const char *start = p;
+    while (isIdentifierChar((unsigned char)*p)) {
+        p++;
+    }
+    if (p == start)
+        asmError("expected a symbol", start);
+    *end = p;
+    return elfSymbol(&Object, start, p - start);
+}
+
+/**
+ * parseMemory - Parse [xn], [xn, #imm], [xn, #imm]!, [xn, xm{, lsl #s}]
+ * and [xn, :lo12:symbol].
+ */
+static void parseMemory(const char *p, struct operand *op) {
+    struct operand r = {0};
+    const char *start;
+
+    op->kind = OPERAND_MEMORY;
+    op->addressing = ADDRESSING_OFFSET;
+    op->symbol = -1;
+    op->value = 0;
+
+    p = skipSpaces(p);
+    start = p;
+    while (isIdentifierChar((unsigned char)*p)) {
+        p++;
+    }
+    if (!parseRegister(start, p - start, &r) || !r.is64)
+        asmError("expected a base register", start);
+    op->base = r.reg;
+
+    p = skipSpaces(p);
+    if (*p == ',') {
+        p = skipSpaces(p + 1);
+        if (strncasecmp(p, ":lo12:", 6) == 0) {
+            op->symbol = parseSymbolName(p + 6, &p);
+        } else if (*p == '#' || *p == '-' || isdigit((unsigned char)*p)) {
+            op->value = parseNumber(p, &p);
+        } else {
+            start = p;
+            while (isIdentifierChar((unsigned char)*p)) {
+                p++;
+            }
+            if (!parseRegister(start, p - start, &r) || !r.is64 || r.isSP)
+                asmError("expected an offset register", start);
+            op->addressing = ADDRESSING_REGISTER;
+            op->index = r.reg;
+            p = skipSpaces(p);
+            if (*p == ',') {
+                p = skipSpaces(p + 1);
+                if (strncasecmp(p, "lsl", 3) != 0)
+                    asmError("expected lsl", p);
+                op->value = parseNumber(p + 3, &p);
+            }
+        }
+        p = skipSpaces(p);
+    }
+
+    if (*p != ']')
+        asmError("missing ]", p);
+    p = skipSpaces(p + 1);
+    if (*p == '!') {
+        if (op->addressing != ADDRESSING_OFFSET || op->symbol >= 0)
+            asmError("bad pre-index addressing", NULL);
+        op->addressing = ADDRESSING_PRE_INDEX;
+    }
+}
+
+/**
+ * parseOperand - Parse one operand.
+ */
+static void parseOperand(const char *p, struct operand *op) {
+    memset(op, 0, sizeof(*op));
+    op->symbol = -1;
+    p = skipSpaces(p);
+
+    if (*p == '[') {
+        parseMemory(p + 1, op);
+        return;
+    }
+    if (*p == '#')
+        p = skipSpaces(p + 1);
+    if (strncasecmp(p, ":lo12:", 6) == 0) {
+        op->kind = OPERAND_LO12;
+        op->symbol = parseSymbolName(p + 6, &p);
+        return;
+    }
+    if (*p == '-' || *p == '+' || isdigit((unsigned char)*p)) {
+        op->kind = OPERAND_IMMEDIATE;
+        op->value = parseNumber(p, &p);
+        return;
+    }
+
+    const char *start = p;
+    while (isIdentifierChar((unsigned char)*p)) {
+        p++;
+    }
+    size_t length = p - start;
+    if (length == 0)
+        asmError("bad operand", start);
+
+    if (parseRegister(start, length, op)) {
+        op->kind = OPERAND_REGISTER;
+        return;
+    }
+    if (length == 3 && strncasecmp(start, "lsl", 3) == 0) {
+        op->kind = OPERAND_SHIFT;
+        op->value = parseNumber(p, &p);
+        return;
+    }
+    int condition = findCondition(start, length);
+    if (condition >= 0) {
+        op->kind = OPERAND_CONDITION;
+        op->value = condition;
+        return;
+    }
+
+    op->kind = OPERAND_SYMBOL;
+    op->symbol = elfSymbol(&Object, start, length);
+    p = skipSpaces(p);
+    if (*p == '+' || *p == '-')
+        op->value = parseNumber(p, &p);
+}
+
+/**
+ * parseSymbolOperand - Parse an operand that can only be a symbol
+ * (optionally plus or minus an offset), so that names like "cc" or "lsl"
+ * are not read as condition codes or shifts.
+ */
+static void parseSymbolOperand(const char *p, struct operand *op) {
+    memset(op, 0, sizeof(*op));
+    op->kind = OPERAND_SYMBOL;
+    op->symbol = parseSymbolName(skipSpaces(p), &p);
+    p = skipSpaces(p);
+    if (*p == '+' || *p == '-')
+        op->value = parseNumber(p, &p);
+}
+
+/**
+ * isSymbolOperand - Tell whether an instruction's operand can only be a
+ * symbol: the target of b, bl, b.cond, cbz and cbnz, and the page of adrp.
+ *
+ * @param mnemonic Lower-case mnemonic.
+ * @param index Position of the operand.
+ */
+static bool isSymbolOperand(const char *mnemonic, int index) {
+    if (strcmp(mnemonic, "b") == 0 || strcmp(mnemonic, "bl") == 0)
+        return index == 0;
+    if (strcmp(mnemonic, "cbz") == 0 || strcmp(mnemonic, "cbnz") == 0 ||
+        strcmp(mnemonic, "adrp") == 0)
+        return index == 1;
+    if (mnemonic[0] == 'b' && strlen(mnemonic) >= 3) {
+        const char *cond = mnemonic + (mnemonic[1] == '.' ? 2 : 1);
+        return index == 0 && findCondition(cond, strlen(cond)) >= 0;
+    }
+    return false;
+}
+
+/**
+ * NOTE:
+ * Encoding helpers
+ */
+
+/**
+ * emitWord - Append one instruction word (little-endian) to the current
+ * section.
+ */
+static void emitWord(uint32_t word) {
+    unsigned char bytes[4] = {
+        (unsigned char)word,
+        (unsigned char)(word >> 8),
+        (unsigned char)(word >> 16),
+        (unsigned char)(word >> 24),
+    };
+    elfAppend(&Object, CurrentSection, bytes, 4);
+}
+
+/**
+ * addFixup - Remember a symbol reference in the word about to be emitted.
+ */
+static void addFixup(int symbol, int64_t addend, uint32_t type) {
+    if (FixupCount == FixupCapacity) {
+        FixupCapacity = FixupCapacity ? FixupCapacity * 2 : 256;
+        Fixups = realloc(Fixups, FixupCapacity * sizeof(struct fixup));
+        if (Fixups == NULL)
+            asmError("out of memory", NULL);
+    }
+    Fixups[FixupCount++] = (struct fixup){
+        .section = CurrentSection,
+        .offset = Object.sections[CurrentSection].size,
+        .symbol = symbol,
+        .addend = addend,
+        .type = type,
+    };
+}
+
+static struct operand *expectRegister(struct operand *op) {
+    if (op->kind != OPERAND_REGISTER)
+        asmError("expected a register", NULL);
+    return op;
+}
+
+/**
+ * sizeFlag - The sf bit (bit 31) for an instruction on this register.
+ */
+static uint32_t sizeFlag(const struct operand *op) {
+    return op->is64 ? 0x80000000u : 0;
+}
+
+/**
+ * encodeBitmask - Encode a logical immediate (N:immr:imms).
+ *
+ * @return true if value is a valid bitmask immediate for the width.
+ */
+static bool encodeBitmask(uint64_t value, bool is64, uint32_t *out) {
+    if (!is64) {
+        value &= 0xffffffffu;
+        value |= value << 32;
+    }
+    if (value == 0 || value == ~0ull)
+        return false;
+
+    // Smallest repeating element
+    int size = 64;
+    while (size > 2) {
+        int half = size / 2;
+        uint64_t mask = (1ull << half) - 1;
+        if ((value & mask) != ((value >> half) & mask))
+            break;
+        size = half;
+    }
+    uint64_t mask = size == 64 ? ~0ull : (1ull << size) - 1;
+    uint64_t element = value & mask;
+    int ones = __builtin_popcountll(element);
+    uint64_t run = (1ull << ones) - 1;
+
+    // element must be a run of ones rotated right by some amount
+    for (int r = 0; r < size; r++) {
+        uint64_t rotated =
+            r == 0 ? run : ((run >> r) | (run << (size - r))) & mask;
+        if (rotated == element) {
+            uint32_t n = size == 64 ? 1 : 0;
+            uint32_t imms = ((~(uint32_t)(size * 2 - 1)) & 0x3f) | (ones - 1);
+            *out = (n << 22) | ((uint32_t)r << 16) | (imms << 10);
+            return true;
+        }
+    }
+    return false;
+}
+
+/**
+ * encodeAddSubImmediate - add/sub/adds/subs with a 12-bit immediate
+ * (optionally shifted by 12). Negative immediates flip add and sub.
+ */
+static void encodeAddSubImmediate(bool sub, bool setFlags, int rd,
+                                  const struct operand *rn, int64_t imm,
+                                  int shift) {
+    if (imm < 0) {
+        imm = -imm;
+        sub = !sub;
+    }
+    if (shift == 0 && imm > 0xfff && (imm & 0xfff) == 0) {
+        imm >>= 12;
+        shift = 12;
+    }
+    if (imm > 0xfff || (shift != 0 && shift != 12))
+        asmError("immediate out of range for add/sub", NULL);
+
+    uint32_t word = 0x11000000u | sizeFlag(rn);
+    if (sub)
+        word |= 0x40000000u;
+    if (setFlags)
+        word |= 0x20000000u;
+    if (shift == 12)
+        word |= 1u << 22;
+    emitWord(word | ((uint32_t)imm << 10) | ((uint32_t)rn->reg << 5) |
+             (uint32_t)rd);
+}
+
+/**
+ * encodeAddSubRegister - add/sub/adds/subs with a register operand.
+ * Uses the extended-register form when sp is involved.
+ */
+static void encodeAddSubRegister(bool sub, bool setFlags,
+                                 const struct operand *rd,
+                                 const struct operand *rn,
+                                 const struct operand *rm) {
+    uint32_t word = sizeFlag(rn) | (sub ? 0x40000000u : 0) |
+                    (setFlags ? 0x20000000u : 0);
+    if (rd->isSP || rn->isSP) {
+        // Extended register, UXTX (64-bit) / UXTW (32-bit), no shift
+        word |= 0x0B200000u | ((rn->is64 ? 3u : 2u) << 13);
+    } else {
+        word |= 0x0B000000u;
+    }
+    emitWord(word | ((uint32_t)rm->reg << 16) | ((uint32_t)rn->reg << 5) |
+             (uint32_t)rd->reg);
+}
+
+/**
+ * encodeMoveWide - movz/movn/movk.
+ */
+static void encodeMoveWide(uint32_t opc, const struct operand *rd,
+                           uint64_t imm16, int shift) {
+    if (imm16 > 0xffff || shift % 16 != 0 || shift > (rd->is64 ? 48 : 16))
+        asmError("bad wide immediate", NULL);
+    emitWord(opc | sizeFlag(rd) | ((uint32_t)(shift / 16) << 21) |
+             ((uint32_t)imm16 << 5) | (uint32_t)rd->reg);
+}
+
+/**
+ * encodeMoveImmediate - mov rd, #imm as a single movz, movn or orr.
+ */
+static void encodeMoveImmediate(const struct operand *rd, int64_t value) {
+    uint64_t v = (uint64_t)value;
+    int width = rd->is64 ? 64 : 32;
+    if (!rd->is64)
+        v &= 0xffffffffu;
+    uint64_t inverted = rd->is64 ? ~v : (~v & 0xffffffffu);
+
+    for (int shift = 0; shift < width; shift += 16) {
+        if ((v & ~(0xffffull << shift)) == 0) {
+            encodeMoveWide(0x52800000u, rd, (v >> shift) & 0xffff, shift);
+            return;
+        }
+    }
+    for (int shift = 0; shift < width; shift += 16) {
+        if ((inverted & ~(0xffffull << shift)) == 0) {
+            encodeMoveWide(0x12800000u, rd, (inverted >> shift) & 0xffff,
+                           shift);
+            return;
+        }
+    }
+    uint32_t bitmask;
+    if (encodeBitmask(v, rd->is64, &bitmask)) {
+        // orr rd, zr, #imm
+        emitWord(0x32000000u | sizeFlag(rd) | bitmask | (31u << 5) |
+                 (uint32_t)rd->reg);
+        return;
+    }
+    asmError("immediate cannot be moved in one instruction", NULL);
+}
+
+/**
+ * encodeLoadStore - ldr/str family with immediate, pre-index, post-index,
+ * register and :lo12: addressing.
+ *
+ * @param size Access size in bytes (1, 2, 4, 8).
+ * @param opc The opc field (0: store, 1: load, 2: load signed to 64-bit,
+ * 3: load signed to 32-bit).
+ * @param rt Data register.
+ * @param mem Memory operand.
+ * @param post Post-index immediate operand, or NULL.
+ */
+static void encodeLoadStore(int size, uint32_t opc, const struct operand *rt,
+                            const struct operand *mem,
+                            const struct operand *post) {
+    uint32_t sizeBits = (uint32_t)__builtin_ctz(size) << 30;
+    uint32_t base = 0x38000000u | sizeBits | (opc << 22) |
+                    ((uint32_t)mem->base << 5) | (uint32_t)rt->reg;
+
+    if (mem->kind != OPERAND_MEMORY)
+        asmError("expected a memory operand", NULL);
+
+    if (post != NULL) {
+        if (post->kind != OPERAND_IMMEDIATE || mem->value != 0 ||
+            mem->addressing != ADDRESSING_OFFSET || post->value < -256 ||
+            post->value > 255)
+            asmError("bad post-index addressing", NULL);
+        emitWord(base | (((uint32_t)post->value & 0x1ff) << 12) | (1u << 10));
+        return;
+    }
+
+    if (mem->addressing == ADDRESSING_REGISTER) {
+        if (mem->value != 0 && mem->value != __builtin_ctz(size))
+            asmError("bad register offset shift", NULL);
+        emitWord(base | 0x00200800u | ((uint32_t)mem->index << 16) |
+                 (3u << 13) | (mem->value != 0 ? 1u << 12 : 0));
+        return;
+    }
+
+    if (mem->addressing == ADDRESSING_PRE_INDEX) {
+        if (mem->value < -256 || mem->value > 255)
+            asmError("pre-index offset out of range", NULL);
+        emitWord(base | (((uint32_t)mem->value & 0x1ff) << 12) | (3u << 10));
+        return;
+    }
+
+    if (mem->symbol >= 0) {
+        static const uint32_t lo12[] = {
+            R_AARCH64_LDST8_ABS_LO12_NC, R_AARCH64_LDST16_ABS_LO12_NC, 0,
+            R_AARCH64_LDST32_ABS_LO12_NC, 0, 0, 0,
+            R_AARCH64_LDST64_ABS_LO12_NC};
+        addFixup(mem->symbol, 0, lo12[size - 1]);
+        emitWord(base | 0x01000000u);
+        return;
+    }
+
+    int64_t offset = mem->value;
+    if (offset >= 0 && offset % size == 0 && offset / size <= 0xfff) {
+        // Unsigned, scaled offset
+        emitWord(base | 0x01000000u | ((uint32_t)(offset / size) << 10));
+    } else if (offset >= -256 && offset <= 255) {
+        // Unscaled offset (ldur/stur)
+        emitWord(base | (((uint32_t)offset & 0x1ff) << 12));
+    } else {
+        asmError("load/store offset out of range", NULL);
+    }
+}
+
+/**
+ * encodeLoadStorePair - stp/ldp with offset, pre-index or post-index.
+ */
+static void encodeLoadStorePair(bool load, const struct operand *rt1,
+                                const struct operand *rt2,
+                                const struct operand *mem,
+                                const struct operand *post) {
+    int scale = rt1->is64 ? 8 : 4;
+    uint32_t word = (rt1->is64 ? 0xA8000000u : 0x28000000u) |
+                    (load ? 1u << 22 : 0) | ((uint32_t)rt2->reg << 10) |
+                    ((uint32_t)mem->base << 5) | (uint32_t)rt1->reg;
+    int64_t offset = mem->value;
+
+    if (mem->kind != OPERAND_MEMORY || mem->symbol >= 0 ||
+        mem->addressing == ADDRESSING_REGISTER)
+        asmError("bad pair addressing", NULL);
+
+    if (post != NULL) {
+        if (post->kind != OPERAND_IMMEDIATE || mem->value != 0)
+            asmError("bad post-index addressing", NULL);
+        offset = post->value;
+        word |= 1u << 23; // post-index
+    } else if (mem->addressing == ADDRESSING_PRE_INDEX) {
+        word |= 3u << 23; // pre-index
+    } else {
+        word |= 2u << 23; // signed offset
+    }
+
+    if (offset % scale != 0 || offset / scale < -64 || offset / scale > 63)
+        asmError("pair offset out of range", NULL);
+    emitWord(word | (((uint32_t)(offset / scale) & 0x7f) << 15));
+}
+
+/**
+ * encodeBranch - b, bl, b.cond, cbz, cbnz to a label.
+ */
+static void encodeBranch(uint32_t word, const struct operand *target,
+                         uint32_t type) {
+    if (target->kind != OPERAND_SYMBOL)
+        asmError("expected a branch target", NULL);
+    addFixup(target->symbol, target->value, type);
+    emitWord(word);
+}
+
+/**
+ * assembleInstruction - Encode one instruction.
+ *
+ * @param mnemonic Lower-case mnemonic.
+ * @param ops Parsed operands.
+ * @param count Number of operands.
+ */
+static void assembleInstruction(const char *mnemonic, struct operand *ops,
+                                int count) {
+    struct operand *a = &ops[0];
+    struct operand *b = &ops[1];
+    struct operand *c = &ops[2];
+
+    if (strcmp(mnemonic, "ret") == 0) {
+        int rn = count == 1 ? expectRegister(a)->reg : 30;
+        emitWord(0xD65F0000u | ((uint32_t)rn << 5));
+        return;
+    }
+    if (strcmp(mnemonic, "nop") == 0) {
+        emitWord(0xD503201Fu);
+        return;
+    }
+    if (strcmp(mnemonic, "svc") == 0) {
+        emitWord(0xD4000001u | (((uint32_t)a->value & 0xffff) << 5));
+        return;
+    }
+
+    // Branches
+    if (strcmp(mnemonic, "b") == 0) {
+        encodeBranch(0x14000000u, a, R_AARCH64_JUMP26);
+        return;
+    }
+    if (strcmp(mnemonic, "bl") == 0) {
+        encodeBranch(0x94000000u, a, R_AARCH64_CALL26);
+        return;
+    }
+    if (strcmp(mnemonic, "br") == 0 || strcmp(mnemonic, "blr") == 0) {
+        uint32_t word = mnemonic[1] == 'r' ? 0xD61F0000u : 0xD63F0000u;
+        emitWord(word | ((uint32_t)expectRegister(a)->reg << 5));
+        return;
+    }
+    if (mnemonic[0] == 'b' && strlen(mnemonic) >= 3) {
+        // b.cond or bcond (beq, bne, ...)
+        const char *cond = mnemonic + (mnemonic[1] == '.' ? 2 : 1);
+        int code = findCondition(cond, strlen(cond));
+        if (code >= 0) {
+            encodeBranch(0x54000000u | (uint32_t)code, a, R_AARCH64_CONDBR19);
+            return;
+        }
+    }
+    if (strcmp(mnemonic, "cbz") == 0 || strcmp(mnemonic, "cbnz") == 0) {
+        uint32_t word = 0x34000000u | sizeFlag(expectRegister(a)) |
+                        (mnemonic[2] == 'n' ? 1u << 24 : 0) |
+                        (uint32_t)a->reg;
+        encodeBranch(word, b, R_AARCH64_CONDBR19);
+        return;
+    }
+
+    // Address generation
+    if (strcmp(mnemonic, "adrp") == 0) {
+        if (b->kind != OPERAND_SYMBOL)
+            asmError("expected a symbol", mnemonic);
+        addFixup(b->symbol, b->value, R_AARCH64_ADR_PREL_PG_HI21);
+        emitWord(0x90000000u | (uint32_t)expectRegister(a)->reg);
+        return;
+    }
+
+    // Moves
+    if (strcmp(mnemonic, "mov") == 0) {
+        expectRegister(a);
+        if (b->kind == OPERAND_IMMEDIATE) {
+            encodeMoveImmediate(a, b->value);
+        } else if (a->isSP || expectRegister(b)->isSP) {
+            // mov to/from sp is add rd, rn, #0
+            encodeAddSubImmediate(false, false, a->reg, b, 0, 0);
+        } else {
+            // orr rd, zr, rm
+            emitWord(0x2A000000u | sizeFlag(a) | ((uint32_t)b->reg << 16) |
+                     (31u << 5) | (uint32_t)a->reg);
+        }
+        return;
+    }
+    if (strcmp(mnemonic, "movz") == 0 || strcmp(mnemonic, "movn") == 0 ||
+        strcmp(mnemonic, "movk") == 0) {
+        static const uint32_t opcodes[] = {0x52800000u, 0x12800000u,
+                                           0x72800000u};
+        int which = mnemonic[3] == 'z' ? 0 : mnemonic[3] == 'n' ? 1 : 2;
+        int shift = 0;
+        if (count == 3) {
+            if (c->kind != OPERAND_SHIFT)
+                asmError("expected lsl", mnemonic);
+            shift = (int)c->value;
+        }
+        if (b->kind != OPERAND_IMMEDIATE)
+            asmError("expected an immediate", mnemonic);
+        encodeMoveWide(opcodes[which], expectRegister(a), (uint64_t)b->value,
+                       shift);
+        return;
+    }
+
+    // Arithmetic
+    if (strcmp(mnemonic, "add") == 0 || strcmp(mnemonic, "sub") == 0 ||
+        strcmp(mnemonic, "adds") == 0 || strcmp(mnemonic, "subs") == 0) {
+        bool sub = mnemonic[0] == 's';
+        bool setFlags = mnemonic[3] == 's';
+        if (count < 3)
+            asmError("expected three operands", mnemonic);
+        expectRegister(a);
+        expectRegister(b);
+        if (c->kind == OPERAND_IMMEDIATE) {
+            int shift = count == 4 && ops[3].kind == OPERAND_SHIFT
+                            ? (int)ops[3].value
+                            : 0;
+            encodeAddSubImmediate(sub, setFlags, a->reg, b, c->value, shift);
+        } else if (c->kind == OPERAND_LO12 && !sub && !setFlags) {
+            addFixup(c->symbol, c->value, R_AARCH64_ADD_ABS_LO12_NC);
+            encodeAddSubImmediate(false, false, a->reg, b, 0, 0);
+        } else {
+            encodeAddSubRegister(sub, setFlags, a, b, expectRegister(c));
+        }
+        return;
+    }
+    if (strcmp(mnemonic, "cmp") == 0 || strcmp(mnemonic, "cmn") == 0) {
+        bool sub = mnemonic[2] == 'p';
+        struct operand zr = {.kind = OPERAND_REGISTER, .reg = 31,
+                             .is64 = expectRegister(a)->is64};
+        if (b->kind == OPERAND_IMMEDIATE)
+            encodeAddSubImmediate(sub, true, 31, a, b->value, 0);
+        else
+            encodeAddSubRegister(sub, true, &zr, a, expectRegister(b));
+        return;
+    }
+    if (strcmp(mnemonic, "neg") == 0) {
+        struct operand zr = {.kind = OPERAND_REGISTER, .reg = 31,
+                             .is64 = expectRegister(a)->is64};
+        encodeAddSubRegister(true, false, a, &zr, expectRegister(b));
+        return;
+    }
+
+    // Multiply and divide
+    static const struct {
+        const char *name;
+        uint32_t opcode;
+    } threeRegister[] = {
+        {"mul", 0x1B007C00u},   {"smulh", 0x9B407C00u},
+        {"umulh", 0x9BC07C00u}, {"sdiv", 0x1AC00C00u},
+        {"udiv", 0x1AC00800u},  {"lslv", 0x1AC02000u},
+        {"lsrv", 0x1AC02400u},  {"asrv", 0x1AC02800u},
+    };
+    for (size_t i = 0; i < sizeof(threeRegister) / sizeof(threeRegister[0]);
+         i++) {
+        if (strcmp(mnemonic, threeRegister[i].name) != 0)
+            continue;
+        if (count != 3)
+            asmError("expected three operands", mnemonic);
+        emitWord(threeRegister[i].opcode | sizeFlag(expectRegister(a)) |
+                 ((uint32_t)expectRegister(c)->reg << 16) |
+                 ((uint32_t)expectRegister(b)->reg << 5) | (uint32_t)a->reg);
+        return;
+    }
+    if (strcmp(mnemonic, "madd") == 0 || strcmp(mnemonic, "msub") == 0) {
+        if (count != 4)
+            asmError("expected four operands", mnemonic);
+        emitWord(0x1B000000u | (mnemonic[1] == 's' ? 1u << 15 : 0) |
+                 sizeFlag(expectRegister(a)) |
+                 ((uint32_t)expectRegister(c)->reg << 16) |
+                 ((uint32_t)expectRegister(&ops[3])->reg << 10) |
+                 ((uint32_t)expectRegister(b)->reg << 5) | (uint32_t)a->reg);
+        return;
+    }
+
+    // Shifts: immediate forms are bitfield moves, register forms *v
+    if (strcmp(mnemonic, "lsl") == 0 || strcmp(mnemonic, "lsr") == 0 ||
+        strcmp(mnemonic, "asr") == 0) {
+        if (count != 3)
+            asmError("expected three operands", mnemonic);
+        expectRegister(a);
+        expectRegister(b);
+        if (c->kind == OPERAND_REGISTER) {
+            uint32_t op2 = mnemonic[0] == 'a'   ? 0x2800u
+                           : mnemonic[1] == 's' && mnemonic[2] == 'l'
+                               ? 0x2000u
+                               : 0x2400u;
+            emitWord(0x1AC00000u | op2 | sizeFlag(a) |
+                     ((uint32_t)c->reg << 16) | ((uint32_t)b->reg << 5) |
+                     (uint32_t)a->reg);
+            return;
+        }
+        int width = a->is64 ? 64 : 32;
+        int shift = (int)c->value;
+        if (c->kind != OPERAND_IMMEDIATE || shift < 0 || shift >= width)
+            asmError("bad shift amount", mnemonic);
+        uint32_t immr, imms;
+        if (strcmp(mnemonic, "lsl") == 0) {
+            immr = (uint32_t)((width - shift) % width);
+            imms = (uint32_t)(width - 1 - shift);
+        } else {
+            immr = (uint32_t)shift;
+            imms = (uint32_t)(width - 1);
+        }
+        uint32_t opcode = mnemonic[0] == 'a' ? 0x13000000u : 0x53000000u;
+        emitWord(opcode | (a->is64 ? 0x80400000u : 0) | (immr << 16) |
+                 (imms << 10) | ((uint32_t)b->reg << 5) | (uint32_t)a->reg);
+        return;
+    }
+
+    // Extensions (sbfm/ubfm aliases)
+    static const struct {
+        const char *name;
+        uint32_t opcode;
+        uint32_t imms;
+    } extensions[] = {
+        {"sxtb", 0x13000000u, 7},  {"sxth", 0x13000000u, 15},
+        {"sxtw", 0x13000000u, 31}, {"uxtb", 0x53000000u, 7},
+        {"uxth", 0x53000000u, 15},
+    };
+    for (size_t i = 0; i < sizeof(extensions) / sizeof(extensions[0]); i++) {
+        if (strcmp(mnemonic, extensions[i].name) != 0)
+            continue;
+        uint32_t sf = expectRegister(a)->is64 ? 0x80400000u : 0;
+        emitWord(extensions[i].opcode | sf | (extensions[i].imms << 10) |
+                 ((uint32_t)expectRegister(b)->reg << 5) | (uint32_t)a->reg);
+        return;
+    }
+
+    // Logical
+    static const struct {
+        const char *name;
+        uint32_t opc;  // Bits 30:29
+        bool inverted; // N bit of the shifted-register form
+    } logical[] = {
+        {"and", 0, false}, {"orr", 1, false}, {"eor", 2, false},
+        {"ands", 3, false}, {"bic", 0, true}, {"orn", 1, true},
+        {"eon", 2, true},  {"bics", 3, true},
+    };
+    for (size_t i = 0; i < sizeof(logical) / sizeof(logical[0]); i++) {
+        if (strcmp(mnemonic, logical[i].name) != 0)
+            continue;
+        if (count != 3)
+            asmError("expected three operands", mnemonic);
+        expectRegister(a);
+        expectRegister(b);
+        uint32_t opc = logical[i].opc << 29;
+        if (c->kind == OPERAND_IMMEDIATE && !logical[i].inverted) {
+            uint32_t bitmask;
+            if (!encodeBitmask((uint64_t)c->value, a->is64, &bitmask))
+                asmError("immediate is not a valid bitmask", mnemonic);
+            emitWord(0x12000000u | opc | sizeFlag(a) | bitmask |
+                     ((uint32_t)b->reg << 5) | (uint32_t)a->reg);
+        } else {
+            emitWord(0x0A000000u | opc | sizeFlag(a) |
+                     (logical[i].inverted ? 1u << 21 : 0) |
+                     ((uint32_t)expectRegister(c)->reg << 16) |
+                     ((uint32_t)b->reg << 5) | (uint32_t)a->reg);
+        }
+        return;
+    }
+    if (strcmp(mnemonic, "mvn") == 0) {
+        // orn rd, zr, rm
+        emitWord(0x2A200000u | sizeFlag(expectRegister(a)) |
+                 ((uint32_t)expectRegister(b)->reg << 16) | (31u << 5) |
+                 (uint32_t)a->reg);
+        return;
+    }
+    if (strcmp(mnemonic, "tst") == 0) {
+        struct operand ands[3] = {{.kind = OPERAND_REGISTER, .reg = 31,
+                                   .is64 = expectRegister(a)->is64},
+                                  *a, *b};
+        assembleInstruction("ands", ands, 3);
+        return;
+    }
+
+    // Conditional select
+    if (strcmp(mnemonic, "cset") == 0) {
+        if (count != 2 || b->kind != OPERAND_CONDITION)
+            asmError("expected a condition", mnemonic);
+        // csinc rd, zr, zr, invert(cond)
+        emitWord(0x1A800400u | sizeFlag(expectRegister(a)) | (31u << 16) |
+                 ((uint32_t)(b->value ^ 1) << 12) | (31u << 5) |
+                 (uint32_t)a->reg);
+        return;
+    }
+    if (strcmp(mnemonic, "csel") == 0 || strcmp(mnemonic, "csinc") == 0) {
+        if (count != 4 || ops[3].kind != OPERAND_CONDITION)
+            asmError("expected a condition", mnemonic);
+        emitWord((mnemonic[2] == 'e' ? 0x1A800000u : 0x1A800400u) |
+                 sizeFlag(expectRegister(a)) |
+                 ((uint32_t)expectRegister(c)->reg << 16) |
+                 ((uint32_t)ops[3].value << 12) |
+                 ((uint32_t)expectRegister(b)->reg << 5) | (uint32_t)a->reg);
+        return;
+    }
+
+    // Loads and stores
+    static const struct {
+        const char *name;
+        int size; // 0: size of the register
+        uint32_t opc;
+    } loadStores[] = {
+        {"ldr", 0, 1},   {"str", 0, 0},   {"ldrb", 1, 1},  {"strb", 1, 0},
+        {"ldrh", 2, 1},  {"strh", 2, 0},  {"ldrsw", 4, 2}, {"ldrsb", 1, 2},
+        {"ldrsh", 2, 2}, {"ldur", 0, 1},  {"stur", 0, 0},  {"ldurb", 1, 1},
+        {"sturb", 1, 0}, {"ldursw", 4, 2},
+    };
+    for (size_t i = 0; i < sizeof(loadStores) / sizeof(loadStores[0]); i++) {
+        if (strcmp(mnemonic, loadStores[i].name) != 0)
+            continue;
+        if (count != 2 && count != 3)
+            asmError("expected two operands", mnemonic);
+        expectRegister(a);
+        int size = loadStores[i].size ? loadStores[i].size : (a->is64 ? 8 : 4);
+        uint32_t opc = loadStores[i].opc;
+        if (opc == 2 && !a->is64)
+            opc = 3; // Sign-extend into a w register
+        encodeLoadStore(size, opc, a, b, count == 3 ? c : NULL);
+        return;
+    }
+    if (strcmp(mnemonic, "stp") == 0 || strcmp(mnemonic, "ldp") == 0) {
+        if (count != 3 && count != 4)
+            asmError("expected three operands", mnemonic);
+        encodeLoadStorePair(mnemonic[0] == 'l', expectRegister(a),
+                            expectRegister(b), c,
+                            count == 4 ? &ops[3] : NULL);
+        return;
+    }
+
+    asmError("unsupported instruction", mnemonic);
+}
+
+/**
+ * patchBranch - Store a resolved branch displacement into its instruction.
+ */
+static void patchBranch(struct fixup *f, int64_t displacement) {
+    unsigned char *field = Object.sections[f->section].data + f->offset;
+    uint32_t word = (uint32_t)field[0] | ((uint32_t)field[1] << 8) |
+                    ((uint32_t)field[2] << 16) | ((uint32_t)field[3] << 24);
+    int64_t units = displacement / 4;
+
+    if (f->type == R_AARCH64_CONDBR19) {
+        if (units < -(1 << 18) || units >= (1 << 18))
+            asmError("conditional branch out of range", NULL);
+        word |= ((uint32_t)units & 0x7ffff) << 5;
+    } else {
+        if (units < -(1 << 25) || units >= (1 << 25))
+            asmError("branch out of range", NULL);
+        word |= (uint32_t)units & 0x3ffffff;
+    }
+
+    for (int b = 0; b < 4; b++) {
+        field[b] = (unsigned char)(word >> (8 * b));
+    }
+}
+
+/**
+ * resolveFixups - Patch branches to labels in the same section, and turn
+ * the rest into relocations. Undefined symbols are external (as in GNU as).
+ */
+static void resolveFixups(void) {
+    for (int i = 0; i < FixupCount; i++) {
+        struct fixup *f = &Fixups[i];
+        struct elfSymbol *sym = &Object.symbols[f->symbol];
+        bool branch = f->type == R_AARCH64_JUMP26 ||
+                      f->type == R_AARCH64_CALL26 ||
+                      f->type == R_AARCH64_CONDBR19;
+
+        if (branch && sym->section == f->section) {
+            patchBranch(f, (int64_t)sym->value + f->addend -
+                               (int64_t)f->offset);
+            continue;
+        }
+        if (sym->section == -1)
+            sym->isGlobal = true;
+        elfAddRelocation(&Object, f->section, f->offset, f->symbol, f->type,
+                         f->addend);
+    }
+}
+
+/**
+ * addOperand - Store an operand's text at the given index of Operands.
+ */
+static void addOperand(int index, char *text) {
+    if (index == OperandCapacity) {
+        OperandCapacity = OperandCapacity ? OperandCapacity * 2 : 16;
+        Operands = realloc(Operands, OperandCapacity * sizeof(char *));
+        if (Operands == NULL)
+            asmError("out of memory", NULL);
+    }
+    Operands[index] = text;
+}
+
+/**
+ * splitOperands - Split an operand list at top-level commas.
+ * The operands are stored in the growable Operands array.
+ *
+ * @return Number of operands.
+ */
+static int splitOperands(char *p) {
+    int count = 0;
+    int depth = 0;
+    bool quoted = false;
+
+    p = (char *)skipSpaces(p);
+    if (*p == '\0')
+        return 0;
+
+    addOperand(count++, p);
+    for (; *p != '\0'; p++) {
+        if (quoted) {
+            if (*p == '\\' && p[1] != '\0')
+                p++;
+            else if (*p == '"')
+                quoted = false;
+        } else if (*p == '"')
+            quoted = true;
+        else if (*p == '[')
+            depth++;
+        else if (*p == ']')
+            depth--;
+        else if (depth == 0 && *p == ',') {
+            *p = '\0';
+            addOperand(count++, (char *)skipSpaces(p + 1));
+        }
+    }
+    return count;
+}
+
+/**
+ * assembleString - Handle .ascii/.asciz with GNU as escapes.
+ */
+static void assembleString(const char *p, bool terminate) {
+    p = skipSpaces(p);
+    if (*p != '"')
+        asmError("expected a string", p);
+    p++;
+
+    while (*p != '"') {
+        unsigned char c = (unsigned char)*p++;
+        if (c == '\0')
+            asmError("unterminated string", NULL);
+        if (c == '\\') {
+            c = (unsigned char)*p++;
+            switch (c) {
+            case 'n':
+                c = '\n';
+                break;
+            case 't':
+                c = '\t';
+                break;
+            case 'r':
+                c = '\r';
+                break;
+            case 'b':
+                c = '\b';
+                break;
+            case 'f':
+                c = '\f';
+                break;
+            case 'x': {
+                char *end;
+                c = (unsigned char)strtoul(p, &end, 16);
+                p = end;
+                break;
+            }
+            default:
+                if (c >= '0' && c <= '7') {
+                    int value = c - '0';
+                    for (int i = 0; i < 2 && *p >= '0' && *p <= '7'; i++) {
+                        value = value * 8 + (*p++ - '0');
+                    }
+                    c = (unsigned char)value;
+                }
+                // '\\', '"' and anything else stand for themselves
+                break;
+            }
+        }
+        elfAppend(&Object, CurrentSection, &c, 1);
+    }
+    if (terminate)
+        elfAppend(&Object, CurrentSection, "", 1);
+}
+
+/**
+ * assembleData - Handle .byte/.hword/.word/.quad and their aliases.
+ */
+static void assembleData(int size, char **items, int count) {
+    for (int i = 0; i < count; i++) {
+        struct operand op;
+        const char *item = skipSpaces(items[i]);
+        if (isalpha((unsigned char)*item) || *item == '_' || *item == '.') {
+            parseSymbolOperand(item, &op);
+        } else {
+            parseOperand(item, &op);
+        }
+        if (op.kind == OPERAND_SYMBOL && size == 8) {
+            addFixup(op.symbol, op.value, R_AARCH64_ABS64);
+            elfReserve(&Object, CurrentSection, 8);
+        } else if (op.kind == OPERAND_IMMEDIATE) {
+            unsigned char bytes[8];
+            for (int b = 0; b < size; b++) {
+                bytes[b] = (unsigned char)((uint64_t)op.value >> (8 * b));
+            }
+            elfAppend(&Object, CurrentSection, bytes, size);
+        } else {
+            asmError("bad data item", items[i]);
+        }
+    }
+}
+
+/**
+ * assembleDirective - Handle an assembler directive.
+ *
+ * @param name Lower-case directive name, including the leading dot.
+ * @param rest The text following the directive name.
+ */
+static void assembleDirective(const char *name, char *rest) {
+    const char *end;
+
+    if (strcmp(name, ".text") == 0 || strcmp(name, ".data") == 0 ||
+        strcmp(name, ".bss") == 0) {
+        CurrentSection = elfSection(&Object, name);
+        return;
+    }
+    if (strcmp(name, ".section") == 0) {
+        char *p = (char *)skipSpaces(rest);
+        p[strcspn(p, " \t,")] = '\0';
+        CurrentSection = elfSection(&Object, p);
+        return;
+    }
+    if (strcmp(name, ".ascii") == 0 || strcmp(name, ".asciz") == 0 ||
+        strcmp(name, ".string") == 0) {
+        assembleString(rest, strcmp(name, ".ascii") != 0);
+        return;
+    }
+
+    int count = splitOperands(rest);
+    char **operands = Operands;
+
+    if (strcmp(name, ".global") == 0 || strcmp(name, ".globl") == 0 ||
+        strcmp(name, ".extern") == 0) {
+        for (int i = 0; i < count; i++) {
+            char *symbolName = operands[i];
+            symbolName[strcspn(symbolName, " \t")] = '\0';
+            int sym = elfSymbol(&Object, symbolName, strlen(symbolName));
+            Object.symbols[sym].isGlobal = true;
+        }
+        return;
+    }
+    if (strcmp(name, ".p2align") == 0 || strcmp(name, ".align") == 0 ||
+        strcmp(name, ".balign") == 0) {
+        if (count < 1)
+            asmError("expected an alignment", name);
+        int64_t n = parseNumber(operands[0], &end);
+        uint64_t align = strcmp(name, ".balign") == 0 ? (uint64_t)n : 1ull << n;
+        bool code = Object.sections[CurrentSection].flags & ELF_FLAG_EXEC;
+        if (code) {
+            while (Object.sections[CurrentSection].size % align != 0) {
+                emitWord(0xD503201Fu); // nop
+            }
+        }
+        elfAlign(&Object, CurrentSection, align, 0);
+        return;
+    }
+    if (strcmp(name, ".zero") == 0 || strcmp(name, ".skip") == 0 ||
+        strcmp(name, ".space") == 0) {
+        if (count < 1)
+            asmError("expected a size", name);
+        elfReserve(&Object, CurrentSection,
+                   (uint64_t)parseNumber(operands[0], &end));
+        return;
+    }
+
+    static const struct {
+        const char *name;
+        int size;
+    } data[] = {
+        {".byte", 1}, {".hword", 2}, {".short", 2}, {".2byte", 2},
+        {".word", 4}, {".long", 4},  {".4byte", 4}, {".quad", 8},
+        {".xword", 8}, {".8byte", 8},
+    };
+    for (size_t i = 0; i < sizeof(data) / sizeof(data[0]); i++) {
+        if (strcmp(name, data[i].name) == 0) {
+            assembleData(data[i].size, operands, count);
+            return;
+        }
+    }
+
+    // Directives without effect on the object (.type, .size, .file, ...)
+    if (strcmp(name, ".type") == 0 || strcmp(name, ".size") == 0 ||
+        strcmp(name, ".file") == 0 || strcmp(name, ".ident") == 0)
+        return;
+
+    asmError("unsupported directive", name);
+}
+
+/**
+ * assembleLine - Assemble a single line (label, directive or instruction).
+ */
+static void assembleLine(char *line) {
+    // Strip the comment ("//" outside of quotes)
+    bool quoted = false;
+    for (char *p = line; *p != '\0'; p++) {
+        if (quoted) {
+            if (*p == '\\' && p[1] != '\0')
+                p++;
+            else if (*p == '"')
+                quoted = false;
+        } else if (*p == '"') {
+            quoted = true;
+        } else if (p[0] == '/' && p[1] == '/') {
+            *p = '\0';
+            break;
+        }
+    }
+
+    char *p = (char *)skipSpaces(line);
+    char *word = p;
+    while (isIdentifierChar((unsigned char)*p)) {
+        p++;
+    }
+    size_t wordLength = p - word;
+    if (wordLength == 0) {
+        if (*p != '\0' && *p != '\r')
+            asmError("syntax error", word);
+        return;
+    }
+
+    // Label definition
+    if (*p == ':') {
+        int sym = elfSymbol(&Object, word, wordLength);
+        elfDefineSymbol(&Object, sym, CurrentSection,
+                        Object.sections[CurrentSection].size);
+        assembleLine(p + 1);
+        return;
+    }
+
+    char mnemonic[16];
+    if (wordLength >= sizeof(mnemonic))
+        asmError("unknown mnemonic", word);
+    for (size_t i = 0; i < wordLength; i++) {
+        mnemonic[i] = (char)tolower((unsigned char)word[i]);
+    }
+    mnemonic[wordLength] = '\0';
+
+    // Trim trailing whitespace
+    char *end = p + strlen(p);
+    while (end > p && isspace((unsigned char)end[-1])) {
+        *--end = '\0';
+    }
+
+    if (mnemonic[0] == '.') {
+        assembleDirective(mnemonic, p);
+        return;
+    }
+
+    int count = splitOperands(p);
+    struct operand ops[5];
+    if (count > 5)
+        asmError("too many operands", mnemonic);
+    memset(ops, 0, sizeof(ops));
+    for (int i = 0; i < count; i++) {
+        if (isSymbolOperand(mnemonic, i)) {
+            parseSymbolOperand(Operands[i], &ops[i]);
+        } else {
+            parseOperand(Operands[i], &ops[i]);
+        }
+    }
+    assembleInstruction(mnemonic, ops, count);
+}
+
+/**
+ * aarch64AssembleObject - Assemble GNU as text produced by this backend into
+ * an ELF64 relocatable object file.
+ *
+ * @param text The assembly text.
+ * @param length Length of the text in bytes.
+ * @param objPath Path of the object file to write.
+ *
+ * @return true on success (assembly errors exit the compiler).
+ */
+bool aarch64AssembleObject(const char *text, size_t length,
+                           const char *objPath) {
+    char *line = NULL;
+    size_t lineCapacity = 0;
+
+    elfInitObject(&Object, ELF_MACHINE_AARCH64);
+    CurrentSection = elfSection(&Object, ".text");
+    FixupCount = 0;
+    AsmLine = 0;
+
+    const char *p = text;
+    const char *limit = text + length;
+    while (p < limit) {
+        const char *eol = memchr(p, '\n', limit - p);
+        size_t lineLength = eol ? (size_t)(eol - p) : (size_t)(limit - p);
+
+        if (lineLength + 1 > lineCapacity) {
+            lineCapacity = (lineLength + 1) * 2;
+            line = realloc(line, lineCapacity);
+            if (line == NULL)
+                asmError("out of memory", NULL);
+        }
+        memcpy(line, p, lineLength);
+        line[lineLength] = '\0';
+
+        AsmLine++;
+        assembleLine(line);
+        p += lineLength + 1;
+    }
+
+    resolveFixups();
+    bool ok = elfWriteObject(&Object, objPath);
+
+    free(line);
+    free(Fixups);
+    Fixups = NULL;
+    FixupCapacity = 0;
+    free(Operands);
+    Operands = NULL;
+    OperandCapacity = 0;
+    elfFreeObject(&Object);
+    return ok;
+}
@@ -10,6 +10,7 @@
 #include "data.h"
 #include "decl.h"
 #include "defs.h"
+#include "emit.h"
 
 #include <limits.h>
 
@@ -42,6 +43,46 @@ int aarch64GetPrimitiveTypeSize(int type) {
     return aarch64PrimitiveSizeInBytes[type];
 }
 
+/**
+ * aarch64MoveConstant - Generates code to set a register to a 64-bit
+ * constant.
+ *
+ * @param reg Name of the 64-bit register to set (also used by cgn_ir.c).
+ * @param value The constant.
+ *
+ * NOTE:
+ * mov only takes a 16-bit immediate (or its inverse). Wider constants,
+ * e.g. from constant folding, are built 16 bits at a time with movk.
+ */
+void aarch64MoveConstant(const char *reg, long long value) {
+    if (value > -65536 && value < 65536) {
+        emitBeginInstruction("mov");
+        emitOperand(reg);
+        emitImmediate(value);
+        emitEndInstruction();
+        return;
+    }
+
+    uint64_t bits = (uint64_t)value;
+    emitBeginInstruction("mov");
+    emitOperand(reg);
+    emitImmediate(bits & 0xffff);
+    emitEndInstruction();
+    for (int shift = 16; shift < 64; shift += 16) {
+        char shiftOperand[16];
+        uint64_t chunk = (bits >> shift) & 0xffff;
+        if (chunk == 0) {
+            continue;
+        }
+        snprintf(shiftOperand, sizeof(shiftOperand), "lsl #%d", shift);
+        emitBeginInstruction("movk");
+        emitOperand(reg);
+        emitImmediate(chunk);
+        emitOperand(shiftOperand);
+        emitEndInstruction();
+    }
+}
+
 /**
  * aarch64LoadImmediateInt - Generates code to load an integer constant into a
  * register.
@@ -58,7 +99,7 @@ int aarch64LoadImmediateInt(int value, int primitiveType) {
     int r = aarch64AllocateRegister();
     (void)primitiveType; // unused (all are represented as 64-bit)
 
-    fprintf(Outfile, "\tmov\t%s, #%d\n", aarch64QwordRegisterList[r], value);
+    aarch64MoveConstant(aarch64QwordRegisterList[r], value);
     return r;
 }
 
@@ -73,8 +114,14 @@ static void aarch64LoadGlobalAddressIntoX0(const char *name) {
     // PC-relative addressing:
     //   adrp x0, name
     //   add  x0, x0, :lo12:name
-    fprintf(Outfile, "\tadrp\tx0, %s\n", name);
-    fprintf(Outfile, "\tadd\tx0, x0, :lo12:%s\n", name);
+    emitInstruction2("adrp", "x0", name);
+    emitBeginInstruction("add");
+    emitOperand("x0");
+    emitOperand("x0");
+    emitOperandStart();
+    emitText(":lo12:");
+    emitText(name);
+    emitEndInstruction();
 }
 
 /**
@@ -84,11 +131,19 @@ static void aarch64LoadGlobalAddressIntoX0(const char *name) {
  * @param id The ID of the local symbol in the symbol table.
  */
 static void aarch64LoadLocalAddressIntoX0(int id) {
-    int offset = SymbolTable[id].offset;
+    int offset = getSymbol(id)->offset;
     if (offset >= 0) {
-        fprintf(Outfile, "\tadd\tx0, x29, #%d\n", offset);
+        emitBeginInstruction("add");
+        emitOperand("x0");
+        emitOperand("x29");
+        emitImmediate(offset);
+        emitEndInstruction();
     } else {
-        fprintf(Outfile, "\tsub\tx0, x29, #%d\n", -offset);
+        emitBeginInstruction("sub");
+        emitOperand("x0");
+        emitOperand("x29");
+        emitImmediate(-offset);
+        emitEndInstruction();
     }
 }
 
@@ -103,8 +158,8 @@ static void aarch64LoadLocalAddressIntoX0(int id) {
  */
 int aarch64LoadGlobalSymbol(int id, int op) {
     int r = aarch64AllocateRegister();
-    int primitiveType = SymbolTable[id].primitiveType;
-    char *name = SymbolTable[id].name;
+    int primitiveType = getSymbol(id)->primitiveType;
+    const char *name = getSymbol(id)->name;
 
     int tmpReg = -1; // optional temp for post-inc/dec
 
@@ -114,31 +169,27 @@ int aarch64LoadGlobalSymbol(int id, int op) {
     case P_CHAR:
         // Pre-increment/decrement: update memory before load
         if (op == A_PREINCREMENT || op == A_PREDECREMENT) {
-            fprintf(Outfile, "\tldrb\t%s, [x0]\n", aarch64DwordRegisterList[r]);
+            emitInstruction2("ldrb", aarch64DwordRegisterList[r], "[x0]");
             if (op == A_PREINCREMENT) {
-                fprintf(Outfile, "\tadd\t%s, %s, #1\n",
-                        aarch64DwordRegisterList[r],
-                        aarch64DwordRegisterList[r]);
+                emitInstruction3("add", aarch64DwordRegisterList[r],
+                                 aarch64DwordRegisterList[r], "#1");
             } else {
-                fprintf(Outfile, "\tsub\t%s, %s, #1\n",
-                        aarch64DwordRegisterList[r],
-                        aarch64DwordRegisterList[r]);
+                emitInstruction3("sub", aarch64DwordRegisterList[r],
+                                 aarch64DwordRegisterList[r], "#1");
             }
-            fprintf(Outfile, "\tstrb\t%s, [x0]\n", aarch64DwordRegisterList[r]);
+            emitInstruction2("strb", aarch64DwordRegisterList[r], "[x0]");
         }
 
         // Load (zero-extend byte into w-reg)
-        fprintf(Outfile, "\tldrb\t%s, [x0]\n", aarch64DwordRegisterList[r]);
+        emitInstruction2("ldrb", aarch64DwordRegisterList[r], "[x0]");
 
         // Post-increment/decrement: update memory after load, keep r intact
         if (op == A_POSTINCREMENT || op == A_POSTDECREMENT) {
             tmpReg = aarch64AllocateRegister();
-            fprintf(Outfile, "\t%s\t%s, %s, #1\n",
-                    (op == A_POSTINCREMENT) ? "add" : "sub",
-                    aarch64DwordRegisterList[tmpReg],
-                    aarch64DwordRegisterList[r]);
-            fprintf(Outfile, "\tstrb\t%s, [x0]\n",
-                    aarch64DwordRegisterList[tmpReg]);
+            emitInstruction3((op == A_POSTINCREMENT) ? "add" : "sub",
+                             aarch64DwordRegisterList[tmpReg],
+                             aarch64DwordRegisterList[r], "#1");
+            emitInstruction2("strb", aarch64DwordRegisterList[tmpReg], "[x0]");
             aarch64FreeRegister(tmpReg);
         }
         break;
@@ -146,33 +197,28 @@ int aarch64LoadGlobalSymbol(int id, int op) {
         if (op == A_PREINCREMENT || op == A_PREDECREMENT) {
             // Sign-extend 32-bit int into 64-bit register so subsequent
             // operations and calls (e.g. printint) observe signed values.
-            fprintf(Outfile, "\tldrsw\t%s, [x0]\n",
-                    aarch64QwordRegisterList[r]);
+            emitInstruction2("ldrsw", aarch64QwordRegisterList[r], "[x0]");
             if (op == A_PREINCREMENT) {
-                fprintf(Outfile, "\tadd\t%s, %s, #1\n",
-                        aarch64QwordRegisterList[r],
-                        aarch64QwordRegisterList[r]);
+                emitInstruction3("add", aarch64QwordRegisterList[r],
+                                 aarch64QwordRegisterList[r], "#1");
             } else {
-                fprintf(Outfile, "\tsub\t%s, %s, #1\n",
-                        aarch64QwordRegisterList[r],
-                        aarch64QwordRegisterList[r]);
+                emitInstruction3("sub", aarch64QwordRegisterList[r],
+                                 aarch64QwordRegisterList[r], "#1");
             }
             // Store back as 32-bit int.
-            fprintf(Outfile, "\tstr\t%s, [x0]\n", aarch64DwordRegisterList[r]);
+            emitInstruction2("str", aarch64DwordRegisterList[r], "[x0]");
         }
 
         // Normal load: sign-extend into 64-bit register.
-        fprintf(Outfile, "\tldrsw\t%s, [x0]\n", aarch64QwordRegisterList[r]);
+        emitInstruction2("ldrsw", aarch64QwordRegisterList[r], "[x0]");
 
         if (op == A_POSTINCREMENT || op == A_POSTDECREMENT) {
             tmpReg = aarch64AllocateRegister();
-            fprintf(Outfile, "\t%s\t%s, %s, #1\n",
-                    (op == A_POSTINCREMENT) ? "add" : "sub",
-                    aarch64QwordRegisterList[tmpReg],
-                    aarch64QwordRegisterList[r]);
+            emitInstruction3((op == A_POSTINCREMENT) ? "add" : "sub",
+                             aarch64QwordRegisterList[tmpReg],
+                             aarch64QwordRegisterList[r], "#1");
             // Store back as 32-bit int.
-            fprintf(Outfile, "\tstr\t%s, [x0]\n",
-                    aarch64DwordRegisterList[tmpReg]);
+            emitInstruction2("str", aarch64DwordRegisterList[tmpReg], "[x0]");
             aarch64FreeRegister(tmpReg);
         }
         break;
@@ -183,29 +229,25 @@ int aarch64LoadGlobalSymbol(int id, int op) {
     case P_INTPTR:
     case P_LONGPTR:
         if (op == A_PREINCREMENT || op == A_PREDECREMENT) {
-            fprintf(Outfile, "\tldr\t%s, [x0]\n", aarch64QwordRegisterList[r]);
+            emitInstruction2("ldr", aarch64QwordRegisterList[r], "[x0]");
             if (op == A_PREINCREMENT) {
-                fprintf(Outfile, "\tadd\t%s, %s, #1\n",
-                        aarch64QwordRegisterList[r],
-                        aarch64QwordRegisterList[r]);
+                emitInstruction3("add", aarch64QwordRegisterList[r],
+                                 aarch64QwordRegisterList[r], "#1");
             } else {
-                fprintf(Outfile, "\tsub\t%s, %s, #1\n",
-                        aarch64QwordRegisterList[r],
-                        aarch64QwordRegisterList[r]);
+                emitInstruction3("sub", aarch64QwordRegisterList[r],
+                                 aarch64QwordRegisterList[r], "#1");
             }
-            fprintf(Outfile, "\tstr\t%s, [x0]\n", aarch64QwordRegisterList[r]);
+            emitInstruction2("str", aarch64QwordRegisterList[r], "[x0]");
         }
 
-        fprintf(Outfile, "\tldr\t%s, [x0]\n", aarch64QwordRegisterList[r]);
+        emitInstruction2("ldr", aarch64QwordRegisterList[r], "[x0]");
 
         if (op == A_POSTINCREMENT || op == A_POSTDECREMENT) {
             tmpReg = aarch64AllocateRegister();
-            fprintf(Outfile, "\t%s\t%s, %s, #1\n",
-                    (op == A_POSTINCREMENT) ? "add" : "sub",
-                    aarch64QwordRegisterList[tmpReg],
-                    aarch64QwordRegisterList[r]);
-            fprintf(Outfile, "\tstr\t%s, [x0]\n",
-                    aarch64QwordRegisterList[tmpReg]);
+            emitInstruction3((op == A_POSTINCREMENT) ? "add" : "sub",
+                             aarch64QwordRegisterList[tmpReg],
+                             aarch64QwordRegisterList[r], "#1");
+            emitInstruction2("str", aarch64QwordRegisterList[tmpReg], "[x0]");
             aarch64FreeRegister(tmpReg);
         }
         break;
@@ -226,7 +268,7 @@ int aarch64LoadGlobalSymbol(int id, int op) {
  */
 int aarch64LoadLocalSymbol(int id, int op) {
     int r = aarch64AllocateRegister();
-    int primitiveType = SymbolTable[id].primitiveType;
+    int primitiveType = getSymbol(id)->primitiveType;
 
     int tmpReg = -1;
 
@@ -235,47 +277,42 @@ int aarch64LoadLocalSymbol(int id, int op) {
     switch (primitiveType) {
     case P_CHAR:
         if (op == A_PREINCREMENT || op == A_PREDECREMENT) {
-            fprintf(Outfile, "\tldrb\t%s, [x0]\n", aarch64DwordRegisterList[r]);
-            fprintf(Outfile, "\t%s\t%s, %s, #1\n",
-                    (op == A_PREINCREMENT) ? "add" : "sub",
-                    aarch64DwordRegisterList[r], aarch64DwordRegisterList[r]);
-            fprintf(Outfile, "\tstrb\t%s, [x0]\n", aarch64DwordRegisterList[r]);
+            emitInstruction2("ldrb", aarch64DwordRegisterList[r], "[x0]");
+            emitInstruction3((op == A_PREINCREMENT) ? "add" : "sub",
+                             aarch64DwordRegisterList[r],
+                             aarch64DwordRegisterList[r], "#1");
+            emitInstruction2("strb", aarch64DwordRegisterList[r], "[x0]");
         }
 
-        fprintf(Outfile, "\tldrb\t%s, [x0]\n", aarch64DwordRegisterList[r]);
+        emitInstruction2("ldrb", aarch64DwordRegisterList[r], "[x0]");
 
         if (op == A_POSTINCREMENT || op == A_POSTDECREMENT) {
             tmpReg = aarch64AllocateRegister();
-            fprintf(Outfile, "\t%s\t%s, %s, #1\n",
-                    (op == A_POSTINCREMENT) ? "add" : "sub",
-                    aarch64DwordRegisterList[tmpReg],
-                    aarch64DwordRegisterList[r]);
-            fprintf(Outfile, "\tstrb\t%s, [x0]\n",
-                    aarch64DwordRegisterList[tmpReg]);
+            emitInstruction3((op == A_POSTINCREMENT) ? "add" : "sub",
+                             aarch64DwordRegisterList[tmpReg],
+                             aarch64DwordRegisterList[r], "#1");
+            emitInstruction2("strb", aarch64DwordRegisterList[tmpReg], "[x0]");
             aarch64FreeRegister(tmpReg);
         }
         break;
 
     case P_INT:
         if (op == A_PREINCREMENT || op == A_PREDECREMENT) {
-            fprintf(Outfile, "\tldrsw\t%s, [x0]\n",
-                    aarch64QwordRegisterList[r]);
-            fprintf(Outfile, "\t%s\t%s, %s, #1\n",
-                    (op == A_PREINCREMENT) ? "add" : "sub",
-                    aarch64QwordRegisterList[r], aarch64QwordRegisterList[r]);
-            fprintf(Outfile, "\tstr\t%s, [x0]\n", aarch64DwordRegisterList[r]);
+            emitInstruction2("ldrsw", aarch64QwordRegisterList[r], "[x0]");
+            emitInstruction3((op == A_PREINCREMENT) ? "add" : "sub",
+                             aarch64QwordRegisterList[r],
+                             aarch64QwordRegisterList[r], "#1");
+            emitInstruction2("str", aarch64DwordRegisterList[r], "[x0]");
         }
 
-        fprintf(Outfile, "\tldrsw\t%s, [x0]\n", aarch64QwordRegisterList[r]);
+        emitInstruction2("ldrsw", aarch64QwordRegisterList[r], "[x0]");
 
         if (op == A_POSTINCREMENT || op == A_POSTDECREMENT) {
             tmpReg = aarch64AllocateRegister();
-            fprintf(Outfile, "\t%s\t%s, %s, #1\n",
-                    (op == A_POSTINCREMENT) ? "add" : "sub",
-                    aarch64QwordRegisterList[tmpReg],
-                    aarch64QwordRegisterList[r]);
-            fprintf(Outfile, "\tstr\t%s, [x0]\n",
-                    aarch64DwordRegisterList[tmpReg]);
+            emitInstruction3((op == A_POSTINCREMENT) ? "add" : "sub",
+                             aarch64QwordRegisterList[tmpReg],
+                             aarch64QwordRegisterList[r], "#1");
+            emitInstruction2("str", aarch64DwordRegisterList[tmpReg], "[x0]");
             aarch64FreeRegister(tmpReg);
         }
         break;
@@ -285,23 +322,21 @@ int aarch64LoadLocalSymbol(int id, int op) {
     case P_INTPTR:
     case P_LONGPTR:
         if (op == A_PREINCREMENT || op == A_PREDECREMENT) {
-            fprintf(Outfile, "\tldr\t%s, [x0]\n", aarch64QwordRegisterList[r]);
-            fprintf(Outfile, "\t%s\t%s, %s, #1\n",
-                    (op == A_PREINCREMENT) ? "add" : "sub",
-                    aarch64QwordRegisterList[r], aarch64QwordRegisterList[r]);
-            fprintf(Outfile, "\tstr\t%s, [x0]\n", aarch64QwordRegisterList[r]);
+            emitInstruction2("ldr", aarch64QwordRegisterList[r], "[x0]");
+            emitInstruction3((op == A_PREINCREMENT) ? "add" : "sub",
+                             aarch64QwordRegisterList[r],
+                             aarch64QwordRegisterList[r], "#1");
+            emitInstruction2("str", aarch64QwordRegisterList[r], "[x0]");
         }
 
-        fprintf(Outfile, "\tldr\t%s, [x0]\n", aarch64QwordRegisterList[r]);
+        emitInstruction2("ldr", aarch64QwordRegisterList[r], "[x0]");
 
         if (op == A_POSTINCREMENT || op == A_POSTDECREMENT) {
             tmpReg = aarch64AllocateRegister();
-            fprintf(Outfile, "\t%s\t%s, %s, #1\n",
-                    (op == A_POSTINCREMENT) ? "add" : "sub",
-                    aarch64QwordRegisterList[tmpReg],
-                    aarch64QwordRegisterList[r]);
-            fprintf(Outfile, "\tstr\t%s, [x0]\n",
-                    aarch64QwordRegisterList[tmpReg]);
+            emitInstruction3((op == A_POSTINCREMENT) ? "add" : "sub",
+                             aarch64QwordRegisterList[tmpReg],
+                             aarch64QwordRegisterList[r], "#1");
+            emitInstruction2("str", aarch64QwordRegisterList[tmpReg], "[x0]");
             aarch64FreeRegister(tmpReg);
         }
         break;
@@ -328,9 +363,17 @@ int aarch64LoadLocalSymbol(int id, int op) {
 int aarch64LoadGlobalString(int id) {
     int r = aarch64AllocateRegister();
 
-    fprintf(Outfile, "\tadrp\t%s, L%d\n", aarch64QwordRegisterList[r], id);
-    fprintf(Outfile, "\tadd\t%s, %s, :lo12:L%d\n", aarch64QwordRegisterList[r],
-            aarch64QwordRegisterList[r], id);
+    emitBeginInstruction("adrp");
+    emitOperand(aarch64QwordRegisterList[r]);
+    emitLabelOperand(id);
+    emitEndInstruction();
+    emitBeginInstruction("add");
+    emitOperand(aarch64QwordRegisterList[r]);
+    emitOperand(aarch64QwordRegisterList[r]);
+    emitOperandStart();
+    emitText(":lo12:L");
+    emitInt(id);
+    emitEndInstruction();
 
     return r;
 }
@@ -345,24 +388,24 @@ int aarch64LoadGlobalString(int id) {
  * @return Index of the register that was stored.
  */
 int aarch64StoreGlobalSymbol(int r, int id) {
-    int primitiveType = SymbolTable[id].primitiveType;
-    char *name = SymbolTable[id].name;
+    int primitiveType = getSymbol(id)->primitiveType;
+    const char *name = getSymbol(id)->name;
 
     aarch64LoadGlobalAddressIntoX0(name);
 
     switch (primitiveType) {
     case P_CHAR:
         // NOTE: Store Register Byte
-        fprintf(Outfile, "\tstrb\t%s, [x0]\n", aarch64DwordRegisterList[r]);
+        emitInstruction2("strb", aarch64DwordRegisterList[r], "[x0]");
         break;
     case P_INT:
-        fprintf(Outfile, "\tstr\t%s, [x0]\n", aarch64DwordRegisterList[r]);
+        emitInstruction2("str", aarch64DwordRegisterList[r], "[x0]");
         break;
     case P_LONG:
     case P_CHARPTR:
     case P_INTPTR:
     case P_LONGPTR:
-        fprintf(Outfile, "\tstr\t%s, [x0]\n", aarch64QwordRegisterList[r]);
+        emitInstruction2("str", aarch64QwordRegisterList[r], "[x0]");
         break;
     default:
         fprintf(stderr,
@@ -380,22 +423,22 @@ int aarch64StoreGlobalSymbol(int r, int id) {
  * symbol.
  */
 int aarch64StoreLocalSymbol(int r, int id) {
-    int primitiveType = SymbolTable[id].primitiveType;
+    int primitiveType = getSymbol(id)->primitiveType;
 
     aarch64LoadLocalAddressIntoX0(id);
 
     switch (primitiveType) {
     case P_CHAR:
-        fprintf(Outfile, "\tstrb\t%s, [x0]\n", aarch64DwordRegisterList[r]);
+        emitInstruction2("strb", aarch64DwordRegisterList[r], "[x0]");
         break;
     case P_INT:
-        fprintf(Outfile, "\tstr\t%s, [x0]\n", aarch64DwordRegisterList[r]);
+        emitInstruction2("str", aarch64DwordRegisterList[r], "[x0]");
         break;
     case P_LONG:
     case P_CHARPTR:
     case P_INTPTR:
     case P_LONGPTR:
-        fprintf(Outfile, "\tstr\t%s, [x0]\n", aarch64QwordRegisterList[r]);
+        emitInstruction2("str", aarch64QwordRegisterList[r], "[x0]");
         break;
     default:
         fprintf(
@@ -440,34 +483,34 @@ static int aarch64P2AlignFor(int alignmentBytes) {
  */
 void aarch64DeclareGlobalSymbol(int id) {
     // Functions are defined in the text section, not as storage in BSS.
-    if (SymbolTable[id].structuralType == S_FUNCTION) {
+    if (getSymbol(id)->structuralType == S_FUNCTION) {
         return;
     }
 
-    int primitiveType = SymbolTable[id].primitiveType;
+    int primitiveType = getSymbol(id)->primitiveType;
 
     int elementSize = aarch64GetPrimitiveTypeSize(primitiveType);
     if (elementSize <= 0) {
         fprintf(stderr,
                 "Error: Invalid element size %d for symbol %s in "
                 "aarch64DeclareGlobalSymbol\n",
-                elementSize, SymbolTable[id].name);
+                elementSize, getSymbol(id)->name);
         exit(1);
     }
 
     int count = 1;
-    if (SymbolTable[id].structuralType == S_ARRAY) {
-        count = SymbolTable[id].size;
+    if (getSymbol(id)->structuralType == S_ARRAY) {
+        count = getSymbol(id)->size;
         if (count <= 0 || count > INT_MAX / elementSize) {
             fprintf(stderr, "Error: bad array count %d for symbol %s\n", count,
-                    SymbolTable[id].name);
+                    getSymbol(id)->name);
             exit(1);
         }
     }
 
     if (elementSize > LLONG_MAX / count) {
         fprintf(stderr, "Error: total size overflow for symbol %s\n",
-                SymbolTable[id].name);
+                getSymbol(id)->name);
         exit(1);
     }
 
@@ -480,16 +523,22 @@ void aarch64DeclareGlobalSymbol(int id) {
     int p2 = aarch64P2AlignFor(alignment);
 
     // Prefer BSS for zero-initialized storage
-    fprintf(Outfile, "\t.section\t.bss\n");
-    fprintf(Outfile, "\t.globl\t%s\n", SymbolTable[id].name);
+    emitInstruction1(".section", ".bss");
+    emitInstruction1(".globl", getSymbol(id)->name);
     if (p2 >= 0) {
-        fprintf(Outfile, "\t.p2align\t%d\n", p2);
+        emitBeginInstruction(".p2align");
+        emitOperandStart();
+        emitInt(p2);
+        emitEndInstruction();
     }
 
-    fprintf(Outfile, "%s:\n", SymbolTable[id].name);
+    emitSymbolLabel(getSymbol(id)->name);
 
     // Reserve zeroed bytes
-    fprintf(Outfile, "\t.zero\t%lld\n", totalBytesRequired);
+    emitBeginInstruction(".zero");
+    emitOperandStart();
+    emitInt(totalBytesRequired);
+    emitEndInstruction();
 }
 
 /**
@@ -502,49 +551,49 @@ void aarch64DeclareGlobalSymbol(int id) {
 void aarch64DeclareGlobalString(int labelIndex, char *stringValue) {
     const unsigned char *s = (const unsigned char *)stringValue;
 
-    fprintf(Outfile, "\t.section\t.rodata\n");
+    emitInstruction1(".section", ".rodata");
     aarch64Label(labelIndex);
 
-    fprintf(Outfile, "\t.ascii\t");
-    fprintf(Outfile, "\"");
+    emitText("\t.ascii\t");
+    emitChar('\"');
 
     for (const unsigned char *p = s; *p != '\0'; p++) {
         unsigned char c = *p;
 
         switch (c) {
         case '\\':
-            fputs("\\\\", Outfile);
+            emitText("\\\\");
             break;
         case '"':
-            fputs("\\\"", Outfile);
+            emitText("\\\"");
             break;
         case '\n':
-            fputs("\\n", Outfile);
+            emitText("\\n");
             break;
         case '\r':
-            fputs("\\r", Outfile);
+            emitText("\\r");
             break;
         case '\t':
-            fputs("\\t", Outfile);
+            emitText("\\t");
             break;
         default:
             if (c >= 32 && c <= 126) {
                 // Printable
-                fputc((char)c, Outfile);
+                emitChar((char)c);
             } else {
                 // Non-printable: use octal escape
-                fputs("\" \n\t.byte ", Outfile);
-                fprintf(Outfile, "%u", (unsigned)c);
-                fputs("\n\t.ascii \"", Outfile);
+                emitText("\" \n\t.byte ");
+                emitInt((unsigned)c);
+                emitText("\n\t.ascii \"");
             }
             break;
         }
     }
-    fputc('"', Outfile); // Closing quote for string
+    emitChar('"'); // Closing quote for string
 
-    fputc('\n', Outfile); // Newline after .asciz
+    emitChar('\n'); // Newline after .asciz
 
-    fprintf(Outfile, "\t.byte\t0\n");
+    emitInstruction1(".byte", "0");
 }
 
 /**
@@ -557,11 +606,11 @@ void aarch64DeclareGlobalString(int labelIndex, char *stringValue) {
  * @return Index of the register containing the result.
  */
 int aarch64AddRegs(int r1, int r2) {
-    fprintf(Outfile, "\tadd\t%s, %s, %s\n",
-            aarch64QwordRegisterList[r2], // destination
-            aarch64QwordRegisterList[r2], // source 1
-            aarch64QwordRegisterList[r1]  // source 2
-    );
+    emitBeginInstruction("add");
+    emitOperand(aarch64QwordRegisterList[r2]); // destination
+    emitOperand(aarch64QwordRegisterList[r2]); // source 1
+    emitOperand(aarch64QwordRegisterList[r1]); // source 2
+    emitEndInstruction();
     aarch64FreeRegister(r1);
     return r2;
 }
@@ -576,11 +625,11 @@ int aarch64AddRegs(int r1, int r2) {
  * @return Index of the register containing the result.
  */
 int aarch64SubRegs(int r1, int r2) {
-    fprintf(Outfile, "\tsub\t%s, %s, %s\n",
-            aarch64QwordRegisterList[r1], // destination
-            aarch64QwordRegisterList[r1], // minuend
-            aarch64QwordRegisterList[r2]  // subtrahend
-    );
+    emitBeginInstruction("sub");
+    emitOperand(aarch64QwordRegisterList[r1]); // destination
+    emitOperand(aarch64QwordRegisterList[r1]); // minuend
+    emitOperand(aarch64QwordRegisterList[r2]); // subtrahend
+    emitEndInstruction();
     aarch64FreeRegister(r2);
     return r1;
 }
@@ -595,11 +644,11 @@ int aarch64SubRegs(int r1, int r2) {
  * @return Index of the register containing the result.
  */
 int aarch64MulRegs(int r1, int r2) {
-    fprintf(Outfile, "\tmul\t%s, %s, %s\n",
-            aarch64QwordRegisterList[r2], // destination
-            aarch64QwordRegisterList[r2], // source 1
-            aarch64QwordRegisterList[r1]  // source 2
-    );
+    emitBeginInstruction("mul");
+    emitOperand(aarch64QwordRegisterList[r2]); // destination
+    emitOperand(aarch64QwordRegisterList[r2]); // source 1
+    emitOperand(aarch64QwordRegisterList[r1]); // source 2
+    emitEndInstruction();
     aarch64FreeRegister(r1);
     return r2;
 }
@@ -614,11 +663,11 @@ int aarch64MulRegs(int r1, int r2) {
  * @return Index of the register containing the result (quotient).
  */
 int aarch64DivRegsSigned(int r1, int r2) {
-    fprintf(Outfile, "\tsdiv\t%s, %s, %s\n",
-            aarch64QwordRegisterList[r1], // destination
-            aarch64QwordRegisterList[r1], // dividend
-            aarch64QwordRegisterList[r2]  // divisor
-    );
+    emitBeginInstruction("sdiv");
+    emitOperand(aarch64QwordRegisterList[r1]); // destination
+    emitOperand(aarch64QwordRegisterList[r1]); // dividend
+    emitOperand(aarch64QwordRegisterList[r2]); // divisor
+    emitEndInstruction();
     aarch64FreeRegister(r2);
     return r1;
 }
@@ -633,8 +682,11 @@ int aarch64DivRegsSigned(int r1, int r2) {
  * @return Index of the register containing the shifted value.
  */
 int aarch64ShiftLeftConst(int reg, int shiftAmount) {
-    fprintf(Outfile, "\tlsl\t%s, %s, #%d\n", aarch64QwordRegisterList[reg],
-            aarch64QwordRegisterList[reg], shiftAmount);
+    emitBeginInstruction("lsl");
+    emitOperand(aarch64QwordRegisterList[reg]);
+    emitOperand(aarch64QwordRegisterList[reg]);
+    emitImmediate(shiftAmount);
+    emitEndInstruction();
     return reg;
 }
 
@@ -648,8 +700,9 @@ int aarch64ShiftLeftConst(int reg, int shiftAmount) {
  * @return Index of the register containing the shifted value.
  */
 int aarch64ShiftLeftRegs(int dstReg, int srcReg) {
-    fprintf(Outfile, "\tlsl\t%s, %s, %s\n", aarch64QwordRegisterList[dstReg],
-            aarch64QwordRegisterList[dstReg], aarch64QwordRegisterList[srcReg]);
+    emitInstruction3("lsl", aarch64QwordRegisterList[dstReg],
+                     aarch64QwordRegisterList[dstReg],
+                     aarch64QwordRegisterList[srcReg]);
     aarch64FreeRegister(srcReg);
     return dstReg;
 }
@@ -664,8 +717,9 @@ int aarch64ShiftLeftRegs(int dstReg, int srcReg) {
  * @return Index of the register containing the shifted value.
  */
 int aarch64ShiftRightRegs(int dstReg, int srcReg) {
-    fprintf(Outfile, "\tlsr\t%s, %s, %s\n", aarch64QwordRegisterList[dstReg],
-            aarch64QwordRegisterList[dstReg], aarch64QwordRegisterList[srcReg]);
+    emitInstruction3("lsr", aarch64QwordRegisterList[dstReg],
+                     aarch64QwordRegisterList[dstReg],
+                     aarch64QwordRegisterList[srcReg]);
     aarch64FreeRegister(srcReg);
     return dstReg;
 }
@@ -678,8 +732,9 @@ int aarch64ShiftRightRegs(int dstReg, int srcReg) {
  * @return Index of the register containing the negated value.
  */
 int aarch64ArithmeticNegate(int reg) {
-    fprintf(Outfile, "\tneg\t%s, %s\n", aarch64QwordRegisterList[reg],
-            aarch64QwordRegisterList[reg]);
+    aarch64CheckRegister(reg);
+    emitInstruction2("neg", aarch64QwordRegisterList[reg],
+                     aarch64QwordRegisterList[reg]);
     return reg;
 }
 
@@ -691,8 +746,9 @@ int aarch64ArithmeticNegate(int reg) {
  * @return Index of the register containing the inverted value.
  */
 int aarch64LogicalInvert(int reg) {
-    fprintf(Outfile, "\tmvn\t%s, %s\n", aarch64QwordRegisterList[reg],
-            aarch64QwordRegisterList[reg]);
+    aarch64CheckRegister(reg);
+    emitInstruction2("mvn", aarch64QwordRegisterList[reg],
+                     aarch64QwordRegisterList[reg]);
     return reg;
 }
 
@@ -705,8 +761,9 @@ int aarch64LogicalInvert(int reg) {
  * @return Index of the register containing the boolean result.
  */
 int aarch64LogicalNot(int reg) {
-    fprintf(Outfile, "\tcmp\t%s, #0\n", aarch64QwordRegisterList[reg]);
-    fprintf(Outfile, "\tcset\t%s, eq\n", aarch64DwordRegisterList[reg]);
+    aarch64CheckRegister(reg);
+    emitInstruction2("cmp", aarch64QwordRegisterList[reg], "#0");
+    emitInstruction2("cset", aarch64DwordRegisterList[reg], "eq");
     return reg;
 }
 
@@ -714,8 +771,9 @@ int aarch64LogicalNot(int reg) {
  * aarch64BitwiseAndRegs - Bitwise AND two registers (dst &= src).
  */
 int aarch64BitwiseAndRegs(int dstReg, int srcReg) {
-    fprintf(Outfile, "\tand\t%s, %s, %s\n", aarch64QwordRegisterList[dstReg],
-            aarch64QwordRegisterList[dstReg], aarch64QwordRegisterList[srcReg]);
+    emitInstruction3("and", aarch64QwordRegisterList[dstReg],
+                     aarch64QwordRegisterList[dstReg],
+                     aarch64QwordRegisterList[srcReg]);
     aarch64FreeRegister(srcReg);
     return dstReg;
 }
@@ -724,8 +782,9 @@ int aarch64BitwiseAndRegs(int dstReg, int srcReg) {
  * aarch64BitwiseOrRegs - Bitwise OR two registers (dst |= src).
  */
 int aarch64BitwiseOrRegs(int dstReg, int srcReg) {
-    fprintf(Outfile, "\torr\t%s, %s, %s\n", aarch64QwordRegisterList[dstReg],
-            aarch64QwordRegisterList[dstReg], aarch64QwordRegisterList[srcReg]);
+    emitInstruction3("orr", aarch64QwordRegisterList[dstReg],
+                     aarch64QwordRegisterList[dstReg],
+                     aarch64QwordRegisterList[srcReg]);
     aarch64FreeRegister(srcReg);
     return dstReg;
 }
@@ -734,8 +793,9 @@ int aarch64BitwiseOrRegs(int dstReg, int srcReg) {
  * aarch64BitwiseXorRegs - Bitwise XOR two registers (dst ^= src).
  */
 int aarch64BitwiseXorRegs(int dstReg, int srcReg) {
-    fprintf(Outfile, "\teor\t%s, %s, %s\n", aarch64QwordRegisterList[dstReg],
-            aarch64QwordRegisterList[dstReg], aarch64QwordRegisterList[srcReg]);
+    emitInstruction3("eor", aarch64QwordRegisterList[dstReg],
+                     aarch64QwordRegisterList[dstReg],
+                     aarch64QwordRegisterList[srcReg]);
     aarch64FreeRegister(srcReg);
     return dstReg;
 }
@@ -747,11 +807,12 @@ int aarch64BitwiseXorRegs(int dstReg, int srcReg) {
  * 0/1 based on non-zeroness.
  */
 int aarch64ToBoolean(int reg, int op, int label) {
-    fprintf(Outfile, "\tcmp\t%s, #0\n", aarch64QwordRegisterList[reg]);
+    aarch64CheckRegister(reg);
+    emitInstruction2("cmp", aarch64QwordRegisterList[reg], "#0");
     if (op == A_IF || op == A_WHILE) {
-        fprintf(Outfile, "\tbeq\tL%d\n", label);
+        emitInstructionLabel("beq", label);
     } else {
-        fprintf(Outfile, "\tcset\t%s, ne\n", aarch64DwordRegisterList[reg]);
+        emitInstruction2("cset", aarch64DwordRegisterList[reg], "ne");
     }
     return reg;
 }
@@ -776,8 +837,8 @@ int aarch64CompareAndSet(int ASTop, int r1, int r2) {
         exit(1);
     }
 
-    fprintf(Outfile, "\tcmp\t%s, %s\n", aarch64QwordRegisterList[r1],
-            aarch64QwordRegisterList[r2]);
+    emitInstruction2("cmp", aarch64QwordRegisterList[r1],
+                     aarch64QwordRegisterList[r2]);
 
     const char *condition = NULL;
     switch (ASTop) {
@@ -807,8 +868,7 @@ int aarch64CompareAndSet(int ASTop, int r1, int r2) {
     }
 
     // cset wN, condition => wN = 0 or 1, high bits of xN are zeroed.
-    fprintf(Outfile, "\tcset\t%s, %s\n", aarch64DwordRegisterList[r2],
-            condition);
+    emitInstruction2("cset", aarch64DwordRegisterList[r2], condition);
 
     aarch64FreeRegister(r1);
     return r2;
@@ -839,14 +899,20 @@ int aarch64WidenPrimitiveType(int r, int oldPrimitiveType,
 int aarch64AddressOfSymbol(int id) {
     int r = aarch64AllocateRegister();
 
-    if (SymbolTable[id].class == C_LOCAL) {
-        int offset = SymbolTable[id].offset;
+    if (getSymbol(id)->class == C_LOCAL) {
+        int offset = getSymbol(id)->offset;
         if (offset >= 0) {
-            fprintf(Outfile, "\tadd\t%s, x29, #%d\n",
-                    aarch64QwordRegisterList[r], offset);
+            emitBeginInstruction("add");
+            emitOperand(aarch64QwordRegisterList[r]);
+            emitOperand("x29");
+            emitImmediate(offset);
+            emitEndInstruction();
         } else {
-            fprintf(Outfile, "\tsub\t%s, x29, #%d\n",
-                    aarch64QwordRegisterList[r], -offset);
+            emitBeginInstruction("sub");
+            emitOperand(aarch64QwordRegisterList[r]);
+            emitOperand("x29");
+            emitImmediate(-offset);
+            emitEndInstruction();
         }
         return r;
     }
@@ -854,10 +920,14 @@ int aarch64AddressOfSymbol(int id) {
     // PC-relative addressing:
     //   adrp xN, name             ; compute page address
     //   add  xN, xN, :lo12:name   ; add page offset
-    fprintf(Outfile, "\tadrp\t%s, %s\n", aarch64QwordRegisterList[r],
-            SymbolTable[id].name);
-    fprintf(Outfile, "\tadd\t%s, %s, :lo12:%s\n", aarch64QwordRegisterList[r],
-            aarch64QwordRegisterList[r], SymbolTable[id].name);
+    emitInstruction2("adrp", aarch64QwordRegisterList[r], getSymbol(id)->name);
+    emitBeginInstruction("add");
+    emitOperand(aarch64QwordRegisterList[r]);
+    emitOperand(aarch64QwordRegisterList[r]);
+    emitOperandStart();
+    emitText(":lo12:");
+    emitText(getSymbol(id)->name);
+    emitEndInstruction();
     return r;
 }
 
@@ -877,15 +947,24 @@ int aarch64DereferencePointer(int pointerReg, int primitiveType) {
     switch (primitiveType) {
     case P_CHARPTR:
         // zero-extend byte into wN (upper bites cleared)
-        fprintf(Outfile, "\tldrb\t%s, [%s]\n", w, x);
+        emitBeginInstruction("ldrb");
+        emitOperand(w);
+        emitMemoryOperand("", x);
+        emitEndInstruction();
         break;
     case P_INTPTR:
         // loads 32-bit into wN (upper bits cleared)
-        fprintf(Outfile, "\tldr\t%s, [%s]\n", w, x);
+        emitBeginInstruction("ldr");
+        emitOperand(w);
+        emitMemoryOperand("", x);
+        emitEndInstruction();
         break;
     case P_LONGPTR:
         // loads 64-bit into xN
-        fprintf(Outfile, "\tldr\t%s, [%s]\n", x, x);
+        emitBeginInstruction("ldr");
+        emitOperand(x);
+        emitMemoryOperand("", x);
+        emitEndInstruction();
         break;
     default:
         fprintf(stderr,
@@ -913,26 +992,29 @@ int aarch64StoreDereferencedPointer(int valueReg, int pointerReg,
     switch (primitiveType) {
     case P_CHAR:
         // Store 1 byte: uses W register, low 8 bits written.
-        fprintf(Outfile, "\tstrb\t%s, [%s]\n",
-                aarch64DwordRegisterList[valueReg],  // source (wN)
-                aarch64QwordRegisterList[pointerReg] // address (xM)
-        );
+        emitBeginInstruction("strb");
+        emitOperand(aarch64DwordRegisterList[valueReg]); // source (wN)
+        emitMemoryOperand("",
+                          aarch64QwordRegisterList[pointerReg]); // address (xM)
+        emitEndInstruction();
         break;
 
     case P_INT:
         // Store 4 bytes: STR Wt, [Xn]
-        fprintf(Outfile, "\tstr\t%s, [%s]\n",
-                aarch64DwordRegisterList[valueReg],  // source (wN)
-                aarch64QwordRegisterList[pointerReg] // address (xM)
-        );
+        emitBeginInstruction("str");
+        emitOperand(aarch64DwordRegisterList[valueReg]); // source (wN)
+        emitMemoryOperand("",
+                          aarch64QwordRegisterList[pointerReg]); // address (xM)
+        emitEndInstruction();
         break;
 
     case P_LONG:
         // Store 8 bytes: STR Xt, [Xn]
-        fprintf(Outfile, "\tstr\t%s, [%s]\n",
-                aarch64QwordRegisterList[valueReg],  // source (xN)
-                aarch64QwordRegisterList[pointerReg] // address (xM)
-        );
+        emitBeginInstruction("str");
+        emitOperand(aarch64QwordRegisterList[valueReg]); // source (xN)
+        emitMemoryOperand("",
+                          aarch64QwordRegisterList[pointerReg]); // address (xM)
+        emitEndInstruction();
         break;
 
     default:
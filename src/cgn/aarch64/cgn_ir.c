@@ -0,0 +1,555 @@
+// src/cgn/aarch64/cgn_ir.c
+
+/**
+ * NOTE:
+ * AArch64 GNU as-style backend
+ * Register-allocated code: the operations gen.c lowers the IR with at -O1,
+ * on the registers regalloc.c assigned instead of the pool in cgn_regs.c.
+ *
+ * x19-x28 are callee-saved, x9-x15 and x1-x8 (the same order as the pool)
+ * are not, and x16/x17 are the scratch registers for spilled values. x0
+ * holds addresses and constants for a single instruction, and the argument
+ * and result of calls. Loads compute their address in the register they
+ * load instead, so that x0 keeps a function's result while the callee-saved
+ * registers are restored at its exit.
+ */
+
+#include "cgn/aarch64/cgn_regs.h"
+#include "data.h"
+#include "decl.h"
+#include "defs.h"
+#include "emit.h"
+#include "ir.h"
+
+#define IR_REGISTER_COUNT                                                      \
+    (AARCH64_CALLEE_SAVED_COUNT + AARCH64_CALLER_SAVED_COUNT + 2)
+
+static char *irQwordRegisterList[IR_REGISTER_COUNT] = {
+    "x19", "x20", "x21", "x22", "x23", "x24", "x25", "x26", "x27",
+    "x28", "x9",  "x10", "x11", "x12", "x13", "x14", "x15", "x1",
+    "x2",  "x3",  "x4",  "x5",  "x6",  "x7",  "x8",  "x16", "x17",
+};
+static char *irDwordRegisterList[IR_REGISTER_COUNT] = {
+    "w19", "w20", "w21", "w22", "w23", "w24", "w25", "w26", "w27",
+    "w28", "w9",  "w10", "w11", "w12", "w13", "w14", "w15", "w1",
+    "w2",  "w3",  "w4",  "w5",  "w6",  "w7",  "w8",  "w16", "w17",
+};
+
+/**
+ * emitFrameAccess - Generates a load or store of a stack slot.
+ * Offsets within -256 ... 255 use the unscaled form on x29 directly, others
+ * compute the address in a register first.
+ *
+ * @param mnemonic The scaled mnemonic (e.g. "ldrb").
+ * @param unscaledMnemonic The unscaled mnemonic (e.g. "ldurb").
+ * @param reg Name of the register loaded or stored.
+ * @param address Name of the 64-bit register to compute an address in.
+ * @param offset Offset of the slot from x29.
+ */
+static void emitFrameAccess(const char *mnemonic, const char *unscaledMnemonic,
+                            const char *reg, const char *address, int offset) {
+    if (offset >= -256 && offset <= 255) {
+        emitBeginInstruction(unscaledMnemonic);
+        emitOperand(reg);
+        emitOperandStart();
+        emitText("[x29, #");
+        emitInt(offset);
+        emitChar(']');
+        emitEndInstruction();
+        return;
+    }
+
+    emitBeginInstruction(offset >= 0 ? "add" : "sub");
+    emitOperand(address);
+    emitOperand("x29");
+    emitImmediate(offset >= 0 ? offset : -offset);
+    emitEndInstruction();
+    emitBeginInstruction(mnemonic);
+    emitOperand(reg);
+    emitOperandStart();
+    emitChar('[');
+    emitText(address);
+    emitChar(']');
+    emitEndInstruction();
+}
+
+/**
+ * emitVariableAccess - Generates a load or store of a variable: a stack
+ * slot for locals, "adrp <address>, name" and a :lo12: offset for globals.
+ *
+ * @param mnemonic The scaled mnemonic (e.g. "ldrb").
+ * @param unscaledMnemonic The unscaled mnemonic (e.g. "ldurb").
+ * @param reg Name of the register loaded or stored.
+ * @param address Name of the 64-bit register to compute an address in.
+ * @param id The variable's symbol table ID.
+ */
+static void emitVariableAccess(const char *mnemonic,
+                               const char *unscaledMnemonic, const char *reg,
+                               const char *address, int id) {
+    const char *name = getSymbol(id)->name;
+
+    if (getSymbol(id)->class == C_LOCAL) {
+        emitFrameAccess(mnemonic, unscaledMnemonic, reg, address,
+                        getSymbol(id)->offset);
+        return;
+    }
+
+    emitInstruction2("adrp", address, name);
+    emitBeginInstruction(mnemonic);
+    emitOperand(reg);
+    emitOperandStart();
+    emitChar('[');
+    emitText(address);
+    emitText(", :lo12:");
+    emitText(name);
+    emitChar(']');
+    emitEndInstruction();
+}
+
+/**
+ * conditionCode - Returns the condition code of a comparison.
+ */
+static const char *conditionCode(int ASTop) {
+    switch (ASTop) {
+    case A_EQ:
+        return "eq";
+    case A_NE:
+        return "ne";
+    case A_LT:
+        return "lt";
+    case A_LE:
+        return "le";
+    case A_GT:
+        return "gt";
+    case A_GE:
+        return "ge";
+    default:
+        logFatald("Error: Invalid comparison in conditionCode: ", ASTop);
+        return NULL;
+    }
+}
+
+/**
+ * aarch64MoveRegister - Generates code to copy one register to another.
+ *
+ * @param dst Index of the destination register.
+ * @param src Index of the source register.
+ */
+void aarch64MoveRegister(int dst, int src) {
+    if (dst != src) {
+        emitInstruction2("mov", irQwordRegisterList[dst],
+                         irQwordRegisterList[src]);
+    }
+}
+
+/**
+ * aarch64LoadConstant - Generates code to set a register to a constant.
+ *
+ * @param dst Index of the destination register.
+ * @param value The constant.
+ */
+void aarch64LoadConstant(int dst, long long value) {
+    aarch64MoveConstant(irQwordRegisterList[dst], value);
+}
+
+/**
+ * aarch64LoadVariable - Generates code to load a variable, zero-extending a
+ * char and sign-extending an int like aarch64LoadLocalSymbol() does.
+ *
+ * @param dst Index of the destination register.
+ * @param id The variable's symbol table ID.
+ */
+void aarch64LoadVariable(int dst, int id) {
+    switch (getSymbol(id)->primitiveType) {
+    case P_CHAR:
+        emitVariableAccess("ldrb", "ldurb", irDwordRegisterList[dst],
+                           irQwordRegisterList[dst], id);
+        break;
+    case P_INT:
+        emitVariableAccess("ldrsw", "ldursw", irQwordRegisterList[dst],
+                           irQwordRegisterList[dst], id);
+        break;
+    default:
+        emitVariableAccess("ldr", "ldur", irQwordRegisterList[dst],
+                           irQwordRegisterList[dst], id);
+        break;
+    }
+}
+
+/**
+ * aarch64StoreVariable - Generates code to store a register into a
+ * variable, truncated to the variable's type.
+ *
+ * @param src Index of the register holding the value.
+ * @param id The variable's symbol table ID.
+ */
+void aarch64StoreVariable(int src, int id) {
+    switch (getSymbol(id)->primitiveType) {
+    case P_CHAR:
+        emitVariableAccess("strb", "sturb", irDwordRegisterList[src], "x0", id);
+        break;
+    case P_INT:
+        emitVariableAccess("str", "stur", irDwordRegisterList[src], "x0", id);
+        break;
+    default:
+        emitVariableAccess("str", "stur", irQwordRegisterList[src], "x0", id);
+        break;
+    }
+}
+
+/**
+ * aarch64LoadAddress - Generates code to load the address of a variable.
+ *
+ * @param dst Index of the destination register.
+ * @param id The variable's symbol table ID.
+ */
+void aarch64LoadAddress(int dst, int id) {
+    const char *x = irQwordRegisterList[dst];
+
+    if (getSymbol(id)->class == C_LOCAL) {
+        int offset = getSymbol(id)->offset;
+        emitBeginInstruction(offset >= 0 ? "add" : "sub");
+        emitOperand(x);
+        emitOperand("x29");
+        emitImmediate(offset >= 0 ? offset : -offset);
+        emitEndInstruction();
+        return;
+    }
+
+    emitInstruction2("adrp", x, getSymbol(id)->name);
+    emitBeginInstruction("add");
+    emitOperand(x);
+    emitOperand(x);
+    emitOperandStart();
+    emitText(":lo12:");
+    emitText(getSymbol(id)->name);
+    emitEndInstruction();
+}
+
+/**
+ * aarch64LoadStringAddress - Generates code to load the address of a
+ * string literal.
+ *
+ * @param dst Index of the destination register.
+ * @param label The string's label.
+ */
+void aarch64LoadStringAddress(int dst, int label) {
+    const char *x = irQwordRegisterList[dst];
+
+    emitBeginInstruction("adrp");
+    emitOperand(x);
+    emitLabelOperand(label);
+    emitEndInstruction();
+    emitBeginInstruction("add");
+    emitOperand(x);
+    emitOperand(x);
+    emitOperandStart();
+    emitText(":lo12:L");
+    emitInt(label);
+    emitEndInstruction();
+}
+
+/**
+ * aarch64LoadIndirect - Generates code to load the value a pointer points
+ * to, with the same widths as aarch64DereferencePointer().
+ *
+ * @param dst Index of the destination register.
+ * @param pointerReg Index of the register holding the pointer.
+ * @param pointerType The pointer's primitive type.
+ */
+void aarch64LoadIndirect(int dst, int pointerReg, int pointerType) {
+    switch (pointerType) {
+    case P_CHARPTR:
+        emitBeginInstruction("ldrb");
+        emitOperand(irDwordRegisterList[dst]);
+        break;
+    case P_INTPTR:
+        emitBeginInstruction("ldr");
+        emitOperand(irDwordRegisterList[dst]);
+        break;
+    case P_LONGPTR:
+        emitBeginInstruction("ldr");
+        emitOperand(irQwordRegisterList[dst]);
+        break;
+    default:
+        logFatald("Error: Unsupported primitive type in aarch64LoadIndirect: ",
+                  pointerType);
+    }
+    emitMemoryOperand("", irQwordRegisterList[pointerReg]);
+    emitEndInstruction();
+}
+
+/**
+ * aarch64StoreIndirect - Generates code to store a register where a pointer
+ * points to, truncated to a primitive type.
+ *
+ * @param src Index of the register holding the value.
+ * @param pointerReg Index of the register holding the pointer.
+ * @param primitiveType The primitive type of the value being stored.
+ */
+void aarch64StoreIndirect(int src, int pointerReg, int primitiveType) {
+    switch (primitiveType) {
+    case P_CHAR:
+        emitBeginInstruction("strb");
+        emitOperand(irDwordRegisterList[src]);
+        break;
+    case P_INT:
+        emitBeginInstruction("str");
+        emitOperand(irDwordRegisterList[src]);
+        break;
+    case P_LONG:
+        emitBeginInstruction("str");
+        emitOperand(irQwordRegisterList[src]);
+        break;
+    default:
+        logFatald("Error: Unsupported primitive type in aarch64StoreIndirect: ",
+                  primitiveType);
+    }
+    emitMemoryOperand("", irQwordRegisterList[pointerReg]);
+    emitEndInstruction();
+}
+
+/**
+ * aarch64LoadFrameSlot - Generates code to load a register from a spill or
+ * save slot.
+ *
+ * @param dst Index of the destination register.
+ * @param offset Offset of the slot from x29.
+ */
+void aarch64LoadFrameSlot(int dst, int offset) {
+    emitFrameAccess("ldr", "ldur", irQwordRegisterList[dst],
+                    irQwordRegisterList[dst], offset);
+}
+
+/**
+ * aarch64StoreFrameSlot - Generates code to store a register into a spill
+ * or save slot.
+ *
+ * @param src Index of the register holding the value.
+ * @param offset Offset of the slot from x29.
+ */
+void aarch64StoreFrameSlot(int src, int offset) {
+    emitFrameAccess("str", "stur", irQwordRegisterList[src], "x0", offset);
+}
+
+/**
+ * aarch64BinaryOperation - Generates code for a binary operator on two
+ * registers (dst = src1 <op> src2). AArch64 operators take three registers,
+ * so dst may be either operand.
+ *
+ * @param ASTop The AST operation code.
+ * @param dst Index of the destination register.
+ * @param src1 Index of the left operand's register.
+ * @param src2 Index of the right operand's register.
+ */
+void aarch64BinaryOperation(int ASTop, int dst, int src1, int src2) {
+    const char *mnemonic = NULL;
+
+    switch (ASTop) {
+    case A_ADD:
+        mnemonic = "add";
+        break;
+    case A_SUBTRACT:
+        mnemonic = "sub";
+        break;
+    case A_MULTIPLY:
+        mnemonic = "mul";
+        break;
+    case A_DIVIDE:
+        mnemonic = "sdiv";
+        break;
+    case A_BITWISEAND:
+        mnemonic = "and";
+        break;
+    case A_BITWISEOR:
+        mnemonic = "orr";
+        break;
+    case A_BITWISEXOR:
+        mnemonic = "eor";
+        break;
+    case A_LSHIFT:
+        mnemonic = "lsl";
+        break;
+    case A_RSHIFT:
+        mnemonic = "lsr";
+        break;
+
+    case A_EQ:
+    case A_NE:
+    case A_LT:
+    case A_LE:
+    case A_GT:
+    case A_GE:
+        emitInstruction2("cmp", irQwordRegisterList[src1],
+                         irQwordRegisterList[src2]);
+        emitInstruction2("cset", irDwordRegisterList[dst],
+                         conditionCode(ASTop));
+        return;
+
+    default:
+        logFatald("Error: Unknown operation in aarch64BinaryOperation: ",
+                  ASTop);
+    }
+
+    emitInstruction3(mnemonic, irQwordRegisterList[dst],
+                     irQwordRegisterList[src1], irQwordRegisterList[src2]);
+}
+
+/**
+ * aarch64UnaryOperation - Generates code for a unary operator on a
+ * register.
+ *
+ * @param ASTop A_ARITHMETICNEGATE, A_LOGICALINVERT, A_LOGICALNOT or
+ * A_TOBOOLEAN.
+ * @param dst Index of the destination register.
+ * @param src Index of the operand's register.
+ */
+void aarch64UnaryOperation(int ASTop, int dst, int src) {
+    switch (ASTop) {
+    case A_ARITHMETICNEGATE:
+        emitInstruction2("neg", irQwordRegisterList[dst],
+                         irQwordRegisterList[src]);
+        break;
+    case A_LOGICALINVERT:
+        emitInstruction2("mvn", irQwordRegisterList[dst],
+                         irQwordRegisterList[src]);
+        break;
+    case A_LOGICALNOT:
+    case A_TOBOOLEAN:
+        emitInstruction2("cmp", irQwordRegisterList[src], "#0");
+        emitInstruction2("cset", irDwordRegisterList[dst],
+                         ASTop == A_LOGICALNOT ? "eq" : "ne");
+        break;
+    default:
+        logFatald("Error: Unknown operation in aarch64UnaryOperation: ", ASTop);
+    }
+}
+
+/**
+ * aarch64ShiftByConstant - Generates code to shift a register by a
+ * constant.
+ *
+ * @param irOp IR_SHIFTLEFTCONST, IR_SHIFTRIGHTCONST or
+ * IR_ARITHSHIFTRIGHTCONST.
+ * @param dst Index of the destination register.
+ * @param src Index of the operand's register.
+ * @param amount The shift amount (0 to 63).
+ */
+void aarch64ShiftByConstant(int irOp, int dst, int src, int amount) {
+    const char *mnemonic = irOp == IR_SHIFTLEFTCONST    ? "lsl"
+                           : irOp == IR_SHIFTRIGHTCONST ? "lsr"
+                                                        : "asr";
+
+    emitBeginInstruction(mnemonic);
+    emitOperand(irQwordRegisterList[dst]);
+    emitOperand(irQwordRegisterList[src]);
+    emitImmediate(amount);
+    emitEndInstruction();
+}
+
+/**
+ * aarch64MultiplyHighByConstant - Generates code for the upper 64 bits of
+ * the signed 128-bit product of a register and a constant (smulh, with the
+ * constant in x0).
+ *
+ * @param dst Index of the destination register.
+ * @param src Index of the operand's register.
+ * @param value The constant.
+ */
+void aarch64MultiplyHighByConstant(int dst, int src, long long value) {
+    aarch64MoveConstant("x0", value);
+    emitInstruction3("smulh", irQwordRegisterList[dst],
+                     irQwordRegisterList[src], "x0");
+}
+
+/**
+ * aarch64NarrowToType - Generates code to truncate a register to a
+ * primitive type and extend it again like aarch64LoadVariable() would.
+ *
+ * @param dst Index of the destination register.
+ * @param src Index of the operand's register.
+ * @param primitiveType The type to narrow to.
+ */
+void aarch64NarrowToType(int dst, int src, int primitiveType) {
+    switch (primitiveType) {
+    case P_CHAR:
+        emitInstruction2("uxtb", irDwordRegisterList[dst],
+                         irDwordRegisterList[src]);
+        break;
+    case P_INT:
+        emitInstruction2("sxtw", irQwordRegisterList[dst],
+                         irDwordRegisterList[src]);
+        break;
+    default:
+        aarch64MoveRegister(dst, src);
+        break;
+    }
+}
+
+/**
+ * aarch64BranchIfCompare - Generates code to jump to a label if a
+ * comparison holds. Equality with zero uses cbz/cbnz.
+ *
+ * @param ASTop The comparison (A_EQ ... A_GE).
+ * @param src1 Index of the left operand's register.
+ * @param src2 Index of the right operand's register, or NOREG for zero.
+ * @param label The label to jump to.
+ */
+void aarch64BranchIfCompare(int ASTop, int src1, int src2, int label) {
+    char mnemonic[8];
+
+    if (src2 == NOREG && (ASTop == A_EQ || ASTop == A_NE)) {
+        emitBeginInstruction(ASTop == A_EQ ? "cbz" : "cbnz");
+        emitOperand(irQwordRegisterList[src1]);
+        emitLabelOperand(label);
+        emitEndInstruction();
+        return;
+    }
+
+    emitInstruction2("cmp", irQwordRegisterList[src1],
+                     src2 == NOREG ? "#0" : irQwordRegisterList[src2]);
+    snprintf(mnemonic, sizeof(mnemonic), "b%s", conditionCode(ASTop));
+    emitInstructionLabel(mnemonic, label);
+}
+
+/**
+ * aarch64CallFunction - Generates code to call a function. The allocator
+ * keeps values live across the call in callee-saved registers, so nothing
+ * is saved around it.
+ *
+ * @param dst Index of the register receiving the result, or NOREG.
+ * @param arg Index of the register holding the argument.
+ * @param id The function's symbol table ID.
+ */
+void aarch64CallFunction(int dst, int arg, int id) {
+    emitInstruction2("mov", "x0", irQwordRegisterList[arg]);
+    emitInstruction1("bl", getSymbol(id)->name);
+    if (dst != NOREG) {
+        emitInstruction2("mov", irQwordRegisterList[dst], "x0");
+    }
+}
+
+/**
+ * aarch64MoveReturnValue - Generates code to move a function's return value
+ * into x0, like aarch64ReturnFromFunction() but without the branch.
+ *
+ * @param src Index of the register holding the value.
+ * @param id The function's symbol table ID.
+ */
+void aarch64MoveReturnValue(int src, int id) {
+    int primitiveType = getSymbol(id)->primitiveType;
+
+    switch (primitiveType) {
+    case P_CHAR:
+    case P_INT:
+        emitInstruction2("mov", "w0", irDwordRegisterList[src]);
+        break;
+    case P_LONG:
+        emitInstruction2("mov", "x0", irQwordRegisterList[src]);
+        break;
+    default:
+        logFatald(
+            "Error: Unsupported primitive type in aarch64MoveReturnValue: ",
+            primitiveType);
+    }
+}
@@ -1,10 +1,16 @@
 // src/cgn/aarch64/cgn_ops.c
 
+#include "cgn/aarch64/cgn_regs.h"
 #include "cgn/cg_ops.h"
 #include "decl.h" // for aarch64* prototypes already declared there
 
 const struct CodegenOps aarch64Ops = {
+    .immediatePrefix = "#",
+
     .resetRegisters = aarch64ResetRegisterPool,
+    .countFreeRegisters = aarch64CountFreeRegisters,
+    .spillRegister = aarch64SpillRegister,
+    .reloadRegister = aarch64ReloadRegister,
 
     .preamble = aarch64Preamble,
     .postamble = aarch64Postamble,
@@ -55,4 +61,28 @@ const struct CodegenOps aarch64Ops = {
 
     .resetLocalOffset = aarch64ResetLocalOffset,
     .getLocalOffset = aarch64GetLocalOffset,
+
+    .calleeSavedRegisterCount = AARCH64_CALLEE_SAVED_COUNT,
+    .callerSavedRegisterCount = AARCH64_CALLER_SAVED_COUNT,
+    .moveRegister = aarch64MoveRegister,
+    .loadConstant = aarch64LoadConstant,
+    .loadVariable = aarch64LoadVariable,
+    .storeVariable = aarch64StoreVariable,
+    .loadAddress = aarch64LoadAddress,
+    .loadStringAddress = aarch64LoadStringAddress,
+    .loadIndirect = aarch64LoadIndirect,
+    .storeIndirect = aarch64StoreIndirect,
+    .loadFrameSlot = aarch64LoadFrameSlot,
+    .storeFrameSlot = aarch64StoreFrameSlot,
+    .binaryOperation = aarch64BinaryOperation,
+    .unaryOperation = aarch64UnaryOperation,
+    .shiftByConstant = aarch64ShiftByConstant,
+    .multiplyHighByConstant = aarch64MultiplyHighByConstant,
+    .narrowToType = aarch64NarrowToType,
+    .branchIfCompare = aarch64BranchIfCompare,
+    .callFunction = aarch64CallFunction,
+    .moveReturnValue = aarch64MoveReturnValue,
+    .peephole = &aarch64Peephole,
+
+    .assembleObject = aarch64AssembleObject,
 };
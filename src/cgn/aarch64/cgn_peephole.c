@@ -0,0 +1,606 @@
+// src/cgn/aarch64/cgn_peephole.c
+
+/**
+ * NOTE:
+ * AArch64 GNU as-style backend
+ * Peephole rules for the code cgn_ir.c generates at -O1 (see peephole.c),
+ * in the order they are tried:
+ * - jump-to-next, jump-to-jump: see peephole.c.
+ * - store-reload: a load of what the previous instruction stored becomes a
+ *   move or extension of the stored register ("str w9, [x29, #-4];
+ *   ldrsw x10, [x29, #-4]" -> "sxtw x10, w9"). A global's address loaded
+ *   again in between ("adrp x10, name") goes too.
+ * - constant-extension: "mov x9, #5; sxtw x20, w9" -> "mov x20, #5" (also
+ *   uxtb and 32-bit moves), if the result still fits a single mov.
+ * - immediate-operand: "mov x13, #39; cmp x20, x13" -> "cmp x20, #39"
+ *   (also add and sub, turned into cmn, sub and add for negative
+ *   constants), if the constant fits in 12 bits.
+ * - move-forwarding: "mov x9, #0; mov x0, x9" -> "mov x0, #0" (any
+ *   instruction whose first operand is only written).
+ * - condition-to-branch: "cset w9, lt; cbz x9, L" -> "bge L" (also with
+ *   "cmp x9, #0" and beq/bne or cset).
+ * Except for store-reload, the register the removed instruction wrote must
+ * be dead afterwards.
+ *
+ * Registers are numbered as the machine encodes them (x0 0 ... x30 30, sp
+ * 31); w<n> is x<n>.
+ */
+
+#include "data.h"
+#include "decl.h"
+#include "defs.h"
+#include "peephole.h"
+
+#define SP 31
+
+#define BIT(r) (1ull << (r))
+
+// Widths of register names
+enum { XREG, WREG };
+
+// Condition codes (as cgn_ir.c spells them) and their inverses
+static const struct {
+    const char *condition;
+    const char *inverse;
+} conditions[] = {
+    {"eq", "ne"}, {"ne", "eq"}, {"lt", "ge"},
+    {"ge", "lt"}, {"le", "gt"}, {"gt", "le"},
+};
+
+// Instructions writing their first operand without reading it
+static const char *writeOnlyMnemonics[] = {
+    "mov",  "movz",  "movn",  "add",    "sub",  "mul",  "sdiv",
+    "udiv", "smulh", "lsl",   "lsr",    "asr",  "neg",  "mvn",
+    "and",  "orr",   "eor",   "ldr",    "ldur", "ldrb", "ldurb",
+    "ldrh", "ldurh", "ldrsw", "ldursw", "sxtw", "uxtb", "cset",
+    "csel", "adrp",  "adr",   "madd",   "msub",
+};
+
+/**
+ * registerNumber - Look up a register name ("x9", "w9", "sp").
+ *
+ * @param width Receives the width of the name (XREG or WREG)
+ *
+ * @return The register's number, or -1 if the text is not a register
+ */
+static int registerNumber(const char *text, int *width) {
+    int number = 0;
+
+    if (strcmp(text, "sp") == 0) {
+        *width = XREG;
+        return SP;
+    }
+    if ((text[0] != 'x' && text[0] != 'w') || text[1] == '\0') {
+        return -1;
+    }
+    for (const char *s = text + 1; *s != '\0'; s++) {
+        if (*s < '0' || *s > '9' || s - text > 2) {
+            return -1;
+        }
+        number = number * 10 + (*s - '0');
+    }
+    if (number > 30 || (text[1] == '0' && text[2] != '\0')) {
+        return -1;
+    }
+    *width = text[0] == 'x' ? XREG : WREG;
+    return number;
+}
+
+/**
+ * registerName - Write the name of a register at a width.
+ */
+static void registerName(char *name, size_t size, int r, int width) {
+    if (r == SP) {
+        snprintf(name, size, "sp");
+    } else {
+        snprintf(name, size, "%c%d", width == XREG ? 'x' : 'w', r);
+    }
+}
+
+/**
+ * operandRegisters - Returns the registers named in an operand, e.g. the
+ * base of an address.
+ */
+static uint64_t operandRegisters(const char *operand) {
+    uint64_t registers = 0;
+    const char *s = operand;
+
+    while (*s != '\0') {
+        char word[8];
+        size_t length = 0;
+        int width, r;
+
+        if (!isalnum((unsigned char)*s)) {
+            s++;
+            continue;
+        }
+        while (isalnum((unsigned char)s[length])) {
+            length++;
+        }
+        if (length < sizeof(word)) {
+            memcpy(word, s, length);
+            word[length] = '\0';
+            if ((r = registerNumber(word, &width)) >= 0) {
+                registers |= BIT(r);
+            }
+        }
+        s += length;
+    }
+    return registers;
+}
+
+/**
+ * invertCondition - Returns the inverse of a condition, or NULL if it is
+ * not one cgn_ir.c uses.
+ */
+static const char *invertCondition(const char *condition) {
+    for (size_t k = 0; k < sizeof(conditions) / sizeof(conditions[0]); k++) {
+        if (strcmp(condition, conditions[k].condition) == 0) {
+            return conditions[k].inverse;
+        }
+    }
+    return NULL;
+}
+
+/**
+ * isConditionalBranch - Tell whether a mnemonic is b<cond> or b.<cond>.
+ */
+static bool isConditionalBranch(const char *mnemonic) {
+    static const char *codes[] = {"eq", "ne", "lt", "le", "gt", "ge",
+                                  "hi", "hs", "lo", "ls", "mi", "pl",
+                                  "vs", "vc", "cs", "cc", "al"};
+    const char *code = mnemonic + 1;
+
+    if (mnemonic[0] != 'b') {
+        return false;
+    }
+    if (*code == '.') {
+        code++;
+    }
+    for (size_t k = 0; k < sizeof(codes) / sizeof(codes[0]); k++) {
+        if (strcmp(code, codes[k]) == 0) {
+            return true;
+        }
+    }
+    return false;
+}
+
+/**
+ * isWriteOnly - Tell whether an instruction writes its first operand
+ * without reading it.
+ */
+static bool isWriteOnly(const char *mnemonic) {
+    for (size_t k = 0;
+         k < sizeof(writeOnlyMnemonics) / sizeof(writeOnlyMnemonics[0]); k++) {
+        if (strcmp(mnemonic, writeOnlyMnemonics[k]) == 0) {
+            return true;
+        }
+    }
+    return false;
+}
+
+/**
+ * describeInstruction - Tell what an instruction does with the registers
+ * (see struct peepholeEffect). A w register write clears the upper half,
+ * so it writes the whole register.
+ */
+static void describeInstruction(const struct peepholeLine *line,
+                                struct peepholeEffect *effect) {
+    const char *m = line->mnemonic;
+    int first = 0, width, r;
+
+    effect->reads = effect->writes = 0;
+    effect->flow = PEEPHOLE_NEXT;
+    effect->label = -1;
+
+    if (strcmp(m, "bl") == 0) {
+        // keccc functions take one argument
+        effect->reads = BIT(0) | BIT(SP);
+        effect->flow = PEEPHOLE_CALL;
+        return;
+    }
+    if (strcmp(m, "ret") == 0) {
+        effect->reads = BIT(0) | BIT(SP);
+        for (r = 19; r <= 30; r++) {
+            effect->reads |= BIT(r);
+        }
+        effect->flow = PEEPHOLE_RETURN;
+        return;
+    }
+    if (line->operandCount > 0 &&
+        (strcmp(m, "b") == 0 || strcmp(m, "cbz") == 0 ||
+         strcmp(m, "cbnz") == 0 || isConditionalBranch(m))) {
+        effect->flow = strcmp(m, "b") == 0 ? PEEPHOLE_JUMP : PEEPHOLE_BRANCH;
+        effect->label =
+            peepholeParseLabel(line->operands[line->operandCount - 1]);
+        if (line->operandCount == 2) {
+            effect->reads = operandRegisters(line->operands[0]);
+        }
+        return;
+    }
+
+    if (isWriteOnly(m) && line->operandCount >= 2 &&
+        (r = registerNumber(line->operands[0], &width)) >= 0) {
+        effect->writes = BIT(r);
+        first = 1;
+    }
+    for (int k = first; k < line->operandCount; k++) {
+        effect->reads |= operandRegisters(line->operands[k]);
+    }
+    effect->writes &= ~effect->reads;
+}
+
+/**
+ * isInstruction - Tell whether a line is an instruction with a given
+ * mnemonic and number of operands.
+ */
+static bool isInstruction(const struct peepholeLine *line, const char *mnemonic,
+                          int operandCount) {
+    return line->kind == PEEPHOLE_INSTRUCTION &&
+           line->operandCount == operandCount &&
+           strcmp(line->mnemonic, mnemonic) == 0;
+}
+
+/**
+ * isRegister - Tell whether an operand names a register at a width.
+ */
+static bool isRegister(const char *operand, int r, int width) {
+    char name[16];
+
+    registerName(name, sizeof(name), r, width);
+    return strcmp(operand, name) == 0;
+}
+
+/**
+ * loadsConstant - Tell whether a line is "mov x<n>, #<value>".
+ *
+ * @param r Receives the register
+ * @param value Receives the value
+ */
+static bool loadsConstant(const struct peepholeLine *line, int *r,
+                          long long *value) {
+    int width;
+
+    return isInstruction(line, "mov", 2) && line->operands[1][0] == '#' &&
+           (*r = registerNumber(line->operands[0], &width)) >= 0 &&
+           width == XREG && *r != SP &&
+           peepholeParseImmediate(line->operands[1], value);
+}
+
+/**
+ * rewrite - Replace a line's instruction, with an immediate as its last
+ * operand.
+ */
+static void rewrite(struct peepholeLine *line, const char *mnemonic,
+                    const char *first, const char *second, long long value) {
+    char immediate[24];
+    const char *operands[3] = {first, second, immediate};
+
+    snprintf(immediate, sizeof(immediate), "#%lld", value);
+    if (second == NULL) {
+        operands[1] = immediate;
+        peepholeRewrite(line, mnemonic, operands, 2);
+    } else {
+        peepholeRewrite(line, mnemonic, operands, 3);
+    }
+}
+
+/**
+ * sameGlobalAccess - Tell whether a store and a load address the same
+ * global through the registers their adrp loaded ("[x0, :lo12:name]" and
+ * "[x11, :lo12:name]"), the load's being the register it loads.
+ */
+static bool sameGlobalAccess(const char *storeOperand, const char *storeBase,
+                             const char *loadOperand, const char *loadBase,
+                             int dst) {
+    size_t storeLength = strlen(storeBase), loadLength = strlen(loadBase);
+    int width;
+
+    return registerNumber(loadBase, &width) == dst &&
+           strncmp(storeOperand + 1, storeBase, storeLength) == 0 &&
+           strncmp(loadOperand + 1, loadBase, loadLength) == 0 &&
+           storeOperand[storeLength + 1] == ',' &&
+           loadOperand[loadLength + 1] == ',' &&
+           strcmp(storeOperand + storeLength + 1,
+                  loadOperand + loadLength + 1) == 0;
+}
+
+/**
+ * storeReload - Rule turning the load of what was just stored into a move
+ * or an extension of the stored register, or removing it if it loads the
+ * stored register.
+ */
+static bool storeReload(struct peepholeFunction *p, int i) {
+    struct peepholeLine *store = &p->lines[i], *load;
+    const char *m = store->mnemonic, *mnemonic;
+    char operands[2][16];
+    const char *pair[2] = {operands[0], operands[1]};
+    int j, adrp = -1, previous, src, dst, width, dstWidth;
+    bool byte;
+
+    if ((strcmp(m, "str") != 0 && strcmp(m, "stur") != 0 &&
+         strcmp(m, "strb") != 0 && strcmp(m, "sturb") != 0) ||
+        store->operandCount != 2 || store->operands[1][0] != '[' ||
+        (src = registerNumber(store->operands[0], &width)) < 0 ||
+        (j = peepholeNextInstruction(p, i)) < 0) {
+        return false;
+    }
+    byte = m[strlen(m) - 1] == 'b';
+
+    // The address of a global, loaded again for the load (into the register
+    // it loads)
+    previous = peepholePreviousInstruction(p, i);
+    if (isInstruction(&p->lines[j], "adrp", 2) && previous >= 0 &&
+        isInstruction(&p->lines[previous], "adrp", 2) &&
+        strcmp(p->lines[j].operands[1], p->lines[previous].operands[1]) == 0) {
+        adrp = j;
+        if ((j = peepholeNextInstruction(p, j)) < 0) {
+            return false;
+        }
+    }
+
+    load = &p->lines[j];
+    if (load->operandCount != 2 ||
+        (dst = registerNumber(load->operands[0], &dstWidth)) < 0 || dst == SP) {
+        return false;
+    }
+    if (adrp < 0 ? strcmp(load->operands[1], store->operands[1]) != 0
+                 : !sameGlobalAccess(
+                       store->operands[1], p->lines[previous].operands[0],
+                       load->operands[1], p->lines[adrp].operands[0], dst)) {
+        return false;
+    }
+
+    m = load->mnemonic;
+    if (byte && (strcmp(m, "ldrb") == 0 || strcmp(m, "ldurb") == 0)) {
+        mnemonic = "uxtb";
+        registerName(operands[0], 16, dst, WREG);
+        registerName(operands[1], 16, src, WREG);
+    } else if (!byte && width == WREG &&
+               (strcmp(m, "ldrsw") == 0 || strcmp(m, "ldursw") == 0)) {
+        mnemonic = "sxtw";
+        registerName(operands[0], 16, dst, XREG);
+        registerName(operands[1], 16, src, WREG);
+    } else if (!byte && width == dstWidth &&
+               (strcmp(m, "ldr") == 0 || strcmp(m, "ldur") == 0)) {
+        mnemonic = "mov";
+        registerName(operands[0], 16, dst, width);
+        registerName(operands[1], 16, src, width);
+    } else {
+        return false;
+    }
+
+    if (adrp >= 0) {
+        peepholeRemove(p, adrp);
+    }
+    if (width == XREG && dst == src && strcmp(mnemonic, "mov") == 0) {
+        peepholeRemove(p, j);
+    } else {
+        peepholeRewrite(load, mnemonic, pair, 2);
+    }
+    return true;
+}
+
+/**
+ * constantExtension - Rule extending a constant when it is loaded rather
+ * than in its register afterwards.
+ */
+static bool constantExtension(struct peepholeFunction *p, int i) {
+    struct peepholeLine *line = &p->lines[i], *extend;
+    char name[16];
+    long long value;
+    int j, a, b, width;
+
+    if (!loadsConstant(line, &a, &value) ||
+        (j = peepholeNextInstruction(p, i)) < 0) {
+        return false;
+    }
+    extend = &p->lines[j];
+    if (extend->operandCount != 2 ||
+        (b = registerNumber(extend->operands[0], &width)) < 0 || b == SP ||
+        !isRegister(extend->operands[1], a, WREG)) {
+        return false;
+    }
+
+    if (strcmp(extend->mnemonic, "sxtw") == 0 && width == XREG) {
+        value = (int32_t)value;
+    } else if (strcmp(extend->mnemonic, "uxtb") == 0 && width == WREG) {
+        value = (uint8_t)value;
+    } else if (strcmp(extend->mnemonic, "mov") == 0 && width == WREG) {
+        value = (uint32_t)value;
+    } else {
+        return false;
+    }
+    // A single mov (see aarch64MoveConstant())
+    if (value <= -65536 || value >= 65536 ||
+        (b != a && !peepholeRegisterDead(p, j, a))) {
+        return false;
+    }
+
+    registerName(name, sizeof(name), b, XREG);
+    rewrite(line, "mov", name, NULL, value);
+    peepholeRemove(p, j);
+    return true;
+}
+
+/**
+ * immediateOperand - Rule using a constant as the immediate operand of the
+ * add, sub or cmp after it instead of loading it into a register.
+ */
+static bool immediateOperand(struct peepholeFunction *p, int i) {
+    struct peepholeLine *line;
+    char source[PEEPHOLE_TEXT_SIZE];
+    long long value;
+    int j, a, d, s, width;
+    bool add;
+
+    if (!loadsConstant(&p->lines[i], &a, &value) || value < -4095 ||
+        value > 4095 || (j = peepholeNextInstruction(p, i)) < 0) {
+        return false;
+    }
+    line = &p->lines[j];
+
+    if (isInstruction(line, "cmp", 2) &&
+        isRegister(line->operands[1], a, XREG)) {
+        if ((s = registerNumber(line->operands[0], &width)) < 0 ||
+            width != XREG || s == a || !peepholeRegisterDead(p, j, a)) {
+            return false;
+        }
+        snprintf(source, sizeof(source), "%s", line->operands[0]);
+        rewrite(line, value < 0 ? "cmn" : "cmp", source, NULL,
+                value < 0 ? -value : value);
+        peepholeRemove(p, i);
+        return true;
+    }
+
+    if ((!isInstruction(line, "add", 3) && !isInstruction(line, "sub", 3)) ||
+        (d = registerNumber(line->operands[0], &width)) < 0 || width != XREG) {
+        return false;
+    }
+    add = strcmp(line->mnemonic, "add") == 0;
+    if (isRegister(line->operands[2], a, XREG)) {
+        snprintf(source, sizeof(source), "%s", line->operands[1]);
+    } else if (add && isRegister(line->operands[1], a, XREG)) {
+        snprintf(source, sizeof(source), "%s", line->operands[2]);
+    } else {
+        return false;
+    }
+    if ((s = registerNumber(source, &width)) < 0 || width != XREG || s == a ||
+        (d != a && !peepholeRegisterDead(p, j, a))) {
+        return false;
+    }
+    if (value < 0) {
+        add = !add;
+        value = -value;
+    }
+    snprintf(line->operands[1], PEEPHOLE_TEXT_SIZE, "%s", source);
+    rewrite(line, add ? "add" : "sub", line->operands[0], line->operands[1],
+            value);
+    peepholeRemove(p, i);
+    return true;
+}
+
+/**
+ * moveForwarding - Rule writing a value straight into the register it is
+ * moved to next.
+ */
+static bool moveForwarding(struct peepholeFunction *p, int i) {
+    struct peepholeLine *line = &p->lines[i], *move;
+    char name[16];
+    int j, a, b, width, moveWidth;
+
+    if (!isWriteOnly(line->mnemonic) || line->operandCount < 2 ||
+        (a = registerNumber(line->operands[0], &width)) < 0 || a >= 29 ||
+        (j = peepholeNextInstruction(p, i)) < 0) {
+        return false;
+    }
+    move = &p->lines[j];
+    if (!isInstruction(move, "mov", 2) ||
+        !isRegister(move->operands[1], a, XREG) ||
+        (b = registerNumber(move->operands[0], &moveWidth)) < 0 ||
+        moveWidth != XREG || b == a || b >= 29 ||
+        !peepholeRegisterDead(p, j, a)) {
+        return false;
+    }
+
+    registerName(name, sizeof(name), b, width);
+    snprintf(line->operands[0], PEEPHOLE_TEXT_SIZE, "%s", name);
+    line->rewritten = true;
+    peepholeRemove(p, j);
+    if (isInstruction(line, "mov", 2) &&
+        strcmp(line->operands[0], line->operands[1]) == 0 && width == XREG) {
+        peepholeRemove(p, i);
+    }
+    return true;
+}
+
+/**
+ * conditionToBranch - Rule branching (or setting a register) on the flags
+ * a 0 or 1 was set from, instead of on that value.
+ */
+static bool conditionToBranch(struct peepholeFunction *p, int i) {
+    struct peepholeLine *set = &p->lines[i], *use;
+    const char *condition, *inverse, *operand;
+    char mnemonic[PEEPHOLE_TEXT_SIZE + 1];
+    long long zero;
+    int j, k, a, u, width;
+    bool onZero;
+
+    if (!isInstruction(set, "cset", 2) ||
+        (inverse = invertCondition(set->operands[1])) == NULL ||
+        (a = registerNumber(set->operands[0], &width)) < 0 ||
+        (j = peepholeNextInstruction(p, i)) < 0) {
+        return false;
+    }
+    condition = set->operands[1];
+
+    // cbz/cbnz x9, L
+    use = &p->lines[j];
+    if ((isInstruction(use, "cbz", 2) || isInstruction(use, "cbnz", 2)) &&
+        isRegister(use->operands[0], a, XREG)) {
+        if (!peepholeRegisterDead(p, j, a)) {
+            return false;
+        }
+        snprintf(mnemonic, sizeof(mnemonic), "b%s",
+                 strcmp(use->mnemonic, "cbz") == 0 ? inverse : condition);
+        operand = use->operands[1];
+        peepholeRewrite(use, mnemonic, &operand, 1);
+        peepholeRemove(p, i);
+        return true;
+    }
+
+    // cmp x9, #0; beq/bne L (or cset w10, eq/ne)
+    if (!isInstruction(use, "cmp", 2) ||
+        !isRegister(use->operands[0], a, XREG) ||
+        !peepholeParseImmediate(use->operands[1], &zero) || zero != 0 ||
+        (k = peepholeNextInstruction(p, j)) < 0) {
+        return false;
+    }
+    use = &p->lines[k];
+    if (isInstruction(use, "beq", 1) || isInstruction(use, "bne", 1)) {
+        onZero = strcmp(use->mnemonic, "beq") == 0;
+        if (!peepholeRegisterDead(p, k, a)) {
+            return false;
+        }
+        snprintf(mnemonic, sizeof(mnemonic), "b%s",
+                 onZero ? inverse : condition);
+        operand = use->operands[0];
+        peepholeRewrite(use, mnemonic, &operand, 1);
+    } else if (isInstruction(use, "cset", 2) &&
+               (strcmp(use->operands[1], "eq") == 0 ||
+                strcmp(use->operands[1], "ne") == 0)) {
+        onZero = strcmp(use->operands[1], "eq") == 0;
+        u = registerNumber(use->operands[0], &width);
+        if (u != a && !peepholeRegisterDead(p, k, a)) {
+            return false;
+        }
+        snprintf(use->operands[1], PEEPHOLE_TEXT_SIZE, "%s",
+                 onZero ? inverse : condition);
+        use->rewritten = true;
+    } else {
+        return false;
+    }
+    peepholeRemove(p, i);
+    peepholeRemove(p, j);
+    return true;
+}
+
+// Rules in the order they are tried (hit counts for --stats)
+static struct peepholeRule rules[] = {
+    {"jump-to-next", peepholeJumpToNext, 0},
+    {"jump-to-jump", peepholeJumpToJump, 0},
+    {"store-reload", storeReload, 0},
+    {"constant-extension", constantExtension, 0},
+    {"immediate-operand", immediateOperand, 0},
+    {"move-forwarding", moveForwarding, 0},
+    {"condition-to-branch", conditionToBranch, 0},
+};
+
+const struct peepholeTarget aarch64Peephole = {
+    .rules = rules,
+    .ruleCount = sizeof(rules) / sizeof(rules[0]),
+    .describe = describeInstruction,
+    .preservedByCalls = BIT(19) | BIT(20) | BIT(21) | BIT(22) | BIT(23) |
+                        BIT(24) | BIT(25) | BIT(26) | BIT(27) | BIT(28) |
+                        BIT(29) | BIT(SP),
+};
@@ -5,26 +5,36 @@
 #include "decl.h"
 #include "defs.h"
 
-// 4 general-purpose scratch registers
-// Using caller-saved x9–x12 (AAPCS64: caller-saved, so we don't
-// have to preserve them across calls; our codegen doesn’t assume
-// anything survives a call except x0 return).
-static bool aarch64FreeRegisters[8];
+/**
+ * NOTE:
+ * The pool holds the caller-saved registers that the generated code does not
+ * use for a fixed purpose: x0 carries arguments, return values and global
+ * addresses, x16/x17 may be clobbered by linker veneers and x18 is the
+ * platform register. Values still live at a call are saved around it (see
+ * aarch64FunctionCall), and gen.c spills to the stack when an expression
+ * needs more registers than are free (aarch64SpillRegister).
+ */
+static bool aarch64FreeRegisters[AARCH64_REGISTER_COUNT];
 
-char *aarch64QwordRegisterList[8] = {"x9", // 64-bit GPR
-                                     "x10", "x11", "x12", "x13",
-                                     "x14", "x15", "x16"};
+char *aarch64QwordRegisterList[AARCH64_REGISTER_COUNT] = {
+    "x9", "x10", "x11", "x12", "x13", "x14", "x15", // temporaries
+    "x1", "x2",  "x3",  "x4",  "x5",  "x6",  "x7",  // argument registers
+    "x8",                                           // indirect result
+};
 
-char *aarch64DwordRegisterList[8] = {"w9", // low 32 bits of x9
-                                     "w10", "w11", "w12", "w13",
-                                     "w14", "w15", "w16"};
+char *aarch64DwordRegisterList[AARCH64_REGISTER_COUNT] = {
+    "w9", "w10", "w11", "w12", "w13", "w14", "w15", "w1",
+    "w2", "w3",  "w4",  "w5",  "w6",  "w7",  "w8",
+};
 
 // WARNING:
 // We don’t really have 8-bit registers on AArch64; we’ll treat
 // “byte” registers as the 32-bit view (wN). Instructions like
 // `ldrb`/`strb` take a w-register.
-char *aarch64ByteRegisterList[8] = {"w9",  "w10", "w11", "w12",
-                                    "w13", "w14", "w15", "w16"};
+char *aarch64ByteRegisterList[AARCH64_REGISTER_COUNT] = {
+    "w9", "w10", "w11", "w12", "w13", "w14", "w15", "w1",
+    "w2", "w3",  "w4",  "w5",  "w6",  "w7",  "w8",
+};
 
 /**
  * aarch64ResetRegisterPool - Reset the aarch64 register pool, marking all
@@ -68,3 +78,39 @@ void aarch64FreeRegister(int r) {
     }
     aarch64FreeRegisters[r] = true;
 }
+
+/**
+ * aarch64IsRegisterAllocated - Check whether a register currently holds a
+ * value.
+ *
+ * @param r The index of the register.
+ *
+ * @return true if the register is allocated.
+ */
+bool aarch64IsRegisterAllocated(int r) { return !aarch64FreeRegisters[r]; }
+
+/**
+ * aarch64CheckRegister - Dies with an error if a register index is outside
+ * the register name tables (e.g. NOREG handed to an emit routine).
+ *
+ * @param r The index of the register.
+ */
+void aarch64CheckRegister(int r) {
+    if (r < 0 || r >= AARCH64_REGISTER_COUNT) {
+        logFatald("Invalid register index: ", r);
+    }
+}
+
+/**
+ * aarch64CountFreeRegisters - Count the registers available for allocation.
+ *
+ * @return Number of free registers.
+ */
+int aarch64CountFreeRegisters(void) {
+    int count = 0;
+
+    for (int i = 0; i < AARCH64_REGISTER_COUNT; i++) {
+        count += aarch64FreeRegisters[i];
+    }
+    return count;
+}
@@ -3,12 +3,22 @@
 
 #include <stdbool.h>
 
-// Simple 4-register pool for aarch64 backend.
-// We’ll use caller-saved registers x9–x12 / w9–w12.
-extern char *aarch64QwordRegisterList[8];
-extern char *aarch64DwordRegisterList[8];
-extern char *aarch64ByteRegisterList[8];
+// Number of registers in the allocation pool
+#define AARCH64_REGISTER_COUNT 15
+
+// Register pool for the aarch64 backend: the caller-saved registers
+// x9–x15 and x1–x8 (w-views for 32-bit and byte accesses).
+extern char *aarch64QwordRegisterList[AARCH64_REGISTER_COUNT];
+extern char *aarch64DwordRegisterList[AARCH64_REGISTER_COUNT];
+extern char *aarch64ByteRegisterList[AARCH64_REGISTER_COUNT];
 
 void aarch64ResetRegisterPool(void);
 int aarch64AllocateRegister(void);
 void aarch64FreeRegister(int r);
+bool aarch64IsRegisterAllocated(int r);
+void aarch64CheckRegister(int r);
+int aarch64CountFreeRegisters(void);
+
+// Registers handed to the register allocator at -O1 (see cgn_ir.c)
+#define AARCH64_CALLEE_SAVED_COUNT 10
+#define AARCH64_CALLER_SAVED_COUNT 15
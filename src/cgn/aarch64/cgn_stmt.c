@@ -10,6 +10,7 @@
 #include "data.h"
 #include "decl.h"
 #include "defs.h"
+#include "emit.h"
 
 // Position of next local variable relative to frame pointer (x29).
 // We track local allocation size as a positive number of bytes.
@@ -40,10 +41,10 @@ int aarch64GetLocalOffset(int type, bool isFunctionParameter) {
 void aarch64Preamble(void) {
     aarch64ResetRegisterPool();
 
-    fputs("\t.text\n", Outfile);
-    fputs("\t.extern\tprintint\n", Outfile);
-    fputs("\t.extern\tprintchar\n", Outfile);
-    fputs("\t.extern\tprintstring\n", Outfile);
+    emitInstruction0(".text");
+    emitInstruction1(".extern", "printint");
+    emitInstruction1(".extern", "printchar");
+    emitInstruction1(".extern", "printstring");
 }
 
 /**
@@ -59,42 +60,106 @@ void aarch64Postamble(void) {}
  * aarch64FunctionCall - Generates code to call a function with an argument in a
  * register.
  *
+ * NOTE:
+ * Every pool register is caller-saved, so the ones still holding values
+ * (other than the argument) are stored below sp before the call and loaded
+ * back after it, in pairs where possible.
+ *
  * @param r Index of the register containing the argument.
  * @param functionSymbolId The function's symbol table ID.
  *
  * @return Index of the register containing the function's return value.
  */
 int aarch64FunctionCall(int r, int functionSymbolId) {
-    int out = aarch64AllocateRegister();
+    int saved[AARCH64_REGISTER_COUNT];
+    int savedCount = 0;
 
-    fprintf(Outfile, "\tmov\tx0, %s\n", aarch64QwordRegisterList[r]);
-    fprintf(Outfile, "\tbl\t%s\n", SymbolTable[functionSymbolId].name);
-    fprintf(Outfile, "\tmov\t%s, x0\n", aarch64QwordRegisterList[out]);
+    for (int i = 0; i < AARCH64_REGISTER_COUNT; i++) {
+        if (i != r && aarch64IsRegisterAllocated(i)) {
+            saved[savedCount++] = i;
+        }
+    }
+    for (int i = 0; i < savedCount; i += 2) {
+        if (i + 1 < savedCount) {
+            emitInstruction3("stp", aarch64QwordRegisterList[saved[i]],
+                             aarch64QwordRegisterList[saved[i + 1]],
+                             "[sp, -16]!");
+        } else {
+            emitInstruction2("str", aarch64QwordRegisterList[saved[i]],
+                             "[sp, -16]!");
+        }
+    }
 
+    emitInstruction2("mov", "x0", aarch64QwordRegisterList[r]);
     aarch64FreeRegister(r);
+    emitInstruction1("bl", getSymbol(functionSymbolId)->name);
+
+    int out = aarch64AllocateRegister();
+    emitInstruction2("mov", aarch64QwordRegisterList[out], "x0");
+
+    // Restore in reverse order; an odd register count ends with a single one
+    for (int i = (savedCount - 1) & ~1; i >= 0; i -= 2) {
+        if (i + 1 < savedCount) {
+            emitInstruction3("ldp", aarch64QwordRegisterList[saved[i]],
+                             aarch64QwordRegisterList[saved[i + 1]],
+                             "[sp], 16");
+        } else {
+            emitInstruction2("ldr", aarch64QwordRegisterList[saved[i]],
+                             "[sp], 16");
+        }
+    }
+
     return out;
 }
 
+/**
+ * aarch64SpillRegister - Generates code to push a register's value onto the
+ * stack and frees the register.
+ *
+ * @param r Index of the register to spill.
+ */
+void aarch64SpillRegister(int r) {
+    emitInstruction2("str", aarch64QwordRegisterList[r], "[sp, -16]!");
+    aarch64FreeRegister(r);
+}
+
+/**
+ * aarch64ReloadRegister - Generates code to pop the most recently spilled
+ * value into a newly allocated register.
+ *
+ * @return Index of the register holding the value.
+ */
+int aarch64ReloadRegister(void) {
+    int r = aarch64AllocateRegister();
+
+    emitInstruction2("ldr", aarch64QwordRegisterList[r], "[sp], 16");
+    return r;
+}
+
 /**
  * aarch64FunctionPreamble - Outputs the assembly code function preamble.
  *
  * @param id The function's symbol table ID.
  */
 void aarch64FunctionPreamble(int id) {
-    char *functionName = SymbolTable[id].name;
+    const char *functionName = getSymbol(id)->name;
 
     // Allocate locals already recorded via aarch64GetLocalOffset().
     // Keep 16-byte stack alignment.
     stackOffset = (localOffset + 15) & ~15;
 
-    fprintf(Outfile, "\t.text\n");
-    fprintf(Outfile, "\t.global\t%s\n", functionName);
-    fprintf(Outfile, "%s:\n", functionName);
-    fprintf(Outfile, "\tstp\tx29, x30, [sp, -16]!\n");
-    fprintf(Outfile, "\tmov\tx29, sp\n");
+    emitInstruction0(".text");
+    emitInstruction1(".global", functionName);
+    emitSymbolLabel(functionName);
+    emitInstruction3("stp", "x29", "x30", "[sp, -16]!");
+    emitInstruction2("mov", "x29", "sp");
 
     if (stackOffset > 0) {
-        fprintf(Outfile, "\tsub\tsp, sp, #%d\n", stackOffset);
+        emitBeginInstruction("sub");
+        emitOperand("sp");
+        emitOperand("sp");
+        emitImmediate(stackOffset);
+        emitEndInstruction();
     }
 }
 
@@ -105,17 +170,17 @@ void aarch64FunctionPreamble(int id) {
  * @param id The function's symbol table ID.
  */
 void aarch64ReturnFromFunction(int reg, int id) {
-    int primitiveType = SymbolTable[id].primitiveType;
+    int primitiveType = getSymbol(id)->primitiveType;
 
     switch (primitiveType) {
     case P_CHAR:
-        fprintf(Outfile, "\tmov\tw0, %s\n", aarch64DwordRegisterList[reg]);
+        emitInstruction2("mov", "w0", aarch64DwordRegisterList[reg]);
         break;
     case P_INT:
-        fprintf(Outfile, "\tmov\tw0, %s\n", aarch64DwordRegisterList[reg]);
+        emitInstruction2("mov", "w0", aarch64DwordRegisterList[reg]);
         break;
     case P_LONG:
-        fprintf(Outfile, "\tmov\tx0, %s\n", aarch64QwordRegisterList[reg]);
+        emitInstruction2("mov", "x0", aarch64QwordRegisterList[reg]);
         break;
     default:
         logFatald(
@@ -124,7 +189,7 @@ void aarch64ReturnFromFunction(int reg, int id) {
     }
 
     // After moving return value to x0, branch to function end label.
-    fprintf(Outfile, "\tb\tL%d\n", SymbolTable[id].endLabel);
+    emitInstructionLabel("b", getSymbol(id)->endLabel);
 }
 
 /**
@@ -135,14 +200,13 @@ void aarch64ReturnFromFunction(int reg, int id) {
 void aarch64FunctionPostamble(int id) {
     (void)id;
     // end label is emitted by aarch64Label from gen.c
-    // (we’ll call aarch64Label(SymbolTable[id].endLabel) there)
+    // (we’ll call aarch64Label(getSymbol(id)->endLabel) there)
     // and then we output epilogue:
-    aarch64Label(SymbolTable[id].endLabel);
+    aarch64Label(getSymbol(id)->endLabel);
     // Discard local stack space.
-    fprintf(Outfile, "\tmov\tsp, x29\n");
-    fputs("\tldp\tx29, x30, [sp], 16\n"
-          "\tret\n",
-          Outfile);
+    emitInstruction2("mov", "sp", "x29");
+    emitInstruction3("ldp", "x29", "x30", "[sp], 16");
+    emitInstruction0("ret");
 }
 
 /**
@@ -150,14 +214,14 @@ void aarch64FunctionPostamble(int id) {
  *
  * @param label The label number to output.
  */
-void aarch64Label(int label) { fprintf(Outfile, "L%d:\n", label); }
+void aarch64Label(int label) { emitLabel(label); }
 
 /**
  * aarch64Jump - Generates an unconditional jump to a label.
  *
  * @param label The label number to jump to.
  */
-void aarch64Jump(int label) { fprintf(Outfile, "\tb\tL%d\n", label); }
+void aarch64Jump(int label) { emitInstructionLabel("b", label); }
 
 /**
  * aarch64CompareAndJump - Generates code to compare two registers and jump to a
@@ -179,8 +243,8 @@ int aarch64CompareAndJump(int ASTop, int r1, int r2, int label) {
         exit(1);
     }
 
-    fprintf(Outfile, "\tcmp\t%s, %s\n", aarch64QwordRegisterList[r1],
-            aarch64QwordRegisterList[r2]);
+    emitInstruction2("cmp", aarch64QwordRegisterList[r1],
+                     aarch64QwordRegisterList[r2]);
 
     const char *branch = NULL;
     // We invert condition, same as NASM cgn_* code:
@@ -211,7 +275,7 @@ int aarch64CompareAndJump(int ASTop, int r1, int r2, int label) {
         exit(1);
     }
 
-    fprintf(Outfile, "\t%s\tL%d\n", branch, label);
+    emitInstructionLabel(branch, label);
 
     aarch64ResetRegisterPool();
     return NOREG;
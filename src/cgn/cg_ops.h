@@ -2,12 +2,24 @@
 #pragma once
 
 #include <stdbool.h>
+#include <stddef.h>
+
+struct peepholeTarget;
 
 struct CodegenOps {
+    // Assembly syntax
+    // Prefix written before immediate operands by emitImmediate()
+    const char *immediatePrefix;
+
     // Register pool
     void (*declareDataSegment)(void);
     void (*declareTextSegment)(void);
     void (*resetRegisters)(void);
+    int (*countFreeRegisters)(void);
+    // Pushes a register's value onto the stack and frees the register
+    void (*spillRegister)(int reg);
+    // Pops the most recently spilled value into a new register
+    int (*reloadRegister)(void);
 
     // Preamble / postamble
     void (*preamble)(void);
@@ -70,6 +82,48 @@ struct CodegenOps {
     // Offset
     void (*resetLocalOffset)(void);
     int (*getLocalOffset)(int type, bool isFunctionParameter);
+
+    // Register-allocated code (the IR at -O1, see gen.c)
+    // The register allocator hands out registers 0 ... N - 1, where the
+    // first calleeSavedRegisterCount are preserved by calls and the next
+    // callerSavedRegisterCount are not; N and N + 1 are scratch registers
+    // for spilled values. Every operation works when a destination is also
+    // a source.
+    int calleeSavedRegisterCount;
+    int callerSavedRegisterCount;
+    void (*moveRegister)(int dst, int src);
+    void (*loadConstant)(int dst, long long value);
+    void (*loadVariable)(int dst, int symId);
+    void (*storeVariable)(int src, int symId);
+    void (*loadAddress)(int dst, int symId);
+    void (*loadStringAddress)(int dst, int label);
+    void (*loadIndirect)(int dst, int pointerReg, int pointerType);
+    void (*storeIndirect)(int src, int pointerReg, int primitiveType);
+    void (*loadFrameSlot)(int dst, int offset);
+    void (*storeFrameSlot)(int src, int offset);
+    // Arithmetic, bitwise and comparison (0 or 1) A_* operators
+    void (*binaryOperation)(int astOp, int dst, int src1, int src2);
+    // A_ARITHMETICNEGATE, A_LOGICALINVERT, A_LOGICALNOT, A_TOBOOLEAN
+    void (*unaryOperation)(int astOp, int dst, int src);
+    // IR_SHIFTLEFTCONST, IR_SHIFTRIGHTCONST, IR_ARITHSHIFTRIGHTCONST
+    void (*shiftByConstant)(int irOp, int dst, int src, int amount);
+    // Upper half of the signed product of src and value
+    void (*multiplyHighByConstant)(int dst, int src, long long value);
+    // Truncates to a primitive type and extends like a load of it would
+    void (*narrowToType)(int dst, int src, int primitiveType);
+    // Jumps if (src1 <astOp> src2), or (src1 <astOp> 0) if src2 is NOREG
+    void (*branchIfCompare)(int astOp, int src1, int src2, int label);
+    // dst (unless NOREG) = function(arg)
+    void (*callFunction)(int dst, int arg, int funcSymId);
+    void (*moveReturnValue)(int src, int funcSymId);
+    // Peephole rules run over each function's code (see peephole.h)
+    const struct peepholeTarget *peephole;
+
+    // Object emission
+    // Built-in assembler turning the generated text into an ELF object
+    // (NULL if the backend has none; the driver then runs the external one)
+    bool (*assembleObject)(const char *text, size_t length,
+                           const char *objPath);
 };
 
 // Selected backend-specific operation table
@@ -0,0 +1,1125 @@
+// src/cgn/nasm/cgn_asm.c
+
+#include "data.h"
+#include "decl.h"
+#include "elf.h"
+
+#include <stdint.h>
+#include <strings.h>
+
+/**
+ * NOTE:
+ * Built-in assembler for the NASM x86-64 backend (--emit obj).
+ * (Target-specific layer)
+ *
+ * It reads back the assembly text the nasm* routines produce and encodes it
+ * straight into an ELF64 relocatable object, so no external nasm process has
+ * to re-parse it. Only the NASM subset keccc emits is understood:
+ * - directives: section/segment, global, extern, align, db/dw/dd/dq,
+ *   resb/resw/resd/resq (default/bits are accepted and ignored)
+ * - operands: registers, immediates, symbols, and memory references
+ *   [base + index*scale + disp], [symbol + disp], [rel symbol]
+ * - the integer instructions listed in assembleInstruction()
+ *
+ * Memory references to symbols are always encoded RIP-relative, and branches
+ * always use 32-bit displacements, so every instruction's size is known when
+ * it is parsed and a single pass plus a fixup list is enough.
+ */
+
+enum {
+    OPERAND_NONE,
+    OPERAND_REGISTER,
+    OPERAND_IMMEDIATE,
+    OPERAND_SYMBOL, // Bare symbol (branch target or absolute address)
+    OPERAND_MEMORY,
+};
+
+struct operand {
+    int kind;
+    int size;      // Operand size in bytes, 0 if not known
+    int reg;       // OPERAND_REGISTER: register number (0-15)
+    int64_t value; // OPERAND_IMMEDIATE: value; otherwise displacement/addend
+    int symbol;    // Referenced ELF symbol, or -1
+    int base;      // OPERAND_MEMORY: base register, or -1
+    int index;     // OPERAND_MEMORY: index register, or -1
+    int scale;     // OPERAND_MEMORY: index scale (1, 2, 4, 8)
+};
+
+// One encoded instruction, with at most one symbol reference
+struct instruction {
+    unsigned char bytes[16];
+    int length;
+    int fixupPosition; // Offset of the symbol field within bytes, or -1
+    int fixupSymbol;
+    int64_t fixupAddend;
+    uint32_t fixupType; // R_X86_64_*
+};
+
+// Symbol reference resolved once all labels are known
+struct fixup {
+    int section;
+    uint64_t offset;
+    int symbol;
+    int64_t addend;
+    uint32_t type;
+};
+
+static struct elfObject Object;
+static int CurrentSection;
+static struct fixup *Fixups;
+static int FixupCount;
+static int FixupCapacity;
+static int AsmLine; // Line of the assembly text being assembled
+static char **Operands; // Operand texts of the current line
+static int OperandCapacity;
+
+static const struct {
+    const char *name;
+    int reg;
+    int size;
+} registerNames[] = {
+    {"rax", 0, 8},   {"rcx", 1, 8},   {"rdx", 2, 8},   {"rbx", 3, 8},
+    {"rsp", 4, 8},   {"rbp", 5, 8},   {"rsi", 6, 8},   {"rdi", 7, 8},
+    {"r8", 8, 8},    {"r9", 9, 8},    {"r10", 10, 8},  {"r11", 11, 8},
+    {"r12", 12, 8},  {"r13", 13, 8},  {"r14", 14, 8},  {"r15", 15, 8},
+    {"eax", 0, 4},   {"ecx", 1, 4},   {"edx", 2, 4},   {"ebx", 3, 4},
+    {"esp", 4, 4},   {"ebp", 5, 4},   {"esi", 6, 4},   {"edi", 7, 4},
+    {"r8d", 8, 4},   {"r9d", 9, 4},   {"r10d", 10, 4}, {"r11d", 11, 4},
+    {"r12d", 12, 4}, {"r13d", 13, 4}, {"r14d", 14, 4}, {"r15d", 15, 4},
+    {"ax", 0, 2},    {"cx", 1, 2},    {"dx", 2, 2},    {"bx", 3, 2},
+    {"sp", 4, 2},    {"bp", 5, 2},    {"si", 6, 2},    {"di", 7, 2},
+    {"r8w", 8, 2},   {"r9w", 9, 2},   {"r10w", 10, 2}, {"r11w", 11, 2},
+    {"r12w", 12, 2}, {"r13w", 13, 2}, {"r14w", 14, 2}, {"r15w", 15, 2},
+    {"al", 0, 1},    {"cl", 1, 1},    {"dl", 2, 1},    {"bl", 3, 1},
+    {"spl", 4, 1},   {"bpl", 5, 1},   {"sil", 6, 1},   {"dil", 7, 1},
+    {"r8b", 8, 1},   {"r9b", 9, 1},   {"r10b", 10, 1}, {"r11b", 11, 1},
+    {"r12b", 12, 1}, {"r13b", 13, 1}, {"r14b", 14, 1}, {"r15b", 15, 1},
+};
+
+// Condition code suffixes (jcc, setcc, cmovcc)
+static const struct {
+    const char *name;
+    int code;
+} conditionNames[] = {
+    {"o", 0},   {"no", 1},  {"b", 2},   {"c", 2},    {"nae", 2}, {"ae", 3},
+    {"nb", 3},  {"nc", 3},  {"e", 4},   {"z", 4},    {"ne", 5},  {"nz", 5},
+    {"be", 6},  {"na", 6},  {"a", 7},   {"nbe", 7},  {"s", 8},   {"ns", 9},
+    {"p", 10},  {"pe", 10}, {"np", 11}, {"po", 11},  {"l", 12},  {"nge", 12},
+    {"ge", 13}, {"nl", 13}, {"le", 14}, {"ng", 14},  {"g", 15},  {"nle", 15},
+};
+
+// Two-operand ALU instructions, indexed by their /digit
+static const char *aluNames[] = {"add", "or",  "adc", "sbb",
+                                 "and", "sub", "xor", "cmp"};
+
+/**
+ * asmError - Report an error in the assembly text and exit.
+ *
+ * @param message The error message.
+ * @param detail Additional detail (e.g. the offending token), or NULL.
+ */
+static void asmError(const char *message, const char *detail) {
+    fprintf(stderr, "Assembler error: %s%s%s, line %d\n", message,
+            detail ? ": " : "", detail ? detail : "", AsmLine);
+    exit(1);
+}
+
+/**
+ * NOTE:
+ * Lexical helpers
+ */
+static const char *skipSpaces(const char *p) {
+    while (*p == ' ' || *p == '\t') {
+        p++;
+    }
+    return p;
+}
+
+static bool isIdentifierChar(int c) {
+    return isalnum(c) || c == '_' || c == '.' || c == '$' || c == '?' ||
+           c == '@';
+}
+
+static bool matchesWord(const char *p, size_t length, const char *word) {
+    return strlen(word) == length && strncasecmp(p, word, length) == 0;
+}
+
+/**
+ * findRegister - Look up a register name.
+ *
+ * @return Index into registerNames, or -1.
+ */
+static int findRegister(const char *p, size_t length) {
+    for (size_t i = 0; i < sizeof(registerNames) / sizeof(registerNames[0]);
+         i++) {
+        if (matchesWord(p, length, registerNames[i].name))
+            return (int)i;
+    }
+    return -1;
+}
+
+/**
+ * findCondition - Look up a condition code suffix.
+ *
+ * @return The condition code (0-15), or -1.
+ */
+static int findCondition(const char *p) {
+    for (size_t i = 0; i < sizeof(conditionNames) / sizeof(conditionNames[0]);
+         i++) {
+        if (strcasecmp(p, conditionNames[i].name) == 0)
+            return conditionNames[i].code;
+    }
+    return -1;
+}
+
+/**
+ * parseNumber - Parse a decimal or 0x-prefixed hexadecimal number.
+ *
+ * @param p Start of the number.
+ * @param end Receives the first character after the number.
+ *
+ * @return The value.
+ */
+static int64_t parseNumber(const char *p, const char **end) {
+    char *e;
+    bool hex = p[0] == '0' && (p[1] == 'x' || p[1] == 'X');
+    unsigned long long value = strtoull(p, &e, hex ? 16 : 10);
+    if (e == p)
+        asmError("expected a number", p);
+    *end = e;
+    return (int64_t)value;
+}
+
+/**
+ * parseMemory - Parse the inside of a memory reference
+ * ([base + index*scale + disp], [symbol + disp], [rel symbol]).
+ */
+static void parseMemory(const char *p, struct operand *op) {
+    op->kind = OPERAND_MEMORY;
+    op->base = op->index = -1;
+    op->scale = 1;
+    op->symbol = -1;
+    op->value = 0;
+
+    p = skipSpaces(p);
+    if (strncasecmp(p, "rel", 3) == 0 && (p[3] == ' ' || p[3] == '\t'))
+        p = skipSpaces(p + 3);
+    else if (strncasecmp(p, "abs", 3) == 0 && (p[3] == ' ' || p[3] == '\t'))
+        p = skipSpaces(p + 3);
+
+    while (*p != ']') {
+        int sign = 1;
+        while (*p == '+' || *p == '-' || *p == ' ' || *p == '\t') {
+            if (*p == '-')
+                sign = -sign;
+            p++;
+        }
+
+        if (isdigit((unsigned char)*p)) {
+            op->value += sign * parseNumber(p, &p);
+        } else if (isIdentifierChar((unsigned char)*p)) {
+            const char *start = p;
+            while (isIdentifierChar((unsigned char)*p)) {
+                p++;
+            }
+            int r = findRegister(start, p - start);
+            if (r >= 0) {
+                if (registerNames[r].size != 8 || sign < 0)
+                    asmError("bad address register", start);
+                p = skipSpaces(p);
+                if (*p == '*') {
+                    op->index = registerNames[r].reg;
+                    op->scale = (int)parseNumber(skipSpaces(p + 1), &p);
+                } else if (op->base < 0) {
+                    op->base = registerNames[r].reg;
+                } else {
+                    op->index = registerNames[r].reg;
+                }
+            } else {
+                if (op->symbol >= 0 || sign < 0)
+                    asmError("bad address expression", start);
+                op->symbol = elfSymbol(&Object, start, p - start);
+            }
+        } else {
+            asmError("bad memory reference", p);
+        }
+        p = skipSpaces(p);
+        if (*p == '\0')
+            asmError("missing ]", NULL);
+    }
+
+    if (op->scale != 1 && op->scale != 2 && op->scale != 4 && op->scale != 8)
+        asmError("bad index scale", NULL);
+    if (op->index == 4)
+        asmError("rsp cannot be an index register", NULL);
+    if (op->symbol >= 0 && (op->base >= 0 || op->index >= 0))
+        asmError("symbol cannot be combined with registers", NULL);
+}
+
+/**
+ * parseOperand - Parse one operand (with an optional size keyword).
+ */
+static void parseOperand(const char *p, struct operand *op) {
+    memset(op, 0, sizeof(*op));
+    op->symbol = -1;
+
+    // Size keywords (BYTE, DWORD, ...) may precede any operand
+    for (;;) {
+        p = skipSpaces(p);
+        const char *start = p;
+        while (isalpha((unsigned char)*p)) {
+            p++;
+        }
+        size_t length = p - start;
+        if (matchesWord(start, length, "byte"))
+            op->size = 1;
+        else if (matchesWord(start, length, "word"))
+            op->size = 2;
+        else if (matchesWord(start, length, "dword"))
+            op->size = 4;
+        else if (matchesWord(start, length, "qword"))
+            op->size = 8;
+        else if (!matchesWord(start, length, "strict") &&
+                 !matchesWord(start, length, "near")) {
+            p = start;
+            break;
+        }
+    }
+
+    if (*p == '[') {
+        int size = op->size;
+        parseMemory(p + 1, op);
+        op->size = size;
+        return;
+    }
+
+    if (isdigit((unsigned char)*p) || *p == '-' || *p == '+') {
+        int sign = *p == '-' ? -1 : 1;
+        if (*p == '-' || *p == '+')
+            p = skipSpaces(p + 1);
+        op->kind = OPERAND_IMMEDIATE;
+        op->value = sign * parseNumber(p, &p);
+        return;
+    }
+
+    const char *start = p;
+    while (isIdentifierChar((unsigned char)*p)) {
+        p++;
+    }
+    if (p == start)
+        asmError("bad operand", start);
+
+    int r = findRegister(start, p - start);
+    if (r >= 0) {
+        if (op->size != 0 && op->size != registerNames[r].size)
+            asmError("operand size does not match register", start);
+        op->kind = OPERAND_REGISTER;
+        op->reg = registerNames[r].reg;
+        op->size = registerNames[r].size;
+        return;
+    }
+
+    op->kind = OPERAND_SYMBOL;
+    op->symbol = elfSymbol(&Object, start, p - start);
+    p = skipSpaces(p);
+    if (*p == '+' || *p == '-') {
+        int sign = *p == '-' ? -1 : 1;
+        op->value = sign * parseNumber(skipSpaces(p + 1), &p);
+    }
+}
+
+/**
+ * NOTE:
+ * Encoding helpers
+ */
+static void put8(struct instruction *in, int byte) {
+    in->bytes[in->length++] = (unsigned char)byte;
+}
+
+static void putImmediate(struct instruction *in, int64_t value, int size) {
+    for (int i = 0; i < size; i++) {
+        put8(in, (int)((uint64_t)value >> (8 * i)));
+    }
+}
+
+static bool fitsInt8(int64_t v) { return v >= -128 && v <= 127; }
+static bool fitsInt32(int64_t v) { return v >= INT32_MIN && v <= INT32_MAX; }
+
+/**
+ * needsRexForByte - spl, bpl, sil and dil are only reachable with a REX
+ * prefix (without one, the same numbers select ah, ch, dh and bh).
+ */
+static bool needsRexForByte(const struct operand *op) {
+    return op->kind == OPERAND_REGISTER && op->size == 1 && op->reg >= 4 &&
+           op->reg <= 7;
+}
+
+/**
+ * encodeModRM - Emit prefixes, opcode, ModRM, SIB and displacement.
+ *
+ * @param in Instruction being built.
+ * @param size Operand size (selects 0x66 / REX.W).
+ * @param opcode Opcode bytes.
+ * @param opcodeLength Number of opcode bytes.
+ * @param regField ModRM.reg: a register number or a /digit extension.
+ * @param regOperand Register operand in ModRM.reg (for REX on byte
+ * registers), or NULL.
+ * @param rm Register or memory operand in ModRM.rm.
+ */
+static void encodeModRM(struct instruction *in, int size,
+                        const unsigned char *opcode, int opcodeLength,
+                        int regField, const struct operand *regOperand,
+                        const struct operand *rm) {
+    int rex = 0;
+
+    if (size == 2)
+        put8(in, 0x66);
+
+    if (size == 8)
+        rex |= 0x08;
+    if (regField & 8)
+        rex |= 0x04;
+    if (rm->kind == OPERAND_REGISTER && (rm->reg & 8))
+        rex |= 0x01;
+    if (rm->kind == OPERAND_MEMORY && rm->base >= 0 && (rm->base & 8))
+        rex |= 0x01;
+    if (rm->kind == OPERAND_MEMORY && rm->index >= 0 && (rm->index & 8))
+        rex |= 0x02;
+    if (rex != 0 || needsRexForByte(rm) ||
+        (regOperand != NULL && needsRexForByte(regOperand)))
+        put8(in, 0x40 | rex);
+
+    for (int i = 0; i < opcodeLength; i++) {
+        put8(in, opcode[i]);
+    }
+
+    int reg = (regField & 7) << 3;
+
+    if (rm->kind == OPERAND_REGISTER) {
+        put8(in, 0xC0 | reg | (rm->reg & 7));
+        return;
+    }
+    if (rm->kind != OPERAND_MEMORY)
+        asmError("expected a register or memory operand", NULL);
+
+    if (rm->symbol >= 0) {
+        // [rip + disp32], relocated against the symbol
+        put8(in, 0x00 | reg | 5);
+        in->fixupPosition = in->length;
+        in->fixupSymbol = rm->symbol;
+        in->fixupAddend = rm->value;
+        in->fixupType = R_X86_64_PC32;
+        putImmediate(in, 0, 4);
+        return;
+    }
+
+    if (rm->base < 0) {
+        // Absolute [disp32], optionally with an index
+        put8(in, 0x00 | reg | 4);
+        put8(in, ((rm->index >= 0 ? __builtin_ctz(rm->scale) : 0) << 6) |
+                     ((rm->index >= 0 ? rm->index & 7 : 4) << 3) | 5);
+        putImmediate(in, rm->value, 4);
+        return;
+    }
+
+    int mod;
+    if (rm->value == 0 && (rm->base & 7) != 5)
+        mod = 0x00; // rbp/r13 as base always need a displacement
+    else if (fitsInt8(rm->value))
+        mod = 0x40;
+    else
+        mod = 0x80;
+    if (!fitsInt32(rm->value))
+        asmError("displacement out of range", NULL);
+
+    if (rm->index >= 0 || (rm->base & 7) == 4) {
+        // SIB form (also required for rsp/r12 as base)
+        put8(in, mod | reg | 4);
+        int index = rm->index >= 0 ? rm->index & 7 : 4;
+        int scale = rm->index >= 0 ? __builtin_ctz(rm->scale) : 0;
+        put8(in, (scale << 6) | (index << 3) | (rm->base & 7));
+    } else {
+        put8(in, mod | reg | (rm->base & 7));
+    }
+
+    if (mod == 0x40)
+        putImmediate(in, rm->value, 1);
+    else if (mod == 0x80)
+        putImmediate(in, rm->value, 4);
+}
+
+/**
+ * encodeBranch - Emit an opcode followed by a 32-bit displacement to a
+ * symbol (call, jmp, jcc).
+ */
+static void encodeBranch(struct instruction *in, const unsigned char *opcode,
+                         int opcodeLength, const struct operand *target,
+                         uint32_t type) {
+    if (target->kind != OPERAND_SYMBOL)
+        asmError("expected a branch target", NULL);
+    for (int i = 0; i < opcodeLength; i++) {
+        put8(in, opcode[i]);
+    }
+    in->fixupPosition = in->length;
+    in->fixupSymbol = target->symbol;
+    in->fixupAddend = target->value;
+    in->fixupType = type;
+    putImmediate(in, 0, 4);
+}
+
+/**
+ * operationSize - Size of a two-operand instruction, taken from whichever
+ * operand knows it.
+ */
+static int operationSize(const struct operand *a, const struct operand *b) {
+    int size = a->size ? a->size : (b ? b->size : 0);
+    if (size == 0)
+        asmError("operation size not specified", NULL);
+    if (b && b->kind != OPERAND_IMMEDIATE && b->size && b->size != size)
+        asmError("mismatched operand sizes", NULL);
+    return size;
+}
+
+/**
+ * encodeImmediateField - Emit an imm8/16/32 for an instruction of the given
+ * operand size (64-bit operations take a sign-extended imm32).
+ */
+static void encodeImmediateField(struct instruction *in, int64_t value,
+                                 int size) {
+    if (size == 8 && !fitsInt32(value))
+        asmError("immediate does not fit in 32 bits", NULL);
+    putImmediate(in, value, size == 8 ? 4 : size);
+}
+
+/**
+ * assembleInstruction - Encode one instruction.
+ *
+ * @param mnemonic Lower-case mnemonic.
+ * @param ops Parsed operands.
+ * @param count Number of operands.
+ * @param in Receives the encoding.
+ */
+static void assembleInstruction(const char *mnemonic, struct operand *ops,
+                                int count, struct instruction *in) {
+    struct operand *a = &ops[0];
+    struct operand *b = &ops[1];
+    unsigned char opcode[3];
+    int condition;
+
+    // Instructions without operands
+    static const struct {
+        const char *name;
+        unsigned char bytes[3];
+        int length;
+    } fixed[] = {
+        {"ret", {0xC3}, 1},        {"leave", {0xC9}, 1},
+        {"nop", {0x90}, 1},        {"cqo", {0x48, 0x99}, 2},
+        {"cdq", {0x99}, 1},        {"cdqe", {0x48, 0x98}, 2},
+        {"syscall", {0x0F, 0x05}, 2},
+    };
+    for (size_t i = 0; i < sizeof(fixed) / sizeof(fixed[0]); i++) {
+        if (strcmp(mnemonic, fixed[i].name) == 0) {
+            if (count != 0)
+                asmError("unexpected operand", mnemonic);
+            for (int j = 0; j < fixed[i].length; j++) {
+                put8(in, fixed[i].bytes[j]);
+            }
+            return;
+        }
+    }
+
+    // add, or, adc, sbb, and, sub, xor, cmp
+    for (int n = 0; n < 8; n++) {
+        if (strcmp(mnemonic, aluNames[n]) != 0)
+            continue;
+        if (count != 2)
+            asmError("expected two operands", mnemonic);
+        int size = operationSize(a, b);
+        if (b->kind == OPERAND_IMMEDIATE) {
+            if (size == 1) {
+                opcode[0] = 0x80;
+                encodeModRM(in, size, opcode, 1, n, NULL, a);
+                putImmediate(in, b->value, 1);
+            } else if (fitsInt8(b->value)) {
+                opcode[0] = 0x83;
+                encodeModRM(in, size, opcode, 1, n, NULL, a);
+                putImmediate(in, b->value, 1);
+            } else {
+                opcode[0] = 0x81;
+                encodeModRM(in, size, opcode, 1, n, NULL, a);
+                encodeImmediateField(in, b->value, size);
+            }
+        } else if (b->kind == OPERAND_REGISTER) {
+            opcode[0] = (unsigned char)(8 * n + (size == 1 ? 0x00 : 0x01));
+            encodeModRM(in, size, opcode, 1, b->reg, b, a);
+        } else if (a->kind == OPERAND_REGISTER) {
+            opcode[0] = (unsigned char)(8 * n + (size == 1 ? 0x02 : 0x03));
+            encodeModRM(in, size, opcode, 1, a->reg, a, b);
+        } else {
+            asmError("invalid operands", mnemonic);
+        }
+        return;
+    }
+
+    if (strcmp(mnemonic, "mov") == 0) {
+        if (count != 2)
+            asmError("expected two operands", mnemonic);
+        if (b->kind == OPERAND_IMMEDIATE && a->kind == OPERAND_REGISTER) {
+            int size = a->size;
+            int64_t v = b->value;
+            if (size == 8 && v >= 0 && v <= UINT32_MAX) {
+                // Writing the 32-bit register zero-extends: shorter
+                size = 4;
+            }
+            if (size == 8 && fitsInt32(v)) {
+                opcode[0] = 0xC7;
+                encodeModRM(in, 8, opcode, 1, 0, NULL, a);
+                putImmediate(in, v, 4);
+            } else {
+                if (size == 2)
+                    put8(in, 0x66);
+                if (size == 8 || (a->reg & 8) || needsRexForByte(a))
+                    put8(in, 0x40 | (size == 8 ? 0x08 : 0) |
+                                 ((a->reg & 8) ? 0x01 : 0));
+                put8(in, (size == 1 ? 0xB0 : 0xB8) + (a->reg & 7));
+                putImmediate(in, v, size);
+            }
+        } else if (b->kind == OPERAND_IMMEDIATE) {
+            int size = operationSize(a, NULL);
+            opcode[0] = size == 1 ? 0xC6 : 0xC7;
+            encodeModRM(in, size, opcode, 1, 0, NULL, a);
+            encodeImmediateField(in, b->value, size);
+        } else if (b->kind == OPERAND_SYMBOL && a->kind == OPERAND_REGISTER &&
+                   a->size == 8) {
+            // mov reg, symbol: 64-bit absolute address
+            put8(in, 0x48 | ((a->reg & 8) ? 0x01 : 0));
+            put8(in, 0xB8 + (a->reg & 7));
+            in->fixupPosition = in->length;
+            in->fixupSymbol = b->symbol;
+            in->fixupAddend = b->value;
+            in->fixupType = R_X86_64_64;
+            putImmediate(in, 0, 8);
+        } else if (b->kind == OPERAND_REGISTER) {
+            int size = operationSize(a, b);
+            opcode[0] = size == 1 ? 0x88 : 0x89;
+            encodeModRM(in, size, opcode, 1, b->reg, b, a);
+        } else if (a->kind == OPERAND_REGISTER) {
+            int size = operationSize(a, b);
+            opcode[0] = size == 1 ? 0x8A : 0x8B;
+            encodeModRM(in, size, opcode, 1, a->reg, a, b);
+        } else {
+            asmError("invalid operands", mnemonic);
+        }
+        return;
+    }
+
+    if (strcmp(mnemonic, "movzx") == 0 || strcmp(mnemonic, "movsx") == 0) {
+        if (count != 2 || a->kind != OPERAND_REGISTER)
+            asmError("invalid operands", mnemonic);
+        if (b->size != 1 && b->size != 2)
+            asmError("source must be a byte or word", mnemonic);
+        opcode[0] = 0x0F;
+        opcode[1] = (unsigned char)((mnemonic[3] == 'z' ? 0xB6 : 0xBE) +
+                                    (b->size == 2 ? 1 : 0));
+        encodeModRM(in, a->size, opcode, 2, a->reg, NULL, b);
+        return;
+    }
+
+    if (strcmp(mnemonic, "movsxd") == 0) {
+        if (count != 2 || a->kind != OPERAND_REGISTER || a->size != 8)
+            asmError("invalid operands", mnemonic);
+        opcode[0] = 0x63;
+        encodeModRM(in, 8, opcode, 1, a->reg, NULL, b);
+        return;
+    }
+
+    if (strcmp(mnemonic, "lea") == 0) {
+        if (count != 2 || a->kind != OPERAND_REGISTER ||
+            b->kind != OPERAND_MEMORY)
+            asmError("invalid operands", mnemonic);
+        opcode[0] = 0x8D;
+        encodeModRM(in, a->size, opcode, 1, a->reg, NULL, b);
+        return;
+    }
+
+    if (strcmp(mnemonic, "test") == 0) {
+        if (count != 2)
+            asmError("expected two operands", mnemonic);
+        int size = operationSize(a, b);
+        if (b->kind == OPERAND_IMMEDIATE) {
+            opcode[0] = size == 1 ? 0xF6 : 0xF7;
+            encodeModRM(in, size, opcode, 1, 0, NULL, a);
+            encodeImmediateField(in, b->value, size);
+        } else if (b->kind == OPERAND_REGISTER) {
+            opcode[0] = size == 1 ? 0x84 : 0x85;
+            encodeModRM(in, size, opcode, 1, b->reg, b, a);
+        } else {
+            asmError("invalid operands", mnemonic);
+        }
+        return;
+    }
+
+    // Unary group: inc/dec (FE/FF), not/neg/mul/imul/div/idiv (F6/F7)
+    static const struct {
+        const char *name;
+        unsigned char opcode;
+        int digit;
+    } unary[] = {
+        {"inc", 0xFE, 0}, {"dec", 0xFE, 1}, {"not", 0xF6, 2},
+        {"neg", 0xF6, 3}, {"mul", 0xF6, 4}, {"imul", 0xF6, 5},
+        {"div", 0xF6, 6}, {"idiv", 0xF6, 7},
+    };
+    for (size_t i = 0; i < sizeof(unary) / sizeof(unary[0]); i++) {
+        if (strcmp(mnemonic, unary[i].name) != 0 || count != 1)
+            continue;
+        int size = operationSize(a, NULL);
+        opcode[0] = (unsigned char)(unary[i].opcode + (size == 1 ? 0 : 1));
+        encodeModRM(in, size, opcode, 1, unary[i].digit, NULL, a);
+        return;
+    }
+
+    if (strcmp(mnemonic, "imul") == 0) {
+        if (a->kind != OPERAND_REGISTER || a->size == 1)
+            asmError("invalid operands", mnemonic);
+        if (count == 2) {
+            opcode[0] = 0x0F;
+            opcode[1] = 0xAF;
+            encodeModRM(in, a->size, opcode, 2, a->reg, NULL, b);
+        } else if (count == 3 && ops[2].kind == OPERAND_IMMEDIATE) {
+            bool short8 = fitsInt8(ops[2].value);
+            opcode[0] = short8 ? 0x6B : 0x69;
+            encodeModRM(in, a->size, opcode, 1, a->reg, NULL, b);
+            if (short8)
+                putImmediate(in, ops[2].value, 1);
+            else
+                encodeImmediateField(in, ops[2].value, a->size);
+        } else {
+            asmError("invalid operands", mnemonic);
+        }
+        return;
+    }
+
+    // Shifts and rotates
+    static const struct {
+        const char *name;
+        int digit;
+    } shifts[] = {
+        {"rol", 0}, {"ror", 1}, {"rcl", 2}, {"rcr", 3},
+        {"shl", 4}, {"sal", 4}, {"shr", 5}, {"sar", 7},
+    };
+    for (size_t i = 0; i < sizeof(shifts) / sizeof(shifts[0]); i++) {
+        if (strcmp(mnemonic, shifts[i].name) != 0)
+            continue;
+        if (count != 2)
+            asmError("expected two operands", mnemonic);
+        int size = operationSize(a, NULL);
+        if (b->kind == OPERAND_REGISTER && b->reg == 1 && b->size == 1) {
+            opcode[0] = size == 1 ? 0xD2 : 0xD3;
+            encodeModRM(in, size, opcode, 1, shifts[i].digit, NULL, a);
+        } else if (b->kind == OPERAND_IMMEDIATE && b->value == 1) {
+            opcode[0] = size == 1 ? 0xD0 : 0xD1;
+            encodeModRM(in, size, opcode, 1, shifts[i].digit, NULL, a);
+        } else if (b->kind == OPERAND_IMMEDIATE) {
+            opcode[0] = size == 1 ? 0xC0 : 0xC1;
+            encodeModRM(in, size, opcode, 1, shifts[i].digit, NULL, a);
+            putImmediate(in, b->value, 1);
+        } else {
+            asmError("shift count must be an immediate or cl", mnemonic);
+        }
+        return;
+    }
+
+    if (strcmp(mnemonic, "push") == 0 || strcmp(mnemonic, "pop") == 0) {
+        bool push = mnemonic[1] == 'u';
+        if (count != 1)
+            asmError("expected one operand", mnemonic);
+        if (a->kind == OPERAND_REGISTER && a->size == 8) {
+            if (a->reg & 8)
+                put8(in, 0x41);
+            put8(in, (push ? 0x50 : 0x58) + (a->reg & 7));
+        } else if (push && a->kind == OPERAND_IMMEDIATE) {
+            if (fitsInt8(a->value)) {
+                put8(in, 0x6A);
+                putImmediate(in, a->value, 1);
+            } else {
+                put8(in, 0x68);
+                encodeImmediateField(in, a->value, 8);
+            }
+        } else {
+            asmError("invalid operands", mnemonic);
+        }
+        return;
+    }
+
+    if (strcmp(mnemonic, "call") == 0 || strcmp(mnemonic, "jmp") == 0) {
+        bool call = mnemonic[0] == 'c';
+        if (count != 1)
+            asmError("expected one operand", mnemonic);
+        if (a->kind == OPERAND_SYMBOL) {
+            opcode[0] = call ? 0xE8 : 0xE9;
+            encodeBranch(in, opcode, 1, a,
+                         call ? R_X86_64_PLT32 : R_X86_64_PC32);
+        } else {
+            // Indirect: the target is a 64-bit value, no REX.W needed
+            opcode[0] = 0xFF;
+            encodeModRM(in, 4, opcode, 1, call ? 2 : 4, NULL, a);
+        }
+        return;
+    }
+
+    if (mnemonic[0] == 'j' && (condition = findCondition(mnemonic + 1)) >= 0) {
+        if (count != 1)
+            asmError("expected one operand", mnemonic);
+        opcode[0] = 0x0F;
+        opcode[1] = (unsigned char)(0x80 + condition);
+        encodeBranch(in, opcode, 2, a, R_X86_64_PC32);
+        return;
+    }
+
+    if (strncmp(mnemonic, "set", 3) == 0 &&
+        (condition = findCondition(mnemonic + 3)) >= 0) {
+        if (count != 1 || a->size != 1)
+            asmError("expected a byte operand", mnemonic);
+        opcode[0] = 0x0F;
+        opcode[1] = (unsigned char)(0x90 + condition);
+        encodeModRM(in, 1, opcode, 2, 0, NULL, a);
+        return;
+    }
+
+    if (strncmp(mnemonic, "cmov", 4) == 0 &&
+        (condition = findCondition(mnemonic + 4)) >= 0) {
+        if (count != 2 || a->kind != OPERAND_REGISTER || a->size == 1)
+            asmError("invalid operands", mnemonic);
+        opcode[0] = 0x0F;
+        opcode[1] = (unsigned char)(0x40 + condition);
+        encodeModRM(in, a->size, opcode, 2, a->reg, NULL, b);
+        return;
+    }
+
+    asmError("unsupported instruction", mnemonic);
+}
+
+/**
+ * emitInstruction - Append an encoded instruction to the current section
+ * and remember its symbol reference, if any.
+ */
+static void emitInstruction(struct instruction *in) {
+    uint64_t start = Object.sections[CurrentSection].size;
+
+    elfAppend(&Object, CurrentSection, in->bytes, in->length);
+    if (in->fixupPosition < 0)
+        return;
+
+    if (FixupCount == FixupCapacity) {
+        FixupCapacity = FixupCapacity ? FixupCapacity * 2 : 256;
+        Fixups = realloc(Fixups, FixupCapacity * sizeof(struct fixup));
+        if (Fixups == NULL)
+            asmError("out of memory", NULL);
+    }
+
+    int64_t addend = in->fixupAddend;
+    if (in->fixupType == R_X86_64_PC32 || in->fixupType == R_X86_64_PLT32) {
+        // Relative to the end of the instruction, not of the field
+        addend -= in->length - in->fixupPosition;
+    }
+    Fixups[FixupCount++] = (struct fixup){
+        .section = CurrentSection,
+        .offset = start + in->fixupPosition,
+        .symbol = in->fixupSymbol,
+        .addend = addend,
+        .type = in->fixupType,
+    };
+}
+
+/**
+ * resolveFixups - Patch references to labels in the same section, and turn
+ * the rest into relocations.
+ */
+static void resolveFixups(void) {
+    for (int i = 0; i < FixupCount; i++) {
+        struct fixup *f = &Fixups[i];
+        struct elfSymbol *sym = &Object.symbols[f->symbol];
+        bool relative =
+            f->type == R_X86_64_PC32 || f->type == R_X86_64_PLT32;
+
+        if (sym->section == -1 && !sym->isGlobal) {
+            fprintf(stderr, "Assembler error: symbol `%s' not defined\n",
+                    sym->name);
+            exit(1);
+        }
+
+        if (relative && sym->section == f->section) {
+            int64_t value =
+                (int64_t)sym->value + f->addend - (int64_t)f->offset;
+            unsigned char *field = Object.sections[f->section].data + f->offset;
+            for (int b = 0; b < 4; b++) {
+                field[b] = (unsigned char)((uint64_t)value >> (8 * b));
+            }
+            continue;
+        }
+
+        elfAddRelocation(&Object, f->section, f->offset, f->symbol,
+                         relative && sym->section != -1 ? R_X86_64_PC32
+                                                        : f->type,
+                         f->addend);
+    }
+}
+
+/**
+ * addOperand - Store an operand's text at the given index of Operands.
+ */
+static void addOperand(int index, char *text) {
+    if (index == OperandCapacity) {
+        OperandCapacity = OperandCapacity ? OperandCapacity * 2 : 16;
+        Operands = realloc(Operands, OperandCapacity * sizeof(char *));
+        if (Operands == NULL)
+            asmError("out of memory", NULL);
+    }
+    Operands[index] = text;
+}
+
+/**
+ * splitOperands - Split an operand list at top-level commas.
+ * The operands are stored in the growable Operands array (data directives
+ * can carry any number of items).
+ *
+ * @return Number of operands.
+ */
+static int splitOperands(char *p) {
+    int count = 0;
+    int depth = 0;
+    char quote = '\0';
+
+    p = (char *)skipSpaces(p);
+    if (*p == '\0')
+        return 0;
+
+    addOperand(count++, p);
+    for (; *p != '\0'; p++) {
+        if (quote != '\0') {
+            if (*p == quote)
+                quote = '\0';
+        } else if (*p == '"' || *p == '\'' || *p == '`')
+            quote = *p;
+        else if (*p == '[')
+            depth++;
+        else if (*p == ']')
+            depth--;
+        else if (depth == 0 && *p == ',') {
+            *p = '\0';
+            addOperand(count++, (char *)skipSpaces(p + 1));
+        }
+    }
+    return count;
+}
+
+/**
+ * assembleData - Handle db/dw/dd/dq.
+ */
+static void assembleData(int size, char **items, int count) {
+    for (int i = 0; i < count; i++) {
+        const char *p = items[i];
+        if (*p == '"' || *p == '\'' || *p == '`') {
+            // Quoted string: one byte per character, padded to the unit size
+            char quote = *p++;
+            const char *end = strchr(p, quote);
+            if (end == NULL)
+                asmError("unterminated string", items[i]);
+            size_t length = end - p;
+            elfAppend(&Object, CurrentSection, p, length);
+            if (length % size != 0)
+                elfReserve(&Object, CurrentSection, size - length % size);
+            continue;
+        }
+
+        struct operand op;
+        parseOperand(p, &op);
+        if (op.kind == OPERAND_IMMEDIATE) {
+            struct instruction in = {.fixupPosition = -1};
+            putImmediate(&in, op.value, size);
+            elfAppend(&Object, CurrentSection, in.bytes, in.length);
+        } else if (op.kind == OPERAND_SYMBOL && size == 8) {
+            struct instruction in = {
+                .fixupPosition = 0,
+                .fixupSymbol = op.symbol,
+                .fixupAddend = op.value,
+                .fixupType = R_X86_64_64,
+            };
+            putImmediate(&in, 0, 8);
+            emitInstruction(&in);
+        } else {
+            asmError("bad data item", p);
+        }
+    }
+}
+
+/**
+ * assembleLine - Assemble a single line (label, directive or instruction).
+ */
+static void assembleLine(char *line) {
+    // Strip the comment (';' outside of quotes)
+    char quote = '\0';
+    for (char *p = line; *p != '\0'; p++) {
+        if (quote != '\0') {
+            if (*p == quote)
+                quote = '\0';
+        } else if (*p == '"' || *p == '\'' || *p == '`')
+            quote = *p;
+        else if (*p == ';') {
+            *p = '\0';
+            break;
+        }
+    }
+
+    char *p = (char *)skipSpaces(line);
+    char *word = p;
+    while (isIdentifierChar((unsigned char)*p)) {
+        p++;
+    }
+    size_t wordLength = p - word;
+    if (wordLength == 0) {
+        if (*p != '\0' && *p != '\n' && *p != '\r')
+            asmError("syntax error", word);
+        return;
+    }
+
+    // Label definition
+    if (*p == ':') {
+        int sym = elfSymbol(&Object, word, wordLength);
+        elfDefineSymbol(&Object, sym, CurrentSection,
+                        Object.sections[CurrentSection].size);
+        assembleLine(p + 1);
+        return;
+    }
+
+    char mnemonic[16];
+    if (wordLength >= sizeof(mnemonic))
+        asmError("unknown mnemonic", word);
+    for (size_t i = 0; i < wordLength; i++) {
+        mnemonic[i] = (char)tolower((unsigned char)word[i]);
+    }
+    mnemonic[wordLength] = '\0';
+
+    // Trim trailing whitespace
+    char *end = p + strlen(p);
+    while (end > p && isspace((unsigned char)end[-1])) {
+        *--end = '\0';
+    }
+
+    int count = splitOperands(p);
+    char **operands = Operands;
+
+    // Directives
+    if (strcmp(mnemonic, "section") == 0 || strcmp(mnemonic, "segment") == 0) {
+        if (count != 1)
+            asmError("expected a section name", NULL);
+        char *name = operands[0];
+        name[strcspn(name, " \t")] = '\0';
+        CurrentSection = elfSection(&Object, name);
+        return;
+    }
+    if (strcmp(mnemonic, "global") == 0 || strcmp(mnemonic, "extern") == 0) {
+        for (int i = 0; i < count; i++) {
+            char *name = operands[i];
+            name[strcspn(name, " \t:")] = '\0';
+            int sym = elfSymbol(&Object, name, strlen(name));
+            Object.symbols[sym].isGlobal = true;
+        }
+        return;
+    }
+    if (strcmp(mnemonic, "default") == 0 || strcmp(mnemonic, "bits") == 0)
+        return;
+    if (strcmp(mnemonic, "align") == 0) {
+        const char *endp;
+        if (count < 1)
+            asmError("expected an alignment", NULL);
+        int64_t align = parseNumber(operands[0], &endp);
+        if (align <= 0 || (align & (align - 1)) != 0)
+            asmError("alignment must be a power of two", operands[0]);
+        bool code = Object.sections[CurrentSection].flags & ELF_FLAG_EXEC;
+        elfAlign(&Object, CurrentSection, (uint64_t)align, code ? 0x90 : 0);
+        return;
+    }
+    if (mnemonic[0] == 'r' && mnemonic[1] == 'e' && mnemonic[2] == 's' &&
+        mnemonic[4] == '\0') {
+        static const char units[] = "bwdq";
+        const char *unit = strchr(units, mnemonic[3]);
+        const char *endp;
+        if (unit == NULL || count != 1)
+            asmError("bad reservation", mnemonic);
+        int64_t n = parseNumber(operands[0], &endp);
+        elfReserve(&Object, CurrentSection, (uint64_t)n << (unit - units));
+        return;
+    }
+    if (mnemonic[0] == 'd' && mnemonic[2] == '\0' &&
+        strchr("bwdq", mnemonic[1]) != NULL) {
+        static const char units[] = "bwdq";
+        assembleData(1 << (strchr(units, mnemonic[1]) - units), operands,
+                     count);
+        return;
+    }
+
+    struct operand ops[3];
+    if (count > 3)
+        asmError("too many operands", mnemonic);
+    for (int i = 0; i < count; i++) {
+        parseOperand(operands[i], &ops[i]);
+    }
+
+    struct instruction in = {.fixupPosition = -1};
+    assembleInstruction(mnemonic, ops, count, &in);
+    emitInstruction(&in);
+}
+
+/**
+ * nasmAssembleObject - Assemble NASM text produced by this backend into an
+ * ELF64 relocatable object file.
+ *
+ * @param text The assembly text.
+ * @param length Length of the text in bytes.
+ * @param objPath Path of the object file to write.
+ *
+ * @return true on success (assembly errors exit the compiler).
+ */
+bool nasmAssembleObject(const char *text, size_t length, const char *objPath) {
+    char *line = NULL;
+    size_t lineCapacity = 0;
+
+    elfInitObject(&Object, ELF_MACHINE_X86_64);
+    CurrentSection = elfSection(&Object, ".text");
+    FixupCount = 0;
+    AsmLine = 0;
+
+    const char *p = text;
+    const char *limit = text + length;
+    while (p < limit) {
+        const char *eol = memchr(p, '\n', limit - p);
+        size_t lineLength = eol ? (size_t)(eol - p) : (size_t)(limit - p);
+
+        if (lineLength + 1 > lineCapacity) {
+            lineCapacity = (lineLength + 1) * 2;
+            line = realloc(line, lineCapacity);
+            if (line == NULL)
+                asmError("out of memory", NULL);
+        }
+        memcpy(line, p, lineLength);
+        line[lineLength] = '\0';
+
+        AsmLine++;
+        assembleLine(line);
+        p += lineLength + 1;
+    }
+
+    resolveFixups();
+    bool ok = elfWriteObject(&Object, objPath);
+
+    free(line);
+    free(Fixups);
+    Fixups = NULL;
+    FixupCapacity = 0;
+    free(Operands);
+    Operands = NULL;
+    OperandCapacity = 0;
+    elfFreeObject(&Object);
+    return ok;
+}
@@ -4,6 +4,7 @@
 #include "data.h"
 #include "decl.h"
 #include "defs.h"
+#include "emit.h"
 
 #include <limits.h>
 
@@ -34,6 +35,23 @@ static int primitiveSizeInBytes[] = {
     8  // Extra entry for safety/P_LONGPTR if enum values shifted
 };
 
+/**
+ * emitFrameOperand - Append a stack slot operand ("<size>\t[rbp+<offset>]").
+ *
+ * @param size Operand size keyword (e.g. "DWORD"), or NULL for none.
+ * @param offset Offset of the slot from rbp (usually negative).
+ */
+static void emitFrameOperand(const char *size, int offset) {
+    emitOperandStart();
+    if (size != NULL) {
+        emitText(size);
+        emitChar('\t');
+    }
+    emitText("[rbp+");
+    emitInt(offset);
+    emitChar(']');
+}
+
 /**
  * nasmGetPrimitiveTypeSize - Returns the size in bytes of a primitive type.
  *
@@ -67,8 +85,10 @@ int nasmGetPrimitiveTypeSize(int type) {
 int nasmLoadImmediateInt(int value, int primitiveType) {
     int registerIndex = allocateRegister();
 
-    fprintf(Outfile, "\tmov\t%s, %d\n", qwordRegisterList[registerIndex],
-            value);
+    emitBeginInstruction("mov");
+    emitOperand(qwordRegisterList[registerIndex]);
+    emitImmediate(value);
+    emitEndInstruction();
     return registerIndex;
 }
 
@@ -86,32 +106,41 @@ int nasmLoadImmediateInt(int value, int primitiveType) {
  */
 int nasmLoadGlobalSymbol(int id, int op) {
     int registerIndex = allocateRegister();
-    int primitiveType = SymbolTable[id].primitiveType;
+    int primitiveType = getSymbol(id)->primitiveType;
 
     switch (primitiveType) {
     case P_CHAR:
         if (op == A_PREINCREMENT) {
             // Increase first, then load
-            fprintf(Outfile, "\tinc\tBYTE [%s]\n", SymbolTable[id].name);
+            emitBeginInstruction("inc");
+            emitMemoryOperand("BYTE ", getSymbol(id)->name);
+            emitEndInstruction();
         }
         if (op == A_PREDECREMENT) {
             // Decrease first, then load
-            fprintf(Outfile, "\tdec\tBYTE [%s]\n", SymbolTable[id].name);
+            emitBeginInstruction("dec");
+            emitMemoryOperand("BYTE ", getSymbol(id)->name);
+            emitEndInstruction();
         }
 
         // Load
-        fprintf(Outfile, "\tmovzx\t%s, BYTE [%s]\n", // Zero-extend for char
-                qwordRegisterList[registerIndex],    // destination register
-                SymbolTable[id].name                 // source global symbol
-        );
+        emitBeginInstruction("movzx");                 // Zero-extend for char
+        emitOperand(qwordRegisterList[registerIndex]); // destination register
+        emitMemoryOperand("BYTE ",
+                          getSymbol(id)->name); // source global symbol
+        emitEndInstruction();
 
         if (op == A_POSTINCREMENT) {
             // Load first, then increase
-            fprintf(Outfile, "\tinc\tBYTE [%s]\n", SymbolTable[id].name);
+            emitBeginInstruction("inc");
+            emitMemoryOperand("BYTE ", getSymbol(id)->name);
+            emitEndInstruction();
         }
         if (op == A_POSTDECREMENT) {
             // Load first, then decrease
-            fprintf(Outfile, "\tdec\tBYTE [%s]\n", SymbolTable[id].name);
+            emitBeginInstruction("dec");
+            emitMemoryOperand("BYTE ", getSymbol(id)->name);
+            emitEndInstruction();
         }
 
         break;
@@ -119,34 +148,43 @@ int nasmLoadGlobalSymbol(int id, int op) {
     case P_INT:
         if (op == A_PREINCREMENT) {
             // Increase first, then load
-            fprintf(Outfile, "\tinc\tDWORD [%s]\n", SymbolTable[id].name);
+            emitBeginInstruction("inc");
+            emitMemoryOperand("DWORD ", getSymbol(id)->name);
+            emitEndInstruction();
         }
         if (op == A_PREDECREMENT) {
             // Decrease first, then load
-            fprintf(Outfile, "\tdec\tDWORD [%s]\n", SymbolTable[id].name);
+            emitBeginInstruction("dec");
+            emitMemoryOperand("DWORD ", getSymbol(id)->name);
+            emitEndInstruction();
         }
 
         // Load
-        fprintf(Outfile, "\txor\t%s, %s\n",       // Clear upper 32 bits
-                qwordRegisterList[registerIndex], // destination register
-                qwordRegisterList[registerIndex]  // source register
-        );
-        fprintf(Outfile, "\tmov\t%s, DWORD [%s]\n",
-                dwordRegisterList[registerIndex], // lower 32 bits
-                SymbolTable[id].name              // source global symbol
-        );
-        fprintf(Outfile, "\tmovsxd\t%s, %s\n",
-                qwordRegisterList[registerIndex], // dest
-                dwordRegisterList[registerIndex]  // Sign-extend to 64 bits
-        );
+        emitBeginInstruction("xor");                   // Clear upper 32 bits
+        emitOperand(qwordRegisterList[registerIndex]); // destination register
+        emitOperand(qwordRegisterList[registerIndex]); // source register
+        emitEndInstruction();
+        emitBeginInstruction("mov");
+        emitOperand(dwordRegisterList[registerIndex]); // lower 32 bits
+        emitMemoryOperand("DWORD ",
+                          getSymbol(id)->name); // source global symbol
+        emitEndInstruction();
+        emitBeginInstruction("movsxd");
+        emitOperand(qwordRegisterList[registerIndex]); // dest
+        emitOperand(dwordRegisterList[registerIndex]); // Sign-extend to 64 bits
+        emitEndInstruction();
 
         if (op == A_POSTINCREMENT) {
             // Load first, then increase
-            fprintf(Outfile, "\tinc\tDWORD [%s]\n", SymbolTable[id].name);
+            emitBeginInstruction("inc");
+            emitMemoryOperand("DWORD ", getSymbol(id)->name);
+            emitEndInstruction();
         }
         if (op == A_POSTDECREMENT) {
             // Load first, then decrease
-            fprintf(Outfile, "\tdec\tDWORD [%s]\n", SymbolTable[id].name);
+            emitBeginInstruction("dec");
+            emitMemoryOperand("DWORD ", getSymbol(id)->name);
+            emitEndInstruction();
         }
 
         break;
@@ -159,26 +197,34 @@ int nasmLoadGlobalSymbol(int id, int op) {
     case P_LONGPTR:
         if (op == A_PREINCREMENT) {
             // Increase first, then load
-            fprintf(Outfile, "\tinc\tQWORD [%s]\n", SymbolTable[id].name);
+            emitBeginInstruction("inc");
+            emitMemoryOperand("QWORD ", getSymbol(id)->name);
+            emitEndInstruction();
         }
         if (op == A_PREDECREMENT) {
             // Decrease first, then load
-            fprintf(Outfile, "\tdec\tQWORD [%s]\n", SymbolTable[id].name);
+            emitBeginInstruction("dec");
+            emitMemoryOperand("QWORD ", getSymbol(id)->name);
+            emitEndInstruction();
         }
 
         // Load
-        fprintf(Outfile, "\tmov\t%s, [%s]\n",
-                qwordRegisterList[registerIndex], // destination register
-                SymbolTable[id].name              // source global symbol
-        );
+        emitBeginInstruction("mov");
+        emitOperand(qwordRegisterList[registerIndex]); // destination register
+        emitMemoryOperand("", getSymbol(id)->name);    // source global symbol
+        emitEndInstruction();
 
         if (op == A_POSTINCREMENT) {
             // Load first, then increase
-            fprintf(Outfile, "\tinc\tQWORD [%s]\n", SymbolTable[id].name);
+            emitBeginInstruction("inc");
+            emitMemoryOperand("QWORD ", getSymbol(id)->name);
+            emitEndInstruction();
         }
         if (op == A_POSTDECREMENT) {
             // Load first, then decrease
-            fprintf(Outfile, "\tdec\tQWORD [%s]\n", SymbolTable[id].name);
+            emitBeginInstruction("dec");
+            emitMemoryOperand("QWORD ", getSymbol(id)->name);
+            emitEndInstruction();
         }
 
         break;
@@ -207,31 +253,39 @@ int nasmLoadGlobalSymbol(int id, int op) {
  */
 int nasmLoadLocalSymbol(int id, int op) {
     int registerIndex = allocateRegister();
-    int offset = SymbolTable[id].offset;
+    int offset = getSymbol(id)->offset;
 
-    switch (SymbolTable[id].primitiveType) {
+    switch (getSymbol(id)->primitiveType) {
     case P_CHAR:
         if (op == A_PREINCREMENT) {
             // Increment first, then load the value
-            fprintf(Outfile, "\tinc\tbyte\t[rbp+%d]\n", offset);
+            emitBeginInstruction("inc");
+            emitFrameOperand("byte", offset);
+            emitEndInstruction();
         }
         if (op == A_PREDECREMENT) {
             // Decrement first, then load the value
-            fprintf(Outfile, "\tdec\tbyte\t[rbp+%d]\n", offset);
+            emitBeginInstruction("dec");
+            emitFrameOperand("byte", offset);
+            emitEndInstruction();
         }
 
-        fprintf(Outfile, "\tmovzx\t%s, byte\t[rbp+%d]\n",
-                qwordRegisterList[registerIndex], // destination register
-                offset                            // source local symbol
-        );
+        emitBeginInstruction("movzx");
+        emitOperand(qwordRegisterList[registerIndex]); // destination register
+        emitFrameOperand("byte", offset);              // source local symbol
+        emitEndInstruction();
 
         if (op == A_POSTINCREMENT) {
             // Load first, then increment
-            fprintf(Outfile, "\tinc\tbyte\t[rbp+%d]\n", offset);
+            emitBeginInstruction("inc");
+            emitFrameOperand("byte", offset);
+            emitEndInstruction();
         }
         if (op == A_POSTDECREMENT) {
             // Load first, then decrement
-            fprintf(Outfile, "\tdec\tbyte\t[rbp+%d]\n", offset);
+            emitBeginInstruction("dec");
+            emitFrameOperand("byte", offset);
+            emitEndInstruction();
         }
 
         break;
@@ -239,33 +293,41 @@ int nasmLoadLocalSymbol(int id, int op) {
     case P_INT:
         if (op == A_PREINCREMENT) {
             // Increment first, then load the value
-            fprintf(Outfile, "\tinc\tDWORD\t[rbp+%d]\n", offset);
+            emitBeginInstruction("inc");
+            emitFrameOperand("DWORD", offset);
+            emitEndInstruction();
         }
         if (op == A_PREDECREMENT) {
             // Decrement first, then load the value
-            fprintf(Outfile, "\tdec\tDWORD\t[rbp+%d]\n", offset);
+            emitBeginInstruction("dec");
+            emitFrameOperand("DWORD", offset);
+            emitEndInstruction();
         }
 
-        fprintf(Outfile, "\txor\t%s, %s\n",       // Clear upper 32 bits
-                qwordRegisterList[registerIndex], // destination register
-                qwordRegisterList[registerIndex]  // source register
-        );
-        fprintf(Outfile, "\tmov\t%s, DWORD\t[rbp+%d]\n",
-                dwordRegisterList[registerIndex], // lower 32 bits
-                offset                            // source local symbol
-        );
-        fprintf(Outfile, "\tmovsxd\t%s, %s\n",
-                qwordRegisterList[registerIndex], // dest
-                dwordRegisterList[registerIndex]  // Sign-extend to 64 bits
-        );
+        emitBeginInstruction("xor");                   // Clear upper 32 bits
+        emitOperand(qwordRegisterList[registerIndex]); // destination register
+        emitOperand(qwordRegisterList[registerIndex]); // source register
+        emitEndInstruction();
+        emitBeginInstruction("mov");
+        emitOperand(dwordRegisterList[registerIndex]); // lower 32 bits
+        emitFrameOperand("DWORD", offset);             // source local symbol
+        emitEndInstruction();
+        emitBeginInstruction("movsxd");
+        emitOperand(qwordRegisterList[registerIndex]); // dest
+        emitOperand(dwordRegisterList[registerIndex]); // Sign-extend to 64 bits
+        emitEndInstruction();
 
         if (op == A_POSTINCREMENT) {
             // Load first, then increment
-            fprintf(Outfile, "\tinc\tDWORD\t[rbp+%d]\n", offset);
+            emitBeginInstruction("inc");
+            emitFrameOperand("DWORD", offset);
+            emitEndInstruction();
         }
         if (op == A_POSTDECREMENT) {
             // Load first, then decrement
-            fprintf(Outfile, "\tdec\tDWORD\t[rbp+%d]\n", offset);
+            emitBeginInstruction("dec");
+            emitFrameOperand("DWORD", offset);
+            emitEndInstruction();
         }
 
         break;
@@ -276,33 +338,41 @@ int nasmLoadLocalSymbol(int id, int op) {
     case P_LONGPTR:
         if (op == A_PREINCREMENT) {
             // Increase first, then load
-            fprintf(Outfile, "\tinc\tQWORD\t[rbp+%d]\n", offset);
+            emitBeginInstruction("inc");
+            emitFrameOperand("QWORD", offset);
+            emitEndInstruction();
         }
         if (op == A_PREDECREMENT) {
             // Decrease first, then load
-            fprintf(Outfile, "\tdec\tQWORD\t[rbp+%d]\n", offset);
+            emitBeginInstruction("dec");
+            emitFrameOperand("QWORD", offset);
+            emitEndInstruction();
         }
 
         // Load
-        fprintf(Outfile, "\tmov\t%s, QWORD\t[rbp+%d]\n",
-                qwordRegisterList[registerIndex], // destination register
-                offset                            // source local symbol
-        );
+        emitBeginInstruction("mov");
+        emitOperand(qwordRegisterList[registerIndex]); // destination register
+        emitFrameOperand("QWORD", offset);             // source local symbol
+        emitEndInstruction();
 
         if (op == A_POSTINCREMENT) {
             // Load first, then increment
-            fprintf(Outfile, "\tinc\tQWORD\t[rbp+%d]\n", offset);
+            emitBeginInstruction("inc");
+            emitFrameOperand("QWORD", offset);
+            emitEndInstruction();
         }
         if (op == A_POSTDECREMENT) {
             // Load first, then decrement
-            fprintf(Outfile, "\tdec\tQWORD\t[rbp+%d]\n", offset);
+            emitBeginInstruction("dec");
+            emitFrameOperand("QWORD", offset);
+            emitEndInstruction();
         }
 
         break;
 
     default:
         logFatald("Bad type in nasmLoadLocalSymbol: ",
-                  SymbolTable[id].primitiveType);
+                  getSymbol(id)->primitiveType);
     }
 
     return registerIndex;
@@ -319,10 +389,13 @@ int nasmLoadLocalSymbol(int id, int op) {
 int nasmLoadGlobalString(int id) {
     int registerIndex = allocateRegister();
 
-    fprintf(Outfile, "\tlea\t%s, [rel L%d]\n",
-            qwordRegisterList[registerIndex], // destination register
-            id                                // string label
-    );
+    emitBeginInstruction("lea");
+    emitOperand(qwordRegisterList[registerIndex]); // destination register
+    emitOperandStart();
+    emitText("[rel L");
+    emitInt(id); // string label
+    emitText("]");
+    emitEndInstruction();
     return registerIndex;
 }
 
@@ -336,31 +409,38 @@ int nasmLoadGlobalString(int id) {
  * @return Index of the register that was stored.
  */
 int nasmStoreGlobalSymbol(int registerIndex, int id) {
-    int primitiveType = SymbolTable[id].primitiveType;
+    int primitiveType = getSymbol(id)->primitiveType;
 
     switch (primitiveType) {
     case P_CHAR:
-        fprintf(
-            Outfile, "\tmov\t[%s], BYTE %s\n",
-            SymbolTable[id].name,           // destination global symbol
-            byteRegisterList[registerIndex] // source register (lower 8 bits)
-        );
+        // mov [symbol], BYTE <source register>
+        emitBeginInstruction("mov");
+        emitMemoryOperand("", getSymbol(id)->name);
+        emitOperandStart();
+        emitText("BYTE ");
+        emitText(byteRegisterList[registerIndex]);
+        emitEndInstruction();
         break;
     case P_INT:
-        fprintf(
-            Outfile, "\tmov\t[%s], DWORD %s\n",
-            SymbolTable[id].name,            // destination global symbol
-            dwordRegisterList[registerIndex] // source register (lower 32 bits)
-        );
+        // mov [symbol], DWORD <source register>
+        emitBeginInstruction("mov");
+        emitMemoryOperand("", getSymbol(id)->name);
+        emitOperandStart();
+        emitText("DWORD ");
+        emitText(dwordRegisterList[registerIndex]);
+        emitEndInstruction();
         break;
     case P_LONG:
     case P_CHARPTR:
     case P_INTPTR:
     case P_LONGPTR:
-        fprintf(Outfile, "\tmov\t[%s], QWORD %s\n",
-                SymbolTable[id].name,            // destination global symbol
-                qwordRegisterList[registerIndex] // source register
-        );
+        // mov [symbol], QWORD <source register>
+        emitBeginInstruction("mov");
+        emitMemoryOperand("", getSymbol(id)->name);
+        emitOperandStart();
+        emitText("QWORD ");
+        emitText(qwordRegisterList[registerIndex]);
+        emitEndInstruction();
         break;
     default:
         fprintf(
@@ -383,25 +463,31 @@ int nasmStoreGlobalSymbol(int registerIndex, int id) {
  * @return Index of the register that was stored.
  */
 int nasmStoreLocalSymbol(int registerIndex, int id) {
-    switch (SymbolTable[id].primitiveType) {
+    switch (getSymbol(id)->primitiveType) {
     case P_CHAR:
-        fprintf(Outfile, "\tmov\tBYTE\t[rbp+%d], %s\n", SymbolTable[id].offset,
-                byteRegisterList[registerIndex]);
+        emitBeginInstruction("mov");
+        emitFrameOperand("BYTE", getSymbol(id)->offset);
+        emitOperand(byteRegisterList[registerIndex]);
+        emitEndInstruction();
         break;
     case P_INT:
-        fprintf(Outfile, "\tmov\tDWORD\t[rbp+%d], %s\n", SymbolTable[id].offset,
-                dwordRegisterList[registerIndex]);
+        emitBeginInstruction("mov");
+        emitFrameOperand("DWORD", getSymbol(id)->offset);
+        emitOperand(dwordRegisterList[registerIndex]);
+        emitEndInstruction();
         break;
     case P_LONG:
     case P_CHARPTR:
     case P_INTPTR:
     case P_LONGPTR:
-        fprintf(Outfile, "\tmov\tQWORD\t[rbp+%d], %s\n", SymbolTable[id].offset,
-                qwordRegisterList[registerIndex]);
+        emitBeginInstruction("mov");
+        emitFrameOperand("QWORD", getSymbol(id)->offset);
+        emitOperand(qwordRegisterList[registerIndex]);
+        emitEndInstruction();
         break;
     default:
         logFatald("Bad type in nasmStoreLocalSymbol: ",
-                  SymbolTable[id].primitiveType);
+                  getSymbol(id)->primitiveType);
     }
 
     return registerIndex;
@@ -437,32 +523,32 @@ static int nasmAlignPow2(int n) {
  * @param id The ID of the global symbol in the symbol table.
  */
 void nasmDeclareGlobalSymbol(int id) {
-    if (SymbolTable[id].structuralType == S_FUNCTION) {
+    if (getSymbol(id)->structuralType == S_FUNCTION) {
         return;
     }
 
-    int primitiveType = SymbolTable[id].primitiveType;
+    int primitiveType = getSymbol(id)->primitiveType;
 
     int elementSize = nasmGetPrimitiveTypeSize(primitiveType);
     if (elementSize <= 0) {
         fprintf(stderr, "Error: bad elemSize %d for symbol %s\n", elementSize,
-                SymbolTable[id].name);
+                getSymbol(id)->name);
         exit(1);
     }
 
     int count = 1;
-    if (SymbolTable[id].structuralType == S_ARRAY) {
-        count = SymbolTable[id].size;
+    if (getSymbol(id)->structuralType == S_ARRAY) {
+        count = getSymbol(id)->size;
         if (count <= 0 || count > INT_MAX / elementSize) {
             fprintf(stderr, "Error: bad array count %d for symbol %s\n", count,
-                    SymbolTable[id].name);
+                    getSymbol(id)->name);
             exit(1);
         }
     }
 
     if (elementSize > LLONG_MAX / count) {
         fprintf(stderr, "Error: total size overflow for symbol %s\n",
-                SymbolTable[id].name);
+                getSymbol(id)->name);
         exit(1);
     }
 
@@ -471,30 +557,42 @@ void nasmDeclareGlobalSymbol(int id) {
     int alignment = nasmAlignPow2(elementSize);
 
     // Prefer BSS for zero-initialized storage
-    fprintf(Outfile, "\tsection\t.bss\n");
-    fprintf(Outfile, "\talign\t%d\n", alignment);
-    fprintf(Outfile, "\tglobal\t%s\n", SymbolTable[id].name);
-    fprintf(Outfile, "%s:\n", SymbolTable[id].name);
+    emitInstruction1("section", ".bss");
+    emitBeginInstruction("align");
+    emitImmediate(alignment);
+    emitEndInstruction();
+    emitInstruction1("global", getSymbol(id)->name);
+    emitSymbolLabel(getSymbol(id)->name);
 
     // Reserve storage: choose the directive that matches element width.
     // This emits ONE directive with a COUNT (e.g., resd 5), which is
     // exactly what you want.
     switch (elementSize) {
     case 1:
-        fprintf(Outfile, "\tresb\t%d\n", count);
+        emitBeginInstruction("resb");
+        emitImmediate(count);
+        emitEndInstruction();
         break;
     case 2:
-        fprintf(Outfile, "\tresw\t%d\n", count);
+        emitBeginInstruction("resw");
+        emitImmediate(count);
+        emitEndInstruction();
         break;
     case 4:
-        fprintf(Outfile, "\tresd\t%d\n", count); // 5 => 20 bytes total
+        emitBeginInstruction("resd"); // 5 => 20 bytes total
+        emitImmediate(count);
+        emitEndInstruction();
         break;
     case 8:
-        fprintf(Outfile, "\tresq\t%d\n", count);
+        emitBeginInstruction("resq");
+        emitImmediate(count);
+        emitEndInstruction();
         break;
     default:
         // Fallback: reserve raw bytes (still correct)
-        fprintf(Outfile, "\tresb\t%lld\n", totalBytesRequired);
+        emitBeginInstruction("resb");
+        emitImmediate(totalBytesRequired);
+        emitEndInstruction();
         break;
     }
 }
@@ -509,11 +607,11 @@ void nasmDeclareGlobalSymbol(int id) {
 void nasmDeclareGlobalString(int labelIndex, char *stringValue) {
     const unsigned char *s = (const unsigned char *)stringValue;
 
-    fprintf(Outfile, "\tsection .rodata\n");
+    emitInstruction1("section", ".rodata");
     nasmLabel(labelIndex);
 
-    fprintf(Outfile, "\tdb ");
-    fputc('"', Outfile); // Opening quote for string
+    emitText("\tdb ");
+    emitChar('"'); // Opening quote for string
     for (const unsigned char *p = s; *p != '\0'; p++) {
         unsigned char c = *p;
 
@@ -521,38 +619,38 @@ void nasmDeclareGlobalString(int labelIndex, char *stringValue) {
         case '\n':
             // NASM doesn't interpret C-style escapes in quoted strings.
             // Emit a real newline byte.
-            fputs("\", 10, \"", Outfile);
+            emitText("\", 10, \"");
             break;
         case '\r':
-            fputs("\", 13, \"", Outfile);
+            emitText("\", 13, \"");
             break;
         case '\t':
-            fputs("\", 9, \"", Outfile);
+            emitText("\", 9, \"");
             break;
         case '\\':
             // Emit a literal backslash byte.
-            fputs("\", 92, \"", Outfile);
+            emitText("\", 92, \"");
             break;
         case '"':
             // Emit a literal double-quote byte.
-            fputs("\", 34, \"", Outfile);
+            emitText("\", 34, \"");
             break;
         default:
             if (c >= 32 && c <= 126) {
                 // Printable
-                fputc((char)c, Outfile);
+                emitChar((char)c);
             } else {
                 // Non-printable: close string, emit byte, reopen string
-                fputs("\", ", Outfile);
-                fprintf(Outfile, "%u", (unsigned)c);
-                fputs(", \"", Outfile);
+                emitText("\", ");
+                emitInt((unsigned)c);
+                emitText(", \"");
             }
             break;
         }
     }
-    fputc('"', Outfile); // Closing quote for string
+    emitChar('"'); // Closing quote for string
 
-    fprintf(Outfile, ", 0\n"); // NUL terminator
+    emitText(", 0\n"); // NUL terminator
 }
 
 /**
@@ -564,8 +662,7 @@ void nasmDeclareGlobalString(int labelIndex, char *stringValue) {
  * @return Index of the register containing the result.
  */
 int nasmAddRegs(int r1, int r2) {
-    fprintf(Outfile, "\tadd\t%s, %s\n", qwordRegisterList[r2],
-            qwordRegisterList[r1]);
+    emitInstruction2("add", qwordRegisterList[r2], qwordRegisterList[r1]);
     freeRegister(r1);
 
     return r2;
@@ -580,8 +677,7 @@ int nasmAddRegs(int r1, int r2) {
  * @return Index of the register containing the result.
  */
 int nasmSubRegs(int r1, int r2) {
-    fprintf(Outfile, "\tsub\t%s, %s\n", qwordRegisterList[r1],
-            qwordRegisterList[r2]);
+    emitInstruction2("sub", qwordRegisterList[r1], qwordRegisterList[r2]);
     freeRegister(r2);
 
     return r1;
@@ -596,8 +692,7 @@ int nasmSubRegs(int r1, int r2) {
  * @return Index of the register containing the result.
  */
 int nasmMulRegs(int r1, int r2) {
-    fprintf(Outfile, "\timul\t%s, %s\n", qwordRegisterList[r2],
-            qwordRegisterList[r1]);
+    emitInstruction2("imul", qwordRegisterList[r2], qwordRegisterList[r1]);
     freeRegister(r1);
 
     return r2;
@@ -612,10 +707,10 @@ int nasmMulRegs(int r1, int r2) {
  * @return Index of the register containing the result (quotient).
  */
 int nasmDivRegsSigned(int r1, int r2) {
-    fprintf(Outfile, "\tmov\trax, %s\n", qwordRegisterList[r1]);
-    fprintf(Outfile, "\tcqo\n"); // Sign-extend rax into rdx:rax
-    fprintf(Outfile, "\tidiv\t%s\n", qwordRegisterList[r2]);
-    fprintf(Outfile, "\tmov\t%s, rax\n", qwordRegisterList[r1]);
+    emitInstruction2("mov", "rax", qwordRegisterList[r1]);
+    emitInstruction0("cqo"); // Sign-extend rax into rdx:rax
+    emitInstruction1("idiv", qwordRegisterList[r2]);
+    emitInstruction2("mov", qwordRegisterList[r1], "rax");
     freeRegister(r2);
 
     return r1;
@@ -629,7 +724,8 @@ int nasmDivRegsSigned(int r1, int r2) {
  * @return Index of the register containing the negated value.
  */
 int nasmArithmeticNegate(int reg) {
-    fprintf(Outfile, "\tneg\t%s\n", qwordRegisterList[reg]);
+    nasmCheckRegister(reg);
+    emitInstruction1("neg", qwordRegisterList[reg]);
 
     return reg;
 }
@@ -643,7 +739,8 @@ int nasmArithmeticNegate(int reg) {
  * @return Index of the register containing the inverted value.
  */
 int nasmLogicalInvert(int reg) {
-    fprintf(Outfile, "\tnot\t%s\n", qwordRegisterList[reg]);
+    nasmCheckRegister(reg);
+    emitInstruction1("not", qwordRegisterList[reg]);
 
     return reg;
 }
@@ -657,11 +754,10 @@ int nasmLogicalInvert(int reg) {
  * @return Index of the register containing the NOTed value.
  */
 int nasmLogicalNot(int reg) {
-    fprintf(Outfile, "\ttest\t%s, %s\n", qwordRegisterList[reg],
-            qwordRegisterList[reg]);
-    fprintf(Outfile, "\tsete\t%s\n", byteRegisterList[reg]);
-    fprintf(Outfile, "\tmovzx\t%s, %s\n", qwordRegisterList[reg],
-            byteRegisterList[reg]);
+    nasmCheckRegister(reg);
+    emitInstruction2("test", qwordRegisterList[reg], qwordRegisterList[reg]);
+    emitInstruction1("sete", byteRegisterList[reg]);
+    emitInstruction2("movzx", qwordRegisterList[reg], byteRegisterList[reg]);
 
     return reg;
 }
@@ -680,14 +776,14 @@ int nasmLogicalNot(int reg) {
  * @return Index of the register containing the boolean value (0 or 1).
  */
 int nasmToBoolean(int reg, int op, int label) {
-    fprintf(Outfile, "\ttest\t%s, %s\n", qwordRegisterList[reg],
-            qwordRegisterList[reg]);
+    nasmCheckRegister(reg);
+    emitInstruction2("test", qwordRegisterList[reg], qwordRegisterList[reg]);
     if (op == A_IF || op == A_WHILE) {
-        fprintf(Outfile, "\tje\tL%d\n", label);
+        emitInstructionLabel("je", label);
     } else {
-        fprintf(Outfile, "\tsetnz\t%s\n", byteRegisterList[reg]);
-        fprintf(Outfile, "\tmovzx\t%s, %s\n", qwordRegisterList[reg],
-                byteRegisterList[reg]);
+        emitInstruction1("setnz", byteRegisterList[reg]);
+        emitInstruction2("movzx", qwordRegisterList[reg],
+                         byteRegisterList[reg]);
     }
 
     return reg;
@@ -703,8 +799,8 @@ int nasmToBoolean(int reg, int op, int label) {
  * @return Index of the register containing the result.
  */
 int nasmBitwiseAndRegs(int dstReg, int srcReg) {
-    fprintf(Outfile, "\tand\t%s, %s\n", qwordRegisterList[dstReg],
-            qwordRegisterList[srcReg]);
+    emitInstruction2("and", qwordRegisterList[dstReg],
+                     qwordRegisterList[srcReg]);
     freeRegister(srcReg);
 
     return dstReg;
@@ -720,8 +816,8 @@ int nasmBitwiseAndRegs(int dstReg, int srcReg) {
  * @return Index of the register containing the result.
  */
 int nasmBitwiseOrRegs(int dstReg, int srcReg) {
-    fprintf(Outfile, "\tor\t%s, %s\n", qwordRegisterList[dstReg],
-            qwordRegisterList[srcReg]);
+    emitInstruction2("or", qwordRegisterList[dstReg],
+                     qwordRegisterList[srcReg]);
     freeRegister(srcReg);
 
     return dstReg;
@@ -737,8 +833,8 @@ int nasmBitwiseOrRegs(int dstReg, int srcReg) {
  * @return Index of the register containing the result.
  */
 int nasmBitwiseXorRegs(int dstReg, int srcReg) {
-    fprintf(Outfile, "\txor\t%s, %s\n", qwordRegisterList[dstReg],
-            qwordRegisterList[srcReg]);
+    emitInstruction2("xor", qwordRegisterList[dstReg],
+                     qwordRegisterList[srcReg]);
     freeRegister(srcReg);
 
     return dstReg;
@@ -754,7 +850,10 @@ int nasmBitwiseXorRegs(int dstReg, int srcReg) {
  * @return Index of the register containing the shifted value.
  */
 int nasmShiftLeftConst(int reg, int shiftAmount) {
-    fprintf(Outfile, "\tshl\t%s, %d\n", qwordRegisterList[reg], shiftAmount);
+    emitBeginInstruction("shl");
+    emitOperand(qwordRegisterList[reg]);
+    emitImmediate(shiftAmount);
+    emitEndInstruction();
     return reg;
 }
 
@@ -768,8 +867,8 @@ int nasmShiftLeftConst(int reg, int shiftAmount) {
  * @return Index of the register containing the shifted value.
  */
 int nasmShiftLeftRegs(int dstReg, int srcReg) {
-    fprintf(Outfile, "\tmov\tcl, %s\n", byteRegisterList[srcReg]);
-    fprintf(Outfile, "\tshl\t%s, cl\n", qwordRegisterList[dstReg]);
+    emitInstruction2("mov", "cl", byteRegisterList[srcReg]);
+    emitInstruction2("shl", qwordRegisterList[dstReg], "cl");
     freeRegister(srcReg);
 
     return dstReg;
@@ -785,8 +884,8 @@ int nasmShiftLeftRegs(int dstReg, int srcReg) {
  * @return Index of the register containing the shifted value.
  */
 int nasmShiftRightRegs(int dstReg, int srcReg) {
-    fprintf(Outfile, "\tmov\tcl, %s\n", byteRegisterList[srcReg]);
-    fprintf(Outfile, "\tshr\t%s, cl\n", qwordRegisterList[dstReg]);
+    emitInstruction2("mov", "cl", byteRegisterList[srcReg]);
+    emitInstruction2("shr", qwordRegisterList[dstReg], "cl");
     freeRegister(srcReg);
 
     return dstReg;
@@ -811,29 +910,28 @@ int nasmCompareAndSet(int ASTop, int r1, int r2) {
         exit(1);
     }
 
-    fprintf(Outfile, "\tcmp\t%s, %s\n", qwordRegisterList[r1],
-            qwordRegisterList[r2]);
+    emitInstruction2("cmp", qwordRegisterList[r1], qwordRegisterList[r2]);
 
     // Set the lower 8 bits of r1 based on the comparison
     char *byteRegister = byteRegisterList[r2];
     switch (ASTop) {
     case A_EQ:
-        fprintf(Outfile, "\tsete\t%s\n", byteRegister);
+        emitInstruction1("sete", byteRegister);
         break;
     case A_NE:
-        fprintf(Outfile, "\tsetne\t%s\n", byteRegister);
+        emitInstruction1("setne", byteRegister);
         break;
     case A_LT:
-        fprintf(Outfile, "\tsetl\t%s\n", byteRegister);
+        emitInstruction1("setl", byteRegister);
         break;
     case A_LE:
-        fprintf(Outfile, "\tsetle\t%s\n", byteRegister);
+        emitInstruction1("setle", byteRegister);
         break;
     case A_GT:
-        fprintf(Outfile, "\tsetg\t%s\n", byteRegister);
+        emitInstruction1("setg", byteRegister);
         break;
     case A_GE:
-        fprintf(Outfile, "\tsetge\t%s\n", byteRegister);
+        emitInstruction1("setge", byteRegister);
         break;
     default:
         fprintf(stderr,
@@ -843,7 +941,7 @@ int nasmCompareAndSet(int ASTop, int r1, int r2) {
     }
 
     // Zero-extend the result to the full register
-    fprintf(Outfile, "\tmovzx\t%s, %s\n", qwordRegisterList[r2], byteRegister);
+    emitInstruction2("movzx", qwordRegisterList[r2], byteRegister);
 
     freeRegister(r1);
 
@@ -871,27 +969,31 @@ int nasmWidenPrimitiveType(int r, int oldPrimitiveType, int newPrimitiveType) {
  * nasmAddressOfSymbol - Generates code to get the address of a symbol.
  * - For globals: `lea reg, [rel name]`
  * - For locals:  `lea reg, [rbp+offset]`
- * 
+ *
  * @param id The ID of the symbol in the symbol table.
- * 
+ *
  * @return Index of the register containing the address of the symbol.
  */
 int nasmAddressOfSymbol(int id) {
     int r = allocateRegister();
 
-    if (SymbolTable[id].class == C_LOCAL) {
-        fprintf(Outfile, "\tlea\t%s, [rbp+%d]\n",
-                qwordRegisterList[r],  // destination register
-                SymbolTable[id].offset // stack offset (usually negative)
-        );
+    if (getSymbol(id)->class == C_LOCAL) {
+        emitBeginInstruction("lea");
+        emitOperand(qwordRegisterList[r]); // destination register
+        emitFrameOperand(
+            NULL, getSymbol(id)->offset); // stack offset (usually negative)
+        emitEndInstruction();
         return r;
     }
 
     // Global symbol
-    fprintf(Outfile, "\tlea\t%s, [rel %s]\n",
-            qwordRegisterList[r], // destination register
-            SymbolTable[id].name  // source global symbol
-    );
+    emitBeginInstruction("lea");
+    emitOperand(qwordRegisterList[r]); // destination register
+    emitOperandStart();
+    emitText("[rel ");
+    emitText(getSymbol(id)->name); // source global symbol
+    emitText("]");
+    emitEndInstruction();
 
     return r;
 }
@@ -908,23 +1010,26 @@ int nasmAddressOfSymbol(int id) {
 int nasmDereferencePointer(int pointerReg, int primitiveType) {
     switch (primitiveType) {
     case P_CHARPTR:
-        fprintf(Outfile, "\tmovzx\t%s, BYTE [%s]\n",
-                qwordRegisterList[pointerReg], // destination register
-                qwordRegisterList[pointerReg]  // source pointer register
-        );
+        emitBeginInstruction("movzx");
+        emitOperand(qwordRegisterList[pointerReg]); // destination register
+        emitMemoryOperand(
+            "BYTE ", qwordRegisterList[pointerReg]); // source pointer register
+        emitEndInstruction();
         break;
     case P_INTPTR:
-        fprintf(Outfile, "\tmov\t%s, DWORD [%s]\n",
-                dwordRegisterList[pointerReg], // destination register
-                qwordRegisterList[pointerReg]  // source pointer register
-        );
+        emitBeginInstruction("mov");
+        emitOperand(dwordRegisterList[pointerReg]); // destination register
+        emitMemoryOperand(
+            "DWORD ", qwordRegisterList[pointerReg]); // source pointer register
+        emitEndInstruction();
         break;
     case P_VOIDPTR:
     case P_LONGPTR:
-        fprintf(Outfile, "\tmov\t%s, QWORD [%s]\n",
-                qwordRegisterList[pointerReg], // destination register
-                qwordRegisterList[pointerReg]  // source pointer register
-        );
+        emitBeginInstruction("mov");
+        emitOperand(qwordRegisterList[pointerReg]); // destination register
+        emitMemoryOperand(
+            "QWORD ", qwordRegisterList[pointerReg]); // source pointer register
+        emitEndInstruction();
         break;
     }
 
@@ -945,23 +1050,30 @@ int nasmStoreDereferencedPointer(int valueReg, int pointerReg,
                                  int primitiveType) {
     switch (primitiveType) {
     case P_CHAR:
-        fprintf(Outfile, "\tmov\tBYTE [%s], %s\n",
-                qwordRegisterList[pointerReg], // destination pointer register
-                byteRegisterList[valueReg]     // source register (lower 8 bits)
-        );
+        emitBeginInstruction("mov");
+        emitMemoryOperand(
+            "BYTE ",
+            qwordRegisterList[pointerReg]); // destination pointer register
+        emitOperand(
+            byteRegisterList[valueReg]); // source register (lower 8 bits)
+        emitEndInstruction();
         break;
     case P_INT:
-        fprintf(Outfile, "\tmov\tDWORD [%s], %s\n",
-                qwordRegisterList[pointerReg], // destination pointer register
-                dwordRegisterList[valueReg]    // source register (lower 32
-                                               // bits)
-        );
+        emitBeginInstruction("mov");
+        emitMemoryOperand(
+            "DWORD ",
+            qwordRegisterList[pointerReg]); // destination pointer register
+        emitOperand(
+            dwordRegisterList[valueReg]); // source register (lower 32 bits)
+        emitEndInstruction();
         break;
     case P_LONG:
-        fprintf(Outfile, "\tmov\tQWORD [%s], %s\n",
-                qwordRegisterList[pointerReg], // destination pointer register
-                qwordRegisterList[valueReg]    // source register
-        );
+        emitBeginInstruction("mov");
+        emitMemoryOperand(
+            "QWORD ",
+            qwordRegisterList[pointerReg]); // destination pointer register
+        emitOperand(qwordRegisterList[valueReg]); // source register
+        emitEndInstruction();
         break;
     default:
         fprintf(stderr,
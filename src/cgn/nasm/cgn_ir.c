@@ -0,0 +1,566 @@
+// src/cgn/nasm/cgn_ir.c
+
+#include "cgn/nasm/cgn_regs.h"
+#include "data.h"
+#include "decl.h"
+#include "defs.h"
+#include "emit.h"
+#include "ir.h"
+
+/**
+ * NOTE:
+ * Code generation in NASM x86-64 assembly
+ * (Target-specific layer)
+ * Register-allocated code: the operations gen.c lowers the IR with at -O1,
+ * on the registers regalloc.c assigned instead of the pool in cgn_regs.c.
+ *
+ * rbx and r12-r15 are callee-saved, r8, r9, rsi and rdi are not, and r10
+ * and r11 are the scratch registers for spilled values. rax, rcx and rdx
+ * stay free for the instructions that use them implicitly (idiv, the high
+ * multiplication, shifts by cl, return values).
+ */
+
+#define IR_REGISTER_COUNT                                                      \
+    (NASM_CALLEE_SAVED_COUNT + NASM_CALLER_SAVED_COUNT + 2)
+
+static char *irQwordRegisterList[IR_REGISTER_COUNT] = {
+    "rbx", "r12", "r13", "r14", "r15", // callee-saved
+    "r8",  "r9",  "rsi", "rdi",        // caller-saved
+    "r10", "r11",                      // scratch
+};
+static char *irDwordRegisterList[IR_REGISTER_COUNT] = {
+    "ebx", "r12d", "r13d", "r14d", "r15d", "r8d",
+    "r9d", "esi",  "edi",  "r10d", "r11d",
+};
+static char *irByteRegisterList[IR_REGISTER_COUNT] = {
+    "bl",  "r12b", "r13b", "r14b", "r15b", "r8b",
+    "r9b", "sil",  "dil",  "r10b", "r11b",
+};
+
+/**
+ * sizeKeyword - Returns the NASM operand size keyword of a primitive type.
+ */
+static const char *sizeKeyword(int primitiveType) {
+    switch (primitiveType) {
+    case P_CHAR:
+        return "BYTE";
+    case P_INT:
+        return "DWORD";
+    default:
+        return "QWORD";
+    }
+}
+
+/**
+ * sizedRegister - Returns the name of a register's view of a primitive
+ * type's width.
+ */
+static const char *sizedRegister(int r, int primitiveType) {
+    switch (primitiveType) {
+    case P_CHAR:
+        return irByteRegisterList[r];
+    case P_INT:
+        return irDwordRegisterList[r];
+    default:
+        return irQwordRegisterList[r];
+    }
+}
+
+/**
+ * emitVariableOperand - Append the memory operand of a variable
+ * ("<size> [rbp+<offset>]" for locals, "<size> [<name>]" for globals).
+ *
+ * @param size Operand size keyword (e.g. "DWORD"), or NULL for none.
+ * @param id The variable's symbol table ID.
+ */
+static void emitVariableOperand(const char *size, int id) {
+    emitOperandStart();
+    if (size != NULL) {
+        emitText(size);
+        emitChar(' ');
+    }
+    if (getSymbol(id)->class == C_LOCAL) {
+        emitText("[rbp+");
+        emitInt(getSymbol(id)->offset);
+    } else {
+        emitChar('[');
+        emitText(getSymbol(id)->name);
+    }
+    emitChar(']');
+}
+
+/**
+ * emitFrameSlotOperand - Append the memory operand of a spill or save slot
+ * ("QWORD [rbp+<offset>]").
+ */
+static void emitFrameSlotOperand(int offset) {
+    emitOperandStart();
+    emitText("QWORD [rbp+");
+    emitInt(offset);
+    emitChar(']');
+}
+
+/**
+ * conditionSuffix - Returns the condition code of a comparison, as used by
+ * setcc and jcc.
+ */
+static const char *conditionSuffix(int ASTop) {
+    switch (ASTop) {
+    case A_EQ:
+        return "e";
+    case A_NE:
+        return "ne";
+    case A_LT:
+        return "l";
+    case A_LE:
+        return "le";
+    case A_GT:
+        return "g";
+    case A_GE:
+        return "ge";
+    default:
+        logFatald("Error: Invalid comparison in conditionSuffix: ", ASTop);
+        return NULL;
+    }
+}
+
+/**
+ * setFromFlags - Sets a register to 0 or 1 from the flags
+ * ("set<cc> <byte>; movzx <qword>, <byte>").
+ */
+static void setFromFlags(const char *suffix, int dst) {
+    char mnemonic[8];
+
+    snprintf(mnemonic, sizeof(mnemonic), "set%s", suffix);
+    emitInstruction1(mnemonic, irByteRegisterList[dst]);
+    emitInstruction2("movzx", irQwordRegisterList[dst],
+                     irByteRegisterList[dst]);
+}
+
+/**
+ * nasmMoveRegister - Generates code to copy one register to another.
+ *
+ * @param dst Index of the destination register.
+ * @param src Index of the source register.
+ */
+void nasmMoveRegister(int dst, int src) {
+    if (dst != src) {
+        emitInstruction2("mov", irQwordRegisterList[dst],
+                         irQwordRegisterList[src]);
+    }
+}
+
+/**
+ * nasmLoadConstant - Generates code to set a register to a constant.
+ *
+ * @param dst Index of the destination register.
+ * @param value The constant.
+ */
+void nasmLoadConstant(int dst, long long value) {
+    emitBeginInstruction("mov");
+    emitOperand(irQwordRegisterList[dst]);
+    emitImmediate(value);
+    emitEndInstruction();
+}
+
+/**
+ * nasmLoadVariable - Generates code to load a variable, zero-extending a
+ * char and sign-extending an int like nasmLoadLocalSymbol() does.
+ *
+ * @param dst Index of the destination register.
+ * @param id The variable's symbol table ID.
+ */
+void nasmLoadVariable(int dst, int id) {
+    int primitiveType = getSymbol(id)->primitiveType;
+
+    switch (primitiveType) {
+    case P_CHAR:
+        emitBeginInstruction("movzx");
+        break;
+    case P_INT:
+        emitBeginInstruction("movsxd");
+        break;
+    default:
+        emitBeginInstruction("mov");
+        break;
+    }
+    emitOperand(irQwordRegisterList[dst]);
+    emitVariableOperand(sizeKeyword(primitiveType), id);
+    emitEndInstruction();
+}
+
+/**
+ * nasmStoreVariable - Generates code to store a register into a variable,
+ * truncated to the variable's type.
+ *
+ * @param src Index of the register holding the value.
+ * @param id The variable's symbol table ID.
+ */
+void nasmStoreVariable(int src, int id) {
+    int primitiveType = getSymbol(id)->primitiveType;
+
+    emitBeginInstruction("mov");
+    emitVariableOperand(sizeKeyword(primitiveType), id);
+    emitOperand(sizedRegister(src, primitiveType));
+    emitEndInstruction();
+}
+
+/**
+ * nasmLoadAddress - Generates code to load the address of a variable.
+ *
+ * @param dst Index of the destination register.
+ * @param id The variable's symbol table ID.
+ */
+void nasmLoadAddress(int dst, int id) {
+    emitBeginInstruction("lea");
+    emitOperand(irQwordRegisterList[dst]);
+    if (getSymbol(id)->class == C_LOCAL) {
+        emitVariableOperand(NULL, id);
+    } else {
+        emitOperandStart();
+        emitText("[rel ");
+        emitText(getSymbol(id)->name);
+        emitChar(']');
+    }
+    emitEndInstruction();
+}
+
+/**
+ * nasmLoadStringAddress - Generates code to load the address of a string
+ * literal.
+ *
+ * @param dst Index of the destination register.
+ * @param label The string's label.
+ */
+void nasmLoadStringAddress(int dst, int label) {
+    emitBeginInstruction("lea");
+    emitOperand(irQwordRegisterList[dst]);
+    emitOperandStart();
+    emitText("[rel L");
+    emitInt(label);
+    emitChar(']');
+    emitEndInstruction();
+}
+
+/**
+ * nasmLoadIndirect - Generates code to load the value a pointer points to,
+ * with the same widths as nasmDereferencePointer().
+ *
+ * @param dst Index of the destination register.
+ * @param pointerReg Index of the register holding the pointer.
+ * @param pointerType The pointer's primitive type.
+ */
+void nasmLoadIndirect(int dst, int pointerReg, int pointerType) {
+    switch (pointerType) {
+    case P_CHARPTR:
+        emitBeginInstruction("movzx");
+        emitOperand(irQwordRegisterList[dst]);
+        emitMemoryOperand("BYTE ", irQwordRegisterList[pointerReg]);
+        break;
+    case P_INTPTR:
+        emitBeginInstruction("mov");
+        emitOperand(irDwordRegisterList[dst]);
+        emitMemoryOperand("DWORD ", irQwordRegisterList[pointerReg]);
+        break;
+    default:
+        emitBeginInstruction("mov");
+        emitOperand(irQwordRegisterList[dst]);
+        emitMemoryOperand("QWORD ", irQwordRegisterList[pointerReg]);
+        break;
+    }
+    emitEndInstruction();
+}
+
+/**
+ * nasmStoreIndirect - Generates code to store a register where a pointer
+ * points to, truncated to a primitive type.
+ *
+ * @param src Index of the register holding the value.
+ * @param pointerReg Index of the register holding the pointer.
+ * @param primitiveType The primitive type of the value being stored.
+ */
+void nasmStoreIndirect(int src, int pointerReg, int primitiveType) {
+    if (primitiveType != P_CHAR && primitiveType != P_INT &&
+        primitiveType != P_LONG) {
+        logFatald("Error: Unsupported primitive type in nasmStoreIndirect: ",
+                  primitiveType);
+    }
+
+    emitBeginInstruction("mov");
+    emitOperandStart();
+    emitText(sizeKeyword(primitiveType));
+    emitText(" [");
+    emitText(irQwordRegisterList[pointerReg]);
+    emitChar(']');
+    emitOperand(sizedRegister(src, primitiveType));
+    emitEndInstruction();
+}
+
+/**
+ * nasmLoadFrameSlot - Generates code to load a register from a spill or
+ * save slot.
+ *
+ * @param dst Index of the destination register.
+ * @param offset Offset of the slot from rbp.
+ */
+void nasmLoadFrameSlot(int dst, int offset) {
+    emitBeginInstruction("mov");
+    emitOperand(irQwordRegisterList[dst]);
+    emitFrameSlotOperand(offset);
+    emitEndInstruction();
+}
+
+/**
+ * nasmStoreFrameSlot - Generates code to store a register into a spill or
+ * save slot.
+ *
+ * @param src Index of the register holding the value.
+ * @param offset Offset of the slot from rbp.
+ */
+void nasmStoreFrameSlot(int src, int offset) {
+    emitBeginInstruction("mov");
+    emitFrameSlotOperand(offset);
+    emitOperand(irQwordRegisterList[src]);
+    emitEndInstruction();
+}
+
+/**
+ * nasmBinaryOperation - Generates code for a binary operator on two
+ * registers (dst = src1 <op> src2).
+ *
+ * NOTE:
+ * x86 operators overwrite their left operand, so src1 is copied to dst
+ * first. When dst is src2 this would destroy it: commutative operators then
+ * simply swap their operands, subtraction negates and adds, and division
+ * and shifts read src2 into rcx or use it before dst is written.
+ *
+ * @param ASTop The AST operation code.
+ * @param dst Index of the destination register.
+ * @param src1 Index of the left operand's register.
+ * @param src2 Index of the right operand's register.
+ */
+void nasmBinaryOperation(int ASTop, int dst, int src1, int src2) {
+    const char *d = irQwordRegisterList[dst];
+    const char *mnemonic = NULL;
+
+    switch (ASTop) {
+    case A_ADD:
+        mnemonic = "add";
+        break;
+    case A_MULTIPLY:
+        mnemonic = "imul";
+        break;
+    case A_BITWISEAND:
+        mnemonic = "and";
+        break;
+    case A_BITWISEOR:
+        mnemonic = "or";
+        break;
+    case A_BITWISEXOR:
+        mnemonic = "xor";
+        break;
+
+    case A_SUBTRACT:
+        if (dst == src2 && dst != src1) {
+            emitInstruction1("neg", d);
+            emitInstruction2("add", d, irQwordRegisterList[src1]);
+        } else {
+            nasmMoveRegister(dst, src1);
+            emitInstruction2("sub", d, irQwordRegisterList[src2]);
+        }
+        return;
+
+    case A_DIVIDE:
+        emitInstruction2("mov", "rax", irQwordRegisterList[src1]);
+        emitInstruction0("cqo");
+        emitInstruction1("idiv", irQwordRegisterList[src2]);
+        emitInstruction2("mov", d, "rax");
+        return;
+
+    case A_LSHIFT:
+    case A_RSHIFT:
+        emitInstruction2("mov", "rcx", irQwordRegisterList[src2]);
+        nasmMoveRegister(dst, src1);
+        emitInstruction2(ASTop == A_LSHIFT ? "shl" : "shr", d, "cl");
+        return;
+
+    case A_EQ:
+    case A_NE:
+    case A_LT:
+    case A_LE:
+    case A_GT:
+    case A_GE:
+        emitInstruction2("cmp", irQwordRegisterList[src1],
+                         irQwordRegisterList[src2]);
+        setFromFlags(conditionSuffix(ASTop), dst);
+        return;
+
+    default:
+        logFatald("Error: Unknown operation in nasmBinaryOperation: ", ASTop);
+    }
+
+    if (dst == src2) {
+        emitInstruction2(mnemonic, d, irQwordRegisterList[src1]);
+    } else {
+        nasmMoveRegister(dst, src1);
+        emitInstruction2(mnemonic, d, irQwordRegisterList[src2]);
+    }
+}
+
+/**
+ * nasmUnaryOperation - Generates code for a unary operator on a register.
+ *
+ * @param ASTop A_ARITHMETICNEGATE, A_LOGICALINVERT, A_LOGICALNOT or
+ * A_TOBOOLEAN.
+ * @param dst Index of the destination register.
+ * @param src Index of the operand's register.
+ */
+void nasmUnaryOperation(int ASTop, int dst, int src) {
+    switch (ASTop) {
+    case A_ARITHMETICNEGATE:
+        nasmMoveRegister(dst, src);
+        emitInstruction1("neg", irQwordRegisterList[dst]);
+        break;
+    case A_LOGICALINVERT:
+        nasmMoveRegister(dst, src);
+        emitInstruction1("not", irQwordRegisterList[dst]);
+        break;
+    case A_LOGICALNOT:
+    case A_TOBOOLEAN:
+        emitInstruction2("test", irQwordRegisterList[src],
+                         irQwordRegisterList[src]);
+        setFromFlags(ASTop == A_LOGICALNOT ? "e" : "ne", dst);
+        break;
+    default:
+        logFatald("Error: Unknown operation in nasmUnaryOperation: ", ASTop);
+    }
+}
+
+/**
+ * nasmShiftByConstant - Generates code to shift a register by a constant.
+ *
+ * @param irOp IR_SHIFTLEFTCONST, IR_SHIFTRIGHTCONST or
+ * IR_ARITHSHIFTRIGHTCONST.
+ * @param dst Index of the destination register.
+ * @param src Index of the operand's register.
+ * @param amount The shift amount (0 to 63).
+ */
+void nasmShiftByConstant(int irOp, int dst, int src, int amount) {
+    const char *mnemonic = irOp == IR_SHIFTLEFTCONST    ? "shl"
+                           : irOp == IR_SHIFTRIGHTCONST ? "shr"
+                                                        : "sar";
+
+    nasmMoveRegister(dst, src);
+    emitBeginInstruction(mnemonic);
+    emitOperand(irQwordRegisterList[dst]);
+    emitImmediate(amount);
+    emitEndInstruction();
+}
+
+/**
+ * nasmMultiplyHighByConstant - Generates code for the upper 64 bits of the
+ * signed 128-bit product of a register and a constant (one-operand imul,
+ * which leaves them in rdx).
+ *
+ * @param dst Index of the destination register.
+ * @param src Index of the operand's register.
+ * @param value The constant.
+ */
+void nasmMultiplyHighByConstant(int dst, int src, long long value) {
+    emitBeginInstruction("mov");
+    emitOperand("rax");
+    emitImmediate(value);
+    emitEndInstruction();
+    emitInstruction1("imul", irQwordRegisterList[src]);
+    emitInstruction2("mov", irQwordRegisterList[dst], "rdx");
+}
+
+/**
+ * nasmNarrowToType - Generates code to truncate a register to a primitive
+ * type and extend it again like nasmLoadVariable() would.
+ *
+ * @param dst Index of the destination register.
+ * @param src Index of the operand's register.
+ * @param primitiveType The type to narrow to.
+ */
+void nasmNarrowToType(int dst, int src, int primitiveType) {
+    switch (primitiveType) {
+    case P_CHAR:
+        emitInstruction2("movzx", irQwordRegisterList[dst],
+                         irByteRegisterList[src]);
+        break;
+    case P_INT:
+        emitInstruction2("movsxd", irQwordRegisterList[dst],
+                         irDwordRegisterList[src]);
+        break;
+    default:
+        nasmMoveRegister(dst, src);
+        break;
+    }
+}
+
+/**
+ * nasmBranchIfCompare - Generates code to jump to a label if a comparison
+ * holds.
+ *
+ * @param ASTop The comparison (A_EQ ... A_GE).
+ * @param src1 Index of the left operand's register.
+ * @param src2 Index of the right operand's register, or NOREG for zero.
+ * @param label The label to jump to.
+ */
+void nasmBranchIfCompare(int ASTop, int src1, int src2, int label) {
+    char mnemonic[8];
+
+    if (src2 == NOREG) {
+        emitInstruction2("test", irQwordRegisterList[src1],
+                         irQwordRegisterList[src1]);
+    } else {
+        emitInstruction2("cmp", irQwordRegisterList[src1],
+                         irQwordRegisterList[src2]);
+    }
+    snprintf(mnemonic, sizeof(mnemonic), "j%s", conditionSuffix(ASTop));
+    emitInstructionLabel(mnemonic, label);
+}
+
+/**
+ * nasmCallFunction - Generates code to call a function. The allocator keeps
+ * values live across the call in callee-saved registers, so nothing is
+ * pushed.
+ *
+ * @param dst Index of the register receiving the result, or NOREG.
+ * @param arg Index of the register holding the argument.
+ * @param id The function's symbol table ID.
+ */
+void nasmCallFunction(int dst, int arg, int id) {
+    emitInstruction2("mov", "rdi", irQwordRegisterList[arg]);
+    emitInstruction1("call", getSymbol(id)->name);
+    if (dst != NOREG) {
+        emitInstruction2("mov", irQwordRegisterList[dst], "rax");
+    }
+}
+
+/**
+ * nasmMoveReturnValue - Generates code to move a function's return value
+ * into rax, like nasmReturnFromFunction() but without the jump.
+ *
+ * @param src Index of the register holding the value.
+ * @param id The function's symbol table ID.
+ */
+void nasmMoveReturnValue(int src, int id) {
+    int primitiveType = getSymbol(id)->primitiveType;
+
+    switch (primitiveType) {
+    case P_CHAR:
+        emitInstruction2("movzx", "eax", irByteRegisterList[src]);
+        break;
+    case P_INT:
+        emitInstruction2("mov", "eax", irDwordRegisterList[src]);
+        break;
+    case P_LONG:
+        emitInstruction2("mov", "rax", irQwordRegisterList[src]);
+        break;
+    default:
+        logFatald("Error: Unsupported primitive type in nasmMoveReturnValue",
+                  primitiveType);
+    }
+}
@@ -1,10 +1,16 @@
 // src/cgn/nasm/cgn_ops.c
 
 #include "cgn/cg_ops.h"
+#include "cgn/nasm/cgn_regs.h"
 #include "decl.h" // for nasm* prototypes already declared there
 
 const struct CodegenOps nasmOps = {
+    .immediatePrefix = "",
+
     .resetRegisters = nasmResetRegisterPool,
+    .countFreeRegisters = nasmCountFreeRegisters,
+    .spillRegister = nasmSpillRegister,
+    .reloadRegister = nasmReloadRegister,
 
     .preamble = nasmPreamble,
     .postamble = nasmPostamble,
@@ -55,4 +61,28 @@ const struct CodegenOps nasmOps = {
 
     .resetLocalOffset = nasmResetLocalOffset,
     .getLocalOffset = nasmGetLocalOffset,
+
+    .calleeSavedRegisterCount = NASM_CALLEE_SAVED_COUNT,
+    .callerSavedRegisterCount = NASM_CALLER_SAVED_COUNT,
+    .moveRegister = nasmMoveRegister,
+    .loadConstant = nasmLoadConstant,
+    .loadVariable = nasmLoadVariable,
+    .storeVariable = nasmStoreVariable,
+    .loadAddress = nasmLoadAddress,
+    .loadStringAddress = nasmLoadStringAddress,
+    .loadIndirect = nasmLoadIndirect,
+    .storeIndirect = nasmStoreIndirect,
+    .loadFrameSlot = nasmLoadFrameSlot,
+    .storeFrameSlot = nasmStoreFrameSlot,
+    .binaryOperation = nasmBinaryOperation,
+    .unaryOperation = nasmUnaryOperation,
+    .shiftByConstant = nasmShiftByConstant,
+    .multiplyHighByConstant = nasmMultiplyHighByConstant,
+    .narrowToType = nasmNarrowToType,
+    .branchIfCompare = nasmBranchIfCompare,
+    .callFunction = nasmCallFunction,
+    .moveReturnValue = nasmMoveReturnValue,
+    .peephole = &nasmPeephole,
+
+    .assembleObject = nasmAssembleObject,
 };
@@ -0,0 +1,501 @@
+// src/cgn/nasm/cgn_peephole.c
+
+#include "data.h"
+#include "decl.h"
+#include "defs.h"
+#include "peephole.h"
+
+#include <limits.h>
+
+/**
+ * NOTE:
+ * Code generation in NASM x86-64 assembly
+ * (Target-specific layer)
+ * Peephole rules for the code cgn_ir.c generates at -O1 (see peephole.c),
+ * in the order they are tried:
+ * - jump-to-next, jump-to-jump: see peephole.c.
+ * - store-reload: a load of what the previous instruction stored becomes a
+ *   move from the stored register ("mov [m], r8; mov r9, [m]").
+ * - constant-extension: "mov r8, 5; movsxd r12, r8d" -> "mov r12, 5"
+ *   (also movzx and 32-bit moves).
+ * - constant-negation: "mov r9, 1; neg r9" -> "mov r9, -1".
+ * - immediate-operand: "mov r13, 39; cmp r12, r13" -> "cmp r12, 39" (also
+ *   add, sub, and, or, xor and imul), if the constant fits in 32 bits.
+ * - move-forwarding: "mov r8, X; mov rdi, r8" -> "mov rdi, X" (also movzx,
+ *   movsxd and lea).
+ * - condition-to-branch: "setl r8b; movzx r8, r8b; test r8, r8; je L" ->
+ *   "jge L" (also with "cmp r8, 0", and sete/setne instead of je/jne).
+ * Except for store-reload, the register the removed instruction wrote must
+ * be dead afterwards.
+ *
+ * Registers are numbered as the machine encodes them (rax 0 ... r15 15).
+ */
+
+enum { RAX, RCX, RDX, RBX, RSP, RBP, RSI, RDI, R12 = 12, R13, R14, R15 };
+
+// Widths of register names
+enum { QWORD, DWORD, WORD, BYTE };
+
+static const char *registerNames[4][16] = {
+    {"rax", "rcx", "rdx", "rbx", "rsp", "rbp", "rsi", "rdi", "r8", "r9", "r10",
+     "r11", "r12", "r13", "r14", "r15"},
+    {"eax", "ecx", "edx", "ebx", "esp", "ebp", "esi", "edi", "r8d", "r9d",
+     "r10d", "r11d", "r12d", "r13d", "r14d", "r15d"},
+    {"ax", "cx", "dx", "bx", "sp", "bp", "si", "di", "r8w", "r9w", "r10w",
+     "r11w", "r12w", "r13w", "r14w", "r15w"},
+    {"al", "cl", "dl", "bl", "spl", "bpl", "sil", "dil", "r8b", "r9b", "r10b",
+     "r11b", "r12b", "r13b", "r14b", "r15b"},
+};
+
+// Conditions of setcc and jcc (as cgn_ir.c spells them) and their inverses
+static const struct {
+    const char *condition;
+    const char *inverse;
+} conditions[] = {
+    {"e", "ne"}, {"ne", "e"}, {"l", "ge"},
+    {"ge", "l"}, {"le", "g"}, {"g", "le"},
+};
+
+#define BIT(r) (1ull << (r))
+
+/**
+ * registerNumber - Look up a register name.
+ *
+ * @param width Receives the width of the name (QWORD ... BYTE)
+ *
+ * @return The register's number, or -1 if the text is not a register
+ */
+static int registerNumber(const char *text, int *width) {
+    for (int w = QWORD; w <= BYTE; w++) {
+        for (int r = 0; r < 16; r++) {
+            if (strcmp(text, registerNames[w][r]) == 0) {
+                *width = w;
+                return r;
+            }
+        }
+    }
+    return -1;
+}
+
+/**
+ * operandRegisters - Returns the registers named in an operand, e.g. the
+ * base of a memory operand.
+ */
+static uint64_t operandRegisters(const char *operand) {
+    uint64_t registers = 0;
+    const char *s = operand;
+
+    while (*s != '\0') {
+        char word[8];
+        size_t length = 0;
+        int width, r;
+
+        if (!isalnum((unsigned char)*s)) {
+            s++;
+            continue;
+        }
+        while (isalnum((unsigned char)s[length])) {
+            length++;
+        }
+        if (length < sizeof(word)) {
+            memcpy(word, s, length);
+            word[length] = '\0';
+            if ((r = registerNumber(word, &width)) >= 0) {
+                registers |= BIT(r);
+            }
+        }
+        s += length;
+    }
+    return registers;
+}
+
+/**
+ * invertCondition - Returns the inverse of a condition, or NULL if it is
+ * not one cgn_ir.c uses.
+ */
+static const char *invertCondition(const char *condition) {
+    for (size_t k = 0; k < sizeof(conditions) / sizeof(conditions[0]); k++) {
+        if (strcmp(condition, conditions[k].condition) == 0) {
+            return conditions[k].inverse;
+        }
+    }
+    return NULL;
+}
+
+/**
+ * describeInstruction - Tell what an instruction does with the registers
+ * (see struct peepholeEffect). The destination of mov, movzx, movsxd and
+ * lea is written whole when it is a 64- or 32-bit register (32-bit writes
+ * clear the upper half); anything else named is read. set<cc> only writes
+ * the low byte, but keccc always zero-extends it right after, so it counts
+ * as writing the whole register.
+ */
+static void describeInstruction(const struct peepholeLine *line,
+                                struct peepholeEffect *effect) {
+    const char *m = line->mnemonic;
+    int first = 0, width, r;
+
+    effect->reads = effect->writes = 0;
+    effect->flow = PEEPHOLE_NEXT;
+    effect->label = -1;
+
+    if (strcmp(m, "call") == 0) {
+        // keccc functions take one argument
+        effect->reads = BIT(RDI) | BIT(RSP);
+        effect->flow = PEEPHOLE_CALL;
+        return;
+    }
+    if (strcmp(m, "ret") == 0) {
+        effect->reads = BIT(RAX) | BIT(RBX) | BIT(RSP) | BIT(RBP) | BIT(R12) |
+                        BIT(R13) | BIT(R14) | BIT(R15);
+        effect->flow = PEEPHOLE_RETURN;
+        return;
+    }
+    if (strcmp(m, "cqo") == 0) {
+        effect->reads = BIT(RAX);
+        effect->writes = BIT(RDX);
+        return;
+    }
+    if (m[0] == 'j' && line->operandCount == 1) {
+        effect->flow = strcmp(m, "jmp") == 0 ? PEEPHOLE_JUMP : PEEPHOLE_BRANCH;
+        effect->label = peepholeParseLabel(line->operands[0]);
+        return;
+    }
+    if (strcmp(m, "idiv") == 0 ||
+        (strcmp(m, "imul") == 0 && line->operandCount == 1)) {
+        effect->reads = BIT(RAX) | BIT(RDX);
+    }
+
+    if ((strcmp(m, "mov") == 0 || strcmp(m, "movzx") == 0 ||
+         strcmp(m, "movsxd") == 0 || strcmp(m, "lea") == 0) &&
+        line->operandCount == 2 &&
+        (r = registerNumber(line->operands[0], &width)) >= 0 &&
+        (width == QWORD || width == DWORD)) {
+        effect->writes = BIT(r);
+        first = 1;
+    }
+    if (strncmp(m, "set", 3) == 0 && line->operandCount == 1 &&
+        (r = registerNumber(line->operands[0], &width)) >= 0 && width == BYTE) {
+        effect->writes = BIT(r);
+        first = 1;
+    }
+    for (int k = first; k < line->operandCount; k++) {
+        effect->reads |= operandRegisters(line->operands[k]);
+    }
+    effect->writes &= ~effect->reads;
+}
+
+/**
+ * isInstruction - Tell whether a line is an instruction with a given
+ * mnemonic and number of operands.
+ */
+static bool isInstruction(const struct peepholeLine *line, const char *mnemonic,
+                          int operandCount) {
+    return line->kind == PEEPHOLE_INSTRUCTION &&
+           line->operandCount == operandCount &&
+           strcmp(line->mnemonic, mnemonic) == 0;
+}
+
+/**
+ * loadsConstant - Tell whether a line is "mov <64-bit register>, <value>".
+ *
+ * @param r Receives the register
+ * @param value Receives the value
+ */
+static bool loadsConstant(const struct peepholeLine *line, int *r,
+                          long long *value) {
+    int width;
+
+    return isInstruction(line, "mov", 2) &&
+           (*r = registerNumber(line->operands[0], &width)) >= 0 &&
+           width == QWORD && peepholeParseImmediate(line->operands[1], value);
+}
+
+/**
+ * rewriteConstant - Make a line "mov <64-bit register>, <value>".
+ */
+static void rewriteConstant(struct peepholeLine *line, int r, long long value) {
+    char immediate[24];
+    const char *operands[2] = {registerNames[QWORD][r], immediate};
+
+    snprintf(immediate, sizeof(immediate), "%lld", value);
+    peepholeRewrite(line, "mov", operands, 2);
+}
+
+/**
+ * storeReload - Rule turning the load of what was just stored into a move
+ * between registers, or removing it if it loads the stored register.
+ */
+static bool storeReload(struct peepholeFunction *p, int i) {
+    struct peepholeLine *store = &p->lines[i], *load;
+    const char *operands[2];
+    int j, src, dst, width, dstWidth;
+
+    if (!isInstruction(store, "mov", 2) ||
+        strchr(store->operands[0], '[') == NULL ||
+        (src = registerNumber(store->operands[1], &width)) < 0 ||
+        (j = peepholeNextInstruction(p, i)) < 0) {
+        return false;
+    }
+    load = &p->lines[j];
+    if (load->operandCount != 2 ||
+        strcmp(load->operands[1], store->operands[0]) != 0 ||
+        (dst = registerNumber(load->operands[0], &dstWidth)) < 0) {
+        return false;
+    }
+
+    operands[0] = load->operands[0];
+    if (strcmp(load->mnemonic, "mov") == 0 && width == QWORD &&
+        dstWidth == QWORD) {
+        if (dst == src) {
+            peepholeRemove(p, j);
+            return true;
+        }
+        operands[1] = registerNames[QWORD][src];
+    } else if (strcmp(load->mnemonic, "mov") == 0 && width == DWORD &&
+               dstWidth == DWORD) {
+        operands[1] = registerNames[DWORD][src];
+    } else if (strcmp(load->mnemonic, "movsxd") == 0 && width == DWORD) {
+        operands[1] = registerNames[DWORD][src];
+    } else if (strcmp(load->mnemonic, "movzx") == 0 && width == BYTE) {
+        operands[1] = registerNames[BYTE][src];
+    } else {
+        return false;
+    }
+    peepholeRewrite(load, load->mnemonic, operands, 2);
+    return true;
+}
+
+/**
+ * constantExtension - Rule extending a constant when it is loaded rather
+ * than in its register afterwards.
+ */
+static bool constantExtension(struct peepholeFunction *p, int i) {
+    struct peepholeLine *line = &p->lines[i], *extend;
+    long long value;
+    int j, a, b, width;
+
+    if (!loadsConstant(line, &a, &value) ||
+        (j = peepholeNextInstruction(p, i)) < 0) {
+        return false;
+    }
+    extend = &p->lines[j];
+    if (extend->operandCount != 2 ||
+        (b = registerNumber(extend->operands[0], &width)) < 0) {
+        return false;
+    }
+
+    if (strcmp(extend->mnemonic, "movsxd") == 0 &&
+        strcmp(extend->operands[1], registerNames[DWORD][a]) == 0) {
+        value = (int32_t)value;
+    } else if (strcmp(extend->mnemonic, "movzx") == 0 &&
+               strcmp(extend->operands[1], registerNames[BYTE][a]) == 0 &&
+               (width == QWORD || width == DWORD)) {
+        value = (uint8_t)value;
+    } else if (strcmp(extend->mnemonic, "mov") == 0 && width == DWORD &&
+               strcmp(extend->operands[1], registerNames[DWORD][a]) == 0) {
+        value = (uint32_t)value;
+    } else {
+        return false;
+    }
+    if (b != a && !peepholeRegisterDead(p, j, a)) {
+        return false;
+    }
+
+    rewriteConstant(line, b, value);
+    peepholeRemove(p, j);
+    return true;
+}
+
+/**
+ * constantNegation - Rule negating a constant when it is loaded.
+ */
+static bool constantNegation(struct peepholeFunction *p, int i) {
+    long long value;
+    int j, a;
+
+    if (!loadsConstant(&p->lines[i], &a, &value) || value == LLONG_MIN ||
+        (j = peepholeNextInstruction(p, i)) < 0 ||
+        !isInstruction(&p->lines[j], "neg", 1) ||
+        strcmp(p->lines[j].operands[0], registerNames[QWORD][a]) != 0) {
+        return false;
+    }
+
+    rewriteConstant(&p->lines[i], a, -value);
+    peepholeRemove(p, j);
+    return true;
+}
+
+/**
+ * immediateOperand - Rule using a constant as the immediate operand of the
+ * instruction after it instead of loading it into a register.
+ */
+static bool immediateOperand(struct peepholeFunction *p, int i) {
+    static const char *mnemonics[] = {"add", "sub", "and", "or",
+                                      "xor", "cmp", "imul"};
+    struct peepholeLine *line;
+    const char *operands[3];
+    char immediate[24];
+    long long value;
+    int j, a, d, width;
+    bool found = false;
+
+    if (!loadsConstant(&p->lines[i], &a, &value) || value < INT32_MIN ||
+        value > INT32_MAX || (j = peepholeNextInstruction(p, i)) < 0) {
+        return false;
+    }
+    line = &p->lines[j];
+    for (size_t k = 0; k < sizeof(mnemonics) / sizeof(mnemonics[0]); k++) {
+        found |= strcmp(line->mnemonic, mnemonics[k]) == 0;
+    }
+    if (!found || line->operandCount != 2 ||
+        strcmp(line->operands[1], registerNames[QWORD][a]) != 0 ||
+        (d = registerNumber(line->operands[0], &width)) < 0 || width != QWORD ||
+        d == a || !peepholeRegisterDead(p, j, a)) {
+        return false;
+    }
+
+    snprintf(immediate, sizeof(immediate), "%lld", value);
+    operands[0] = operands[1] = line->operands[0];
+    operands[2] = immediate;
+    if (strcmp(line->mnemonic, "imul") == 0) {
+        peepholeRewrite(line, "imul", operands, 3);
+    } else {
+        peepholeRewrite(line, line->mnemonic, operands + 1, 2);
+    }
+    peepholeRemove(p, i);
+    return true;
+}
+
+/**
+ * moveForwarding - Rule writing a value straight into the register it is
+ * moved to next.
+ */
+static bool moveForwarding(struct peepholeFunction *p, int i) {
+    struct peepholeLine *line = &p->lines[i], *move;
+    const char *operands[2];
+    int j, a, b, width, moveWidth;
+
+    if ((strcmp(line->mnemonic, "mov") != 0 &&
+         strcmp(line->mnemonic, "movzx") != 0 &&
+         strcmp(line->mnemonic, "movsxd") != 0 &&
+         strcmp(line->mnemonic, "lea") != 0) ||
+        line->operandCount != 2 ||
+        (a = registerNumber(line->operands[0], &width)) < 0 ||
+        (width != QWORD && width != DWORD) || a == RSP || a == RBP ||
+        (j = peepholeNextInstruction(p, i)) < 0) {
+        return false;
+    }
+    move = &p->lines[j];
+    if (!isInstruction(move, "mov", 2) ||
+        strcmp(move->operands[1], registerNames[QWORD][a]) != 0 ||
+        (b = registerNumber(move->operands[0], &moveWidth)) < 0 ||
+        moveWidth != QWORD || b == a || b == RSP || b == RBP ||
+        !peepholeRegisterDead(p, j, a)) {
+        return false;
+    }
+
+    operands[0] = registerNames[width][b];
+    operands[1] = line->operands[1];
+    peepholeRewrite(line, line->mnemonic, operands, 2);
+    peepholeRemove(p, j);
+    if (width == QWORD && strcmp(line->mnemonic, "mov") == 0 &&
+        strcmp(line->operands[0], line->operands[1]) == 0) {
+        peepholeRemove(p, i);
+    }
+    return true;
+}
+
+/**
+ * conditionToBranch - Rule branching (or setting a register) on the flags
+ * a 0 or 1 was set from, instead of on that value.
+ */
+static bool conditionToBranch(struct peepholeFunction *p, int i) {
+    struct peepholeLine *set = &p->lines[i], *use;
+    const char *condition = set->mnemonic + 3, *inverse, *qword, *operand;
+    char mnemonic[PEEPHOLE_TEXT_SIZE];
+    long long zero;
+    int j, k, l, a, u, width;
+    bool onZero;
+
+    if (strncmp(set->mnemonic, "set", 3) != 0 || set->operandCount != 1 ||
+        (inverse = invertCondition(condition)) == NULL ||
+        (a = registerNumber(set->operands[0], &width)) < 0 || width != BYTE) {
+        return false;
+    }
+    qword = registerNames[QWORD][a];
+
+    // movzx r8, r8b; test r8, r8 (or cmp r8, 0)
+    if ((j = peepholeNextInstruction(p, i)) < 0 ||
+        !isInstruction(&p->lines[j], "movzx", 2) ||
+        strcmp(p->lines[j].operands[0], qword) != 0 ||
+        strcmp(p->lines[j].operands[1], set->operands[0]) != 0 ||
+        (k = peepholeNextInstruction(p, j)) < 0) {
+        return false;
+    }
+    if (!(isInstruction(&p->lines[k], "test", 2) &&
+          strcmp(p->lines[k].operands[0], qword) == 0 &&
+          strcmp(p->lines[k].operands[1], qword) == 0) &&
+        !(isInstruction(&p->lines[k], "cmp", 2) &&
+          strcmp(p->lines[k].operands[0], qword) == 0 &&
+          peepholeParseImmediate(p->lines[k].operands[1], &zero) &&
+          zero == 0)) {
+        return false;
+    }
+    if ((l = peepholeNextInstruction(p, k)) < 0) {
+        return false;
+    }
+    use = &p->lines[l];
+
+    if (isInstruction(use, "je", 1) || isInstruction(use, "jne", 1)) {
+        onZero = strcmp(use->mnemonic, "je") == 0;
+        if (!peepholeRegisterDead(p, l, a)) {
+            return false;
+        }
+        snprintf(mnemonic, sizeof(mnemonic), "j%s",
+                 onZero ? inverse : condition);
+    } else if (isInstruction(use, "sete", 1) ||
+               isInstruction(use, "setne", 1)) {
+        int m = peepholeNextInstruction(p, l);
+        onZero = strcmp(use->mnemonic, "sete") == 0;
+        u = registerNumber(use->operands[0], &width);
+        // Setting r8b again only needs the movzx after it
+        if (u == a ? m < 0 || !isInstruction(&p->lines[m], "movzx", 2) ||
+                         strcmp(p->lines[m].operands[0], qword) != 0 ||
+                         strcmp(p->lines[m].operands[1], set->operands[0]) != 0
+                   : !peepholeRegisterDead(p, l, a)) {
+            return false;
+        }
+        snprintf(mnemonic, sizeof(mnemonic), "set%s",
+                 onZero ? inverse : condition);
+    } else {
+        return false;
+    }
+
+    operand = use->operands[0];
+    peepholeRewrite(use, mnemonic, &operand, 1);
+    peepholeRemove(p, i);
+    peepholeRemove(p, j);
+    peepholeRemove(p, k);
+    return true;
+}
+
+// Rules in the order they are tried (hit counts for --stats)
+static struct peepholeRule rules[] = {
+    {"jump-to-next", peepholeJumpToNext, 0},
+    {"jump-to-jump", peepholeJumpToJump, 0},
+    {"store-reload", storeReload, 0},
+    {"constant-extension", constantExtension, 0},
+    {"constant-negation", constantNegation, 0},
+    {"immediate-operand", immediateOperand, 0},
+    {"move-forwarding", moveForwarding, 0},
+    {"condition-to-branch", conditionToBranch, 0},
+};
+
+const struct peepholeTarget nasmPeephole = {
+    .rules = rules,
+    .ruleCount = sizeof(rules) / sizeof(rules[0]),
+    .describe = describeInstruction,
+    .preservedByCalls = BIT(RBX) | BIT(RSP) | BIT(RBP) | BIT(R12) | BIT(R13) |
+                        BIT(R14) | BIT(R15),
+};
@@ -16,29 +16,40 @@
  * $ ./out
  */
 
-// TODO:
-// Better name for this variable is required,
-// such as "Xth register is currently not used"
-#define NUMFREEREGISTERS 4
-static bool freeRegisters[NUMFREEREGISTERS] = {true, true, true, true};
+/**
+ * NOTE:
+ * The pool holds every caller-saved register that no instruction uses
+ * implicitly: rax and rdx are taken by idiv/imul and return values, rcx by
+ * shifts (cl). Values still live at a call are saved around it (see
+ * nasmFunctionCall), and gen.c spills to the stack when an expression needs
+ * more registers than are free (nasmSpillRegister).
+ */
+static bool freeRegisters[NUMFREEREGISTERS] = {true, true, true,
+                                               true, true, true};
 
-char *qwordRegisterList[] = {
+char *qwordRegisterList[NUMFREEREGISTERS] = {
     "r8",  // x64 general-purpose register #1
     "r9",  // x64 general-purpose register #2
     "r10", // x64 general-purpose register #3
-    "r11"  // x64 general-purpose register #4
+    "r11", // x64 general-purpose register #4
+    "rsi", // x64 general-purpose register #5
+    "rdi", // x64 general-purpose register #6 (also the first argument)
 };
-char *dwordRegisterList[] = {
+char *dwordRegisterList[NUMFREEREGISTERS] = {
     "r8d",  // lower 32 bits of r8
     "r9d",  // lower 32 bits of r9
     "r10d", // lower 32 bits of r10
-    "r11d"  // lower 32 bits of r11
+    "r11d", // lower 32 bits of r11
+    "esi",  // lower 32 bits of rsi
+    "edi",  // lower 32 bits of rdi
 };
-char *byteRegisterList[] = {
+char *byteRegisterList[NUMFREEREGISTERS] = {
     "r8b",  // lower 8 bits of r8
     "r9b",  // lower 8 bits of r9
     "r10b", // lower 8 bits of r10
-    "r11b"  // lower 8 bits of r11
+    "r11b", // lower 8 bits of r11
+    "sil",  // lower 8 bits of rsi
+    "dil",  // lower 8 bits of rdi
 };
 
 /**
@@ -83,3 +94,38 @@ void freeRegister(int r) {
     }
     freeRegisters[r] = 1; // Mark as free
 }
+
+/**
+ * isRegisterAllocated - Check whether a register currently holds a value.
+ *
+ * @param r Index of the register.
+ *
+ * @return true if the register is allocated.
+ */
+bool isRegisterAllocated(int r) { return !freeRegisters[r]; }
+
+/**
+ * nasmCheckRegister - Dies with an error if a register index is outside the
+ * register name tables (e.g. NOREG handed to an emit routine).
+ *
+ * @param r Index of the register.
+ */
+void nasmCheckRegister(int r) {
+    if (r < 0 || r >= NUMFREEREGISTERS) {
+        logFatald("Invalid register index: ", r);
+    }
+}
+
+/**
+ * nasmCountFreeRegisters - Count the registers available for allocation.
+ *
+ * @return Number of free registers.
+ */
+int nasmCountFreeRegisters(void) {
+    int count = 0;
+
+    for (int i = 0; i < NUMFREEREGISTERS; i++) {
+        count += freeRegisters[i];
+    }
+    return count;
+}
@@ -4,12 +4,22 @@
 
 #include <stdbool.h>
 
+// Number of registers in the allocation pool
+#define NUMFREEREGISTERS 6
+
 // Exposed register name tables for NASM x86-64
-extern char *qwordRegisterList[4];
-extern char *dwordRegisterList[4];
-extern char *byteRegisterList[4];
+extern char *qwordRegisterList[NUMFREEREGISTERS];
+extern char *dwordRegisterList[NUMFREEREGISTERS];
+extern char *byteRegisterList[NUMFREEREGISTERS];
 
 // Register pool management
 void nasmResetRegisterPool(void);
 int allocateRegister(void);
 void freeRegister(int r);
+bool isRegisterAllocated(int r);
+void nasmCheckRegister(int r);
+int nasmCountFreeRegisters(void);
+
+// Registers handed to the register allocator at -O1 (see cgn_ir.c)
+#define NASM_CALLEE_SAVED_COUNT 5
+#define NASM_CALLER_SAVED_COUNT 4
@@ -4,6 +4,7 @@
 #include "data.h"
 #include "decl.h"
 #include "defs.h"
+#include "emit.h"
 
 #include <assert.h>
 
@@ -33,13 +34,17 @@ enum {
 static int localOffset;
 static int stackOffset;
 
+// Number of 8-byte values pushed by spills and call saves; calls need the
+// stack 16-byte aligned
+static int pushedValues;
+
 /**
  * nasmDeclareDataSegment - Outputs the data segment declaration if not
  * already in the data segment.
  */
 void nasmDeclareTextSegment() {
     if (currentSegment != TEXT_SEGMENT) {
-        fputs("\tsection\t.text\n", Outfile);
+        emitInstruction1("section", ".text");
         currentSegment = TEXT_SEGMENT;
     }
 }
@@ -50,7 +55,7 @@ void nasmDeclareTextSegment() {
  */
 void nasmDeclareDataSegment() {
     if (currentSegment != DATA_SEGMENT) {
-        fputs("\tsection\t.data\n", Outfile);
+        emitInstruction1("section", ".data");
         currentSegment = DATA_SEGMENT;
     }
 }
@@ -85,50 +90,106 @@ void nasmPreamble() {
     nasmResetRegisterPool();
 
     // printint is provided by custom runtime object
-    fputs("\textern\tprintint\n", Outfile);
-    fputs("\textern\tprintchar\n", Outfile);
-    fputs("\textern\tprintstring\n", Outfile);
+    emitInstruction1("extern", "printint");
+    emitInstruction1("extern", "printchar");
+    emitInstruction1("extern", "printstring");
 
-    fputs("\tsection\t.text\n", Outfile);
+    emitInstruction1("section", ".text");
 }
 
 /**
  * nasmFunctionCall - Generates code to call a function with an argument in a
  * register.
  *
+ * NOTE:
+ * Every pool register is caller-saved, so the ones still holding values
+ * (other than the argument) are pushed before the call and popped after it.
+ *
  * @param registerIndex Index of the register containing the argument.
  * @param functionSymbolId The function's symbol table ID.
  *
  * @return Index of the register containing the function's return value.
  */
 int nasmFunctionCall(int registerIndex, int functionSymbolId) {
-    int outRegister = allocateRegister();
-    fprintf(Outfile, "\tmov\trdi, %s\n", qwordRegisterList[registerIndex]);
-    fprintf(Outfile, "\tcall\t%s\n", SymbolTable[functionSymbolId].name);
-    fprintf(Outfile, "\tmov\t%s, rax\n", qwordRegisterList[outRegister]);
+    int saved[NUMFREEREGISTERS];
+    int savedCount = 0;
+
+    for (int r = 0; r < NUMFREEREGISTERS; r++) {
+        if (r != registerIndex && isRegisterAllocated(r)) {
+            emitInstruction1("push", qwordRegisterList[r]);
+            saved[savedCount++] = r;
+        }
+    }
+    pushedValues += savedCount;
+
+    bool padded = pushedValues % 2 != 0;
+    if (padded) {
+        emitInstruction2("sub", "rsp", "8");
+    }
+    emitInstruction2("mov", "rdi", qwordRegisterList[registerIndex]);
     freeRegister(registerIndex);
+    emitInstruction1("call", getSymbol(functionSymbolId)->name);
+    if (padded) {
+        emitInstruction2("add", "rsp", "8");
+    }
+
+    int outRegister = allocateRegister();
+    emitInstruction2("mov", qwordRegisterList[outRegister], "rax");
+
+    while (savedCount > 0) {
+        emitInstruction1("pop", qwordRegisterList[saved[--savedCount]]);
+        pushedValues--;
+    }
 
     return outRegister;
 }
 
+/**
+ * nasmSpillRegister - Generates code to push a register's value onto the
+ * stack and frees the register.
+ *
+ * @param registerIndex Index of the register to spill.
+ */
+void nasmSpillRegister(int registerIndex) {
+    emitInstruction1("push", qwordRegisterList[registerIndex]);
+    pushedValues++;
+    freeRegister(registerIndex);
+}
+
+/**
+ * nasmReloadRegister - Generates code to pop the most recently spilled value
+ * into a newly allocated register.
+ *
+ * @return Index of the register holding the value.
+ */
+int nasmReloadRegister(void) {
+    int registerIndex = allocateRegister();
+
+    emitInstruction1("pop", qwordRegisterList[registerIndex]);
+    pushedValues--;
+    return registerIndex;
+}
+
 /**
  * nasmFunctionPreamble - Outputs the assembly code function preamble.
  *
  * @param id The function's symbol table ID.
  */
 void nasmFunctionPreamble(int id) {
-    char *functionName = SymbolTable[id].name;
+    const char *functionName = getSymbol(id)->name;
     nasmDeclareTextSegment();
 
+    pushedValues = 0;
     stackOffset = (localOffset + 15) & ~15; // Align to 16 bytes
 
-    fprintf(Outfile,
-            "\tglobal\t%s\n"
-            "%s:\n"
-            "\tpush\trbp\n"
-            "\tmov\trbp, rsp\n"
-            "\tadd\trsp, %d\n",
-            functionName, functionName, -stackOffset);
+    emitInstruction1("global", functionName);
+    emitSymbolLabel(functionName);
+    emitInstruction1("push", "rbp");
+    emitInstruction2("mov", "rbp", "rsp");
+    emitBeginInstruction("add");
+    emitOperand("rsp");
+    emitImmediate(-stackOffset);
+    emitEndInstruction();
 
     // fprintf(Outfile, "\tsection\t.text\n");
     // fprintf(Outfile, "\tglobal\t%s\n", functionName);
@@ -145,17 +206,17 @@ void nasmFunctionPreamble(int id) {
  * @param id The function's symbol table ID.
  */
 void nasmReturnFromFunction(int reg, int id) {
-    int primitiveType = SymbolTable[id].primitiveType;
+    int primitiveType = getSymbol(id)->primitiveType;
 
     switch (primitiveType) {
     case P_CHAR:
-        fprintf(Outfile, "\tmovzx\teax, %s\n", byteRegisterList[reg]);
+        emitInstruction2("movzx", "eax", byteRegisterList[reg]);
         break;
     case P_INT:
-        fprintf(Outfile, "\tmov\teax, %s\n", dwordRegisterList[reg]);
+        emitInstruction2("mov", "eax", dwordRegisterList[reg]);
         break;
     case P_LONG:
-        fprintf(Outfile, "\tmov\trax, %s\n", qwordRegisterList[reg]);
+        emitInstruction2("mov", "rax", qwordRegisterList[reg]);
         break;
     default:
         logFatald("Error: Unsupported primitive type in nasmReturnFromFunction",
@@ -163,7 +224,7 @@ void nasmReturnFromFunction(int reg, int id) {
     }
 
     // After moving the return value to rax, jump to function end label
-    nasmJump(SymbolTable[id].endLabel);
+    nasmJump(getSymbol(id)->endLabel);
 }
 
 /**
@@ -172,11 +233,13 @@ void nasmReturnFromFunction(int reg, int id) {
  * @param id The function's symbol table ID.
  */
 void nasmFunctionPostamble(int id) {
-    nasmLabel(SymbolTable[id].endLabel);
-    fprintf(Outfile, "\tadd\trsp, %d\n", stackOffset);
-    fputs("\tpop	rbp\n"
-          "\tret\n",
-          Outfile);
+    nasmLabel(getSymbol(id)->endLabel);
+    emitBeginInstruction("add");
+    emitOperand("rsp");
+    emitImmediate(stackOffset);
+    emitEndInstruction();
+    emitInstruction1("pop", "rbp");
+    emitInstruction0("ret");
 }
 
 /**
@@ -184,10 +247,9 @@ void nasmFunctionPostamble(int id) {
  *               including function epilogue for main.
  */
 void nasmPostamble() {
-    fputs("\tmov\teax, 0\n"
-          "\tpop\trbp\n"
-          "\tret\n",
-          Outfile);
+    emitInstruction2("mov", "eax", "0");
+    emitInstruction1("pop", "rbp");
+    emitInstruction0("ret");
 }
 
 /**
@@ -195,14 +257,14 @@ void nasmPostamble() {
  *
  * @param label The label number to output.
  */
-void nasmLabel(int label) { fprintf(Outfile, "L%d:\n", label); }
+void nasmLabel(int label) { emitLabel(label); }
 
 /**
  * nasmJump - Generates an unconditional jump to a label.
  *
  * @param label The label number to jump to.
  */
-void nasmJump(int label) { fprintf(Outfile, "\tjmp\tL%d\n", label); }
+void nasmJump(int label) { emitInstructionLabel("jmp", label); }
 
 /**
  * nasmCompareAndJump - Generates code to compare two registers and jump to a
@@ -224,35 +286,34 @@ int nasmCompareAndJump(int ASTop, int r1, int r2, int label) {
         exit(1);
     }
 
-    fprintf(Outfile, "\tcmp\t%s, %s\n", qwordRegisterList[r1],
-            qwordRegisterList[r2]);
+    emitInstruction2("cmp", qwordRegisterList[r1], qwordRegisterList[r2]);
 
     // WARNING:
     // Jump when the condition is FALSE
     switch (ASTop) {
     case A_EQ:
         // !=
-        fprintf(Outfile, "\tjne\tL%d\n", label);
+        emitInstructionLabel("jne", label);
         break;
     case A_NE:
         // ==
-        fprintf(Outfile, "\tje\tL%d\n", label);
+        emitInstructionLabel("je", label);
         break;
     case A_LT:
         // >=
-        fprintf(Outfile, "\tjge\tL%d\n", label);
+        emitInstructionLabel("jge", label);
         break;
     case A_LE:
         // >
-        fprintf(Outfile, "\tjg\tL%d\n", label);
+        emitInstructionLabel("jg", label);
         break;
     case A_GT:
         // <=
-        fprintf(Outfile, "\tjle\tL%d\n", label);
+        emitInstructionLabel("jle", label);
         break;
     case A_GE:
         // <
-        fprintf(Outfile, "\tjl\tL%d\n", label);
+        emitInstructionLabel("jl", label);
         break;
     default:
         fprintf(stderr,
@@ -13,10 +13,20 @@
  */
 // Selected code generation target (see defs.h TARGET_*)
 extern_ int CurrentTarget;
+// Output kind (see defs.h EMIT_*)
+extern_ int Option_emit;
+// Directory searched first for the runtime archive (--runtime-dir), or NULL
+extern_ const char *Option_runtimeDir;
 // Print the dump of the AST to stdout during compilation
 extern_ bool Option_dumpAST;
 // If true, dump a compacted AST (flattens A_GLUE chains)
 extern_ bool Option_dumpASTCompacted;
+// Print the dump of each function's IR to stdout during compilation
+extern_ bool Option_dumpIR;
+// Print compiler statistics (e.g. AST memory use) to stderr
+extern_ bool Option_stats;
+// Optimization level (-O0, -O1); see optimize.c
+extern_ int Option_optimizationLevel;
 
 /**
  * NOTE:
@@ -25,15 +35,12 @@ extern_ bool Option_dumpASTCompacted;
 
 // Current Line number
 extern_ int Line;
-// Character put back by scanner for re-reading
-extern_ int Putback;
 // Symbol ID of the current function being processed
 extern_ int CurrentFunctionSymbolID;
-// Position of the next free global/local symbol slot
-extern_ int NextGlobalSymbolIndex;
-extern_ int NextLocalSymbolIndex;
-// Input file (source code)
-extern_ FILE *Infile;
+// Source text being scanned: next character and end of the text
+// (see input.c)
+extern_ const char *InputCursor;
+extern_ const char *InputEnd;
 // Output file (generated code, currently Assembly)
 extern_ FILE *Outfile;
 // Latest token scanned
@@ -41,17 +48,10 @@ extern_ struct token Token;
 
 // Last identifier scanned (e.g. "print")
 extern_ char Text[TEXTLEN + 1];
-// symbol table for both global and local symbols
-extern_ struct symbolTable SymbolTable[NSYMBOLS];
 
 /**
  * NOTE:
- * SymbolTable exists both for local and global symbols.
- * Global symbols occupy the earlier slots, and grow upwards.
- * Local symbols occupy the later slots, and grow downwards.
- * To visualize:
- * [0]xxxx......................................xxxxxxxxxxxx[NSYMBOLS-1]
- *        ^                                    ^
- *        |                                    |
- *  NextGlobalSymbolIndex            NextLocalSymbolIndex
+ * The symbol table (see symbol.c) holds global and local symbols in two
+ * separately growing regions. Symbols are referred to by slot number (e.g.
+ * the AST's v.identifierIndex) and accessed with getSymbol().
  */
@@ -0,0 +1,245 @@
+// src/dce.c
+
+// Dead code elimination on the IR: branches on constants, unreachable
+// blocks, and instructions whose result is never used.
+
+#include "data.h"
+#include "decl.h"
+#include "defs.h"
+#include "ir.h"
+
+/**
+ * NOTE:
+ * The pass runs in three steps:
+ * 1. A branch comparing literals (such as the one of `if (0)` or
+ *    `while (0)`) becomes a jump if it is always taken and is removed if it
+ *    never is.
+ * 2. The blocks control cannot reach from the entry are removed: code after
+ *    a return, the body of `if (0)`, the loop of `while (0)`. The exit label
+ *    stays, as the lowering ends the function there.
+ * 3. Working backwards through each block from the registers live on its
+ *    exit, an instruction whose result is not live is removed: dead stores
+ *    to the locals kept in registers and unused results of expressions. A
+ *    call is kept for its effects but no longer copies its unused result.
+ *    Removing an instruction may leave its operands unused in turn, so this
+ *    step is repeated until nothing changes.
+ */
+
+// Instructions removed so far (see --stats)
+static struct {
+    size_t unreachable; // In unreachable blocks
+    size_t dead;        // Results never used, branches never taken
+} DeadCodeStats;
+
+/**
+ * compareConstants - Evaluate the comparison of an IR_BRANCH.
+ */
+static bool compareConstants(int op, int64_t left, int64_t right) {
+    switch (op) {
+    case A_EQ:
+        return left == right;
+    case A_NE:
+        return left != right;
+    case A_LT:
+        return left < right;
+    case A_GT:
+        return left > right;
+    case A_LE:
+        return left <= right;
+    default: // A_GE
+        return left >= right;
+    }
+}
+
+/**
+ * foldConstantBranches - Turn the branches comparing literals into jumps
+ * or remove them.
+ *
+ * @param removed Flags indexed by instruction, set for removed branches
+ *
+ * @return true if a branch changed
+ */
+static bool foldConstantBranches(struct irFunction *f, bool *removed) {
+    // Literal held by each temporary (assigned once), if isLiteral says so
+    int64_t *literal = calloc(f->vregCount + 1, sizeof(int64_t));
+    bool *isLiteral = calloc(f->vregCount + 1, sizeof(bool));
+    bool changed = false;
+
+    if (literal == NULL || isLiteral == NULL) {
+        logFatal("Out of memory for dead code elimination");
+    }
+
+    for (int i = 0; i < f->count; i++) {
+        struct irInstruction *in = &f->code[i];
+        if (in->op == A_INTEGERLITERAL && in->dst >= f->variableCount) {
+            literal[in->dst] = in->value;
+            isLiteral[in->dst] = true;
+        }
+    }
+
+    for (int i = 0; i < f->count; i++) {
+        struct irInstruction *in = &f->code[i];
+        if (in->op != IR_BRANCH || !isLiteral[in->src1] ||
+            (in->src2 != IR_NOVREG && !isLiteral[in->src2])) {
+            continue;
+        }
+        if (compareConstants(in->type, literal[in->src1],
+                             in->src2 == IR_NOVREG ? 0 : literal[in->src2])) {
+            in->op = IR_JUMP;
+            in->type = P_NONE;
+            in->src1 = in->src2 = IR_NOVREG;
+        } else {
+            removed[i] = true;
+            DeadCodeStats.dead++;
+        }
+        changed = true;
+    }
+
+    free(literal);
+    free(isLiteral);
+    return changed;
+}
+
+/**
+ * markUnreachableBlocks - Mark the instructions of the blocks control
+ * cannot reach, except the exit label.
+ *
+ * @param removed Flags indexed by instruction
+ *
+ * @return The number of instructions marked
+ */
+static int markUnreachableBlocks(struct irFunction *f, bool *removed) {
+    bool *reached = calloc(f->blockCount + 1, sizeof(bool));
+    int *stack = malloc((f->blockCount + 1) * sizeof(int));
+    int depth = 0, count = 0;
+
+    if (reached == NULL || stack == NULL) {
+        logFatal("Out of memory for dead code elimination");
+    }
+
+    if (f->blockCount > 0) {
+        reached[0] = true;
+        stack[depth++] = 0;
+    }
+    while (depth > 0) {
+        struct irBlock *block = &f->blocks[stack[--depth]];
+        for (int s = 0; s < block->successorCount; s++) {
+            if (!reached[block->successors[s]]) {
+                reached[block->successors[s]] = true;
+                stack[depth++] = block->successors[s];
+            }
+        }
+    }
+
+    for (int b = 0; b < f->blockCount; b++) {
+        if (reached[b]) {
+            continue;
+        }
+        for (int i = f->blocks[b].first; i <= f->blocks[b].last; i++) {
+            if (i != f->count - 1) {
+                removed[i] = true;
+                count++;
+            }
+        }
+    }
+
+    free(reached);
+    free(stack);
+    return count;
+}
+
+/**
+ * markDeadInstructions - Mark the instructions whose result is not live
+ * after them, and drop the unused results of calls.
+ *
+ * @param removed Flags indexed by instruction
+ *
+ * @return The number of instructions marked
+ */
+static int markDeadInstructions(struct irFunction *f, bool *removed) {
+    int words = (f->vregCount + 63) / 64;
+    struct irLiveness *live = computeLiveness(f, words);
+    uint64_t *liveNow = calloc(words + 1, sizeof(uint64_t));
+    int count = 0;
+
+    if (liveNow == NULL) {
+        logFatal("Out of memory for dead code elimination");
+    }
+
+    for (int b = 0; b < f->blockCount; b++) {
+        struct irBlock *block = &f->blocks[b];
+        memcpy(liveNow, live[b].liveOut, words * sizeof(uint64_t));
+
+        for (int i = block->last; i >= block->first; i--) {
+            struct irInstruction *in = &f->code[i];
+            if (in->dst != IR_NOVREG && !testBit(liveNow, in->dst)) {
+                if (in->op != A_FUNCTIONCALL) {
+                    removed[i] = true;
+                    count++;
+                    continue;
+                }
+                in->dst = IR_NOVREG;
+            }
+            if (in->dst != IR_NOVREG) {
+                liveNow[in->dst / 64] &= ~(1ull << (in->dst % 64));
+            }
+            if (in->src1 != IR_NOVREG) {
+                setBit(liveNow, in->src1);
+            }
+            if (in->src2 != IR_NOVREG) {
+                setBit(liveNow, in->src2);
+            }
+        }
+    }
+
+    free(liveNow);
+    freeLiveness(live);
+    return count;
+}
+
+/**
+ * eliminateDeadCode - Remove the instructions of a function that cannot
+ * run or whose result is never used (see the NOTE above).
+ *
+ * @param f The function, with its basic blocks
+ */
+void eliminateDeadCode(struct irFunction *f) {
+    bool *removed = calloc(f->count + 1, sizeof(bool));
+    int count;
+
+    if (removed == NULL) {
+        logFatal("Out of memory for dead code elimination");
+    }
+
+    if (foldConstantBranches(f, removed)) {
+        removeInstructions(f, removed);
+        memset(removed, 0, (f->count + 1) * sizeof(bool));
+    }
+
+    count = markUnreachableBlocks(f, removed);
+    if (count > 0) {
+        DeadCodeStats.unreachable += count;
+        removeInstructions(f, removed);
+        memset(removed, 0, (f->count + 1) * sizeof(bool));
+    }
+
+    while ((count = markDeadInstructions(f, removed)) > 0) {
+        DeadCodeStats.dead += count;
+        removeInstructions(f, removed);
+        memset(removed, 0, (f->count + 1) * sizeof(bool));
+    }
+
+    free(removed);
+}
+
+/**
+ * printDeadCodeStats - Print dead code elimination statistics (--stats).
+ *
+ * @param stream Output stream
+ */
+void printDeadCodeStats(FILE *stream) {
+    fprintf(stream,
+            "Dead code elimination: %zu unreachable and %zu dead "
+            "instructions removed\n",
+            DeadCodeStats.unreachable, DeadCodeStats.dead);
+}
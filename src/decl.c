@@ -144,7 +144,7 @@ struct ASTnode *functionDeclaration(int type) {
         // Check that the last AST operation in the given
         // compound statement was a return statement
         finalStatementNode =
-            (treeNode->op == A_GLUE) ? treeNode->right : treeNode;
+            (treeNode->op == A_GLUE) ? astRight(treeNode) : treeNode;
         if (finalStatementNode == NULL || finalStatementNode->op != A_RETURN) {
             fprintf(stderr,
                     "Error: Non-void function '%s' missing return statement\n",
@@ -175,7 +175,7 @@ void globalDeclaration(void) {
         if (Token.token == T_LPARENTHESIS) {
             // parse the function declaration and generate the assembly code for
             // it
-            treeNode = functionDeclaration(type);
+            treeNode = optimizeAST(functionDeclaration(type));
             // NOTE: Optional) AST dump to stdout
             if (Option_dumpAST) {
                 if (Option_dumpASTCompacted) {
@@ -185,6 +185,9 @@ void globalDeclaration(void) {
                 }
             }
             codegenAST(treeNode, NOREG, NOREG);
+            // The function's locals and tree are not needed any more
+            freeLocalSymbols();
+            resetASTArena();
         } else {
             // Assume
             variableDeclaration(type, false);
@@ -4,8 +4,27 @@
 // Used in various source files
 
 #include <stdbool.h>
+#include <stddef.h>
+#include <stdint.h>
+#include <stdio.h>
 
 struct token;
+struct irFunction;
+struct irSSA;
+struct irLiveness;
+struct irLoop;
+struct peepholeFunction;
+struct peepholeLine;
+struct peepholeTarget;
+
+// NOTE: input.c
+bool inputOpen(const char *path);
+void inputClose(void);
+
+// NOTE: intern.c
+const char *internString(const char *s);
+const char *findInternedString(const char *s);
+uint32_t internPointerHash(const char *s);
 
 // NOTE: scan.c
 void rejectToken(struct token *t);
@@ -29,15 +48,81 @@ struct ASTnode *makeASTUnary(int op,               // AST operation code
                              struct ASTnode *left, // Left child
                              int intvalue // Integer value (for leaf nodes)
 );
+void resetASTArena(void);
+void printASTArenaStats(FILE *stream);
 
 // NOTE: treedump.c (AST dump)
 void dumpAST(struct ASTnode *n, int label, int level);
 void dumpASTTree(struct ASTnode *n);
 void dumpASTTreeCompacted(struct ASTnode *n);
+const char *astOpToString(int op);
+const char *primitiveTypeToString(int primitiveType);
+
+// NOTE: irdump.c (IR dump)
+void dumpIR(struct irFunction *f);
+
+// NOTE: optimize.c (AST optimization passes)
+struct ASTnode *optimizeAST(struct ASTnode *n);
+
+// NOTE: ir.c (three-address IR, see ir.h)
+struct irFunction *buildIR(struct ASTnode *n);
+void buildBasicBlocks(struct irFunction *f);
+int removeInstructions(struct irFunction *f, const bool *removed);
+int addVariables(struct irFunction *f, int count);
+void freeIR(struct irFunction *f);
+
+// NOTE: ssa.c (dominators, loops and SSA form of the IR)
+struct irSSA *buildSSA(struct irFunction *f);
+void freeSSA(struct irSSA *ssa);
+bool blockDominates(const struct irSSA *ssa, int a, int b);
+bool findInnermostLoop(struct irFunction *f, const struct irSSA *ssa,
+                       const int *done, int doneCount, struct irLoop *loop);
+int findPreheader(struct irFunction *f, const struct irSSA *ssa,
+                  const struct irLoop *loop);
+void freeLoop(struct irLoop *loop);
+
+// NOTE: gvn.c (global value numbering)
+void numberValues(struct irFunction *f);
+void printValueNumberingStats(FILE *stream);
+
+// NOTE: regalloc.c (liveness analysis and linear-scan allocation)
+struct irLiveness *computeLiveness(struct irFunction *f, int words);
+void freeLiveness(struct irLiveness *live);
+void allocateRegisters(struct irFunction *f);
+
+// NOTE: licm.c (loop-invariant code motion)
+void hoistLoopInvariants(struct irFunction *f);
+void printLoopInvariantStats(FILE *stream);
+
+// NOTE: ivsr.c (induction variable strength reduction)
+void reduceInductionVariables(struct irFunction *f);
+void printInductionVariableStats(FILE *stream);
+
+// NOTE: dce.c (dead code elimination)
+void eliminateDeadCode(struct irFunction *f);
+void printDeadCodeStats(FILE *stream);
+
+// NOTE: peephole.c (peephole optimization of the generated assembly, see
+// peephole.h)
+void beginPeepholeCapture(void);
+void optimizeCapturedCode(void);
+int peepholeParseLabel(const char *operand);
+bool peepholeParseImmediate(const char *operand, long long *value);
+int peepholeLabelLine(const struct peepholeFunction *p, int label);
+int peepholeNextInstruction(const struct peepholeFunction *p, int i);
+int peepholePreviousInstruction(const struct peepholeFunction *p, int i);
+void peepholeRewrite(struct peepholeLine *line, const char *mnemonic,
+                     const char *const *operands, int operandCount);
+void peepholeRemove(struct peepholeFunction *p, int i);
+bool peepholeRegisterDead(struct peepholeFunction *p, int i, int reg);
+bool peepholeJumpToNext(struct peepholeFunction *p, int i);
+bool peepholeJumpToJump(struct peepholeFunction *p, int i);
+void printPeepholeStats(FILE *stream);
 
 // NOTE: gen.c (target-agnostic code generation)
 int codegenAST(struct ASTnode *n, int reg, int parentASTop);
 int codegenGetLabelNumber(void);
+int codegenInvertComparison(int ASTop);
 void codegenPreamble();
 void codegenPostamble();
 void codegenResetRegisters();
@@ -47,6 +132,7 @@ int codegenGetPrimitiveTypeSize(int primitiveType);
 void codegenReturnFromFunction(int reg, int id);
 void codegenResetLocalOffset(void);
 int codegenGetLocalOffset(int type, bool isFunctionParameter);
+void printRegisterStats(FILE *stream);
 
 // NOTE: cgn/*/*.c
 // (cgn_expr.c, cgn_stmt.c, cgn_regs.c)
@@ -56,6 +142,9 @@ int codegenGetLocalOffset(int type, bool isFunctionParameter);
 void nasmDeclareDataSegment(void);
 void nasmDeclareTextSegment(void);
 void nasmResetRegisterPool(void);
+int nasmCountFreeRegisters(void);
+void nasmSpillRegister(int reg);
+int nasmReloadRegister(void);
 void nasmPreamble();
 void nasmPostamble();
 int nasmFunctionCall(int registerId, int id);
@@ -96,11 +185,34 @@ int nasmBitwiseXorRegs(int dstReg, int srcReg);
 int nasmToBoolean(int reg, int op, int label);
 void nasmResetLocalOffset(void);
 int nasmGetLocalOffset(int type, bool isFunctionParameter);
+void nasmMoveRegister(int dst, int src);
+void nasmLoadConstant(int dst, long long value);
+void nasmLoadVariable(int dst, int id);
+void nasmStoreVariable(int src, int id);
+void nasmLoadAddress(int dst, int id);
+void nasmLoadStringAddress(int dst, int label);
+void nasmLoadIndirect(int dst, int pointerReg, int pointerType);
+void nasmStoreIndirect(int src, int pointerReg, int primitiveType);
+void nasmLoadFrameSlot(int dst, int offset);
+void nasmStoreFrameSlot(int src, int offset);
+void nasmBinaryOperation(int ASTop, int dst, int src1, int src2);
+void nasmUnaryOperation(int ASTop, int dst, int src);
+void nasmShiftByConstant(int irOp, int dst, int src, int amount);
+void nasmMultiplyHighByConstant(int dst, int src, long long value);
+void nasmNarrowToType(int dst, int src, int primitiveType);
+void nasmBranchIfCompare(int ASTop, int src1, int src2, int label);
+void nasmCallFunction(int dst, int arg, int id);
+void nasmMoveReturnValue(int src, int id);
+bool nasmAssembleObject(const char *text, size_t length, const char *objPath);
+extern const struct peepholeTarget nasmPeephole;
 
 // aarch64 AArch64 backend
 void aarch64DeclareDataSegment(void);
 void aarch64DeclareTextSegment(void);
 void aarch64ResetRegisterPool(void);
+int aarch64CountFreeRegisters(void);
+void aarch64SpillRegister(int reg);
+int aarch64ReloadRegister(void);
 void aarch64Preamble(void);
 void aarch64Postamble(void);
 int aarch64FunctionCall(int registerId, int id);
@@ -108,6 +220,7 @@ void aarch64FunctionPreamble(int id);
 void aarch64ReturnFromFunction(int reg, int id);
 void aarch64FunctionPostamble(int id);
 int aarch64LoadImmediateInt(int value, int primitiveType);
+void aarch64MoveConstant(const char *reg, long long value);
 int aarch64LoadGlobalSymbol(int id, int op);
 int aarch64LoadLocalSymbol(int id, int op);
 int aarch64LoadGlobalString(int id);
@@ -142,6 +255,27 @@ int aarch64BitwiseOrRegs(int dstReg, int srcReg);
 int aarch64BitwiseXorRegs(int dstReg, int srcReg);
 void aarch64ResetLocalOffset(void);
 int aarch64GetLocalOffset(int type, bool isFunctionParameter);
+void aarch64MoveRegister(int dst, int src);
+void aarch64LoadConstant(int dst, long long value);
+void aarch64LoadVariable(int dst, int id);
+void aarch64StoreVariable(int src, int id);
+void aarch64LoadAddress(int dst, int id);
+void aarch64LoadStringAddress(int dst, int label);
+void aarch64LoadIndirect(int dst, int pointerReg, int pointerType);
+void aarch64StoreIndirect(int src, int pointerReg, int primitiveType);
+void aarch64LoadFrameSlot(int dst, int offset);
+void aarch64StoreFrameSlot(int src, int offset);
+void aarch64BinaryOperation(int ASTop, int dst, int src1, int src2);
+void aarch64UnaryOperation(int ASTop, int dst, int src);
+void aarch64ShiftByConstant(int irOp, int dst, int src, int amount);
+void aarch64MultiplyHighByConstant(int dst, int src, long long value);
+void aarch64NarrowToType(int dst, int src, int primitiveType);
+void aarch64BranchIfCompare(int ASTop, int src1, int src2, int label);
+void aarch64CallFunction(int dst, int arg, int id);
+void aarch64MoveReturnValue(int src, int id);
+bool aarch64AssembleObject(const char *text, size_t length,
+                           const char *objPath);
+extern const struct peepholeTarget aarch64Peephole;
 
 // NOTE: expr.c
 struct ASTnode *binexpr(int rbp);
@@ -163,14 +297,23 @@ void logFatals(char *s1, char *s2);
 void logFatald(char *s, int d);
 void logFatalc(char *s, int c);
 
+// NOTE: driver.c
+bool driverOpenOutput(const char *outfilePath);
+void driverFinishOutput(const char *outfilePath);
+
 // NOTE: symbol.c
 int findGlobalSymbol(char *s);
 int findLocalSymbol(char *s);
 int findSymbol(char *s);
+struct symbolTable *getSymbol(int id);
 int addGlobalSymbol(char *name, int primitiveType, int structuralType,
                     int endLabel, int size);
 int addLocalSymbol(char *name, int primitiveType, int structuralType,
                    int endlabel, int size);
+void freeLocalSymbols(void);
+int countLocalSymbols(void);
+int localSymbolPosition(int id);
+int localSymbolId(int position);
 
 // NOTE: decl.c
 int parsePrimitiveType(void);
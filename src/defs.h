@@ -9,6 +9,7 @@
  */
 #include <ctype.h>
 #include <stdbool.h>
+#include <stdint.h>
 #include <stdio.h>
 #include <stdlib.h>
 #include <string.h>
@@ -19,13 +20,16 @@ enum {
     TARGET_AARCH64 = 2, // AArch64 (ARM64) GNU as-style assembly
 };
 
+// Output kinds (--emit)
+enum {
+    EMIT_ASM = 1, // Assembly text (default)
+    EMIT_OBJ = 2, // ELF relocatable object, from the built-in assembler
+    EMIT_EXE = 3, // Executable, assembled and linked by the driver
+};
+
 // Length of symbols in input
 #define TEXTLEN 512
 
-// Number of symbol table entries
-// = maximum number of unique symbols in input
-#define NSYMBOLS 1024
-
 // Token types
 enum {
     // Single-character tokens
@@ -157,15 +161,39 @@ enum {
     P_LONGPTR, // pointer to long
 };
 
+/**
+ * NOTE:
+ * AST node layout.
+ * By default nodes are compact (24 bytes): they live in one contiguous
+ * array per function (see tree.c), children are 32-bit indices into that
+ * array (0: no child) and op/primitiveType are 16-bit fields.
+ * Building with -DKECCC_POINTER_AST selects the former layout with 64-bit
+ * child pointers (48 bytes), e.g. to compare both (benchmarks/bench_ast.py).
+ * Either way, read children through astLeft()/astMiddle()/astRight().
+ */
+#ifdef KECCC_POINTER_AST
+typedef struct ASTnode *ASTchildRef;
+#else
+typedef uint32_t ASTchildRef;
+#endif
+
 // AST node structure
 struct ASTnode {
-    int op;                 // operation to be performed on this tree
+#ifdef KECCC_POINTER_AST
+    int op;            // operation to be performed on this tree
+                       // (e.g., A_ADD, A_INTEGERLITERAL)
+    int primitiveType; // primitive type (e.g., P_INT, P_CHAR)
+#else
+    uint16_t op;            // operation to be performed on this tree
                             // (e.g., A_ADD, A_INTEGERLITERAL)
-    int primitiveType;      // primitive type (e.g., P_INT, P_CHAR)
-    bool isRvalue;          // is this node an r-value?
-    struct ASTnode *left;   // left subtree
-    struct ASTnode *middle; // middle subtree (for if-else statements)
-    struct ASTnode *right;  // right subtree
+    uint16_t primitiveType; // primitive type (e.g., P_INT, P_CHAR)
+#endif
+    bool isRvalue;        // is this node an r-value?
+    uint8_t registerNeed; // registers needed to evaluate the tree
+                          // (Sethi-Ullman number, see gen.c)
+    ASTchildRef left;     // left subtree
+    ASTchildRef middle;   // middle subtree (for if-else statements)
+    ASTchildRef right;    // right subtree
 
     /**
      * NOTE:
@@ -181,6 +209,32 @@ struct ASTnode {
     } v;
 };
 
+#ifdef KECCC_POINTER_AST
+static inline struct ASTnode *astNodeAt(ASTchildRef ref) { return ref; }
+static inline ASTchildRef astRefOf(struct ASTnode *n) { return n; }
+#else
+// Node array of the current function (see tree.c); slot 0 is unused
+extern struct ASTnode *ASTnodes;
+
+static inline struct ASTnode *astNodeAt(ASTchildRef ref) {
+    return ref ? ASTnodes + ref : NULL;
+}
+static inline ASTchildRef astRefOf(struct ASTnode *n) {
+    return n ? (ASTchildRef)(n - ASTnodes) : 0;
+}
+#endif
+
+// Children of an AST node (NULL if absent)
+static inline struct ASTnode *astLeft(struct ASTnode *n) {
+    return astNodeAt(n->left);
+}
+static inline struct ASTnode *astMiddle(struct ASTnode *n) {
+    return astNodeAt(n->middle);
+}
+static inline struct ASTnode *astRight(struct ASTnode *n) {
+    return astNodeAt(n->right);
+}
+
 // NOTE:
 // Use NOREG when AST generation;
 // functions have no register to return
@@ -206,7 +260,7 @@ enum {
 
 // Symbol table structure
 struct symbolTable {
-    char *name;         // Name of a symbol
+    const char *name;   // Name of a symbol (interned, see intern.c)
     int primitiveType;  // Primitive type for the symbol (e.g., P_INT)
     int structuralType; // Structural type (e.g., S_VARIABLE)
     int class;          // Storage class for the symbol
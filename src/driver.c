@@ -0,0 +1,268 @@
+// src/driver.c
+
+// Integrated driver (--emit obj/exe): assemble the generated code and link it
+// against the runtime archive (libkecrt-<arch>.a) without any shell glue.
+
+#include "cgn/cg_ops.h"
+#include "data.h"
+#include "decl.h"
+#include "emit.h"
+
+#include <errno.h>
+#include <limits.h>
+#include <spawn.h>
+#include <sys/stat.h>
+#include <sys/wait.h>
+#include <unistd.h>
+
+extern char **environ;
+
+// Directory the runtime archives are built into (set by src/meson.build)
+#ifndef KECCC_BUILD_RUNTIME_DIR
+#define KECCC_BUILD_RUNTIME_DIR ""
+#endif
+// Directory the runtime archives are installed into (set by src/meson.build)
+#ifndef KECCC_INSTALL_RUNTIME_DIR
+#define KECCC_INSTALL_RUNTIME_DIR ""
+#endif
+
+// Private directory holding the intermediates of this compilation
+static char TempDir[PATH_MAX - 16]; // leaves room for "/out.asm"
+static char TempAsmPath[PATH_MAX];
+static char TempObjPath[PATH_MAX];
+
+/**
+ * removeTempFiles - Remove the intermediates and their directory.
+ * Registered with atexit(), so a fatal compile error cleans up as well.
+ */
+static void removeTempFiles(void) {
+    if (TempObjPath[0] != '\0')
+        unlink(TempObjPath);
+    if (TempAsmPath[0] != '\0')
+        unlink(TempAsmPath);
+    if (TempDir[0] != '\0')
+        rmdir(TempDir);
+}
+
+/**
+ * isWritableDirectory - Check whether a path is a directory we can write to.
+ *
+ * @param path The path to check (may be NULL).
+ *
+ * @return true if path is a writable directory.
+ */
+static bool isWritableDirectory(const char *path) {
+    struct stat st;
+
+    if (path == NULL || path[0] == '\0')
+        return false;
+    if (stat(path, &st) != 0 || !S_ISDIR(st.st_mode))
+        return false;
+    return access(path, W_OK | X_OK) == 0;
+}
+
+/**
+ * createTempDir - Create a private temporary directory for the
+ * intermediates of this compilation.
+ *
+ * NOTE:
+ * The directory is created on tmpfs (/dev/shm) when available, so the
+ * intermediates never touch the disk or the current working directory.
+ * Otherwise $TMPDIR or /tmp is used.
+ */
+static void createTempDir(void) {
+    const char *bases[] = {"/dev/shm", getenv("TMPDIR"), "/tmp"};
+    const char *base = NULL;
+
+    for (size_t i = 0; i < sizeof(bases) / sizeof(bases[0]); i++) {
+        if (isWritableDirectory(bases[i])) {
+            base = bases[i];
+            break;
+        }
+    }
+    if (base == NULL) {
+        fprintf(stderr, "No writable temporary directory found\n");
+        exit(1);
+    }
+
+    snprintf(TempDir, sizeof(TempDir), "%s/keccc-XXXXXX", base);
+    if (mkdtemp(TempDir) == NULL) {
+        fprintf(stderr, "Cannot create temporary directory in %s: %s\n", base,
+                strerror(errno));
+        exit(1);
+    }
+    atexit(removeTempFiles);
+
+    snprintf(TempAsmPath, sizeof(TempAsmPath), "%s/out.%s", TempDir,
+             CurrentTarget == TARGET_NASM ? "asm" : "s");
+    snprintf(TempObjPath, sizeof(TempObjPath), "%s/out.o", TempDir);
+}
+
+/**
+ * findRuntimeArchive - Locate the runtime archive for the current target.
+ *
+ * NOTE:
+ * Searched in order: --runtime-dir, $KECCC_RUNTIME_DIR, the build tree
+ * keccc was compiled in, and the install directory.
+ *
+ * @param out Buffer receiving the archive path.
+ * @param outSize Size of the buffer.
+ *
+ * @return true if the archive was found.
+ */
+static bool findRuntimeArchive(char *out, size_t outSize) {
+    const char *archive = CurrentTarget == TARGET_NASM ? "libkecrt-x86_64.a"
+                                                       : "libkecrt-aarch64.a";
+    const char *dirs[] = {
+        Option_runtimeDir,
+        getenv("KECCC_RUNTIME_DIR"),
+        KECCC_BUILD_RUNTIME_DIR,
+        KECCC_INSTALL_RUNTIME_DIR,
+    };
+
+    for (size_t i = 0; i < sizeof(dirs) / sizeof(dirs[0]); i++) {
+        if (dirs[i] == NULL || dirs[i][0] == '\0')
+            continue;
+        snprintf(out, outSize, "%s/%s", dirs[i], archive);
+        if (access(out, R_OK) == 0)
+            return true;
+    }
+    return false;
+}
+
+/**
+ * runTool - Run an external tool (searched in PATH) and wait for it.
+ * Exits if the tool cannot be started or does not succeed.
+ *
+ * @param argv NULL-terminated argument vector; argv[0] is the tool name.
+ */
+static void runTool(char *const argv[]) {
+    pid_t pid;
+    int status;
+    int err = posix_spawnp(&pid, argv[0], NULL, NULL, argv, environ);
+
+    if (err != 0) {
+        fprintf(stderr, "Cannot run %s: %s\n", argv[0], strerror(err));
+        exit(1);
+    }
+    while (waitpid(pid, &status, 0) < 0) {
+        if (errno != EINTR) {
+            fprintf(stderr, "waitpid(%s): %s\n", argv[0], strerror(errno));
+            exit(1);
+        }
+    }
+    if (!WIFEXITED(status) || WEXITSTATUS(status) != 0) {
+        fprintf(stderr, "%s failed\n", argv[0]);
+        exit(1);
+    }
+}
+
+/**
+ * assembleExternally - Run the target's assembler on the generated text.
+ *
+ * @param asmPath Path of the assembly written by the code generator.
+ * @param objPath Path of the object file to produce.
+ */
+static void assembleExternally(const char *asmPath, const char *objPath) {
+    if (CurrentTarget == TARGET_NASM) {
+        char *assemble[] = {"nasm", "-felf64",       (char *)asmPath,
+                            "-o",   (char *)objPath, NULL};
+        runTool(assemble);
+    } else {
+        char *assemble[] = {"aarch64-linux-gnu-as", (char *)asmPath, "-o",
+                            (char *)objPath, NULL};
+        runTool(assemble);
+    }
+}
+
+/**
+ * linkExecutable - Link an object file with the runtime archive into an
+ * executable.
+ *
+ * NOTE:
+ * Nothing in a program references _start, so it is forced out of the
+ * archive with -u; ld pulls in the other runtime objects on demand.
+ *
+ * @param objPath Path of the program's object file.
+ * @param exePath Path of the executable to produce.
+ */
+static void linkExecutable(const char *objPath, const char *exePath) {
+    char runtimeArchive[PATH_MAX];
+
+    if (!findRuntimeArchive(runtimeArchive, sizeof(runtimeArchive))) {
+        fprintf(stderr,
+                "Cannot find the %s runtime archive; "
+                "pass --runtime-dir or set KECCC_RUNTIME_DIR\n",
+                CurrentTarget == TARGET_NASM ? "x86_64" : "aarch64");
+        exit(1);
+    }
+
+    char *linker = CurrentTarget == TARGET_NASM ? "ld" : "aarch64-linux-gnu-ld";
+    char *command[] = {linker, "-o",     (char *)exePath, (char *)objPath,
+                       "-u",   "_start", runtimeArchive,  NULL};
+    runTool(command);
+}
+
+/**
+ * driverOpenOutput - Open the output the code generator emits into.
+ *
+ * NOTE:
+ * For --emit asm the emitter writes to the output file itself. When an
+ * object is needed and the backend has a built-in assembler, the emitter
+ * keeps the text in memory. Otherwise (--emit exe with an external
+ * assembler) it goes to a file in a private temporary directory.
+ * Outfile is NULL while the text stays in memory.
+ *
+ * @param outfilePath Path of the final output.
+ *
+ * @return false (with errno set) if the output file cannot be opened.
+ */
+bool driverOpenOutput(const char *outfilePath) {
+    Outfile = NULL;
+
+    if (Option_emit == EMIT_ASM) {
+        Outfile = fopen(outfilePath, "w");
+    } else {
+        if (Option_emit == EMIT_OBJ && CG->assembleObject == NULL) {
+            fprintf(stderr, "--emit obj is not supported for this target\n");
+            exit(1);
+        }
+        if (Option_emit == EMIT_EXE)
+            createTempDir();
+        if (CG->assembleObject == NULL)
+            Outfile = fopen(TempAsmPath, "w");
+    }
+
+    bool inMemory = Option_emit != EMIT_ASM && CG->assembleObject != NULL;
+    if (Outfile == NULL && !inMemory)
+        return false;
+
+    emitOpen(Outfile, CG->immediatePrefix);
+    return true;
+}
+
+/**
+ * driverFinishOutput - Turn the generated text into the requested output,
+ * once the emitter has been closed.
+ *
+ * @param outfilePath Path of the final output.
+ */
+void driverFinishOutput(const char *outfilePath) {
+    if (Option_emit == EMIT_ASM)
+        return;
+
+    const char *objPath = Option_emit == EMIT_OBJ ? outfilePath : TempObjPath;
+    if (CG->assembleObject != NULL) {
+        size_t length;
+        const char *text = emitBufferedText(&length);
+        bool ok = CG->assembleObject(text, length, objPath);
+        emitFreeBuffer();
+        if (!ok)
+            exit(1);
+    } else {
+        assembleExternally(TempAsmPath, objPath);
+    }
+
+    if (Option_emit == EMIT_EXE)
+        linkExecutable(objPath, outfilePath);
+}
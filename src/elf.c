@@ -0,0 +1,589 @@
+// src/elf.c
+
+#include "elf.h"
+
+#include <errno.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+
+/**
+ * NOTE:
+ * ELF64 relocatable object writer (little-endian only, which covers both
+ * x86_64 and AArch64 Linux).
+ *
+ * Symbols that are not global are resolved by the assemblers or turned into
+ * relocations against their section symbol here, so the symbol table only
+ * carries section symbols, global definitions and undefined references.
+ */
+
+// Symbol bindings and types (st_info)
+#define STB_LOCAL 0
+#define STB_GLOBAL 1
+#define STT_NOTYPE 0
+#define STT_SECTION 3
+
+// Section types (sh_type) used internally
+#define SHT_SYMTAB 2
+#define SHT_STRTAB 3
+#define SHT_RELA 4
+#define SHF_INFO_LINK 0x40
+
+#define ELF_HEADER_SIZE 64
+#define SECTION_HEADER_SIZE 64
+#define SYMBOL_SIZE 24
+#define RELA_SIZE 24
+
+/**
+ * xrealloc - realloc() that exits on failure.
+ */
+static void *xrealloc(void *p, size_t size) {
+    p = realloc(p, size);
+    if (p == NULL) {
+        fprintf(stderr, "Error: out of memory in ELF writer\n");
+        exit(1);
+    }
+    return p;
+}
+
+/**
+ * xstrndup - strndup() that exits on failure.
+ */
+static char *xstrndup(const char *s, size_t length) {
+    char *copy = xrealloc(NULL, length + 1);
+    memcpy(copy, s, length);
+    copy[length] = '\0';
+    return copy;
+}
+
+/**
+ * hashName - FNV-1a hash of a symbol name.
+ */
+static uint32_t hashName(const char *s, size_t length) {
+    uint32_t h = 2166136261u;
+    for (size_t i = 0; i < length; i++) {
+        h = (h ^ (unsigned char)s[i]) * 16777619u;
+    }
+    return h;
+}
+
+/**
+ * elfInitObject - Initialize an empty object file.
+ *
+ * @param obj The object to initialize.
+ * @param machine ELF_MACHINE_* of the generated code.
+ */
+void elfInitObject(struct elfObject *obj, int machine) {
+    memset(obj, 0, sizeof(*obj));
+    obj->machine = machine;
+    obj->symbolHashSize = 256;
+    obj->symbolHash = xrealloc(NULL, obj->symbolHashSize * sizeof(int));
+    for (int i = 0; i < obj->symbolHashSize; i++) {
+        obj->symbolHash[i] = -1;
+    }
+}
+
+/**
+ * elfFreeObject - Release everything owned by an object.
+ *
+ * @param obj The object to release.
+ */
+void elfFreeObject(struct elfObject *obj) {
+    for (int i = 0; i < obj->sectionCount; i++) {
+        free(obj->sections[i].name);
+        free(obj->sections[i].data);
+        free(obj->sections[i].relocations);
+    }
+    for (int i = 0; i < obj->symbolCount; i++) {
+        free(obj->symbols[i].name);
+    }
+    free(obj->sections);
+    free(obj->symbols);
+    free(obj->symbolHash);
+    memset(obj, 0, sizeof(*obj));
+}
+
+/**
+ * elfSection - Find a section by name, creating it on first use.
+ * Type, flags and alignment of the well-known sections follow NASM's
+ * defaults; anything else becomes read-only data.
+ *
+ * @param obj The object.
+ * @param name Section name (e.g. ".text").
+ *
+ * @return Index of the section.
+ */
+int elfSection(struct elfObject *obj, const char *name) {
+    for (int i = 0; i < obj->sectionCount; i++) {
+        if (strcmp(obj->sections[i].name, name) == 0)
+            return i;
+    }
+
+    if (obj->sectionCount == obj->sectionCapacity) {
+        obj->sectionCapacity = obj->sectionCapacity ? obj->sectionCapacity * 2
+                                                    : 4;
+        obj->sections = xrealloc(obj->sections, obj->sectionCapacity *
+                                                    sizeof(struct elfSection));
+    }
+
+    struct elfSection *s = &obj->sections[obj->sectionCount];
+    memset(s, 0, sizeof(*s));
+    s->name = xstrndup(name, strlen(name));
+    s->type = ELF_SECTION_PROGBITS;
+    s->flags = ELF_FLAG_ALLOC;
+    s->align = 4;
+
+    if (strcmp(name, ".text") == 0) {
+        s->flags = ELF_FLAG_ALLOC | ELF_FLAG_EXEC;
+        s->align = 16;
+    } else if (strcmp(name, ".data") == 0) {
+        s->flags = ELF_FLAG_ALLOC | ELF_FLAG_WRITE;
+    } else if (strcmp(name, ".bss") == 0) {
+        s->type = ELF_SECTION_NOBITS;
+        s->flags = ELF_FLAG_ALLOC | ELF_FLAG_WRITE;
+    }
+
+    return obj->sectionCount++;
+}
+
+/**
+ * elfAppend - Append bytes to a section.
+ * Appending to a NOBITS section only grows it (the bytes must be zero).
+ *
+ * @param obj The object.
+ * @param section Index of the section.
+ * @param bytes The bytes to append.
+ * @param length Number of bytes.
+ */
+void elfAppend(struct elfObject *obj, int section, const void *bytes,
+               size_t length) {
+    struct elfSection *s = &obj->sections[section];
+
+    if (s->type == ELF_SECTION_NOBITS) {
+        s->size += length;
+        return;
+    }
+
+    if (s->size + length > s->capacity) {
+        uint64_t capacity = s->capacity ? s->capacity : 256;
+        while (capacity < s->size + length) {
+            capacity *= 2;
+        }
+        s->data = xrealloc(s->data, capacity);
+        s->capacity = capacity;
+    }
+    memcpy(s->data + s->size, bytes, length);
+    s->size += length;
+}
+
+/**
+ * elfReserve - Append zero bytes to a section (NASM's resb & co.).
+ *
+ * @param obj The object.
+ * @param section Index of the section.
+ * @param length Number of bytes.
+ */
+void elfReserve(struct elfObject *obj, int section, uint64_t length) {
+    static const unsigned char zeros[64];
+
+    if (obj->sections[section].type == ELF_SECTION_NOBITS) {
+        obj->sections[section].size += length;
+        return;
+    }
+    while (length > 0) {
+        size_t chunk = length < sizeof(zeros) ? length : sizeof(zeros);
+        elfAppend(obj, section, zeros, chunk);
+        length -= chunk;
+    }
+}
+
+/**
+ * elfAlign - Pad a section up to a multiple of align, and raise the
+ * section's own alignment to match.
+ *
+ * @param obj The object.
+ * @param section Index of the section.
+ * @param align Alignment in bytes (a power of two).
+ * @param fill Padding byte (e.g. NOP for code).
+ */
+void elfAlign(struct elfObject *obj, int section, uint64_t align,
+              unsigned char fill) {
+    struct elfSection *s = &obj->sections[section];
+
+    if (align <= 1)
+        return;
+    if (align > s->align)
+        s->align = align;
+    while (s->size % align != 0) {
+        if (s->type == ELF_SECTION_NOBITS) {
+            s->size++;
+        } else {
+            elfAppend(obj, section, &fill, 1);
+        }
+    }
+}
+
+/**
+ * elfSymbol - Find a symbol by name, creating an undefined one on first use.
+ *
+ * @param obj The object.
+ * @param name Symbol name (not necessarily NUL-terminated).
+ * @param length Length of the name.
+ *
+ * @return Index of the symbol.
+ */
+int elfSymbol(struct elfObject *obj, const char *name, size_t length) {
+    uint32_t mask = obj->symbolHashSize - 1;
+    uint32_t slot = hashName(name, length) & mask;
+
+    while (obj->symbolHash[slot] != -1) {
+        struct elfSymbol *sym = &obj->symbols[obj->symbolHash[slot]];
+        if (strncmp(sym->name, name, length) == 0 && sym->name[length] == '\0')
+            return obj->symbolHash[slot];
+        slot = (slot + 1) & mask;
+    }
+
+    if (obj->symbolCount == obj->symbolCapacity) {
+        obj->symbolCapacity = obj->symbolCapacity ? obj->symbolCapacity * 2
+                                                  : 64;
+        obj->symbols = xrealloc(obj->symbols, obj->symbolCapacity *
+                                                  sizeof(struct elfSymbol));
+    }
+
+    int index = obj->symbolCount++;
+    obj->symbols[index] = (struct elfSymbol){
+        .name = xstrndup(name, length),
+        .section = -1,
+        .value = 0,
+        .isGlobal = false,
+    };
+    obj->symbolHash[slot] = index;
+
+    // Keep the table at most half full
+    if (obj->symbolCount * 2 > obj->symbolHashSize) {
+        int newSize = obj->symbolHashSize * 2;
+        int *newHash = xrealloc(NULL, newSize * sizeof(int));
+        for (int i = 0; i < newSize; i++) {
+            newHash[i] = -1;
+        }
+        for (int i = 0; i < obj->symbolCount; i++) {
+            const char *n = obj->symbols[i].name;
+            uint32_t s = hashName(n, strlen(n)) & (newSize - 1);
+            while (newHash[s] != -1) {
+                s = (s + 1) & (newSize - 1);
+            }
+            newHash[s] = i;
+        }
+        free(obj->symbolHash);
+        obj->symbolHash = newHash;
+        obj->symbolHashSize = newSize;
+    }
+
+    return index;
+}
+
+/**
+ * elfDefineSymbol - Define a symbol at an offset within a section.
+ * Exits if the symbol was already defined.
+ *
+ * @param obj The object.
+ * @param symbol Index of the symbol.
+ * @param section Index of the section.
+ * @param value Offset within the section.
+ */
+void elfDefineSymbol(struct elfObject *obj, int symbol, int section,
+                     uint64_t value) {
+    struct elfSymbol *sym = &obj->symbols[symbol];
+
+    if (sym->section != -1) {
+        fprintf(stderr, "Error: symbol %s is defined more than once\n",
+                sym->name);
+        exit(1);
+    }
+    sym->section = section;
+    sym->value = value;
+}
+
+/**
+ * elfAddRelocation - Record a relocation for the linker.
+ *
+ * @param obj The object.
+ * @param section Index of the section containing the patched field.
+ * @param offset Offset of the patched field within the section.
+ * @param symbol Index of the referenced symbol.
+ * @param type R_* relocation type.
+ * @param addend Constant added to the symbol's address.
+ */
+void elfAddRelocation(struct elfObject *obj, int section, uint64_t offset,
+                      int symbol, uint32_t type, int64_t addend) {
+    struct elfSection *s = &obj->sections[section];
+
+    if (s->relocationCount == s->relocationCapacity) {
+        s->relocationCapacity =
+            s->relocationCapacity ? s->relocationCapacity * 2 : 64;
+        s->relocations =
+            xrealloc(s->relocations,
+                     s->relocationCapacity * sizeof(struct elfRelocation));
+    }
+    s->relocations[s->relocationCount++] = (struct elfRelocation){
+        .offset = offset,
+        .symbol = symbol,
+        .type = type,
+        .addend = addend,
+    };
+}
+
+/**
+ * NOTE:
+ * Output buffer with little-endian store helpers
+ */
+struct outputBuffer {
+    unsigned char *data;
+    size_t size;
+    size_t capacity;
+};
+
+static void put(struct outputBuffer *b, const void *bytes, size_t length) {
+    if (b->size + length > b->capacity) {
+        size_t capacity = b->capacity ? b->capacity : 4096;
+        while (capacity < b->size + length) {
+            capacity *= 2;
+        }
+        b->data = xrealloc(b->data, capacity);
+        b->capacity = capacity;
+    }
+    memcpy(b->data + b->size, bytes, length);
+    b->size += length;
+}
+
+static void putLE(struct outputBuffer *b, uint64_t value, int bytes) {
+    unsigned char le[8];
+    for (int i = 0; i < bytes; i++) {
+        le[i] = (unsigned char)(value >> (8 * i));
+    }
+    put(b, le, bytes);
+}
+
+static void padTo(struct outputBuffer *b, size_t align) {
+    static const unsigned char zero;
+    while (b->size % align != 0) {
+        put(b, &zero, 1);
+    }
+}
+
+static void putSectionHeader(struct outputBuffer *b, uint32_t name,
+                             uint32_t type, uint64_t flags, uint64_t offset,
+                             uint64_t size, uint32_t link, uint32_t info,
+                             uint64_t align, uint64_t entrySize) {
+    putLE(b, name, 4);
+    putLE(b, type, 4);
+    putLE(b, flags, 8);
+    putLE(b, 0, 8); // sh_addr
+    putLE(b, offset, 8);
+    putLE(b, size, 8);
+    putLE(b, link, 4);
+    putLE(b, info, 4);
+    putLE(b, align, 8);
+    putLE(b, entrySize, 8);
+}
+
+/**
+ * elfWriteObject - Lay out and write the object file.
+ *
+ * NOTE:
+ * Layout: ELF header, section contents, .rela.* tables, .symtab, .strtab,
+ * .shstrtab, then the section header table. Symbol table order is the null
+ * symbol, one section symbol per section, then the global and undefined
+ * symbols (ELF requires all locals to come first).
+ *
+ * @param obj The object to write.
+ * @param path Output file path.
+ *
+ * @return true on success.
+ */
+bool elfWriteObject(struct elfObject *obj, const char *path) {
+    struct outputBuffer out = {0};
+    struct outputBuffer strtab = {0};
+    struct outputBuffer shstrtab = {0};
+    int n = obj->sectionCount;
+
+    // Symbol table indices: section symbols take 1..n
+    int *symtabIndex = xrealloc(NULL, (obj->symbolCount + 1) * sizeof(int));
+    int firstGlobal = 1 + n;
+    int symtabCount = firstGlobal;
+    put(&strtab, "", 1);
+    for (int i = 0; i < obj->symbolCount; i++) {
+        struct elfSymbol *sym = &obj->symbols[i];
+        if (sym->isGlobal || sym->section == -1) {
+            symtabIndex[i] = symtabCount++;
+        } else {
+            symtabIndex[i] = -1;
+        }
+    }
+
+    // Header placeholder, patched once the section header offset is known
+    out.size = 0;
+    put(&out, (unsigned char[ELF_HEADER_SIZE]){0}, ELF_HEADER_SIZE);
+
+    // Section contents
+    uint64_t *sectionOffset = xrealloc(NULL, (n + 1) * sizeof(uint64_t));
+    for (int i = 0; i < n; i++) {
+        struct elfSection *s = &obj->sections[i];
+        padTo(&out, s->align ? s->align : 1);
+        sectionOffset[i] = out.size;
+        if (s->type != ELF_SECTION_NOBITS && s->size > 0)
+            put(&out, s->data, s->size);
+    }
+
+    // Relocation tables
+    uint64_t *relaOffset = xrealloc(NULL, (n + 1) * sizeof(uint64_t));
+    int relaCount = 0;
+    for (int i = 0; i < n; i++) {
+        struct elfSection *s = &obj->sections[i];
+        if (s->relocationCount == 0)
+            continue;
+        relaCount++;
+        padTo(&out, 8);
+        relaOffset[i] = out.size;
+        for (int r = 0; r < s->relocationCount; r++) {
+            struct elfRelocation *rel = &s->relocations[r];
+            struct elfSymbol *sym = &obj->symbols[rel->symbol];
+            int index = symtabIndex[rel->symbol];
+            int64_t addend = rel->addend;
+            if (index == -1) {
+                // Local symbol: relocate against its section instead
+                index = 1 + sym->section;
+                addend += (int64_t)sym->value;
+            }
+            putLE(&out, rel->offset, 8);
+            putLE(&out, ((uint64_t)index << 32) | rel->type, 8);
+            putLE(&out, (uint64_t)addend, 8);
+        }
+    }
+
+    // Symbol table
+    padTo(&out, 8);
+    uint64_t symtabOffset = out.size;
+    put(&out, (unsigned char[SYMBOL_SIZE]){0}, SYMBOL_SIZE);
+    for (int i = 0; i < n; i++) {
+        putLE(&out, 0, 4);                 // st_name
+        putLE(&out, STT_SECTION, 1);       // st_info (STB_LOCAL)
+        putLE(&out, 0, 1);                 // st_other
+        putLE(&out, 1 + i, 2);             // st_shndx
+        putLE(&out, 0, 8);                 // st_value
+        putLE(&out, 0, 8);                 // st_size
+    }
+    for (int i = 0; i < obj->symbolCount; i++) {
+        struct elfSymbol *sym = &obj->symbols[i];
+        if (symtabIndex[i] == -1)
+            continue;
+        putLE(&out, strtab.size, 4);
+        put(&strtab, sym->name, strlen(sym->name) + 1);
+        putLE(&out, (STB_GLOBAL << 4) | STT_NOTYPE, 1);
+        putLE(&out, 0, 1);
+        putLE(&out, sym->section == -1 ? 0 : 1 + sym->section, 2);
+        putLE(&out, sym->section == -1 ? 0 : sym->value, 8);
+        putLE(&out, 0, 8);
+    }
+
+    // String tables
+    uint64_t strtabOffset = out.size;
+    put(&out, strtab.data, strtab.size);
+
+    put(&shstrtab, "", 1);
+    uint32_t *sectionName = xrealloc(NULL, (n + 1) * sizeof(uint32_t));
+    uint32_t *relaName = xrealloc(NULL, (n + 1) * sizeof(uint32_t));
+    for (int i = 0; i < n; i++) {
+        struct elfSection *s = &obj->sections[i];
+        if (s->relocationCount > 0) {
+            // ".rela.text" also provides ".text" as its suffix
+            relaName[i] = shstrtab.size;
+            put(&shstrtab, ".rela", 5);
+            sectionName[i] = shstrtab.size;
+            put(&shstrtab, s->name, strlen(s->name) + 1);
+        } else {
+            sectionName[i] = shstrtab.size;
+            put(&shstrtab, s->name, strlen(s->name) + 1);
+        }
+    }
+    uint32_t symtabName = shstrtab.size;
+    put(&shstrtab, ".symtab", 8);
+    uint32_t strtabName = shstrtab.size;
+    put(&shstrtab, ".strtab", 8);
+    uint32_t shstrtabName = shstrtab.size;
+    put(&shstrtab, ".shstrtab", 10);
+    uint64_t shstrtabOffset = out.size;
+    put(&out, shstrtab.data, shstrtab.size);
+
+    // Section header table
+    int symtabSection = 1 + n + relaCount;
+    int sectionCount = symtabSection + 3;
+    padTo(&out, 8);
+    uint64_t sectionHeaderOffset = out.size;
+    put(&out, (unsigned char[SECTION_HEADER_SIZE]){0}, SECTION_HEADER_SIZE);
+    for (int i = 0; i < n; i++) {
+        struct elfSection *s = &obj->sections[i];
+        putSectionHeader(&out, sectionName[i], s->type, s->flags,
+                         sectionOffset[i], s->size, 0, 0, s->align, 0);
+    }
+    for (int i = 0; i < n; i++) {
+        struct elfSection *s = &obj->sections[i];
+        if (s->relocationCount == 0)
+            continue;
+        putSectionHeader(&out, relaName[i], SHT_RELA, SHF_INFO_LINK,
+                         relaOffset[i], (uint64_t)s->relocationCount * RELA_SIZE,
+                         symtabSection, 1 + i, 8, RELA_SIZE);
+    }
+    putSectionHeader(&out, symtabName, SHT_SYMTAB, 0, symtabOffset,
+                     (uint64_t)symtabCount * SYMBOL_SIZE, symtabSection + 1,
+                     firstGlobal, 8, SYMBOL_SIZE);
+    putSectionHeader(&out, strtabName, SHT_STRTAB, 0, strtabOffset,
+                     strtab.size, 0, 0, 1, 0);
+    putSectionHeader(&out, shstrtabName, SHT_STRTAB, 0, shstrtabOffset,
+                     shstrtab.size, 0, 0, 1, 0);
+
+    // ELF header
+    struct outputBuffer header = {0};
+    put(&header, "\x7f" "ELF", 4);
+    putLE(&header, 2, 1); // ELFCLASS64
+    putLE(&header, 1, 1); // ELFDATA2LSB
+    putLE(&header, 1, 1); // EV_CURRENT
+    putLE(&header, 0, 1); // ELFOSABI_NONE
+    putLE(&header, 0, 8); // EI_ABIVERSION + padding
+    putLE(&header, 1, 2); // ET_REL
+    putLE(&header, obj->machine, 2);
+    putLE(&header, 1, 4); // EV_CURRENT
+    putLE(&header, 0, 8); // e_entry
+    putLE(&header, 0, 8); // e_phoff
+    putLE(&header, sectionHeaderOffset, 8);
+    putLE(&header, 0, 4); // e_flags
+    putLE(&header, ELF_HEADER_SIZE, 2);
+    putLE(&header, 0, 2); // e_phentsize
+    putLE(&header, 0, 2); // e_phnum
+    putLE(&header, SECTION_HEADER_SIZE, 2);
+    putLE(&header, sectionCount, 2);
+    putLE(&header, sectionCount - 1, 2); // e_shstrndx
+    memcpy(out.data, header.data, ELF_HEADER_SIZE);
+
+    bool ok = true;
+    FILE *f = fopen(path, "wb");
+    if (f == NULL || fwrite(out.data, 1, out.size, f) != out.size) {
+        fprintf(stderr, "Cannot write %s: %s\n", path, strerror(errno));
+        ok = false;
+    }
+    if (f != NULL && fclose(f) != 0 && ok) {
+        fprintf(stderr, "Cannot write %s: %s\n", path, strerror(errno));
+        ok = false;
+    }
+
+    free(header.data);
+    free(out.data);
+    free(strtab.data);
+    free(shstrtab.data);
+    free(symtabIndex);
+    free(sectionOffset);
+    free(relaOffset);
+    free(sectionName);
+    free(relaName);
+    return ok;
+}
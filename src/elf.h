@@ -0,0 +1,98 @@
+// src/elf.h
+#pragma once
+
+#include <stdbool.h>
+#include <stddef.h>
+#include <stdint.h>
+
+/**
+ * NOTE:
+ * Minimal ELF64 relocatable object (ET_REL) writer, shared by the built-in
+ * assemblers of every backend (--emit obj).
+ * The assemblers append machine code to sections, define symbols and record
+ * relocations; elfWriteObject() lays everything out and writes the file.
+ */
+
+// Machines (e_machine)
+#define ELF_MACHINE_X86_64 62
+#define ELF_MACHINE_AARCH64 183
+
+// Section types (sh_type)
+#define ELF_SECTION_PROGBITS 1
+#define ELF_SECTION_NOBITS 8
+
+// Section flags (sh_flags)
+#define ELF_FLAG_WRITE 0x1
+#define ELF_FLAG_ALLOC 0x2
+#define ELF_FLAG_EXEC 0x4
+
+// Relocation types (x86_64)
+#define R_X86_64_64 1
+#define R_X86_64_PC32 2
+#define R_X86_64_32S 11
+#define R_X86_64_PLT32 4
+
+// Relocation types (AArch64)
+#define R_AARCH64_ABS64 257
+#define R_AARCH64_ADR_PREL_PG_HI21 275
+#define R_AARCH64_ADD_ABS_LO12_NC 277
+#define R_AARCH64_LDST8_ABS_LO12_NC 278
+#define R_AARCH64_JUMP26 282
+#define R_AARCH64_CALL26 283
+#define R_AARCH64_LDST16_ABS_LO12_NC 284
+#define R_AARCH64_LDST32_ABS_LO12_NC 285
+#define R_AARCH64_LDST64_ABS_LO12_NC 286
+
+struct elfRelocation {
+    uint64_t offset; // Offset of the patched field within the section
+    int symbol;      // Index into elfObject.symbols
+    uint32_t type;   // R_* relocation type
+    int64_t addend;
+};
+
+struct elfSection {
+    char *name;
+    uint32_t type;  // ELF_SECTION_*
+    uint64_t flags; // ELF_FLAG_*
+    uint64_t align;
+    unsigned char *data; // NULL for NOBITS sections
+    uint64_t size;
+    uint64_t capacity;
+    struct elfRelocation *relocations;
+    int relocationCount;
+    int relocationCapacity;
+};
+
+struct elfSymbol {
+    char *name;
+    int section; // Index into elfObject.sections, or -1 if undefined
+    uint64_t value;
+    bool isGlobal;
+};
+
+struct elfObject {
+    int machine; // ELF_MACHINE_*
+    struct elfSection *sections;
+    int sectionCount;
+    int sectionCapacity;
+    struct elfSymbol *symbols;
+    int symbolCount;
+    int symbolCapacity;
+    int *symbolHash; // Open-addressing table of symbol indices (-1: empty)
+    int symbolHashSize;
+};
+
+void elfInitObject(struct elfObject *obj, int machine);
+void elfFreeObject(struct elfObject *obj);
+int elfSection(struct elfObject *obj, const char *name);
+void elfAppend(struct elfObject *obj, int section, const void *bytes,
+               size_t length);
+void elfReserve(struct elfObject *obj, int section, uint64_t length);
+void elfAlign(struct elfObject *obj, int section, uint64_t align,
+              unsigned char fill);
+int elfSymbol(struct elfObject *obj, const char *name, size_t length);
+void elfDefineSymbol(struct elfObject *obj, int symbol, int section,
+                     uint64_t value);
+void elfAddRelocation(struct elfObject *obj, int section, uint64_t offset,
+                      int symbol, uint32_t type, int64_t addend);
+bool elfWriteObject(struct elfObject *obj, const char *path);
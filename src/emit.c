@@ -0,0 +1,313 @@
+// src/emit.c
+
+#include "emit.h"
+
+#include <errno.h>
+#include <stdlib.h>
+#include <string.h>
+
+/**
+ * NOTE:
+ * The emitter keeps a single growable buffer. Every append routine first
+ * makes room with ensureCapacity() and then copies bytes with memcpy(), so
+ * the only per-line cost is the copy itself.
+ */
+
+static char *Buffer;
+static size_t Length;
+static size_t Capacity;
+static FILE *Stream;                // NULL: keep everything in memory
+static const char *ImmediatePrefix; // "" (NASM) or "#" (GNU as, AArch64)
+static uint64_t FlushedBytes;       // Bytes already written to Stream
+static int OperandCount;            // Operands of the current instruction
+static bool Capturing;              // Text held back since CaptureStart
+static size_t CaptureStart;
+
+/**
+ * emitFatal - Report an output error and exit.
+ */
+static void emitFatal(const char *what) {
+    fprintf(stderr, "Emitter error: %s: %s\n", what, strerror(errno));
+    exit(1);
+}
+
+/**
+ * ensureCapacity - Make room for at least `extra` more bytes.
+ */
+static inline void ensureCapacity(size_t extra) {
+    if (Length + extra <= Capacity)
+        return;
+
+    size_t capacity = Capacity ? Capacity : EMIT_FLUSH_THRESHOLD;
+    while (Length + extra > capacity) {
+        capacity *= 2;
+    }
+    char *buffer = realloc(Buffer, capacity);
+    if (buffer == NULL)
+        emitFatal("out of memory");
+    Buffer = buffer;
+    Capacity = capacity;
+}
+
+/**
+ * maybeFlush - Write the buffer out once it has grown past the threshold.
+ * Called at line ends, so the stream only ever receives whole lines.
+ */
+static inline void maybeFlush(void) {
+    if (Stream != NULL && !Capturing && Length >= EMIT_FLUSH_THRESHOLD)
+        emitFlush();
+}
+
+/**
+ * emitOpen - Start emitting.
+ *
+ * @param stream Output stream, or NULL to keep the text in memory (see
+ * emitBufferedText()).
+ * @param immediatePrefix Prefix of immediate operands ("" or "#").
+ */
+void emitOpen(FILE *stream, const char *immediatePrefix) {
+    Stream = stream;
+    ImmediatePrefix = immediatePrefix ? immediatePrefix : "";
+    Length = 0;
+    FlushedBytes = 0;
+    OperandCount = 0;
+    Capturing = false;
+}
+
+/**
+ * emitFlush - Write the buffered text to the output stream (if any).
+ */
+void emitFlush(void) {
+    if (Stream == NULL || Length == 0)
+        return;
+    if (fwrite(Buffer, 1, Length, Stream) != Length)
+        emitFatal("cannot write output");
+    FlushedBytes += Length;
+    Length = 0;
+}
+
+/**
+ * emitClose - Flush the remaining text. The buffer itself is kept when
+ * there is no stream; release it with emitFreeBuffer().
+ */
+void emitClose(void) {
+    emitFlush();
+    if (Stream != NULL)
+        emitFreeBuffer();
+    Stream = NULL;
+}
+
+/**
+ * emitBufferedText - Access the text kept in memory (no output stream).
+ *
+ * @param length Receives the length of the text in bytes.
+ *
+ * @return The text (not NUL-terminated), or NULL if nothing was emitted.
+ */
+const char *emitBufferedText(size_t *length) {
+    *length = Length;
+    return Buffer;
+}
+
+/**
+ * emitFreeBuffer - Release the buffer.
+ */
+void emitFreeBuffer(void) {
+    free(Buffer);
+    Buffer = NULL;
+    Length = 0;
+    Capacity = 0;
+}
+
+/**
+ * emitBeginCapture - Hold back the text emitted from now on until
+ * emitEndCapture() (nothing is flushed in between).
+ */
+void emitBeginCapture(void) {
+    Capturing = true;
+    CaptureStart = Length;
+}
+
+/**
+ * emitEndCapture - Take back the text emitted since emitBeginCapture(), so
+ * that the caller can emit a rewritten version of it.
+ *
+ * @param length Receives the length of the text in bytes.
+ *
+ * @return A copy of the text (NUL-terminated), to be freed by the caller.
+ */
+char *emitEndCapture(size_t *length) {
+    size_t captured = Length - CaptureStart;
+    char *text = malloc(captured + 1);
+
+    if (text == NULL)
+        emitFatal("out of memory");
+    if (captured > 0)
+        memcpy(text, Buffer + CaptureStart, captured);
+    text[captured] = '\0';
+    Length = CaptureStart;
+    Capturing = false;
+    *length = captured;
+    return text;
+}
+
+/**
+ * emitByteCount - Total number of bytes emitted since emitOpen().
+ */
+uint64_t emitByteCount(void) { return FlushedBytes + Length; }
+
+/**
+ * NOTE:
+ * Raw text
+ */
+void emitBytes(const char *bytes, size_t length) {
+    ensureCapacity(length);
+    memcpy(Buffer + Length, bytes, length);
+    Length += length;
+}
+
+void emitText(const char *text) { emitBytes(text, strlen(text)); }
+
+void emitChar(char c) {
+    ensureCapacity(1);
+    Buffer[Length++] = c;
+}
+
+/**
+ * emitInt - Append a signed decimal integer.
+ */
+void emitInt(long long value) {
+    char digits[24];
+    char *p = digits + sizeof(digits);
+    unsigned long long magnitude = value < 0 ? 0ull - (unsigned long long)value
+                                             : (unsigned long long)value;
+
+    do {
+        *--p = (char)('0' + magnitude % 10);
+        magnitude /= 10;
+    } while (magnitude != 0);
+    if (value < 0)
+        *--p = '-';
+
+    emitBytes(p, digits + sizeof(digits) - p);
+}
+
+/**
+ * NOTE:
+ * Labels
+ */
+
+/**
+ * emitLabel - Define a numbered label ("L<n>:").
+ */
+void emitLabel(int label) {
+    emitChar('L');
+    emitInt(label);
+    emitBytes(":\n", 2);
+    maybeFlush();
+}
+
+/**
+ * emitSymbolLabel - Define a named label ("<name>:").
+ */
+void emitSymbolLabel(const char *name) {
+    emitText(name);
+    emitBytes(":\n", 2);
+    maybeFlush();
+}
+
+/**
+ * NOTE:
+ * Instructions and directives ("\t<mnemonic>\t<op>, <op>, ...\n").
+ * Directives such as "section" or ".p2align" are written the same way.
+ */
+void emitBeginInstruction(const char *mnemonic) {
+    emitChar('\t');
+    emitText(mnemonic);
+    OperandCount = 0;
+}
+
+/**
+ * emitOperandStart - Write the separator before the next operand.
+ */
+void emitOperandStart(void) {
+    if (OperandCount++ == 0)
+        emitChar('\t');
+    else
+        emitBytes(", ", 2);
+}
+
+/**
+ * emitOperand - Append an operand spelled out as text (register, symbol,
+ * memory reference, condition, ...).
+ */
+void emitOperand(const char *text) {
+    emitOperandStart();
+    emitText(text);
+}
+
+/**
+ * emitMemoryOperand - Append a memory operand "<prefix>[<address>]", e.g.
+ * "DWORD [counter]" or "[x0]".
+ */
+void emitMemoryOperand(const char *prefix, const char *address) {
+    emitOperandStart();
+    emitText(prefix);
+    emitChar('[');
+    emitText(address);
+    emitChar(']');
+}
+
+void emitImmediate(long long value) {
+    emitOperandStart();
+    emitText(ImmediatePrefix);
+    emitInt(value);
+}
+
+void emitLabelOperand(int label) {
+    emitOperandStart();
+    emitChar('L');
+    emitInt(label);
+}
+
+void emitEndInstruction(void) {
+    emitChar('\n');
+    maybeFlush();
+}
+
+void emitInstruction0(const char *mnemonic) {
+    emitBeginInstruction(mnemonic);
+    emitEndInstruction();
+}
+
+void emitInstruction1(const char *mnemonic, const char *a) {
+    emitBeginInstruction(mnemonic);
+    emitOperand(a);
+    emitEndInstruction();
+}
+
+void emitInstruction2(const char *mnemonic, const char *a, const char *b) {
+    emitBeginInstruction(mnemonic);
+    emitOperand(a);
+    emitOperand(b);
+    emitEndInstruction();
+}
+
+void emitInstruction3(const char *mnemonic, const char *a, const char *b,
+                      const char *c) {
+    emitBeginInstruction(mnemonic);
+    emitOperand(a);
+    emitOperand(b);
+    emitOperand(c);
+    emitEndInstruction();
+}
+
+/**
+ * emitInstructionLabel - Write an instruction whose only operand is a
+ * numbered label, e.g. a jump ("\tjmp\tL<n>\n").
+ */
+void emitInstructionLabel(const char *mnemonic, int label) {
+    emitBeginInstruction(mnemonic);
+    emitLabelOperand(label);
+    emitEndInstruction();
+}
@@ -0,0 +1,71 @@
+// src/emit.h
+#pragma once
+
+#include <stdbool.h>
+#include <stddef.h>
+#include <stdint.h>
+#include <stdio.h>
+
+/**
+ * NOTE:
+ * Buffered output emitter shared by all backends.
+ * Generated assembly is appended to one growable byte buffer by specialised
+ * routines (mnemonics, operands, immediates, labels) instead of going
+ * through printf format parsing line by line.
+ * With an output stream, the buffer is written out with fwrite() whenever it
+ * grows past EMIT_FLUSH_THRESHOLD and when the emitter is closed; without one
+ * it keeps the whole text in memory for the built-in assembler.
+ *
+ * An instruction line is either written in one call:
+ *     emitInstruction2("mov", "rax", "rbx");     //  "\tmov\trax, rbx\n"
+ * or built operand by operand:
+ *     emitBeginInstruction("mov");
+ *     emitOperand("rax");
+ *     emitImmediate(42);                         //  "\tmov\trax, 42\n"
+ *     emitEndInstruction();
+ * Operands that do not fit a helper (e.g. "[rbp+-8]") start with
+ * emitOperandStart() and are spelled out with emitText()/emitInt().
+ *
+ * Text emitted between emitBeginCapture() and emitEndCapture() is held back
+ * and handed to the caller instead, which emits it again once rewritten.
+ */
+
+// Buffer size at which the text is written to the output stream
+#define EMIT_FLUSH_THRESHOLD (256 * 1024)
+
+// Setup
+void emitOpen(FILE *stream, const char *immediatePrefix);
+void emitFlush(void);
+void emitClose(void);
+const char *emitBufferedText(size_t *length);
+void emitFreeBuffer(void);
+uint64_t emitByteCount(void);
+
+// Capture (text held back to be rewritten, e.g. by peephole.c)
+void emitBeginCapture(void);
+char *emitEndCapture(size_t *length);
+
+// Raw text
+void emitText(const char *text);
+void emitBytes(const char *bytes, size_t length);
+void emitChar(char c);
+void emitInt(long long value);
+
+// Labels
+void emitLabel(int label);
+void emitSymbolLabel(const char *name);
+
+// Instructions and directives
+void emitInstruction0(const char *mnemonic);
+void emitInstruction1(const char *mnemonic, const char *a);
+void emitInstruction2(const char *mnemonic, const char *a, const char *b);
+void emitInstruction3(const char *mnemonic, const char *a, const char *b,
+                      const char *c);
+void emitInstructionLabel(const char *mnemonic, int label);
+void emitBeginInstruction(const char *mnemonic);
+void emitOperandStart(void);
+void emitOperand(const char *text);
+void emitMemoryOperand(const char *prefix, const char *address);
+void emitImmediate(long long value);
+void emitLabelOperand(int label);
+void emitEndInstruction(void);
@@ -16,7 +16,7 @@ static struct ASTnode *functionCall(void) {
 
     // Identifier
     if ((id = findSymbol(Text)) == -1 ||
-        SymbolTable[id].structuralType != S_FUNCTION) {
+        getSymbol(id)->structuralType != S_FUNCTION) {
         logFatals("Undeclared function: ", Text);
     }
 
@@ -29,7 +29,7 @@ static struct ASTnode *functionCall(void) {
     // Build the function call AST node.
     // - Store the function's return type as this node's type.
     // - Record the function's symbol ID
-    treeNode = makeASTUnary(A_FUNCTIONCALL, SymbolTable[id].primitiveType,
+    treeNode = makeASTUnary(A_FUNCTIONCALL, getSymbol(id)->primitiveType,
                             treeNode, id);
 
     // Right parenthesis (")")
@@ -53,10 +53,10 @@ static struct ASTnode *arrayAccess(void) {
     // Check that the identifier has been defined as an array,
     // then make a leaf node for it that points at the base.
     if ((id = findSymbol(Text)) == -1 ||
-        SymbolTable[id].structuralType != S_ARRAY) {
+        getSymbol(id)->structuralType != S_ARRAY) {
         logFatals("Undeclared array: ", Text);
     }
-    leftNode = makeASTLeaf(A_ADDRESSOF, SymbolTable[id].primitiveType, id);
+    leftNode = makeASTLeaf(A_ADDRESSOF, getSymbol(id)->primitiveType, id);
 
     // '['
     scan(&Token);
@@ -79,7 +79,7 @@ static struct ASTnode *arrayAccess(void) {
     // Return an AST tree where the array's base has the offset
     // added to it, and dereference the element. Still an lvalue
     // at this point.
-    leftNode = makeASTNode(A_ADD, SymbolTable[id].primitiveType, leftNode, NULL,
+    leftNode = makeASTNode(A_ADD, getSymbol(id)->primitiveType, leftNode, NULL,
                            rightNode, 0);
     leftNode = makeASTUnary(A_DEREFERENCE,
                             pointerToPrimitiveType(leftNode->primitiveType),
@@ -113,7 +113,7 @@ static struct ASTnode *postfix(void) {
 
     // A variable (can be local or global)
     id = findSymbol(Text);
-    if (id == -1 || SymbolTable[id].structuralType != S_VARIABLE) {
+    if (id == -1 || getSymbol(id)->structuralType != S_VARIABLE) {
         logFatals("Undeclared variable: ", Text);
     }
 
@@ -121,18 +121,18 @@ static struct ASTnode *postfix(void) {
     case T_INCREMENT:
         // Post increment: skip over the token
         scan(&Token);
-        n = makeASTLeaf(A_POSTINCREMENT, SymbolTable[id].primitiveType, id);
+        n = makeASTLeaf(A_POSTINCREMENT, getSymbol(id)->primitiveType, id);
         break;
 
     case T_DECREMENT:
         // Post decrement: skip over the token
         scan(&Token);
-        n = makeASTLeaf(A_POSTDECREMENT, SymbolTable[id].primitiveType, id);
+        n = makeASTLeaf(A_POSTDECREMENT, getSymbol(id)->primitiveType, id);
         break;
 
     default:
         // Just a variable inference
-        n = makeASTLeaf(A_IDENTIFIER, SymbolTable[id].primitiveType, id);
+        n = makeASTLeaf(A_IDENTIFIER, getSymbol(id)->primitiveType, id);
         break;
     }
 
@@ -346,6 +346,7 @@ static int operatorPrecedence(int tokentype) {
  */
 struct ASTnode *prefix(void) {
     struct ASTnode *tree;
+    int type;
     switch (Token.token) {
     case T_AMPERSAND:
         /**
@@ -400,10 +401,15 @@ struct ASTnode *prefix(void) {
 
         // Prepend an A_ARITHMETICNEGATE operation to the tree and make the
         // child an rvalue. Because character type (T_CHAR) is unsigned, also
-        // widen this to int so that it's signed
+        // widen this to int so that it's signed. Operands that are already
+        // int or wider (i.e. long) keep their own type.
         tree->isRvalue = true;
-        tree = coerceASTTypeForOp(tree, P_INT, 0);
-        tree = makeASTUnary(A_ARITHMETICNEGATE, P_INT, tree, 0);
+        type = tree->primitiveType == P_LONG ? P_LONG : P_INT;
+        tree = coerceASTTypeForOp(tree, type, 0);
+        if (tree == NULL) {
+            logFatal("Operand of unary '-' must be an integer type");
+        }
+        tree = makeASTUnary(A_ARITHMETICNEGATE, type, tree, 0);
         break;
 
     case T_LOGICALINVERT:
@@ -10,6 +10,7 @@
 #include "data.h"
 #include "decl.h"
 #include "defs.h"
+#include "ir.h"
 
 /**
  * codegenGetLabelNumber - Generates a unique label number for code generation.
@@ -53,6 +54,33 @@ static int codegenCompareAndJump(int ASTop, int r1, int r2, int label) {
     return CG->compareAndJump(ASTop, r1, r2, label);
 }
 
+/**
+ * codegenInvertComparison - The comparison that holds exactly when another
+ * one does not.
+ *
+ * @param ASTop The comparison (A_EQ ... A_GE).
+ *
+ * @return The inverted comparison.
+ */
+int codegenInvertComparison(int ASTop) {
+    switch (ASTop) {
+    case A_EQ:
+        return A_NE;
+    case A_NE:
+        return A_EQ;
+    case A_LT:
+        return A_GE;
+    case A_GE:
+        return A_LT;
+    case A_GT:
+        return A_LE;
+    default: // A_LE
+        return A_GT;
+    }
+}
+
+static void codegenCondition(struct ASTnode *n, int label, bool whenTrue);
+
 /**
  * codegenIfStatementAST - Generates code for an IF statement AST node.
  *
@@ -89,20 +117,20 @@ static int codegenIfStatementAST(struct ASTnode *n) {
     // - one for the end of the if statement
     // (When there is no ELSE clause, labelFalseStatement is the ending label.
     labelFalseStatement = codegenGetLabelNumber();
-    if (n->right) {
+    if (astRight(n)) {
         labelEndStatement = codegenGetLabelNumber();
     }
 
     // WARNING:
     // Jump to false label when condition is FALSE
-    codegenAST(n->left, labelFalseStatement, n->op);
+    codegenCondition(astLeft(n), labelFalseStatement, false);
     codegenResetRegisters();
 
     // Generate the true branch's compound statement
-    codegenAST(n->middle, NOLABEL, n->op);
+    codegenAST(astMiddle(n), NOLABEL, n->op);
     codegenResetRegisters();
 
-    if (n->right) {
+    if (astRight(n)) {
         codegenJump(labelEndStatement);
     }
 
@@ -110,8 +138,8 @@ static int codegenIfStatementAST(struct ASTnode *n) {
 
     // Optional ELSE clause exists
     // Generate the false compount statement and the end label
-    if (n->right) {
-        codegenAST(n->right, NOREG, n->op);
+    if (astRight(n)) {
+        codegenAST(astRight(n), NOREG, n->op);
         codegenResetRegisters();
         codegenLabel(labelEndStatement);
     }
@@ -157,11 +185,11 @@ static int codegenWhileStatementAST(struct ASTnode *n) {
     codegenLabel(labelStartLoop);
 
     // Generate the loop condition
-    codegenAST(n->left, labelEndLoop, n->op);
+    codegenCondition(astLeft(n), labelEndLoop, false);
     codegenResetRegisters();
 
     // Generate the loop body (stored in right child for WHILE)
-    codegenAST(n->right, NOLABEL, n->op);
+    codegenAST(astRight(n), NOLABEL, n->op);
     codegenResetRegisters();
 
     // Jump back to the start of the loop
@@ -171,6 +199,476 @@ static int codegenWhileStatementAST(struct ASTnode *n) {
     return NOREG;
 }
 
+/**
+ * NOTE:
+ * Register allocation.
+ * Before a function's body is generated, every node is labelled with the
+ * number of pool registers its subtree needs (its Sethi-Ullman number, kept
+ * in registerNeed): a leaf needs one, and a binary operator whose operands
+ * need l and r registers needs max(l, r), or l + 1 when both are equal.
+ * codegenAST() then evaluates the operand that needs more registers first,
+ * so that its registers are free again while the other one is evaluated.
+ * When the value of the first operand still leaves too few free registers
+ * for the second, it is spilled to the stack and reloaded afterwards
+ * (codegenSecondOperand()), so no expression runs out of registers.
+ */
+
+// Spills made by codegenSecondOperand() (see --stats)
+static size_t spillCount;
+
+/**
+ * maxNeed - The larger of two register needs.
+ */
+static int maxNeed(int a, int b) { return a > b ? a : b; }
+
+/**
+ * labelRegisterNeed - Label a tree's nodes with the number of registers
+ * needed to evaluate them (bottom-up).
+ *
+ * @param n The root of the tree
+ *
+ * @return The root's register need
+ */
+static int labelRegisterNeed(struct ASTnode *n) {
+    struct ASTnode *left, *right;
+    int leftNeed, rightNeed, middleNeed, need;
+
+    if (n == NULL) {
+        return 0;
+    }
+
+    left = astLeft(n);
+    right = astRight(n);
+    leftNeed = labelRegisterNeed(left);
+    middleNeed = labelRegisterNeed(astMiddle(n));
+    rightNeed = labelRegisterNeed(right);
+
+    switch (n->op) {
+    case A_GLUE:
+    case A_IF:
+    case A_WHILE:
+    case A_FUNCTION:
+        // Statements: each child is generated on its own
+        need = maxNeed(maxNeed(leftNeed, middleNeed), rightNeed);
+        break;
+    case A_POSTINCREMENT:
+    case A_POSTDECREMENT:
+    case A_PREINCREMENT:
+    case A_PREDECREMENT:
+        // The value and its updated copy
+        need = 2;
+        break;
+    case A_SCALETYPE:
+        need =
+            maxNeed(leftNeed,
+                    n->v.size == 2 || n->v.size == 4 || n->v.size == 8 ? 1 : 2);
+        break;
+    case A_LOGICALAND:
+    case A_LOGICALOR:
+        // The left operand's value is kept while the right one is evaluated
+        // (see codegenLogicalValue())
+        need = maxNeed(leftNeed, rightNeed + 1);
+        break;
+    case A_ASSIGN:
+        // A variable on the left-hand side is stored to directly
+        if (right->op == A_IDENTIFIER) {
+            need = maxNeed(leftNeed, 1);
+            break;
+        }
+        need =
+            leftNeed == rightNeed ? leftNeed + 1 : maxNeed(leftNeed, rightNeed);
+        break;
+    default:
+        if (left == NULL) {
+            need = 1; // Leaf
+        } else if (right == NULL) {
+            need = maxNeed(leftNeed, 1); // Unary operator
+        } else {
+            need = leftNeed == rightNeed ? leftNeed + 1
+                                         : maxNeed(leftNeed, rightNeed);
+        }
+        break;
+    }
+
+    n->registerNeed = need > UINT8_MAX ? UINT8_MAX : need;
+    return n->registerNeed;
+}
+
+/**
+ * codegenSecondOperand - Generates code for the operand that is evaluated
+ * second, spilling the first operand's register to the stack if too few
+ * registers are free.
+ *
+ * @param first       Register holding the first operand's value; updated if
+ *                    the value is reloaded into another register.
+ * @param n           The second operand.
+ * @param parentASTop The operator of the parent AST node.
+ *
+ * @return The register index where the second operand is stored.
+ */
+static int codegenSecondOperand(int *first, struct ASTnode *n,
+                                int parentASTop) {
+    int second;
+
+    if (*first == NOREG || CG->countFreeRegisters() >= n->registerNeed) {
+        return codegenAST(n, NOLABEL, parentASTop);
+    }
+
+    CG->spillRegister(*first);
+    spillCount++;
+    second = codegenAST(n, NOLABEL, parentASTop);
+    *first = CG->reloadRegister();
+    return second;
+}
+
+/**
+ * codegenOperands - Generates code for the operands of a node, starting with
+ * the one that needs more registers (see labelRegisterNeed()).
+ *
+ * @param n     The AST node whose operands are generated.
+ * @param left  Receives the register holding the left operand (or NOREG).
+ * @param right Receives the register holding the right operand (or NOREG).
+ */
+static void codegenOperands(struct ASTnode *n, int *left, int *right) {
+    *left = *right = NOREG;
+    if (astLeft(n) && astRight(n) &&
+        astRight(n)->registerNeed > astLeft(n)->registerNeed) {
+        *right = codegenAST(astRight(n), NOLABEL, n->op);
+        *left = codegenSecondOperand(right, astLeft(n), n->op);
+    } else {
+        if (astLeft(n)) {
+            // Use NOREG because left subtree can use any register
+            *left = codegenAST(astLeft(n), NOLABEL, n->op);
+        }
+        if (astRight(n)) {
+            *right = codegenSecondOperand(left, astRight(n), n->op);
+        }
+    }
+}
+
+/**
+ * NOTE:
+ * Jumping code.
+ * The condition of an if or while statement is generated as conditional
+ * jumps only: a comparison jumps on its flags, ! swaps the jump's sense, and
+ * && and || jump to the statement's label as soon as one operand decides
+ * the outcome, skipping the other operand. No 0 or 1 value is materialized
+ * unless an operand is a plain value, which is tested against zero.
+ * E.g. `if (a < b && !(c == d))` becomes
+ * ----------------------------------------
+ *        cmp a, b
+ *        jge Lfalse
+ *        cmp c, d
+ *        je  Lfalse
+ * ----------------------------------------
+ */
+
+/**
+ * codegenCondition - Generates code jumping to a label depending on a
+ * condition (jumping code, see the NOTE above).
+ *
+ * @param n        The condition.
+ * @param label    The label to jump to.
+ * @param whenTrue Jump when the condition is true rather than false.
+ */
+static void codegenCondition(struct ASTnode *n, int label, bool whenTrue) {
+    int leftRegister, rightRegister, labelSkip;
+
+    switch (n->op) {
+    case A_TOBOOLEAN:
+        codegenCondition(astLeft(n), label, whenTrue);
+        return;
+    case A_LOGICALNOT:
+        codegenCondition(astLeft(n), label, !whenTrue);
+        return;
+    case A_LOGICALAND:
+    case A_LOGICALOR:
+        if ((n->op == A_LOGICALAND) != whenTrue) {
+            // Either operand alone can take the jump
+            // (a false operand of &&, a true operand of ||)
+            codegenCondition(astLeft(n), label, whenTrue);
+            codegenCondition(astRight(n), label, whenTrue);
+        } else {
+            // The left operand alone can only skip the right one
+            labelSkip = codegenGetLabelNumber();
+            codegenCondition(astLeft(n), labelSkip, !whenTrue);
+            codegenCondition(astRight(n), label, whenTrue);
+            codegenLabel(labelSkip);
+        }
+        return;
+    case A_EQ:
+    case A_NE:
+    case A_LT:
+    case A_GT:
+    case A_LE:
+    case A_GE:
+        // compareAndJump() jumps when the comparison is false
+        codegenOperands(n, &leftRegister, &rightRegister);
+        codegenCompareAndJump(whenTrue ? codegenInvertComparison(n->op) : n->op,
+                              leftRegister, rightRegister, label);
+        return;
+    default:
+        // A value: compare it with zero
+        leftRegister = codegenAST(n, NOLABEL, A_TOBOOLEAN);
+        if (whenTrue) {
+            rightRegister = CG->loadImmediateInt(0, P_INT);
+            codegenCompareAndJump(A_EQ, leftRegister, rightRegister, label);
+        } else {
+            CG->toBoolean(leftRegister, A_IF, label);
+        }
+        codegenResetRegisters();
+        return;
+    }
+}
+
+/**
+ * codegenLogicalValue - Generates code for the value (0 or 1) of an && or ||
+ * outside of a condition.
+ *
+ * NOTE:
+ * The right operand is only evaluated when the left one does not decide the
+ * result. Since both paths must leave the result in the same register, the
+ * left operand's register is kept, and a || b is computed as !(!a && !b):
+ * ----------------------------------------
+ *        r = (a != 0)     (r = !a for ||)
+ *        jump to L if r is 0
+ *        r = r & (b != 0) (r = r & !b for ||)
+ * L:                      (r = !r for ||)
+ * ----------------------------------------
+ *
+ * @param n The A_LOGICALAND or A_LOGICALOR node.
+ *
+ * @return The register index where the result is stored.
+ */
+static int codegenLogicalValue(struct ASTnode *n) {
+    bool isOr = n->op == A_LOGICALOR;
+    int labelEnd = codegenGetLabelNumber();
+    int leftRegister, rightRegister;
+
+    leftRegister = codegenAST(astLeft(n), NOLABEL, n->op);
+    leftRegister = isOr ? CG->logicalNot(leftRegister)
+                        : CG->toBoolean(leftRegister, n->op, NOLABEL);
+    CG->toBoolean(leftRegister, A_IF, labelEnd);
+
+    rightRegister = codegenAST(astRight(n), NOLABEL, n->op);
+    rightRegister = isOr ? CG->logicalNot(rightRegister)
+                         : CG->toBoolean(rightRegister, n->op, NOLABEL);
+    leftRegister = CG->bitwiseAndRegs(leftRegister, rightRegister);
+
+    codegenLabel(labelEnd);
+    return isOr ? CG->logicalNot(leftRegister) : leftRegister;
+}
+
+/**
+ * NOTE:
+ * Code generation from the IR (-O1).
+ * At -O1 a function is translated into IR (ir.c), its virtual registers are
+ * assigned backend registers or stack slots (regalloc.c), and the IR is then
+ * lowered here one instruction at a time. A spilled operand is loaded into
+ * one of the backend's two scratch registers, and a spilled result is
+ * computed in the first one and stored back. The callee-saved registers the
+ * function uses are saved in slots of its frame after the preamble and
+ * restored at its exit label, which every return jumps to.
+ */
+
+/**
+ * irSourceRegister - The register holding an operand, loading it into a
+ * scratch register first if it is spilled.
+ *
+ * @param f The function
+ * @param vreg The operand, or IR_NOVREG
+ * @param scratch The scratch register to use
+ *
+ * @return The register, or NOREG for IR_NOVREG
+ */
+static int irSourceRegister(struct irFunction *f, int vreg, int scratch) {
+    if (vreg == IR_NOVREG) {
+        return NOREG;
+    }
+    if (f->locations[vreg].reg == NOREG) {
+        CG->loadFrameSlot(scratch, f->locations[vreg].offset);
+        return scratch;
+    }
+    return f->locations[vreg].reg;
+}
+
+/**
+ * codegenIRInstruction - Generates code for one IR instruction.
+ *
+ * @param f The function
+ * @param i Index of the instruction
+ */
+static void codegenIRInstruction(struct irFunction *f, int i) {
+    struct irInstruction *in = &f->code[i];
+    int scratch = CG->calleeSavedRegisterCount + CG->callerSavedRegisterCount;
+    int src1 = irSourceRegister(f, in->src1, scratch);
+    int src2 = irSourceRegister(f, in->src2, scratch + 1);
+    int dst = NOREG;
+
+    if (in->dst != IR_NOVREG) {
+        dst = f->locations[in->dst].reg;
+        if (dst == NOREG) {
+            dst = scratch; // Stored to the spill slot below
+        }
+    }
+
+    switch (in->op) {
+    case A_INTEGERLITERAL:
+        CG->loadConstant(dst, in->value);
+        break;
+    case A_STRINGLITERAL:
+        CG->loadStringAddress(dst, in->value);
+        break;
+    case A_ADDRESSOF:
+        CG->loadAddress(dst, in->value);
+        break;
+    case A_IDENTIFIER:
+        CG->loadVariable(dst, in->value);
+        break;
+    case A_ASSIGN:
+        CG->storeVariable(src1, in->value);
+        break;
+    case A_DEREFERENCE:
+        CG->loadIndirect(dst, src1, in->type);
+        break;
+    case IR_STOREINDIRECT:
+        CG->storeIndirect(src1, src2, in->type);
+        break;
+    case A_ADD:
+    case A_SUBTRACT:
+    case A_MULTIPLY:
+    case A_DIVIDE:
+    case A_BITWISEAND:
+    case A_BITWISEOR:
+    case A_BITWISEXOR:
+    case A_LSHIFT:
+    case A_RSHIFT:
+    case A_EQ:
+    case A_NE:
+    case A_LT:
+    case A_GT:
+    case A_LE:
+    case A_GE:
+        CG->binaryOperation(in->op, dst, src1, src2);
+        break;
+    case A_ARITHMETICNEGATE:
+    case A_LOGICALINVERT:
+    case A_LOGICALNOT:
+    case A_TOBOOLEAN:
+        CG->unaryOperation(in->op, dst, src1);
+        break;
+    case IR_COPY:
+        CG->moveRegister(dst, src1);
+        break;
+    case IR_NARROW:
+        CG->narrowToType(dst, src1, in->type);
+        break;
+    case IR_SHIFTLEFTCONST:
+    case IR_SHIFTRIGHTCONST:
+    case IR_ARITHSHIFTRIGHTCONST:
+        CG->shiftByConstant(in->op, dst, src1, (int)in->value);
+        break;
+    case IR_MULHIGHCONST:
+        CG->multiplyHighByConstant(dst, src1, in->value);
+        break;
+    case A_FUNCTIONCALL:
+        CG->callFunction(dst, src1, in->value);
+        break;
+    case A_RETURN:
+        CG->moveReturnValue(src1, f->functionId);
+        break;
+    case IR_LABEL:
+        CG->label(in->value);
+        break;
+    case IR_JUMP:
+        // Falling through is enough if the label comes next
+        if (i + 1 < f->count && f->code[i + 1].op == IR_LABEL &&
+            f->code[i + 1].value == in->value) {
+            break;
+        }
+        CG->jump(in->value);
+        break;
+    case IR_BRANCH:
+        CG->branchIfCompare(in->type, src1, src2, in->value);
+        break;
+    default:
+        logFatald("Unknown IR operation: ", in->op);
+    }
+
+    if (in->dst != IR_NOVREG && f->locations[in->dst].reg == NOREG) {
+        CG->storeFrameSlot(dst, f->locations[in->dst].offset);
+    }
+}
+
+/**
+ * codegenIR - Generates code for a function from its register-allocated IR
+ * and applies the backend's peephole rules to it (see peephole.c).
+ *
+ * @param f The function
+ */
+static void codegenIR(struct irFunction *f) {
+    int calleeCount = CG->calleeSavedRegisterCount;
+    int *saveSlots = malloc((calleeCount + 1) * sizeof(int));
+
+    if (saveSlots == NULL) {
+        logFatal("Out of memory for the callee-saved registers");
+    }
+
+    // The save slots are part of the frame, so they are taken before the
+    // preamble sizes it
+    for (int r = 0; r < calleeCount; r++) {
+        if (f->calleeSavedUsed[r]) {
+            saveSlots[r] = CG->getLocalOffset(P_LONG, false);
+        }
+    }
+
+    beginPeepholeCapture();
+    CG->functionPreamble(f->functionId);
+    for (int r = 0; r < calleeCount; r++) {
+        if (f->calleeSavedUsed[r]) {
+            CG->storeFrameSlot(r, saveSlots[r]);
+        }
+    }
+
+    for (int i = 0; i < f->count; i++) {
+        codegenIRInstruction(f, i);
+    }
+
+    // The last instruction is the exit label
+    for (int r = 0; r < calleeCount; r++) {
+        if (f->calleeSavedUsed[r]) {
+            CG->loadFrameSlot(r, saveSlots[r]);
+        }
+    }
+    CG->functionPostamble(f->functionId);
+    optimizeCapturedCode();
+
+    free(saveSlots);
+}
+
+/**
+ * codegenFunctionIR - Generates code for a function through the IR
+ * (translation, value numbering, loop-invariant code motion, dead code
+ * elimination, register allocation, lowering).
+ *
+ * @param n The function's tree (A_FUNCTION)
+ */
+static void codegenFunctionIR(struct ASTnode *n) {
+    struct irFunction *f = buildIR(n);
+
+    numberValues(f);
+    hoistLoopInvariants(f);
+    reduceInductionVariables(f);
+    eliminateDeadCode(f);
+    allocateRegisters(f);
+    spillCount += f->spillCount;
+    if (Option_dumpIR) {
+        dumpIR(f);
+    }
+    codegenIR(f);
+    freeIR(f);
+}
+
 /**
  * codegenAST - Generates code for the given AST node and its subtrees.
  *
@@ -179,11 +677,10 @@ static int codegenWhileStatementAST(struct ASTnode *n) {
  * @param parentASTop The operator of the parent AST node.
  *
  * NOTE:
- * If parentASTop is A_IF, comparison operations will generate
- * a jump instruction instead of setting a register value.
- * (e.g., `if (b < c) { ... }` )
- * Otherwise, comparison operations will set a register to 1 or 0
- * (e.g., `int a = (b < c);` )
+ * Comparison operations set a register to 1 or 0
+ * (e.g., `int a = (b < c);` ). The conditions of A_IF and A_WHILE
+ * are generated as jumps by codegenCondition() instead
+ * (e.g., `if (b < c) { ... }` ).
  *
  * @return The register index where the result is stored.
  */
@@ -205,14 +702,25 @@ int codegenAST(struct ASTnode *n, int label, int parentASTop) {
         // Do each sub-tree separately,
         // and return NOREG since GLUE does not produce a value
         // Then free registers used in each sub-tree
-        codegenAST(n->left, NOLABEL, n->op);
+        codegenAST(astLeft(n), NOLABEL, n->op);
         CG->resetRegisters();
-        codegenAST(n->right, NOLABEL, n->op);
+        codegenAST(astRight(n), NOLABEL, n->op);
         CG->resetRegisters();
         return NOREG;
     case A_FUNCTION:
+        labelRegisterNeed(n);
+        if (Option_optimizationLevel >= 1) {
+            codegenFunctionIR(n);
+            return NOREG;
+        }
+        if (Option_dumpIR) {
+            // Dumped only: -O0 generates code from the tree
+            struct irFunction *f = buildIR(n);
+            dumpIR(f);
+            freeIR(f);
+        }
         CG->functionPreamble(n->v.identifierIndex);
-        codegenAST(n->left, NOLABEL, n->op);
+        codegenAST(astLeft(n), NOLABEL, n->op);
         CG->functionPostamble(n->v.identifierIndex);
         return NOREG;
     }
@@ -220,15 +728,15 @@ int codegenAST(struct ASTnode *n, int label, int parentASTop) {
     // NOTE:
     // General AST node handling below
 
-    // Get the left and right sub-tree value
-    if (n->left) {
-        // Use NOREG because left subtree can use any register
-        leftRegister = codegenAST(n->left, NOLABEL, n->op);
-    }
-    if (n->right) {
-        rightRegister = codegenAST(n->right, NOLABEL, n->op);
+    // && and || evaluate their right operand only when needed
+    if (n->op == A_LOGICALAND || n->op == A_LOGICALOR) {
+        return codegenLogicalValue(n);
     }
 
+    // Get the left and right sub-tree value, starting with the one that
+    // needs more registers (see labelRegisterNeed())
+    codegenOperands(n, &leftRegister, &rightRegister);
+
     switch (n->op) {
     // Arithmetic operations
     case A_ADD:
@@ -258,16 +766,10 @@ int codegenAST(struct ASTnode *n, int label, int parentASTop) {
     case A_GT:
     case A_LE:
     case A_GE:
-        // If the parent ASFT node is an A_IF,
-        // generate a compare followed by a jjump.
-        // Otherwise, compare registers and set one to 1 or 0 based on the
-        // comparison.
-        if (parentASTop == A_IF || parentASTop == A_WHILE) {
-            return codegenCompareAndJump(n->op, leftRegister, rightRegister,
-                                         label);
-        } else {
-            return CG->compareAndSet(n->op, leftRegister, rightRegister);
-        }
+        // Compare registers and set one to 1 or 0 based on the comparison.
+        // (The conditions of A_IF and A_WHILE jump instead, see
+        // codegenCondition())
+        return CG->compareAndSet(n->op, leftRegister, rightRegister);
 
     // Leaf nodes
     case A_INTEGERLITERAL:
@@ -279,12 +781,12 @@ int codegenAST(struct ASTnode *n, int label, int parentASTop) {
         // Arrays are not scalar variables holding a pointer value.
         // In expressions, an array name evaluates to the address of its first
         // element ("array-to-pointer decay").
-        if (SymbolTable[n->v.identifierIndex].structuralType == S_ARRAY) {
+        if (getSymbol(n->v.identifierIndex)->structuralType == S_ARRAY) {
             return CG->addressOfSymbol(n->v.identifierIndex);
         }
 
         if (n->isRvalue || parentASTop == A_DEREFERENCE) {
-            if (SymbolTable[n->v.identifierIndex].class == C_LOCAL) {
+            if (getSymbol(n->v.identifierIndex)->class == C_LOCAL) {
                 return CG->loadLocalSymbol(n->v.identifierIndex, n->op);
             } else {
                 return CG->loadGlobalSymbol(n->v.identifierIndex, n->op);
@@ -296,10 +798,10 @@ int codegenAST(struct ASTnode *n, int label, int parentASTop) {
         // NOTE: For assignment, the parser swaps subtrees so that
         // n->left is the RHS expression (rvalue) and n->right is the LHS
         // (lvalue).
-        switch (n->right->op) {
+        switch (astRight(n)->op) {
         case A_IDENTIFIER: {
-            int lhsId = n->right->v.identifierIndex;
-            if (SymbolTable[lhsId].class == C_LOCAL) {
+            int lhsId = astRight(n)->v.identifierIndex;
+            if (getSymbol(lhsId)->class == C_LOCAL) {
                 // Local identifier assignment
                 if (!CG->storeLocalSymbol) {
                     logFatal("Target backend does not support local stores");
@@ -314,14 +816,14 @@ int codegenAST(struct ASTnode *n, int label, int parentASTop) {
             // rightRegister is the computed address
             // of the dereferenced pointer
             return CG->storeDereferencedPointer(leftRegister, rightRegister,
-                                                n->right->primitiveType);
+                                                astRight(n)->primitiveType);
         default:
             logFatald("can't assign (A_ASSIGN) to this AST node type: ",
-                      n->right->op);
+                      astRight(n)->op);
         }
     case A_WIDENTYPE:
         // Widen the child node's primitive type to the parent node's type
-        return CG->widenPrimitiveType(leftRegister, n->left->primitiveType,
+        return CG->widenPrimitiveType(leftRegister, astLeft(n)->primitiveType,
                                       n->primitiveType);
     case A_RETURN:
         CG->returnFromFunction(leftRegister, CurrentFunctionSymbolID);
@@ -332,7 +834,8 @@ int codegenAST(struct ASTnode *n, int label, int parentASTop) {
         return CG->addressOfSymbol(n->v.identifierIndex);
     case A_DEREFERENCE:
         if (n->isRvalue) {
-            return CG->dereferencePointer(leftRegister, n->left->primitiveType);
+            return CG->dereferencePointer(leftRegister,
+                                          astLeft(n)->primitiveType);
         } else {
             return leftRegister; // Lvalue: return address in leftRegister;
         }
@@ -355,28 +858,28 @@ int codegenAST(struct ASTnode *n, int label, int parentASTop) {
 
     case A_POSTINCREMENT:
         // Load the variable's value into a register then increment it
-        if (SymbolTable[n->v.identifierIndex].class == C_LOCAL) {
+        if (getSymbol(n->v.identifierIndex)->class == C_LOCAL) {
             return CG->loadLocalSymbol(n->v.identifierIndex, n->op);
         }
         return CG->loadGlobalSymbol(n->v.identifierIndex, n->op);
     case A_POSTDECREMENT:
         // Load the variable's value into a register then decrement it
-        if (SymbolTable[n->v.identifierIndex].class == C_LOCAL) {
+        if (getSymbol(n->v.identifierIndex)->class == C_LOCAL) {
             return CG->loadLocalSymbol(n->v.identifierIndex, n->op);
         }
         return CG->loadGlobalSymbol(n->v.identifierIndex, n->op);
     case A_PREINCREMENT:
         // Increment the variable's value then load it into a register
-        if (SymbolTable[n->left->v.identifierIndex].class == C_LOCAL) {
-            return CG->loadLocalSymbol(n->left->v.identifierIndex, n->op);
+        if (getSymbol(astLeft(n)->v.identifierIndex)->class == C_LOCAL) {
+            return CG->loadLocalSymbol(astLeft(n)->v.identifierIndex, n->op);
         }
-        return CG->loadGlobalSymbol(n->left->v.identifierIndex, n->op);
+        return CG->loadGlobalSymbol(astLeft(n)->v.identifierIndex, n->op);
     case A_PREDECREMENT:
         // Decrement the variable's value then load it into a register
-        if (SymbolTable[n->left->v.identifierIndex].class == C_LOCAL) {
-            return CG->loadLocalSymbol(n->left->v.identifierIndex, n->op);
+        if (getSymbol(astLeft(n)->v.identifierIndex)->class == C_LOCAL) {
+            return CG->loadLocalSymbol(astLeft(n)->v.identifierIndex, n->op);
         }
-        return CG->loadGlobalSymbol(n->left->v.identifierIndex, n->op);
+        return CG->loadGlobalSymbol(astLeft(n)->v.identifierIndex, n->op);
     case A_ARITHMETICNEGATE:
         // Arithmetic negation
         return CG->ArithmeticNegate(leftRegister);
@@ -387,11 +890,9 @@ int codegenAST(struct ASTnode *n, int label, int parentASTop) {
         // Logical NOT
         return CG->logicalNot(leftRegister);
     case A_TOBOOLEAN:
-        // If the present AST node is an A_IF or A_WHILE,
-        // generate a compare followed by a jump.
-        // Otherwise, set the register to 0(false) or 1(true) based on it's
-        // zeroeness or non-zeroeness
-        return CG->toBoolean(leftRegister, parentASTop, label);
+        // Set the register to 0(false) or 1(true) based on it's zeroeness or
+        // non-zeroeness
+        return CG->toBoolean(leftRegister, n->op, NOLABEL);
 
     default:
         // Should not reach here; unsupported operation
@@ -463,3 +964,12 @@ void codegenResetLocalOffset(void) { CG->resetLocalOffset(); }
 int codegenGetLocalOffset(int type, bool isFunctionParameter) {
     return CG->getLocalOffset(type, isFunctionParameter);
 }
+
+/**
+ * printRegisterStats - Print register allocation statistics (--stats).
+ *
+ * @param stream The stream to print to
+ */
+void printRegisterStats(FILE *stream) {
+    fprintf(stream, "Register allocator: %zu spills\n", spillCount);
+}
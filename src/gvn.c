@@ -0,0 +1,337 @@
+// src/gvn.c
+
+// Global value numbering over the SSA form of the IR (see ssa.c): removes
+// instructions that recompute a value already available in a temporary.
+
+#include "data.h"
+#include "decl.h"
+#include "defs.h"
+#include "ir.h"
+
+/**
+ * NOTE:
+ * Dominator-based value numbering (Briggs, Cooper and Simpson).
+ * Every SSA name gets a value number; two names with the same number hold
+ * the same value. An instruction's number is looked up by its operation,
+ * type, constant and operands' numbers (and, for loads, memory's number) in
+ * a table whose entries are scoped to the dominator tree: what a block
+ * computes is available in the blocks it dominates. When the value of an
+ * instruction writing a temporary is already held by another temporary,
+ * the instruction is removed and its readers read that one instead.
+ * - Copies take the number of their source.
+ * - A phi takes the number of its arguments when they all have the same,
+ *   and a new number otherwise (always in a loop header, whose arguments
+ *   from the loop are not numbered yet).
+ * - Calls and stores give memory a new number, so loads are only shared
+ *   while no store or call comes in between.
+ * Literals are numbered but not shared: loading one again is as cheap as
+ * keeping it in a register.
+ */
+
+// Expression looked up in the table
+struct gvnKey {
+    int op, type;
+    int64_t value;
+    int src1, src2; // Value numbers of the operands, or -1
+    int memory;     // Value number of memory for loads, or -1
+};
+
+// Table entry
+struct gvnEntry {
+    struct gvnKey key;
+    int number; // Value number of the expression
+    int holder; // Temporary holding it, or IR_NOVREG
+    int next;   // Next entry of the bucket, or -1
+    int bucket;
+};
+
+// Value numbering state of a function
+struct gvnState {
+    struct irFunction *f;
+    struct irSSA *ssa;
+    int *numbers; // Value number of each SSA name, or -1
+    int nextNumber;
+    int *buckets; // First entry of each bucket, or -1
+    int bucketMask;
+    struct gvnEntry *entries; // Entries of the blocks being visited
+    int entryCount;
+    int *replacement; // Register each temporary is read from
+    bool *removed;    // Instructions removed
+};
+
+// Instructions removed so far (see --stats)
+static size_t RedundantCount;
+
+/**
+ * isCommutative - Check whether an operation gives the same result with
+ * its operands swapped.
+ */
+static bool isCommutative(int op) {
+    switch (op) {
+    case A_ADD:
+    case A_MULTIPLY:
+    case A_BITWISEAND:
+    case A_BITWISEOR:
+    case A_BITWISEXOR:
+    case A_EQ:
+    case A_NE:
+        return true;
+    default:
+        return false;
+    }
+}
+
+/**
+ * hashKey - Hash an expression.
+ */
+static uint32_t hashKey(const struct gvnKey *key) {
+    uint64_t h = (uint64_t)key->op * 0x9e3779b97f4a7c15ull;
+
+    h = (h ^ (uint64_t)key->type) * 0x9e3779b97f4a7c15ull;
+    h = (h ^ (uint64_t)key->value) * 0x9e3779b97f4a7c15ull;
+    h = (h ^ (uint32_t)key->src1) * 0x9e3779b97f4a7c15ull;
+    h = (h ^ (uint32_t)key->src2) * 0x9e3779b97f4a7c15ull;
+    h = (h ^ (uint32_t)key->memory) * 0x9e3779b97f4a7c15ull;
+    return (uint32_t)(h >> 32);
+}
+
+/**
+ * lookupKey - Find the innermost entry of an expression.
+ *
+ * @return The entry's index, or -1
+ */
+static int lookupKey(struct gvnState *state, const struct gvnKey *key) {
+    int e = state->buckets[hashKey(key) & state->bucketMask];
+
+    for (; e >= 0; e = state->entries[e].next) {
+        const struct gvnKey *k = &state->entries[e].key;
+        if (k->op == key->op && k->type == key->type &&
+            k->value == key->value && k->src1 == key->src1 &&
+            k->src2 == key->src2 && k->memory == key->memory) {
+            return e;
+        }
+    }
+    return -1;
+}
+
+/**
+ * insertKey - Make an expression available in the current block and the
+ * blocks it dominates.
+ */
+static void insertKey(struct gvnState *state, const struct gvnKey *key,
+                      int number, int holder) {
+    struct gvnEntry *entry = &state->entries[state->entryCount];
+
+    entry->key = *key;
+    entry->number = number;
+    entry->holder = holder;
+    entry->bucket = hashKey(key) & state->bucketMask;
+    entry->next = state->buckets[entry->bucket];
+    state->buckets[entry->bucket] = state->entryCount++;
+}
+
+/**
+ * numberOf - The value number of an SSA name, or -1 for none.
+ */
+static int numberOf(struct gvnState *state, int name) {
+    return name == IR_NOVREG ? -1 : state->numbers[name];
+}
+
+/**
+ * numberPhi - Number a phi (see the NOTE above).
+ */
+static int numberPhi(struct gvnState *state, struct irPhi *phi) {
+    struct irSSA *ssa = state->ssa;
+    int count = ssa->predecessorStart[phi->block + 1] -
+                ssa->predecessorStart[phi->block];
+    int number = -1;
+
+    if (phi->block == 0) {
+        return state->nextNumber++; // Also entered from the caller
+    }
+    for (int a = 0; a < count; a++) {
+        if (phi->args[a] == IR_NOVREG) {
+            continue; // From an unreachable block
+        }
+        int arg = numberOf(state, phi->args[a]);
+        if (arg < 0 || (number >= 0 && arg != number)) {
+            return state->nextNumber++;
+        }
+        number = arg;
+    }
+    return number >= 0 ? number : state->nextNumber++;
+}
+
+/**
+ * numberInstruction - Number the value of an instruction, and remove the
+ * instruction if a temporary holds that value already.
+ */
+static void numberInstruction(struct gvnState *state, int i) {
+    struct irFunction *f = state->f;
+    struct irSSA *ssa = state->ssa;
+    struct irInstruction *in = &f->code[i];
+    int dst = ssa->dstName[i];
+    struct gvnKey key;
+    int e;
+
+    // A store or call gives memory a new name
+    if (ssa->memoryName[i] != IR_NOVREG &&
+        state->numbers[ssa->memoryName[i]] < 0) {
+        state->numbers[ssa->memoryName[i]] = state->nextNumber++;
+    }
+    if (dst == IR_NOVREG) {
+        return;
+    }
+
+    switch (in->op) {
+    case IR_COPY:
+        state->numbers[dst] = numberOf(state, ssa->src1Name[i]);
+        return;
+    case A_FUNCTIONCALL:
+        state->numbers[dst] = state->nextNumber++;
+        return;
+    }
+
+    key.op = in->op;
+    key.type = in->type;
+    key.value = in->value;
+    key.src1 = numberOf(state, ssa->src1Name[i]);
+    key.src2 = numberOf(state, ssa->src2Name[i]);
+    key.memory = in->op == A_IDENTIFIER || in->op == A_DEREFERENCE
+                     ? state->numbers[ssa->memoryName[i]]
+                     : -1;
+    if (isCommutative(in->op) && key.src1 > key.src2) {
+        int swap = key.src1;
+        key.src1 = key.src2;
+        key.src2 = swap;
+    }
+
+    bool isTemporary = in->dst >= f->variableCount;
+    e = lookupKey(state, &key);
+    if (e < 0) {
+        state->numbers[dst] = state->nextNumber++;
+        insertKey(state, &key, state->numbers[dst],
+                  isTemporary ? in->dst : IR_NOVREG);
+        return;
+    }
+
+    state->numbers[dst] = state->entries[e].number;
+    if (!isTemporary) {
+        return;
+    }
+    if (in->op == A_INTEGERLITERAL) {
+        return; // Not worth sharing
+    }
+    if (state->entries[e].holder == IR_NOVREG) {
+        // No temporary holds the value yet: this one will
+        insertKey(state, &key, state->entries[e].number, in->dst);
+        return;
+    }
+    state->replacement[in->dst] = state->entries[e].holder;
+    state->removed[i] = true;
+    RedundantCount++;
+}
+
+/**
+ * numberBlock - Number the values of a block, then of the blocks it
+ * dominates.
+ */
+static void numberBlock(struct gvnState *state, int b) {
+    struct irSSA *ssa = state->ssa;
+    struct irBlock *block = &state->f->blocks[b];
+    int mark = state->entryCount;
+
+    for (int p = ssa->phiStart[b]; p < ssa->phiStart[b + 1]; p++) {
+        state->numbers[ssa->phis[p].name] = numberPhi(state, &ssa->phis[p]);
+    }
+    for (int i = block->first; i <= block->last; i++) {
+        numberInstruction(state, i);
+    }
+
+    for (int c = ssa->childStart[b]; c < ssa->childStart[b + 1]; c++) {
+        numberBlock(state, ssa->children[c]);
+    }
+
+    // Leave the block's scope
+    while (state->entryCount > mark) {
+        struct gvnEntry *entry = &state->entries[--state->entryCount];
+        state->buckets[entry->bucket] = entry->next;
+    }
+}
+
+/**
+ * numberValues - Remove the instructions of a function that recompute a
+ * value held by a temporary (see the NOTE above).
+ *
+ * @param f The function, with its basic blocks
+ */
+void numberValues(struct irFunction *f) {
+    struct gvnState state;
+    int bucketCount = 16;
+
+    if (f->blockCount == 0) {
+        return;
+    }
+    while (bucketCount < 2 * f->count) {
+        bucketCount *= 2;
+    }
+
+    memset(&state, 0, sizeof(state));
+    state.f = f;
+    state.ssa = buildSSA(f);
+    state.numbers = malloc((state.ssa->nameCount + 1) * sizeof(int));
+    state.buckets = malloc(bucketCount * sizeof(int));
+    state.bucketMask = bucketCount - 1;
+    state.entries = malloc((f->count + 1) * sizeof(*state.entries));
+    state.replacement = malloc((f->vregCount + 1) * sizeof(int));
+    state.removed = calloc(f->count + 1, sizeof(bool));
+    if (state.numbers == NULL || state.buckets == NULL ||
+        state.entries == NULL || state.replacement == NULL ||
+        state.removed == NULL) {
+        logFatal("Out of memory for value numbering");
+    }
+
+    for (int n = 0; n < state.ssa->nameCount; n++) {
+        state.numbers[n] = -1;
+    }
+    for (int b = 0; b < bucketCount; b++) {
+        state.buckets[b] = -1;
+    }
+    for (int v = 0; v < f->vregCount; v++) {
+        state.replacement[v] = v;
+    }
+
+    // The variables' entry values are all different
+    for (int v = 0; v <= f->variableCount; v++) {
+        state.numbers[v] = state.nextNumber++;
+    }
+    numberBlock(&state, 0);
+
+    for (int i = 0; i < f->count; i++) {
+        struct irInstruction *in = &f->code[i];
+        if (in->src1 != IR_NOVREG) {
+            in->src1 = state.replacement[in->src1];
+        }
+        if (in->src2 != IR_NOVREG) {
+            in->src2 = state.replacement[in->src2];
+        }
+    }
+    removeInstructions(f, state.removed);
+
+    freeSSA(state.ssa);
+    free(state.numbers);
+    free(state.buckets);
+    free(state.entries);
+    free(state.replacement);
+    free(state.removed);
+}
+
+/**
+ * printValueNumberingStats - Print value numbering statistics (--stats).
+ *
+ * @param stream Output stream
+ */
+void printValueNumberingStats(FILE *stream) {
+    fprintf(stream, "Value numbering: %zu redundant instructions removed\n",
+            RedundantCount);
+}
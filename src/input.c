@@ -0,0 +1,131 @@
+// src/input.c
+
+// Source input layer: the whole source file is made available in memory so
+// the scanner can walk it with a pointer instead of calling fgetc().
+
+#include "data.h"
+#include "decl.h"
+
+#include <errno.h>
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+
+// Start of the source text and how it was obtained (for inputClose())
+static char *InputStart;
+static size_t InputSize;
+static bool InputMapped;
+
+/**
+ * readWhole - Read everything from a file descriptor into a heap buffer.
+ * Used for inputs that cannot be mapped (pipes, character devices, ...).
+ *
+ * @param fd The file descriptor to read from.
+ *
+ * @return true on success, false on a read error (errno set).
+ */
+static bool readWhole(int fd) {
+    size_t capacity = 64 * 1024;
+    size_t size = 0;
+    char *buffer = malloc(capacity);
+
+    if (buffer == NULL)
+        return false;
+
+    for (;;) {
+        if (size == capacity) {
+            capacity *= 2;
+            char *grown = realloc(buffer, capacity);
+            if (grown == NULL) {
+                free(buffer);
+                return false;
+            }
+            buffer = grown;
+        }
+
+        ssize_t n = read(fd, buffer + size, capacity - size);
+        if (n < 0) {
+            if (errno == EINTR)
+                continue;
+            free(buffer);
+            return false;
+        }
+        if (n == 0)
+            break;
+        size += (size_t)n;
+    }
+
+    InputStart = buffer;
+    InputSize = size;
+    InputMapped = false;
+    return true;
+}
+
+/**
+ * inputOpen - Make the source file available to the scanner.
+ *
+ * NOTE:
+ * Regular files are mapped read-only with mmap(); anything else (e.g. a
+ * pipe) is read in whole. Either way InputCursor/InputEnd delimit the text,
+ * which is not NUL-terminated.
+ *
+ * @param path Path of the source file.
+ *
+ * @return true on success, false (with errno set) on failure.
+ */
+bool inputOpen(const char *path) {
+    struct stat st;
+    int fd = open(path, O_RDONLY);
+
+    if (fd < 0)
+        return false;
+    if (fstat(fd, &st) != 0) {
+        int err = errno;
+        close(fd);
+        errno = err;
+        return false;
+    }
+
+    bool ok;
+    if (S_ISREG(st.st_mode) && st.st_size > 0) {
+        void *map =
+            mmap(NULL, (size_t)st.st_size, PROT_READ, MAP_PRIVATE, fd, 0);
+        ok = map != MAP_FAILED;
+        if (ok) {
+            // The scanner reads the file front to back exactly once
+            madvise(map, (size_t)st.st_size, MADV_SEQUENTIAL);
+            InputStart = map;
+            InputSize = (size_t)st.st_size;
+            InputMapped = true;
+        }
+    } else {
+        ok = readWhole(fd);
+    }
+
+    int err = errno;
+    close(fd);
+    if (!ok) {
+        errno = err;
+        return false;
+    }
+
+    InputCursor = InputStart;
+    InputEnd = InputStart + InputSize;
+    return true;
+}
+
+/**
+ * inputClose - Release the source text.
+ */
+void inputClose(void) {
+    if (InputMapped)
+        munmap(InputStart, InputSize);
+    else
+        free(InputStart);
+
+    InputStart = NULL;
+    InputSize = 0;
+    InputMapped = false;
+    InputCursor = InputEnd = NULL;
+}
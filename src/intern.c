@@ -0,0 +1,171 @@
+// src/intern.c
+
+// Interned string pool: every distinct name is stored once, so names can be
+// compared by pointer (e.g. in the symbol table index, see symbol.c).
+
+#include "data.h"
+#include "decl.h"
+
+#include <stdint.h>
+
+/**
+ * NOTE:
+ * The strings live in large pool blocks that are never freed individually;
+ * an open-addressing (linear probing) table maps each string to its single
+ * copy. The table keeps the full hash of every entry so that probing only
+ * calls strcmp() on a real hash match.
+ */
+
+#define INTERN_BLOCK_SIZE (64 * 1024)
+#define INTERN_INITIAL_CAPACITY 1024 // Must be a power of two
+
+struct internEntry {
+    const char *string; // NULL: empty slot
+    uint32_t hash;
+};
+
+struct internBlock {
+    struct internBlock *next;
+    size_t used;
+    size_t size;
+    char data[];
+};
+
+static struct internEntry *Entries;
+static size_t Capacity; // Number of slots in Entries (power of two)
+static size_t Count;    // Number of interned strings
+static struct internBlock *Blocks;
+
+/**
+ * hashString - FNV-1a hash of a string.
+ *
+ * @param s The string
+ * @param length Receives the length of the string
+ *
+ * @return The hash value
+ */
+static uint32_t hashString(const char *s, size_t *length) {
+    uint32_t hash = 2166136261u;
+    const char *p = s;
+
+    while (*p) {
+        hash = (hash ^ (unsigned char)*p++) * 16777619u;
+    }
+
+    *length = p - s;
+    return hash;
+}
+
+/**
+ * findSlot - Find the slot of a string, or the empty slot where it belongs.
+ */
+static size_t findSlot(const char *s, uint32_t hash) {
+    size_t mask = Capacity - 1;
+    size_t i = hash & mask;
+
+    while (Entries[i].string != NULL) {
+        if (Entries[i].hash == hash && !strcmp(Entries[i].string, s))
+            break;
+        i = (i + 1) & mask;
+    }
+
+    return i;
+}
+
+/**
+ * growTable - Double the table (or allocate the first one) and rehash.
+ */
+static void growTable(void) {
+    struct internEntry *old = Entries;
+    size_t oldCapacity = Capacity;
+
+    Capacity = Capacity ? Capacity * 2 : INTERN_INITIAL_CAPACITY;
+    Entries = calloc(Capacity, sizeof(struct internEntry));
+    if (Entries == NULL)
+        logFatal("Out of memory for the string pool");
+
+    for (size_t i = 0; i < oldCapacity; i++) {
+        if (old[i].string == NULL)
+            continue;
+        size_t j = old[i].hash & (Capacity - 1);
+        while (Entries[j].string != NULL) {
+            j = (j + 1) & (Capacity - 1);
+        }
+        Entries[j] = old[i];
+    }
+    free(old);
+}
+
+/**
+ * copyToPool - Copy a string into the pool storage.
+ */
+static const char *copyToPool(const char *s, size_t length) {
+    if (Blocks == NULL || Blocks->size - Blocks->used < length + 1) {
+        size_t size =
+            length + 1 > INTERN_BLOCK_SIZE ? length + 1 : INTERN_BLOCK_SIZE;
+        struct internBlock *block = malloc(sizeof(*block) + size);
+        if (block == NULL)
+            logFatal("Out of memory for the string pool");
+        block->next = Blocks;
+        block->used = 0;
+        block->size = size;
+        Blocks = block;
+    }
+
+    char *copy = Blocks->data + Blocks->used;
+    memcpy(copy, s, length + 1);
+    Blocks->used += length + 1;
+    return copy;
+}
+
+/**
+ * internString - Return the pooled copy of a string, adding it if needed.
+ *
+ * @param s The string to intern
+ *
+ * @return The unique pooled copy; equal strings give the same pointer
+ */
+const char *internString(const char *s) {
+    size_t length;
+    uint32_t hash = hashString(s, &length);
+
+    // Keep the load factor at or below 1/2
+    if ((Count + 1) * 2 > Capacity)
+        growTable();
+
+    size_t i = findSlot(s, hash);
+    if (Entries[i].string == NULL) {
+        Entries[i].string = copyToPool(s, length);
+        Entries[i].hash = hash;
+        Count++;
+    }
+
+    return Entries[i].string;
+}
+
+/**
+ * findInternedString - Look up the pooled copy of a string without adding
+ * it.
+ *
+ * @param s The string to look up
+ *
+ * @return The pooled copy, or NULL if the string was never interned
+ */
+const char *findInternedString(const char *s) {
+    size_t length;
+
+    if (Count == 0)
+        return NULL;
+    return Entries[findSlot(s, hashString(s, &length))].string;
+}
+
+/**
+ * internPointerHash - Hash of an interned string's address, for tables
+ * keyed by interned names.
+ */
+uint32_t internPointerHash(const char *s) {
+    uintptr_t p = (uintptr_t)s;
+
+    // Fibonacci hashing; the low bits of heap addresses carry little entropy
+    return (uint32_t)((p * 0x9E3779B97F4A7C15ull) >> 32);
+}
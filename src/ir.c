@@ -0,0 +1,1001 @@
+// src/ir.c
+
+// Translation of a function's AST into the three-address IR (see ir.h), which
+// replaces direct code generation from the tree at -O1.
+
+#include "ir.h"
+
+#include "data.h"
+#include "decl.h"
+#include "defs.h"
+#include <limits.h>
+
+/**
+ * NOTE:
+ * Scalar locals live in virtual registers.
+ * A local variable whose address is never taken cannot be reached through a
+ * pointer, so it gets a virtual register of its own instead of being loaded
+ * and stored through its stack slot: a read uses the register, and an
+ * assignment narrows the value to the variable's type (IR_NARROW), so that
+ * the register always holds what a load of the variable would give.
+ * Globals, arrays and locals whose address is taken stay in memory
+ * (A_IDENTIFIER / A_ASSIGN).
+ * These registers are the first ones of the function (0 ... LocalCount - 1);
+ * the register allocator (regalloc.c) decides which of them end up in
+ * machine registers across statements.
+ */
+
+#define IR_INITIAL_CAPACITY 256
+
+static struct irFunction *Function; // IR being built
+static int *LocalRegisters;     // Vreg of each local by position, or IR_NOVREG
+static int LocalCount;          // Number of locals of the function
+static int VariableCount;       // Vregs given to locals (the first ones)
+static int NextLogicalVariable; // Next vreg reserved for an && or || value
+
+/**
+ * appendInstruction - Append an instruction to the function being built.
+ */
+static void appendInstruction(int op, int type, int dst, int src1, int src2,
+                              int64_t value) {
+    struct irInstruction *in;
+
+    if (Function->count == Function->capacity) {
+        Function->capacity *= 2;
+        Function->code = realloc(Function->code,
+                                 Function->capacity * sizeof(*Function->code));
+        if (Function->code == NULL) {
+            logFatal("Out of memory for the IR");
+        }
+    }
+
+    in = &Function->code[Function->count++];
+    in->op = op;
+    in->type = type;
+    in->dst = dst;
+    in->src1 = src1;
+    in->src2 = src2;
+    in->value = value;
+}
+
+/**
+ * emitValue - Append an instruction computing a value into a new virtual
+ * register.
+ *
+ * @return The new virtual register
+ */
+static int emitValue(int op, int type, int src1, int src2, int64_t value) {
+    int dst = Function->vregCount++;
+
+    appendInstruction(op, type, dst, src1, src2, value);
+    return dst;
+}
+
+/**
+ * localRegister - The virtual register of a local variable.
+ *
+ * @param id The symbol of the variable
+ *
+ * @return The virtual register, or IR_NOVREG if the variable is in memory
+ */
+static int localRegister(int id) {
+    int position = localSymbolPosition(id);
+
+    return position < 0 ? IR_NOVREG : LocalRegisters[position];
+}
+
+/**
+ * markAddressTaken - Find the locals whose address is taken in a tree.
+ *
+ * @param n The root of the tree
+ * @param taken Flags indexed by local position
+ */
+static void markAddressTaken(struct ASTnode *n, bool *taken) {
+    int position;
+
+    if (n == NULL) {
+        return;
+    }
+
+    if (n->op == A_ADDRESSOF) {
+        position = localSymbolPosition(n->v.identifierIndex);
+        if (position >= 0) {
+            taken[position] = true;
+        }
+    }
+
+    markAddressTaken(astLeft(n), taken);
+    markAddressTaken(astMiddle(n), taken);
+    markAddressTaken(astRight(n), taken);
+}
+
+/**
+ * countLogicalValues - Count the && and || of a tree whose value is used
+ * (rather than only branched on, see buildCondition()).
+ *
+ * @param n The root of the tree
+ * @param condition n is a condition or part of one
+ */
+static int countLogicalValues(struct ASTnode *n, bool condition) {
+    if (n == NULL) {
+        return 0;
+    }
+
+    switch (n->op) {
+    case A_IF:
+        return countLogicalValues(astLeft(n), true) +
+               countLogicalValues(astMiddle(n), false) +
+               countLogicalValues(astRight(n), false);
+    case A_WHILE:
+        // The condition is translated twice (see buildStatement())
+        return 2 * countLogicalValues(astLeft(n), true) +
+               countLogicalValues(astRight(n), false);
+    case A_LOGICALAND:
+    case A_LOGICALOR:
+        // Its operands are conditions even where its value is used
+        return !condition + countLogicalValues(astLeft(n), true) +
+               countLogicalValues(astRight(n), true);
+    case A_TOBOOLEAN:
+    case A_LOGICALNOT:
+        return countLogicalValues(astLeft(n), condition);
+    }
+
+    return countLogicalValues(astLeft(n), false) +
+           countLogicalValues(astMiddle(n), false) +
+           countLogicalValues(astRight(n), false);
+}
+
+/**
+ * assignLocalRegisters - Give every scalar local whose address is never
+ * taken a virtual register.
+ */
+static void assignLocalRegisters(struct ASTnode *n) {
+    bool *taken;
+    struct symbolTable *symbol;
+
+    LocalCount = countLocalSymbols();
+    LocalRegisters = malloc((LocalCount + 1) * sizeof(int));
+    taken = calloc(LocalCount + 1, sizeof(bool));
+    if (LocalRegisters == NULL || taken == NULL) {
+        logFatal("Out of memory for the IR");
+    }
+
+    markAddressTaken(n, taken);
+    for (int i = 0; i < LocalCount; i++) {
+        LocalRegisters[i] = IR_NOVREG;
+    }
+    for (int i = 0; i < LocalCount; i++) {
+        symbol = getSymbol(localSymbolId(i));
+        if (symbol->structuralType == S_VARIABLE && !taken[i]) {
+            LocalRegisters[i] = Function->vregCount++;
+        }
+    }
+    // The value of an && or || is assigned on two paths, so it is a
+    // variable too
+    NextLogicalVariable = Function->vregCount;
+    Function->vregCount += countLogicalValues(n, false);
+    VariableCount = Function->vregCount;
+    Function->variableCount = VariableCount;
+
+    free(taken);
+}
+
+/**
+ * hasSideEffects - Check whether evaluating a tree can change a variable.
+ *
+ * NOTE:
+ * Calls are not counted: the only variables kept in virtual registers are
+ * locals whose address is never taken, which a callee cannot reach.
+ */
+static bool hasSideEffects(struct ASTnode *n) {
+    if (n == NULL) {
+        return false;
+    }
+
+    switch (n->op) {
+    case A_ASSIGN:
+    case A_PREINCREMENT:
+    case A_PREDECREMENT:
+    case A_POSTINCREMENT:
+    case A_POSTDECREMENT:
+        return true;
+    }
+
+    return hasSideEffects(astLeft(n)) || hasSideEffects(astMiddle(n)) ||
+           hasSideEffects(astRight(n));
+}
+
+/**
+ * keepOperand - Make sure an operand keeps its value while the next operand
+ * is evaluated.
+ *
+ * @param vreg The operand's virtual register
+ * @param next The tree evaluated next
+ *
+ * @return vreg, or a copy of it if it is a variable that next may assign
+ */
+static int keepOperand(int vreg, struct ASTnode *next) {
+    if (vreg != IR_NOVREG && vreg < VariableCount && hasSideEffects(next)) {
+        return emitValue(IR_COPY, P_LONG, vreg, IR_NOVREG, 0);
+    }
+    return vreg;
+}
+
+static int buildExpression(struct ASTnode *n);
+static int buildLogicalValue(struct ASTnode *n);
+
+/**
+ * hasCalls - Check whether a tree calls a function.
+ */
+static bool hasCalls(struct ASTnode *n) {
+    if (n == NULL) {
+        return false;
+    }
+
+    return n->op == A_FUNCTIONCALL || hasCalls(astLeft(n)) ||
+           hasCalls(astMiddle(n)) || hasCalls(astRight(n));
+}
+
+/**
+ * buildOperands - Translate the two operands of a binary operator.
+ *
+ * NOTE:
+ * Like the direct code generation, the operand that needs more registers
+ * (see labelRegisterNeed() in gen.c) is evaluated first, so that fewer
+ * values are live at once. The order only changes when neither operand
+ * assigns a variable or calls a function, as the result would otherwise
+ * depend on it.
+ *
+ * @param left The left operand
+ * @param right The right operand
+ * @param rightVreg Receives the right operand's virtual register
+ *
+ * @return The left operand's virtual register
+ */
+static int buildOperands(struct ASTnode *left, struct ASTnode *right,
+                         int *rightVreg) {
+    int leftVreg;
+
+    if (right->registerNeed > left->registerNeed && !hasSideEffects(left) &&
+        !hasSideEffects(right) && !hasCalls(left) && !hasCalls(right)) {
+        *rightVreg = buildExpression(right);
+        return buildExpression(left);
+    }
+
+    leftVreg = keepOperand(buildExpression(left), right);
+    *rightVreg = buildExpression(right);
+    return leftVreg;
+}
+
+/**
+ * NOTE:
+ * Strength reduction.
+ * A multiplication or signed division by a constant is translated without
+ * A_MULTIPLY or A_DIVIDE where a cheaper sequence exists:
+ * - x * c:  one shift for c = 2^i, two shifts and an add or subtract for
+ *           c = 2^i + 2^j or c = 2^i - 2^j, negated if c < 0.
+ * - x / c:  a rounding-corrected shift for c = 2^k, otherwise a multiply by
+ *           the "magic" reciprocal of c followed by shifts (Hacker's
+ *           Delight, 10-1), negated if c < 0.
+ * Like the instructions they replace, both work on the full 64-bit value.
+ */
+
+/**
+ * isPowerOfTwo - Check whether a value is a power of two.
+ */
+static bool isPowerOfTwo(uint64_t value) {
+    return value != 0 && (value & (value - 1)) == 0;
+}
+
+/**
+ * log2Exact - The exponent of a power of two.
+ */
+static int log2Exact(uint64_t value) {
+    int exponent = 0;
+
+    while (value > 1) {
+        value >>= 1;
+        exponent++;
+    }
+    return exponent;
+}
+
+/**
+ * signedDivisionMagic - Compute the magic multiplier and shift that replace
+ * a signed 64-bit division by a constant.
+ *
+ * @param divisor The divisor, at least 3 and not a power of two.
+ * @param multiplier Receives the magic multiplier.
+ * @param shift Receives the shift applied to the upper half of the product.
+ */
+static void signedDivisionMagic(uint64_t divisor, int64_t *multiplier,
+                                int *shift) {
+    const uint64_t two63 = 1ull << 63;
+    uint64_t absoluteNc = two63 - 1 - two63 % divisor;
+    uint64_t q1 = two63 / absoluteNc, r1 = two63 - q1 * absoluteNc;
+    uint64_t q2 = two63 / divisor, r2 = two63 - q2 * divisor;
+    uint64_t delta;
+    int p = 63;
+
+    do {
+        p++;
+        q1 *= 2;
+        r1 *= 2;
+        if (r1 >= absoluteNc) {
+            q1++;
+            r1 -= absoluteNc;
+        }
+        q2 *= 2;
+        r2 *= 2;
+        if (r2 >= divisor) {
+            q2++;
+            r2 -= divisor;
+        }
+        delta = divisor - r2;
+    } while (q1 < delta || (q1 == delta && r1 == 0));
+
+    *multiplier = (int64_t)(q2 + 1);
+    *shift = p - 64;
+}
+
+/**
+ * shiftByConstant - Append a shift of a register by a constant amount.
+ *
+ * @return The virtual register holding the result
+ */
+static int shiftByConstant(int op, int type, int vreg, int amount) {
+    return emitValue(op, type, vreg, IR_NOVREG, amount);
+}
+
+/**
+ * multiplyByConstant - Translate a multiplication by a constant into shifts
+ * and adds.
+ *
+ * @param vreg The virtual register to multiply
+ * @param type The type of the product
+ * @param value The constant factor
+ *
+ * @return The virtual register holding the product, or IR_NOVREG if no
+ * cheaper sequence exists
+ */
+static int multiplyByConstant(int vreg, int type, int value) {
+    uint64_t factor = value < 0 ? -(uint64_t)value : (uint64_t)value;
+    uint64_t low = factor & -factor; // lowest set bit
+    int high, lowPart;
+
+    if (factor == 0) {
+        return IR_NOVREG;
+    }
+
+    if (isPowerOfTwo(factor)) {
+        // x * 2^i
+        if (factor > 1) {
+            vreg = shiftByConstant(IR_SHIFTLEFTCONST, type, vreg,
+                                   log2Exact(factor));
+        }
+    } else if (isPowerOfTwo(factor - low) || isPowerOfTwo(factor + low)) {
+        // x * (2^i + 2^j): (x << i) + (x << j)
+        // x * (2^i - 2^j): (x << i) - (x << j)
+        bool isSum = isPowerOfTwo(factor - low);
+        high = shiftByConstant(IR_SHIFTLEFTCONST, type, vreg,
+                               log2Exact(isSum ? factor - low : factor + low));
+        lowPart = vreg;
+        if (low > 1) {
+            lowPart =
+                shiftByConstant(IR_SHIFTLEFTCONST, type, vreg, log2Exact(low));
+        }
+        vreg = emitValue(isSum ? A_ADD : A_SUBTRACT, type, high, lowPart, 0);
+    } else {
+        return IR_NOVREG;
+    }
+
+    return value < 0 ? emitValue(A_ARITHMETICNEGATE, type, vreg, IR_NOVREG, 0)
+                     : vreg;
+}
+
+/**
+ * divideByConstant - Translate a signed, truncating division by a constant
+ * without a division.
+ *
+ * @param vreg The virtual register holding the dividend
+ * @param type The type of the quotient
+ * @param value The constant divisor
+ *
+ * @return The virtual register holding the quotient, or IR_NOVREG for a
+ * zero divisor
+ */
+static int divideByConstant(int vreg, int type, int value) {
+    uint64_t divisor = value < 0 ? -(uint64_t)value : (uint64_t)value;
+    int64_t multiplier;
+    int shift, correction, product;
+
+    if (divisor == 0) {
+        return IR_NOVREG;
+    }
+
+    if (isPowerOfTwo(divisor)) {
+        // Shifting rounds towards minus infinity: add 2^k - 1 first to
+        // negative dividends, i.e. ((x >> 63) >>> (64 - k)).
+        int k = log2Exact(divisor);
+        if (k > 0) {
+            correction = vreg;
+            if (k > 1) {
+                correction = shiftByConstant(IR_ARITHSHIFTRIGHTCONST, type,
+                                             correction, 63);
+            }
+            correction =
+                shiftByConstant(IR_SHIFTRIGHTCONST, type, correction, 64 - k);
+            vreg = emitValue(A_ADD, type, correction, vreg, 0);
+            vreg = shiftByConstant(IR_ARITHSHIFTRIGHTCONST, type, vreg, k);
+        }
+    } else {
+        // q = (mulhs(x, M) [+ x]) >> s, then add 1 if q is negative
+        signedDivisionMagic(divisor, &multiplier, &shift);
+        product = emitValue(IR_MULHIGHCONST, type, vreg, IR_NOVREG, multiplier);
+        if (multiplier < 0) {
+            product = emitValue(A_ADD, type, product, vreg, 0);
+        }
+        if (shift > 0) {
+            product =
+                shiftByConstant(IR_ARITHSHIFTRIGHTCONST, type, product, shift);
+        }
+        correction = shiftByConstant(IR_SHIFTRIGHTCONST, type, product, 63);
+        vreg = emitValue(A_ADD, type, correction, product, 0);
+    }
+
+    return value < 0 ? emitValue(A_ARITHMETICNEGATE, type, vreg, IR_NOVREG, 0)
+                     : vreg;
+}
+
+/**
+ * buildMultiplyDivide - Translate an A_MULTIPLY or A_DIVIDE node,
+ * strength-reducing it when one operand is a constant.
+ *
+ * @return The virtual register holding the result
+ */
+static int buildMultiplyDivide(struct ASTnode *n) {
+    struct ASTnode *left = astLeft(n);
+    struct ASTnode *right = astRight(n);
+    struct ASTnode *operand = left;
+    int value, vreg, rightVreg, result;
+
+    if (right->op == A_INTEGERLITERAL) {
+        value = right->v.intvalue;
+    } else if (n->op == A_MULTIPLY && left->op == A_INTEGERLITERAL) {
+        // Multiplication commutes and the literal has no side effects
+        value = left->v.intvalue;
+        operand = right;
+    } else {
+        vreg = buildOperands(left, right, &rightVreg);
+        return emitValue(n->op, n->primitiveType, vreg, rightVreg, 0);
+    }
+
+    vreg = buildExpression(operand);
+    if (n->op == A_MULTIPLY) {
+        result = multiplyByConstant(vreg, n->primitiveType, value);
+    } else {
+        result = divideByConstant(vreg, n->primitiveType, value);
+    }
+    if (result == IR_NOVREG) {
+        result = emitValue(
+            n->op, n->primitiveType, vreg,
+            emitValue(A_INTEGERLITERAL, P_INT, IR_NOVREG, IR_NOVREG, value), 0);
+    }
+    return result;
+}
+
+/**
+ * narrowInto - Append the assignment of a value to a variable register,
+ * narrowed to the variable's type.
+ */
+static void narrowInto(int variable, int vreg, int type) {
+    appendInstruction(type == P_CHAR || type == P_INT ? IR_NARROW : IR_COPY,
+                      type, variable, vreg, IR_NOVREG, 0);
+}
+
+/**
+ * buildIncrementDecrement - Translate a pre- or post-increment or decrement
+ * of a variable.
+ *
+ * NOTE:
+ * Like the direct code generation, the variable is changed by one whatever
+ * its type (pointers are not scaled). A pre-increment gives the variable's
+ * new value, as a load after the store would; a post-increment gives the
+ * old one.
+ *
+ * @return The virtual register holding the expression's value
+ */
+static int buildIncrementDecrement(struct ASTnode *n) {
+    bool isPost = n->op == A_POSTINCREMENT || n->op == A_POSTDECREMENT;
+    int op = n->op == A_PREINCREMENT || n->op == A_POSTINCREMENT ? A_ADD
+                                                                 : A_SUBTRACT;
+    int id = isPost ? n->v.identifierIndex : astLeft(n)->v.identifierIndex;
+    int type = getSymbol(id)->primitiveType;
+    int variable = localRegister(id);
+    int one, old, updated;
+
+    one = emitValue(A_INTEGERLITERAL, P_INT, IR_NOVREG, IR_NOVREG, 1);
+    if (variable != IR_NOVREG) {
+        old = isPost ? emitValue(IR_COPY, type, variable, IR_NOVREG, 0)
+                     : IR_NOVREG;
+        updated = emitValue(op, type, variable, one, 0);
+        narrowInto(variable, updated, type);
+        return isPost ? old : variable;
+    }
+
+    old = emitValue(A_IDENTIFIER, type, IR_NOVREG, IR_NOVREG, id);
+    updated = emitValue(op, type, old, one, 0);
+    appendInstruction(A_ASSIGN, type, IR_NOVREG, updated, IR_NOVREG, id);
+    if (isPost) {
+        return old;
+    }
+    if (type == P_CHAR || type == P_INT) {
+        return emitValue(IR_NARROW, type, updated, IR_NOVREG, 0);
+    }
+    return updated;
+}
+
+/**
+ * buildAssignment - Translate an assignment.
+ *
+ * NOTE:
+ * The parser swaps the subtrees: n->left is the value and n->right the
+ * variable or the dereferenced address assigned to. The value of the
+ * assignment is the value before it is narrowed to the variable's type,
+ * like in the direct code generation.
+ *
+ * @return The virtual register holding the assigned value
+ */
+static int buildAssignment(struct ASTnode *n) {
+    struct ASTnode *target = astRight(n);
+    int value = buildExpression(astLeft(n));
+    int id, variable, address;
+
+    switch (target->op) {
+    case A_IDENTIFIER:
+        id = target->v.identifierIndex;
+        variable = localRegister(id);
+        if (variable != IR_NOVREG) {
+            narrowInto(variable, value, getSymbol(id)->primitiveType);
+        } else {
+            appendInstruction(A_ASSIGN, getSymbol(id)->primitiveType, IR_NOVREG,
+                              value, IR_NOVREG, id);
+        }
+        return value;
+    case A_DEREFERENCE:
+        value = keepOperand(value, astLeft(target));
+        address = buildExpression(astLeft(target));
+        appendInstruction(IR_STOREINDIRECT, target->primitiveType, IR_NOVREG,
+                          value, address, 0);
+        return value;
+    default:
+        logFatald("can't assign (A_ASSIGN) to this AST node type: ",
+                  target->op);
+        return IR_NOVREG; // Unreachable
+    }
+}
+
+/**
+ * buildExpression - Translate an expression.
+ *
+ * @param n The root of the expression
+ *
+ * @return The virtual register holding its value, or IR_NOVREG
+ */
+static int buildExpression(struct ASTnode *n) {
+    struct ASTnode *left, *right;
+    int vreg, rightVreg, id;
+
+    if (n == NULL) {
+        return IR_NOVREG;
+    }
+
+    left = astLeft(n);
+    right = astRight(n);
+
+    switch (n->op) {
+    case A_INTEGERLITERAL:
+        return emitValue(n->op, n->primitiveType, IR_NOVREG, IR_NOVREG,
+                         n->v.intvalue);
+    case A_STRINGLITERAL:
+    case A_ADDRESSOF:
+        return emitValue(n->op, n->primitiveType, IR_NOVREG, IR_NOVREG,
+                         n->v.identifierIndex);
+    case A_IDENTIFIER:
+        id = n->v.identifierIndex;
+        // An array name evaluates to the address of its first element
+        if (getSymbol(id)->structuralType == S_ARRAY) {
+            return emitValue(A_ADDRESSOF, n->primitiveType, IR_NOVREG,
+                             IR_NOVREG, id);
+        }
+        vreg = localRegister(id);
+        if (vreg != IR_NOVREG) {
+            return vreg;
+        }
+        return emitValue(n->op, getSymbol(id)->primitiveType, IR_NOVREG,
+                         IR_NOVREG, id);
+    case A_ASSIGN:
+        return buildAssignment(n);
+    case A_PREINCREMENT:
+    case A_PREDECREMENT:
+    case A_POSTINCREMENT:
+    case A_POSTDECREMENT:
+        return buildIncrementDecrement(n);
+    case A_WIDENTYPE:
+        // Values are kept widened to 64 bits already
+        return buildExpression(left);
+    case A_SCALETYPE:
+        vreg = buildExpression(left);
+        id = multiplyByConstant(vreg, n->primitiveType, n->v.size);
+        if (id != IR_NOVREG) {
+            return id;
+        }
+        return emitValue(
+            A_MULTIPLY, n->primitiveType, vreg,
+            emitValue(A_INTEGERLITERAL, P_INT, IR_NOVREG, IR_NOVREG, n->v.size),
+            0);
+    case A_MULTIPLY:
+    case A_DIVIDE:
+        return buildMultiplyDivide(n);
+    case A_DEREFERENCE:
+        vreg = buildExpression(left);
+        if (!n->isRvalue) {
+            return vreg; // Lvalue: the address
+        }
+        return emitValue(n->op, left->primitiveType, vreg, IR_NOVREG, 0);
+    case A_FUNCTIONCALL:
+        return emitValue(n->op, n->primitiveType, buildExpression(left),
+                         IR_NOVREG, n->v.identifierIndex);
+    case A_ARITHMETICNEGATE:
+    case A_LOGICALINVERT:
+    case A_LOGICALNOT:
+    case A_TOBOOLEAN:
+        return emitValue(n->op, n->primitiveType, buildExpression(left),
+                         IR_NOVREG, 0);
+    case A_LOGICALAND:
+    case A_LOGICALOR:
+        return buildLogicalValue(n);
+    case A_ADD:
+    case A_SUBTRACT:
+    case A_BITWISEAND:
+    case A_BITWISEOR:
+    case A_BITWISEXOR:
+    case A_LSHIFT:
+    case A_RSHIFT:
+    case A_EQ:
+    case A_NE:
+    case A_LT:
+    case A_GT:
+    case A_LE:
+    case A_GE:
+        vreg = buildOperands(left, right, &rightVreg);
+        return emitValue(n->op, n->primitiveType, vreg, rightVreg, 0);
+    default:
+        logFatald("Unknown AST operator: ", n->op);
+        return IR_NOVREG; // Unreachable
+    }
+}
+
+/**
+ * buildCondition - Translate a condition into conditional branches
+ * (jumping code, see codegenCondition() in gen.c): && and || branch as soon
+ * as one operand decides the outcome, and ! swaps the branch's sense, so no
+ * 0 or 1 value is computed.
+ *
+ * @param n The condition
+ * @param label The label to branch to
+ * @param whenTrue Branch when the condition is true rather than false
+ */
+static void buildCondition(struct ASTnode *n, int label, bool whenTrue) {
+    int left, right, labelSkip;
+
+    switch (n->op) {
+    case A_EQ:
+    case A_NE:
+    case A_LT:
+    case A_GT:
+    case A_LE:
+    case A_GE:
+        left = buildOperands(astLeft(n), astRight(n), &right);
+        appendInstruction(IR_BRANCH,
+                          whenTrue ? n->op : codegenInvertComparison(n->op),
+                          IR_NOVREG, left, right, label);
+        break;
+    case A_TOBOOLEAN:
+        buildCondition(astLeft(n), label, whenTrue);
+        break;
+    case A_LOGICALNOT:
+        buildCondition(astLeft(n), label, !whenTrue);
+        break;
+    case A_LOGICALAND:
+    case A_LOGICALOR:
+        if ((n->op == A_LOGICALAND) != whenTrue) {
+            // Either operand alone can take the branch
+            buildCondition(astLeft(n), label, whenTrue);
+            buildCondition(astRight(n), label, whenTrue);
+        } else {
+            // The left operand alone can only skip the right one
+            labelSkip = codegenGetLabelNumber();
+            buildCondition(astLeft(n), labelSkip, !whenTrue);
+            buildCondition(astRight(n), label, whenTrue);
+            appendInstruction(IR_LABEL, P_NONE, IR_NOVREG, IR_NOVREG, IR_NOVREG,
+                              labelSkip);
+        }
+        break;
+    default:
+        appendInstruction(IR_BRANCH, whenTrue ? A_NE : A_EQ, IR_NOVREG,
+                          buildExpression(n), IR_NOVREG, label);
+        break;
+    }
+}
+
+/**
+ * buildLogicalValue - Translate the value (0 or 1) of an && or || outside
+ * of a condition: the branches of the condition lead to the assignment of
+ * 1 or 0 to a variable reserved for it (see countLogicalValues()).
+ *
+ * @return The variable's virtual register
+ */
+static int buildLogicalValue(struct ASTnode *n) {
+    int variable = NextLogicalVariable++;
+    int labelFalse = codegenGetLabelNumber();
+    int labelEnd = codegenGetLabelNumber();
+
+    buildCondition(n, labelFalse, false);
+    appendInstruction(
+        IR_COPY, P_INT, variable,
+        emitValue(A_INTEGERLITERAL, P_INT, IR_NOVREG, IR_NOVREG, 1), IR_NOVREG,
+        0);
+    appendInstruction(IR_JUMP, P_NONE, IR_NOVREG, IR_NOVREG, IR_NOVREG,
+                      labelEnd);
+    appendInstruction(IR_LABEL, P_NONE, IR_NOVREG, IR_NOVREG, IR_NOVREG,
+                      labelFalse);
+    appendInstruction(
+        IR_COPY, P_INT, variable,
+        emitValue(A_INTEGERLITERAL, P_INT, IR_NOVREG, IR_NOVREG, 0), IR_NOVREG,
+        0);
+    appendInstruction(IR_LABEL, P_NONE, IR_NOVREG, IR_NOVREG, IR_NOVREG,
+                      labelEnd);
+    return variable;
+}
+
+/**
+ * NOTE:
+ * Loop rotation.
+ * codegenWhileStatementAST() tests the condition at the top of the loop and
+ * jumps back to it after the body, so every iteration takes a jump and a
+ * conditional branch. The IR tests the condition once before the loop
+ * (skipping it if false) and again after the body, branching back while it
+ * holds:
+ *
+ *         if (!condition) goto end;
+ *     start:
+ *         body
+ *         if (condition) goto start;
+ *     end:
+ *
+ * An iteration then takes the single backward branch. The condition's code
+ * appears twice, but it is evaluated as many times as before. A `for` loop
+ * is an A_WHILE whose body ends with the post-operation (see
+ * forStatement()), so it is rotated the same way.
+ */
+
+/**
+ * buildStatement - Translate a statement (or a glued list of them).
+ */
+static void buildStatement(struct ASTnode *n) {
+    int labelFalse, labelStart, labelEnd;
+
+    if (n == NULL) {
+        return;
+    }
+
+    switch (n->op) {
+    case A_GLUE:
+        buildStatement(astLeft(n));
+        buildStatement(astRight(n));
+        break;
+    case A_IF:
+        // Same layout as codegenIfStatementAST()
+        labelFalse = codegenGetLabelNumber();
+        labelEnd = astRight(n) ? codegenGetLabelNumber() : labelFalse;
+        buildCondition(astLeft(n), labelFalse, false);
+        buildStatement(astMiddle(n));
+        if (astRight(n)) {
+            appendInstruction(IR_JUMP, P_NONE, IR_NOVREG, IR_NOVREG, IR_NOVREG,
+                              labelEnd);
+            appendInstruction(IR_LABEL, P_NONE, IR_NOVREG, IR_NOVREG, IR_NOVREG,
+                              labelFalse);
+            buildStatement(astRight(n));
+        }
+        appendInstruction(IR_LABEL, P_NONE, IR_NOVREG, IR_NOVREG, IR_NOVREG,
+                          labelEnd);
+        break;
+    case A_WHILE:
+        // Rotated loop (see the NOTE above); the body is the right child
+        labelStart = codegenGetLabelNumber();
+        labelEnd = codegenGetLabelNumber();
+        buildCondition(astLeft(n), labelEnd, false);
+        appendInstruction(IR_LABEL, P_NONE, IR_NOVREG, IR_NOVREG, IR_NOVREG,
+                          labelStart);
+        buildStatement(astRight(n));
+        buildCondition(astLeft(n), labelStart, true);
+        appendInstruction(IR_LABEL, P_NONE, IR_NOVREG, IR_NOVREG, IR_NOVREG,
+                          labelEnd);
+        break;
+    case A_RETURN:
+        appendInstruction(A_RETURN,
+                          getSymbol(Function->functionId)->primitiveType,
+                          IR_NOVREG, buildExpression(astLeft(n)), IR_NOVREG, 0);
+        appendInstruction(IR_JUMP, P_NONE, IR_NOVREG, IR_NOVREG, IR_NOVREG,
+                          Function->exitLabel);
+        break;
+    default:
+        // Expression statement; its value is not used
+        buildExpression(n);
+        break;
+    }
+}
+
+/**
+ * isBlockEnd - Check whether an instruction ends its basic block.
+ */
+static bool isBlockEnd(int op) { return op == IR_JUMP || op == IR_BRANCH; }
+
+/**
+ * buildBasicBlocks - Split a function's instructions into basic blocks and
+ * link them to their successors. Passes that change the instructions call
+ * it again.
+ *
+ * @param f The function; f->blocks and f->blockCount are (re)computed
+ */
+void buildBasicBlocks(struct irFunction *f) {
+    struct irBlock *blocks;
+    int *blockOfLabel;
+    int minLabel = INT_MAX, maxLabel = INT_MIN;
+    int count = 0;
+
+    free(f->blocks);
+    blocks = calloc(f->count + 1, sizeof(*blocks));
+    if (blocks == NULL) {
+        logFatal("Out of memory for the IR");
+    }
+
+    for (int i = 0; i < f->count; i++) {
+        struct irInstruction *in = &f->code[i];
+        if (i == 0 || in->op == IR_LABEL || isBlockEnd(f->code[i - 1].op)) {
+            if (count > 0) {
+                blocks[count - 1].last = i - 1;
+            }
+            blocks[count++].first = i;
+        }
+        if (in->op == IR_LABEL) {
+            minLabel = in->value < minLabel ? in->value : minLabel;
+            maxLabel = in->value > maxLabel ? in->value : maxLabel;
+        }
+    }
+    if (count > 0) {
+        blocks[count - 1].last = f->count - 1;
+    }
+
+    // Map the labels to the blocks they start
+    blockOfLabel =
+        calloc(maxLabel >= minLabel ? maxLabel - minLabel + 1 : 1, sizeof(int));
+    if (blockOfLabel == NULL) {
+        logFatal("Out of memory for the IR");
+    }
+    for (int b = 0; b < count; b++) {
+        struct irInstruction *in = &f->code[blocks[b].first];
+        if (in->op == IR_LABEL) {
+            blockOfLabel[in->value - minLabel] = b;
+        }
+    }
+
+    for (int b = 0; b < count; b++) {
+        struct irInstruction *in = &f->code[blocks[b].last];
+        if (isBlockEnd(in->op)) {
+            blocks[b].successors[blocks[b].successorCount++] =
+                blockOfLabel[in->value - minLabel];
+        }
+        if (in->op != IR_JUMP && b + 1 < count) {
+            blocks[b].successors[blocks[b].successorCount++] = b + 1;
+        }
+    }
+
+    free(blockOfLabel);
+    f->blocks = blocks;
+    f->blockCount = count;
+}
+
+/**
+ * removeInstructions - Delete instructions from a function and recompute
+ * its basic blocks.
+ *
+ * @param f The function
+ * @param removed Flags indexed by instruction
+ *
+ * @return The number of instructions deleted
+ */
+int removeInstructions(struct irFunction *f, const bool *removed) {
+    int count = 0;
+
+    for (int i = 0; i < f->count; i++) {
+        if (!removed[i]) {
+            f->code[count++] = f->code[i];
+        }
+    }
+
+    int deleted = f->count - count;
+    f->count = count;
+    buildBasicBlocks(f);
+    return deleted;
+}
+
+/**
+ * addVariables - Make room for new variables after the locals' vregs,
+ * renumbering the temporaries after them.
+ *
+ * @param f The function
+ * @param count Number of variables to add
+ *
+ * @return The vreg of the first new variable
+ */
+int addVariables(struct irFunction *f, int count) {
+    int first = f->variableCount;
+
+    for (int i = 0; i < f->count; i++) {
+        struct irInstruction *in = &f->code[i];
+        int *vregs[3] = {&in->dst, &in->src1, &in->src2};
+        for (int k = 0; k < 3; k++) {
+            if (*vregs[k] >= first) {
+                *vregs[k] += count;
+            }
+        }
+    }
+
+    f->variableCount += count;
+    f->vregCount += count;
+    return first;
+}
+
+/**
+ * buildIR - Translate a function's tree into IR.
+ *
+ * @param n The root of the tree (A_FUNCTION)
+ *
+ * @return The function's IR, to be released with freeIR()
+ */
+struct irFunction *buildIR(struct ASTnode *n) {
+    Function = calloc(1, sizeof(*Function));
+    if (Function == NULL) {
+        logFatal("Out of memory for the IR");
+    }
+    Function->functionId = n->v.identifierIndex;
+    Function->exitLabel = codegenGetLabelNumber();
+    Function->capacity = IR_INITIAL_CAPACITY;
+    Function->code = malloc(Function->capacity * sizeof(*Function->code));
+    if (Function->code == NULL) {
+        logFatal("Out of memory for the IR");
+    }
+
+    assignLocalRegisters(n);
+    buildStatement(astLeft(n));
+    appendInstruction(IR_LABEL, P_NONE, IR_NOVREG, IR_NOVREG, IR_NOVREG,
+                      Function->exitLabel);
+
+    free(LocalRegisters);
+    LocalRegisters = NULL;
+    buildBasicBlocks(Function);
+    return Function;
+}
+
+/**
+ * freeIR - Release a function's IR.
+ */
+void freeIR(struct irFunction *f) {
+    free(f->code);
+    free(f->blocks);
+    free(f->locations);
+    free(f->calleeSavedUsed);
+    free(f);
+}
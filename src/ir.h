@@ -0,0 +1,164 @@
+// src/ir.h
+#pragma once
+
+#include "defs.h"
+
+/**
+ * NOTE:
+ * Three-address IR, built per function at -O1 (see ir.c).
+ * A function is a linear list of instructions over an unbounded set of
+ * virtual registers (vregs), each holding a 64-bit value like the backends'
+ * registers do. Instructions reuse the A_* codes where the operation is the
+ * same as the AST node's, and add IR_* codes for what the AST spells with
+ * its tree shape (copies, narrowing, jumps) or what only the optimizer
+ * produces (shifts and multiplications by constants):
+ * ----------------------------------------
+ *  A_INTEGERLITERAL   dst = value
+ *  A_STRINGLITERAL    dst = address of string label <value>
+ *  A_ADDRESSOF        dst = address of symbol <value>
+ *  A_IDENTIFIER       dst = symbol <value>, loaded as type
+ *  A_ASSIGN           symbol <value> = src1, stored as type
+ *  A_DEREFERENCE      dst = *src1 (type: the pointer type)
+ *  A_ADD ... A_GE     dst = src1 <op> src2 (comparisons give 0 or 1)
+ *  A_ARITHMETICNEGATE dst = <op> src1 (also A_LOGICALINVERT,
+ *                     A_LOGICALNOT and A_TOBOOLEAN)
+ *  A_FUNCTIONCALL     dst = function <value>(src1)
+ *  A_RETURN           return src1 (the function then jumps to its exit)
+ * ----------------------------------------
+ * The remaining IR_* operations are described below.
+ */
+
+// No virtual register (e.g. an instruction without a result)
+#define IR_NOVREG -1
+
+// IR operations beyond the A_* set
+enum {
+    IR_COPY = A_TOBOOLEAN + 1, // dst = src1
+    IR_NARROW,                 // dst = src1 truncated to type and extended
+                               // again, as a load of a type variable would
+    IR_SHIFTLEFTCONST,         // dst = src1 << value
+    IR_SHIFTRIGHTCONST,        // dst = src1 >> value (logical)
+    IR_ARITHSHIFTRIGHTCONST,   // dst = src1 >> value (arithmetic)
+    IR_MULHIGHCONST,           // dst = upper half of src1 * value (signed)
+    IR_STOREINDIRECT,          // *src2 = src1, stored as type
+    IR_LABEL,                  // label <value>:
+    IR_JUMP,                   // goto label <value>
+    IR_BRANCH,                 // if (src1 <type> src2) goto label <value>;
+                               // type is a comparison (A_EQ ... A_GE) and
+                               // src2 may be IR_NOVREG for zero
+};
+
+// IR instruction
+struct irInstruction {
+    int op;        // A_* or IR_* operation
+    int type;      // Primitive type, or the comparison of an IR_BRANCH
+    int dst;       // Virtual register written, or IR_NOVREG
+    int src1;      // Virtual registers read, or IR_NOVREG
+    int src2;      //
+    int64_t value; // Literal, symbol ID, label or shift amount
+};
+
+// Basic block: a run of instructions entered only at its first one (a label,
+// or the one after a jump or branch) and left only after its last one
+struct irBlock {
+    int first, last;   // Instruction range
+    int successors[2]; // Blocks control may flow to next
+    int successorCount;
+};
+
+// Liveness of a basic block (see regalloc.c), indexed like the blocks
+struct irLiveness {
+    uint64_t *use;     // Registers read before being written in the block
+    uint64_t *def;     // Registers written in the block
+    uint64_t *liveIn;  // Registers live on entry
+    uint64_t *liveOut; // Registers live on exit
+};
+
+// Where the register allocator placed a virtual register
+struct irLocation {
+    int reg;    // Backend register (see CodegenOps), or NOREG if spilled
+    int offset; // Frame offset of the spill slot, if spilled
+};
+
+// IR of one function
+struct irFunction {
+    int functionId; // Symbol ID of the function
+    int exitLabel;  // Label that return statements jump to
+    struct irInstruction *code;
+    int count;    // Number of instructions
+    int capacity; // Allocated instructions
+    int vregCount;
+    int variableCount;      // Vregs of variables: the locals and those the
+                            // optimizer adds (the first ones, see ir.c)
+    struct irBlock *blocks; // In instruction order (see buildBasicBlocks())
+    int blockCount;
+
+    // Register allocation (see regalloc.c)
+    struct irLocation *locations; // Indexed by virtual register
+    bool *calleeSavedUsed;        // Indexed by callee-saved register
+    int spillCount;               // Virtual registers kept on the stack
+};
+
+/**
+ * NOTE:
+ * SSA form (see ssa.c).
+ * The instructions are not rewritten: the SSA form is a set of tables beside
+ * them that give every definition of a value a name of its own and tell
+ * which name each operand reads. Temporaries are assigned once already; the
+ * variables are the first vregs (0 ... variableCount - 1) and memory
+ * (variable number variableCount), which A_ASSIGN, IR_STOREINDIRECT and
+ * A_FUNCTIONCALL define and A_IDENTIFIER and A_DEREFERENCE read. Names
+ * 0 ... variableCount are the variables' values on entry to the function.
+ */
+
+// Phi function at the start of a block: the variable's value there is the
+// one it had at the end of the predecessor control came from
+struct irPhi {
+    int block;    // Block it is at the start of
+    int variable; // Local's vreg, or variableCount for memory
+    int name;     // SSA name it defines
+    int *args;    // SSA name of the variable at the end of each predecessor
+                  // (IR_NOVREG for unreachable ones)
+};
+
+// SSA form of a function
+struct irSSA {
+    int *predecessors;     // Predecessors of block b: predecessors[
+    int *predecessorStart; // predecessorStart[b] ... predecessorStart[b + 1])
+    int *order;            // Reachable blocks, in reverse postorder
+    int orderCount;
+    int *idom;          // Immediate dominator of each block, or -1 for the
+                        // entry block and unreachable blocks
+    int *children;      // Dominator tree: children of block b (in reverse
+    int *childStart;    // postorder) are children[childStart[b] ...
+                        // childStart[b + 1])
+    struct irPhi *phis; // Grouped by block: those of block b are phis[
+    int *phiStart;      // phiStart[b] ... phiStart[b + 1])
+    int phiCount;
+    int nameCount;
+    int *src1Name;   // Per instruction: SSA name of src1 and src2 (or
+    int *src2Name;   // IR_NOVREG),
+    int *dstName;    // of dst (or IR_NOVREG),
+    int *memoryName; // and of memory after the instruction
+    int *phiArgs;    // Storage of the phis' arguments
+};
+
+// Natural loop of a function (see findInnermostLoop())
+struct irLoop {
+    int header;   // Header block
+    bool *blocks; // Blocks of the loop, indexed by block
+    int *latches; // Blocks with a back edge to the header
+    int latchCount;
+    int size; // Number of blocks
+};
+
+/**
+ * Bit sets of virtual registers or blocks
+ */
+static inline bool testBit(const uint64_t *set, int bit) {
+    return (set[bit / 64] >> (bit % 64)) & 1;
+}
+
+static inline void setBit(uint64_t *set, int bit) {
+    set[bit / 64] |= 1ull << (bit % 64);
+}
@@ -0,0 +1,156 @@
+// src/irdump.c
+//
+// Functions to dump a function's IR (see ir.h) for debugging purposes
+// (--dump-ir), block by block, with the register allocation if it was done.
+
+#include <stdio.h>
+
+#include "data.h"
+#include "decl.h"
+#include "defs.h"
+#include "ir.h"
+
+/**
+ * irOpToString - Convert an IR operation code to string.
+ *
+ * @param op IR operation code (A_* or IR_*).
+ *
+ * @return String representation of the operation.
+ */
+static const char *irOpToString(int op) {
+    switch (op) {
+    case IR_COPY:
+        return "IR_COPY";
+    case IR_NARROW:
+        return "IR_NARROW";
+    case IR_SHIFTLEFTCONST:
+        return "IR_SHIFTLEFTCONST";
+    case IR_SHIFTRIGHTCONST:
+        return "IR_SHIFTRIGHTCONST";
+    case IR_ARITHSHIFTRIGHTCONST:
+        return "IR_ARITHSHIFTRIGHTCONST";
+    case IR_MULHIGHCONST:
+        return "IR_MULHIGHCONST";
+    case IR_STOREINDIRECT:
+        return "IR_STOREINDIRECT";
+    case IR_LABEL:
+        return "IR_LABEL";
+    case IR_JUMP:
+        return "IR_JUMP";
+    case IR_BRANCH:
+        return "IR_BRANCH";
+    default:
+        return astOpToString(op);
+    }
+}
+
+// Operands printed so far for the current instruction
+static int OperandCount;
+
+/**
+ * dumpOperandStart - Print the separator before the next operand.
+ */
+static void dumpOperandStart(void) { printf(OperandCount++ == 0 ? " " : ", "); }
+
+/**
+ * dumpVreg - Print a virtual register operand, if there is one.
+ *
+ * @param vreg The virtual register, or IR_NOVREG.
+ */
+static void dumpVreg(int vreg) {
+    if (vreg != IR_NOVREG) {
+        dumpOperandStart();
+        printf("v%d", vreg);
+    }
+}
+
+/**
+ * dumpInstruction - Print one instruction
+ * ("[vD =] OP vS1, vS2, <value> (<type>)").
+ *
+ * @param in The instruction.
+ */
+static void dumpInstruction(struct irInstruction *in) {
+    if (in->op == IR_LABEL) {
+        printf("L%lld:\n", (long long)in->value);
+        return;
+    }
+
+    printf("    ");
+    if (in->dst != IR_NOVREG) {
+        printf("v%d = ", in->dst);
+    }
+    printf("%s", irOpToString(in->op));
+    OperandCount = 0;
+    dumpVreg(in->src1);
+    dumpVreg(in->src2);
+
+    switch (in->op) {
+    case A_IDENTIFIER:
+    case A_ASSIGN:
+    case A_ADDRESSOF:
+    case A_FUNCTIONCALL:
+        dumpOperandStart();
+        printf("%s", getSymbol(in->value)->name);
+        break;
+    case A_STRINGLITERAL:
+    case IR_JUMP:
+    case IR_BRANCH:
+        dumpOperandStart();
+        printf("L%lld", (long long)in->value);
+        break;
+    case A_INTEGERLITERAL:
+    case IR_SHIFTLEFTCONST:
+    case IR_SHIFTRIGHTCONST:
+    case IR_ARITHSHIFTRIGHTCONST:
+    case IR_MULHIGHCONST:
+        dumpOperandStart();
+        printf("%lld", (long long)in->value);
+        break;
+    }
+
+    if (in->op == IR_BRANCH) {
+        printf(" (if %s%s)", astOpToString(in->type),
+               in->src2 == IR_NOVREG ? " 0" : "");
+    } else if (in->op != IR_JUMP) {
+        printf(" (%s)", primitiveTypeToString(in->type));
+    }
+    printf("\n");
+}
+
+/**
+ * dumpIR - Dump a function's IR to stdout: its basic blocks with their
+ * successors and instructions, then where each virtual register was placed
+ * if registers have been allocated.
+ *
+ * @param f The function.
+ */
+void dumpIR(struct irFunction *f) {
+    printf("IR of %s: %d instructions, %d blocks, %d virtual registers\n",
+           getSymbol(f->functionId)->name, f->count, f->blockCount,
+           f->vregCount);
+
+    for (int b = 0; b < f->blockCount; b++) {
+        struct irBlock *block = &f->blocks[b];
+        printf("B%d", b);
+        for (int s = 0; s < block->successorCount; s++) {
+            printf("%sB%d", s == 0 ? " -> " : ", ", block->successors[s]);
+        }
+        printf("\n");
+        for (int i = block->first; i <= block->last; i++) {
+            dumpInstruction(&f->code[i]);
+        }
+    }
+
+    if (f->locations == NULL) {
+        return;
+    }
+    printf("Registers (%d spilled):\n", f->spillCount);
+    for (int v = 0; v < f->vregCount; v++) {
+        if (f->locations[v].reg != NOREG) {
+            printf("    v%d: register %d\n", v, f->locations[v].reg);
+        } else if (f->locations[v].offset != 0) {
+            printf("    v%d: stack %d\n", v, f->locations[v].offset);
+        }
+    }
+}
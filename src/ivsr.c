@@ -0,0 +1,606 @@
+// src/ivsr.c
+
+// Induction variable strength reduction on the IR: array addresses computed
+// from a loop counter on every iteration become pointers bumped by the
+// element size instead.
+
+#include "data.h"
+#include "decl.h"
+#include "defs.h"
+#include "ir.h"
+
+/**
+ * NOTE:
+ * arrayAccess() (expr.c) computes the address of a[i] as
+ * a + (i << log2(size)), so a loop walking an array shifts its counter and
+ * adds the base again on every iteration:
+ *
+ *     L:  t1 = i << 2          L:  ... *p ...
+ *         t2 = a + t1     ->       t = i + 1
+ *         ... *t2 ...              i = t
+ *         t = i + 1                p = p + 4
+ *         i = t                    if (i < n) goto L
+ *         if (i < n) goto L
+ *
+ * A basic induction variable is a variable the loop assigns only once, by
+ * adding a literal to itself (i = i + c or i = i - c). An address
+ * base + ((i [+-] x) << k), with base and x invariant in the loop (or x a
+ * literal), then advances by c << k whenever i does. It is replaced by a new
+ * variable p, set to the address before the loop (the preheader, see ssa.c)
+ * and increased right after the assignment of i, so that p holds the
+ * address at every point of the loop. The shift and the adds are left
+ * unused and dead code elimination removes them; the step is loaded once
+ * in the preheader, into a register shared by the pointers with the same
+ * step. Addresses with the same base, index and scale share their pointer.
+ *
+ * Readers of the address read p directly when they all come before the
+ * next assignment of i in the address's block, and a copy of p otherwise.
+ * An int counter is assumed not to overflow, as C leaves that undefined;
+ * char counters, which wrap around, are left alone.
+ */
+
+// Addresses reduced so far (see --stats)
+static size_t ReducedCount;
+
+// Address recognized in a loop
+struct ivsrAddress {
+    int address;         // A_ADD of the base and the scaled index
+    int shift;           // IR_SHIFTLEFTCONST scaling the index
+    int index;           // A_ADD or A_SUBTRACT computing the index from the
+                         // variable, or -1 if the index is the variable
+    int variable;        // Basic induction variable
+    int other;           // The index's other operand (0 or 1 for src1 or src2)
+    bool otherIsLiteral; // Literal loaded in the loop (then in literal)
+    int64_t literal;
+    int update;   // The variable's assignment in the loop
+    int64_t step; // Bytes the address advances by at each update
+    int pointer;  // Address whose pointer this one uses (itself if it has
+                  // its own)
+};
+
+// State of the pass over one loop
+struct ivsrState {
+    struct irFunction *f;
+    const struct irLoop *loop;
+    int *blockOf;        // Block of each instruction
+    int *definition;     // Instruction defining each temporary, or -1
+    bool *definedInLoop; // Vregs the loop writes
+    int *update;         // Per variable: its only assignment in the loop,
+                         // or -1 if it is not a basic induction variable
+    int64_t *increment;  // Per variable: what that assignment adds
+};
+
+/**
+ * literalOf - Check whether a vreg is a temporary holding a literal.
+ *
+ * @param value Set to the literal if so
+ */
+static bool literalOf(struct ivsrState *state, int vreg, int64_t *value) {
+    struct irFunction *f = state->f;
+    int def;
+
+    if (vreg < f->variableCount || (def = state->definition[vreg]) < 0 ||
+        f->code[def].op != A_INTEGERLITERAL) {
+        return false;
+    }
+    *value = f->code[def].value;
+    return true;
+}
+
+/**
+ * isInvariantOperand - Check whether an operand has the same value
+ * throughout the loop, or is a literal that can be loaded again before it.
+ */
+static bool isInvariantOperand(struct ivsrState *state, int vreg) {
+    int64_t value;
+
+    return !state->definedInLoop[vreg] || literalOf(state, vreg, &value);
+}
+
+/**
+ * findInductionVariables - Fill in the loop's basic induction variables.
+ */
+static void findInductionVariables(struct ivsrState *state) {
+    struct irFunction *f = state->f;
+    int *assignments = calloc(f->variableCount + 1, sizeof(int));
+
+    if (assignments == NULL) {
+        logFatal("Out of memory for induction variable strength reduction");
+    }
+
+    for (int i = 0; i < f->count; i++) {
+        struct irInstruction *in = &f->code[i];
+        if (!state->loop->blocks[state->blockOf[i]] || in->dst == IR_NOVREG ||
+            in->dst >= f->variableCount) {
+            continue;
+        }
+        assignments[in->dst]++;
+        state->update[in->dst] = i;
+    }
+
+    for (int v = 0; v < f->variableCount; v++) {
+        struct irInstruction *in, *sum;
+        int64_t value;
+
+        if (assignments[v] != 1) {
+            state->update[v] = -1;
+            continue;
+        }
+        in = &f->code[state->update[v]];
+        state->update[v] = -1;
+
+        // i = (int)t or i = t (long), with t = i + c, c + i or i - c
+        if (!(in->op == IR_NARROW && in->type == P_INT) && in->op != IR_COPY) {
+            continue;
+        }
+        if (in->src1 < f->variableCount || !state->definedInLoop[in->src1]) {
+            continue;
+        }
+        sum = &f->code[state->definition[in->src1]];
+        if (sum->op == A_ADD && sum->src1 == v &&
+            literalOf(state, sum->src2, &value)) {
+            state->increment[v] = value;
+        } else if (sum->op == A_ADD && sum->src2 == v &&
+                   literalOf(state, sum->src1, &value)) {
+            state->increment[v] = value;
+        } else if (sum->op == A_SUBTRACT && sum->src1 == v &&
+                   literalOf(state, sum->src2, &value)) {
+            state->increment[v] = -value;
+        } else {
+            continue;
+        }
+        state->update[v] = in - f->code;
+    }
+
+    free(assignments);
+}
+
+/**
+ * matchIndex - Recognize an index computed from a basic induction variable
+ * (i, i + x, x + i or i - x).
+ *
+ * @param a Its index and variable are filled in
+ *
+ * @return true if the index has that form
+ */
+static bool matchIndex(struct ivsrState *state, int vreg,
+                       struct ivsrAddress *a) {
+    struct irFunction *f = state->f;
+    struct irInstruction *in;
+    int other;
+
+    if (vreg < f->variableCount) {
+        a->index = -1;
+        a->variable = vreg;
+        return state->update[vreg] >= 0;
+    }
+    if (!state->definedInLoop[vreg]) {
+        return false;
+    }
+
+    a->index = state->definition[vreg];
+    in = &f->code[a->index];
+    if (in->op != A_ADD && in->op != A_SUBTRACT) {
+        return false;
+    }
+    if (in->src1 < f->variableCount && state->update[in->src1] >= 0) {
+        a->variable = in->src1;
+        a->other = 1;
+        other = in->src2;
+    } else if (in->op == A_ADD && in->src2 < f->variableCount &&
+               state->update[in->src2] >= 0) {
+        a->variable = in->src2;
+        a->other = 0;
+        other = in->src1;
+    } else {
+        return false;
+    }
+    if (other == a->variable || !isInvariantOperand(state, other)) {
+        return false;
+    }
+    a->otherIsLiteral =
+        state->definedInLoop[other] && literalOf(state, other, &a->literal);
+    return true;
+}
+
+/**
+ * matchAddress - Recognize an address base + (index << k) in the loop.
+ *
+ * @param a Filled in
+ *
+ * @return true if the instruction computes one
+ */
+static bool matchAddress(struct ivsrState *state, int i,
+                         struct ivsrAddress *a) {
+    struct irFunction *f = state->f;
+    struct irInstruction *in = &f->code[i];
+    struct irInstruction *shift;
+    int operands[2] = {in->src1, in->src2};
+
+    if (in->op != A_ADD || !isPointerType(in->type) ||
+        in->dst < f->variableCount) {
+        return false;
+    }
+
+    for (int k = 0; k < 2; k++) {
+        int base = operands[k], offset = operands[1 - k];
+
+        if (state->definedInLoop[base] || offset < f->variableCount ||
+            !state->definedInLoop[offset]) {
+            continue;
+        }
+        a->shift = state->definition[offset];
+        shift = &f->code[a->shift];
+        if (shift->op != IR_SHIFTLEFTCONST ||
+            !matchIndex(state, shift->src1, a)) {
+            continue;
+        }
+        a->address = i;
+        a->update = state->update[a->variable];
+        a->step = state->increment[a->variable] * ((int64_t)1 << shift->value);
+        return true;
+    }
+    return false;
+}
+
+/**
+ * baseOf - The base operand of a recognized address.
+ */
+static int baseOf(const struct irFunction *f, const struct ivsrAddress *a) {
+    const struct irInstruction *address = &f->code[a->address];
+
+    return address->src1 == f->code[a->shift].dst ? address->src2
+                                                  : address->src1;
+}
+
+/**
+ * sameBase - Check whether two bases hold the same address: the same vreg,
+ * or the addresses of the same symbol.
+ */
+static bool sameBase(struct ivsrState *state, int a, int b) {
+    struct irFunction *f = state->f;
+    int da, db;
+
+    if (a == b) {
+        return true;
+    }
+    if (a < f->variableCount || b < f->variableCount) {
+        return false;
+    }
+    da = state->definition[a];
+    db = state->definition[b];
+    return da >= 0 && db >= 0 && f->code[da].op == A_ADDRESSOF &&
+           f->code[db].op == A_ADDRESSOF &&
+           f->code[da].value == f->code[db].value;
+}
+
+/**
+ * sameAddress - Check whether two recognized addresses are always equal.
+ */
+static bool sameAddress(struct ivsrState *state, const struct ivsrAddress *a,
+                        const struct ivsrAddress *b) {
+    struct irFunction *f = state->f;
+    const struct irInstruction *ia, *ib;
+    int oa, ob;
+
+    if (a->variable != b->variable ||
+        !sameBase(state, baseOf(f, a), baseOf(f, b)) ||
+        f->code[a->shift].value != f->code[b->shift].value ||
+        (a->index < 0) != (b->index < 0)) {
+        return false;
+    }
+    if (a->index < 0) {
+        return true;
+    }
+
+    ia = &f->code[a->index];
+    ib = &f->code[b->index];
+    oa = a->other == 0 ? ia->src1 : ia->src2;
+    ob = b->other == 0 ? ib->src1 : ib->src2;
+    if (ia->op != ib->op || a->other != b->other ||
+        a->otherIsLiteral != b->otherIsLiteral) {
+        return false;
+    }
+    return a->otherIsLiteral ? a->literal == b->literal : oa == ob;
+}
+
+/**
+ * emitInstruction - Append an instruction to a code array.
+ */
+static void emitInstruction(struct irInstruction *code, int *count, int op,
+                            int type, int dst, int src1, int src2,
+                            int64_t value) {
+    struct irInstruction *in = &code[(*count)++];
+
+    in->op = op;
+    in->type = type;
+    in->dst = dst;
+    in->src1 = src1;
+    in->src2 = src2;
+    in->value = value;
+}
+
+/**
+ * emitPointerSetup - Append the computation of an address's pointer before
+ * the loop, from the variable's value on entry, and the load of its step.
+ *
+ * @param step The temporary holding the step, or IR_NOVREG to load it into
+ *             a new one
+ */
+static void emitPointerSetup(struct irFunction *f, struct irInstruction *code,
+                             int *count, const struct ivsrAddress *a,
+                             int pointer, int *step) {
+    struct irInstruction *address = &f->code[a->address];
+    struct irInstruction *shift = &f->code[a->shift];
+    int index = a->variable, shifted;
+
+    if (a->index >= 0) {
+        struct irInstruction *in = &f->code[a->index];
+        int operands[2] = {in->src1, in->src2};
+
+        if (a->otherIsLiteral) {
+            operands[a->other] = f->vregCount++;
+            emitInstruction(code, count, A_INTEGERLITERAL,
+                            f->code[a->index].type, operands[a->other],
+                            IR_NOVREG, IR_NOVREG, a->literal);
+        }
+        index = f->vregCount++;
+        emitInstruction(code, count, in->op, in->type, index, operands[0],
+                        operands[1], 0);
+    }
+
+    shifted = f->vregCount++;
+    emitInstruction(code, count, IR_SHIFTLEFTCONST, shift->type, shifted, index,
+                    IR_NOVREG, shift->value);
+    if (address->src1 == shift->dst) {
+        emitInstruction(code, count, A_ADD, address->type, pointer, shifted,
+                        address->src2, 0);
+    } else {
+        emitInstruction(code, count, A_ADD, address->type, pointer,
+                        address->src1, shifted, 0);
+    }
+
+    if (*step == IR_NOVREG) {
+        *step = f->vregCount++;
+        emitInstruction(code, count, A_INTEGERLITERAL, P_LONG, *step, IR_NOVREG,
+                        IR_NOVREG, a->step);
+    }
+}
+
+/**
+ * replaceAddress - Make the readers of an address read its pointer, or
+ * turn the address into a copy of the pointer when the pointer may have
+ * moved on before a reader (see the NOTE above).
+ *
+ * @param removed Flags indexed by instruction, set if the address goes
+ */
+static void replaceAddress(struct ivsrState *state, const struct ivsrAddress *a,
+                           int pointer, bool *removed) {
+    struct irFunction *f = state->f;
+    struct irInstruction *address = &f->code[a->address];
+    int block = state->blockOf[a->address];
+    int lastUse = a->address;
+    bool local = true;
+
+    for (int i = 0; i < f->count; i++) {
+        struct irInstruction *in = &f->code[i];
+        if (in->src1 == address->dst || in->src2 == address->dst) {
+            local &= state->blockOf[i] == block && i > a->address;
+            lastUse = i > lastUse ? i : lastUse;
+        }
+    }
+    local &= state->blockOf[a->update] != block || a->update < a->address ||
+             a->update > lastUse;
+
+    if (!local) {
+        address->op = IR_COPY;
+        address->src1 = pointer;
+        address->src2 = IR_NOVREG;
+        return;
+    }
+    for (int i = a->address + 1; i <= lastUse; i++) {
+        struct irInstruction *in = &f->code[i];
+        if (in->src1 == address->dst) {
+            in->src1 = pointer;
+        }
+        if (in->src2 == address->dst) {
+            in->src2 = pointer;
+        }
+    }
+    removed[a->address] = true;
+}
+
+/**
+ * rewriteLoop - Give the recognized addresses of a loop their pointers.
+ *
+ * @param addresses The addresses, in instruction order
+ * @param pointerCount Number of pointers they need
+ * @param insertAt Index of the instruction the setup goes in front of
+ */
+static void rewriteLoop(struct ivsrState *state, struct ivsrAddress *addresses,
+                        int addressCount, int pointerCount, int insertAt) {
+    struct irFunction *f = state->f;
+    // The pointers are new variables: the temporaries move up
+    int next = addVariables(f, pointerCount);
+    int *pointer = malloc((addressCount + 1) * sizeof(int));
+    int *step = malloc((addressCount + 1) * sizeof(int));
+    bool *removed = calloc(f->count + 1, sizeof(bool));
+    struct irInstruction *setup =
+        malloc((6 * pointerCount + 1) * sizeof(*setup));
+    int capacity = f->count + 7 * pointerCount + 1;
+    struct irInstruction *code = malloc(capacity * sizeof(*code));
+    int setupCount = 0, count = 0;
+
+    if (pointer == NULL || step == NULL || removed == NULL || setup == NULL ||
+        code == NULL) {
+        logFatal("Out of memory for induction variable strength reduction");
+    }
+
+    for (int k = 0; k < addressCount; k++) {
+        struct ivsrAddress *a = &addresses[k];
+        if (a->pointer == k) {
+            pointer[k] = next++;
+            step[k] = IR_NOVREG;
+            for (int j = 0; j < k && step[k] == IR_NOVREG; j++) {
+                if (addresses[j].pointer == j && addresses[j].step == a->step) {
+                    step[k] = step[j]; // Same step: same register
+                }
+            }
+            emitPointerSetup(f, setup, &setupCount, a, pointer[k], &step[k]);
+        }
+        pointer[k] = pointer[a->pointer];
+    }
+    for (int k = 0; k < addressCount; k++) {
+        replaceAddress(state, &addresses[k], pointer[k], removed);
+    }
+    ReducedCount += addressCount;
+
+    for (int i = 0; i < f->count; i++) {
+        if (i == insertAt) {
+            memcpy(code + count, setup, setupCount * sizeof(*setup));
+            count += setupCount;
+        }
+        if (!removed[i]) {
+            code[count++] = f->code[i];
+        }
+        // The pointers move on along with their variable
+        for (int k = 0; k < addressCount; k++) {
+            struct ivsrAddress *a = &addresses[k];
+            if (a->pointer == k && a->update == i) {
+                emitInstruction(code, &count, A_ADD, f->code[a->address].type,
+                                pointer[k], pointer[k], step[k], 0);
+            }
+        }
+    }
+
+    free(f->code);
+    f->code = code;
+    f->count = count;
+    f->capacity = capacity;
+    buildBasicBlocks(f);
+
+    free(pointer);
+    free(step);
+    free(removed);
+    free(setup);
+}
+
+/**
+ * reduceLoop - Replace the addresses of a loop computed from its basic
+ * induction variables by pointers (see the NOTE above).
+ */
+static void reduceLoop(struct irFunction *f, const struct irSSA *ssa,
+                       const struct irLoop *loop) {
+    int insertAt = findPreheader(f, ssa, loop);
+    struct ivsrState state;
+    struct ivsrAddress *addresses;
+    int addressCount = 0, pointerCount = 0;
+
+    if (insertAt < 0) {
+        return;
+    }
+
+    state.f = f;
+    state.loop = loop;
+    state.blockOf = malloc((f->count + 1) * sizeof(int));
+    state.definition = malloc((f->vregCount + 1) * sizeof(int));
+    state.definedInLoop = calloc(f->vregCount + 1, sizeof(bool));
+    state.update = malloc((f->variableCount + 1) * sizeof(int));
+    state.increment = calloc(f->variableCount + 1, sizeof(int64_t));
+    addresses = malloc((f->count + 1) * sizeof(*addresses));
+    if (state.blockOf == NULL || state.definition == NULL ||
+        state.definedInLoop == NULL || state.update == NULL ||
+        state.increment == NULL || addresses == NULL) {
+        logFatal("Out of memory for induction variable strength reduction");
+    }
+
+    for (int v = 0; v < f->vregCount; v++) {
+        state.definition[v] = -1;
+    }
+    for (int b = 0; b < f->blockCount; b++) {
+        for (int i = f->blocks[b].first; i <= f->blocks[b].last; i++) {
+            struct irInstruction *in = &f->code[i];
+            state.blockOf[i] = b;
+            if (in->dst == IR_NOVREG) {
+                continue;
+            }
+            if (in->dst >= f->variableCount) {
+                state.definition[in->dst] = i;
+            }
+            state.definedInLoop[in->dst] |= loop->blocks[b];
+        }
+    }
+    findInductionVariables(&state);
+
+    for (int i = 0; i < f->count; i++) {
+        struct ivsrAddress *a = &addresses[addressCount];
+        if (!loop->blocks[state.blockOf[i]] || !matchAddress(&state, i, a)) {
+            continue;
+        }
+        a->pointer = addressCount;
+        for (int k = 0; k < addressCount; k++) {
+            if (addresses[k].pointer == k &&
+                sameAddress(&state, &addresses[k], a)) {
+                a->pointer = k;
+                break;
+            }
+        }
+        pointerCount += a->pointer == addressCount;
+        addressCount++;
+    }
+
+    if (addressCount > 0) {
+        rewriteLoop(&state, addresses, addressCount, pointerCount, insertAt);
+    }
+
+    free(state.blockOf);
+    free(state.definition);
+    free(state.definedInLoop);
+    free(state.update);
+    free(state.increment);
+    free(addresses);
+}
+
+/**
+ * reduceInductionVariables - Replace the array addresses computed from the
+ * counters of a function's loops by pointers (see the NOTE above).
+ *
+ * @param f The function, with its basic blocks
+ */
+void reduceInductionVariables(struct irFunction *f) {
+    // Labels of the headers of the loops done, innermost first
+    int *done = malloc((f->blockCount + 1) * sizeof(int));
+    int doneCount = 0;
+
+    if (done == NULL) {
+        logFatal("Out of memory for induction variable strength reduction");
+    }
+
+    for (;;) {
+        struct irSSA *ssa = buildSSA(f);
+        struct irLoop loop;
+
+        if (!findInnermostLoop(f, ssa, done, doneCount, &loop)) {
+            freeSSA(ssa);
+            break;
+        }
+        done[doneCount++] = f->code[f->blocks[loop.header].first].value;
+        reduceLoop(f, ssa, &loop);
+        freeLoop(&loop);
+        freeSSA(ssa);
+    }
+
+    free(done);
+}
+
+/**
+ * printInductionVariableStats - Print induction variable strength
+ * reduction statistics (--stats).
+ *
+ * @param stream Output stream
+ */
+void printInductionVariableStats(FILE *stream) {
+    fprintf(stream,
+            "Induction variable strength reduction: %zu addresses reduced\n",
+            ReducedCount);
+}
@@ -0,0 +1,57 @@
+// src/keywords.h
+// Generated by tools/gen_keywords.py - do not edit by hand.
+#pragma once
+
+#include "defs.h"
+
+/**
+ * NOTE:
+ * Minimal perfect hash of the keywords: every keyword owns one slot of
+ * KeywordTable, found from its length and first and last characters.
+ */
+
+// clang-format off
+#define KEYWORD_COUNT 9
+#define KEYWORD_MIN_LENGTH 2
+#define KEYWORD_MAX_LENGTH 6
+
+static const unsigned char KeywordAssociatedValues[256] = {
+    ['c'] = 1,
+    ['l'] = 2,
+    ['n'] = 1,
+    ['t'] = 5,
+    ['v'] = 5,
+    ['w'] = 5,
+};
+
+static const struct {
+    const char *name;
+    int length;
+    int token;
+} KeywordTable[KEYWORD_COUNT] = {
+    {"void", 4, T_VOID},
+    {"while", 5, T_WHILE},
+    {"if", 2, T_IF},
+    {"for", 3, T_FOR},
+    {"else", 4, T_ELSE},
+    {"char", 4, T_CHAR},
+    {"long", 4, T_LONG},
+    {"return", 6, T_RETURN},
+    {"int", 3, T_INT},
+};
+// clang-format on
+
+/**
+ * keywordHash - Slot of KeywordTable that may hold the identifier.
+ *
+ * @param s The identifier (need not be NUL-terminated)
+ * @param length Its length, between KEYWORD_MIN_LENGTH and
+ * KEYWORD_MAX_LENGTH
+ *
+ * @return The slot index
+ */
+static inline unsigned int keywordHash(const char *s, int length) {
+    return (length + KeywordAssociatedValues[(unsigned char)s[0]] +
+            KeywordAssociatedValues[(unsigned char)s[length - 1]]) %
+           KEYWORD_COUNT;
+}
@@ -0,0 +1,234 @@
+// src/licm.c
+
+// Loop-invariant code motion on the IR: computations inside a loop whose
+// operands do not change in it are moved to just before the loop.
+
+#include "data.h"
+#include "decl.h"
+#include "defs.h"
+#include "ir.h"
+
+/**
+ * NOTE:
+ * Loops are found from the dominator tree (see findInnermostLoop() in
+ * ssa.c). Innermost loops are handled first, so what leaves an inner loop
+ * may leave the outer one next.
+ *
+ * An instruction writing a temporary is invariant when its operands are
+ * variables the loop does not assign or temporaries computed outside the
+ * loop or by invariant instructions, and:
+ * - a load of a variable (A_IDENTIFIER) needs a loop without calls,
+ *   indirect stores or stores to that variable;
+ * - a load through a pointer (A_DEREFERENCE) needs a loop without calls or
+ *   stores;
+ * - a load through a pointer or a division, which may fault, must also run
+ *   on every iteration (its block dominates the back edges), so that moving
+ *   it does not make it run when it otherwise would not.
+ * Calls and assignments of variables never move. Literals move only along
+ * with an instruction using them: on their own, loading one again is as
+ * cheap as keeping it in a register.
+ *
+ * The invariant instructions are moved, in the order they were found, in
+ * front of the header's label (see findPreheader() in ssa.c): the moved
+ * code runs once, only when the loop is entered. A loop whose header can be
+ * entered from elsewhere is left alone.
+ */
+
+// Instructions moved out of loops so far (see --stats)
+static size_t HoistedCount;
+
+/**
+ * hoistInvariants - Move the invariant instructions of a loop in front of
+ * it (see the NOTE above).
+ *
+ * @return true if instructions moved
+ */
+static bool hoistInvariants(struct irFunction *f, const struct irSSA *ssa,
+                            const struct irLoop *loop) {
+    int insertAt = findPreheader(f, ssa, loop);
+    bool *definedInLoop, *invariant, *usedByHoisted;
+    int *definition, *hoisted, *assigned;
+    int assignedCount = 0;
+    int hoistedCount = 0, movedCount = 0;
+    bool hasCall = false, hasStore = false, hasIndirectStore = false;
+    bool changed = true;
+
+    if (insertAt < 0) {
+        return false;
+    }
+
+    definedInLoop = calloc(f->vregCount + 1, sizeof(bool));
+    definition = malloc((f->vregCount + 1) * sizeof(int));
+    invariant = calloc(f->count + 1, sizeof(bool));
+    usedByHoisted = calloc(f->count + 1, sizeof(bool));
+    hoisted = malloc((f->count + 1) * sizeof(int));
+    assigned = malloc((f->count + 1) * sizeof(int));
+    if (definedInLoop == NULL || definition == NULL || invariant == NULL ||
+        usedByHoisted == NULL || hoisted == NULL || assigned == NULL) {
+        logFatal("Out of memory for loop-invariant code motion");
+    }
+
+    for (int b = 0; b < f->blockCount; b++) {
+        if (!loop->blocks[b]) {
+            continue;
+        }
+        for (int i = f->blocks[b].first; i <= f->blocks[b].last; i++) {
+            struct irInstruction *in = &f->code[i];
+            if (in->dst != IR_NOVREG) {
+                definedInLoop[in->dst] = true;
+                definition[in->dst] = i;
+            }
+            if (in->op == A_ASSIGN) {
+                assigned[assignedCount++] = in->value;
+            }
+            hasCall |= in->op == A_FUNCTIONCALL;
+            hasStore |= in->op == A_ASSIGN || in->op == IR_STOREINDIRECT;
+            hasIndirectStore |= in->op == IR_STOREINDIRECT;
+        }
+    }
+
+    // Find the invariant instructions, operands first
+    while (changed) {
+        changed = false;
+        for (int b = 0; b < f->blockCount; b++) {
+            if (!loop->blocks[b]) {
+                continue;
+            }
+            bool everyIteration = true;
+            for (int l = 0; l < loop->latchCount; l++) {
+                everyIteration &= blockDominates(ssa, b, loop->latches[l]);
+            }
+
+            for (int i = f->blocks[b].first; i <= f->blocks[b].last; i++) {
+                struct irInstruction *in = &f->code[i];
+                int sources[2] = {in->src1, in->src2};
+                bool isInvariant = !invariant[i] && in->dst != IR_NOVREG &&
+                                   in->dst >= f->variableCount &&
+                                   in->op != A_FUNCTIONCALL;
+
+                for (int k = 0; k < 2 && isInvariant; k++) {
+                    int v = sources[k];
+                    isInvariant =
+                        v == IR_NOVREG || !definedInLoop[v] ||
+                        (v >= f->variableCount && invariant[definition[v]]);
+                }
+
+                switch (in->op) {
+                case A_IDENTIFIER:
+                    isInvariant &= !hasCall && !hasIndirectStore;
+                    for (int a = 0; a < assignedCount && isInvariant; a++) {
+                        isInvariant = assigned[a] != in->value;
+                    }
+                    break;
+                case A_DEREFERENCE:
+                    isInvariant &= !hasCall && !hasStore && everyIteration;
+                    break;
+                case A_DIVIDE:
+                    isInvariant &= everyIteration;
+                    break;
+                }
+
+                if (isInvariant) {
+                    invariant[i] = true;
+                    hoisted[hoistedCount++] = i;
+                    changed = true;
+                }
+            }
+        }
+    }
+
+    // Literals only move with an instruction using them
+    for (int k = hoistedCount - 1; k >= 0; k--) {
+        struct irInstruction *in = &f->code[hoisted[k]];
+        if (in->op == A_INTEGERLITERAL && !usedByHoisted[hoisted[k]]) {
+            invariant[hoisted[k]] = false;
+            continue;
+        }
+        if (in->op != A_INTEGERLITERAL) {
+            movedCount++;
+        }
+        if (in->src1 != IR_NOVREG && definedInLoop[in->src1]) {
+            usedByHoisted[definition[in->src1]] = true;
+        }
+        if (in->src2 != IR_NOVREG && definedInLoop[in->src2]) {
+            usedByHoisted[definition[in->src2]] = true;
+        }
+    }
+
+    if (movedCount > 0) {
+        struct irInstruction *code = malloc((f->capacity + 1) * sizeof(*code));
+        int count = 0;
+
+        if (code == NULL) {
+            logFatal("Out of memory for loop-invariant code motion");
+        }
+        for (int i = 0; i < insertAt; i++) {
+            code[count++] = f->code[i];
+        }
+        for (int k = 0; k < hoistedCount; k++) {
+            if (invariant[hoisted[k]]) {
+                code[count++] = f->code[hoisted[k]];
+            }
+        }
+        for (int i = insertAt; i < f->count; i++) {
+            if (!invariant[i]) {
+                code[count++] = f->code[i];
+            }
+        }
+        free(f->code);
+        f->code = code;
+        buildBasicBlocks(f);
+        HoistedCount += movedCount;
+    }
+
+    free(definedInLoop);
+    free(definition);
+    free(invariant);
+    free(usedByHoisted);
+    free(hoisted);
+    free(assigned);
+    return movedCount > 0;
+}
+
+/**
+ * hoistLoopInvariants - Move the invariant computations of a function's
+ * loops in front of them (see the NOTE above).
+ *
+ * @param f The function, with its basic blocks
+ */
+void hoistLoopInvariants(struct irFunction *f) {
+    // Labels of the headers of the loops done, innermost first
+    int *done = malloc((f->count + 1) * sizeof(int));
+    int doneCount = 0;
+
+    if (done == NULL) {
+        logFatal("Out of memory for loop-invariant code motion");
+    }
+
+    for (;;) {
+        struct irSSA *ssa = buildSSA(f);
+        struct irLoop loop;
+
+        if (!findInnermostLoop(f, ssa, done, doneCount, &loop)) {
+            freeSSA(ssa);
+            break;
+        }
+        done[doneCount++] = f->code[f->blocks[loop.header].first].value;
+        hoistInvariants(f, ssa, &loop);
+        freeLoop(&loop);
+        freeSSA(ssa);
+    }
+
+    free(done);
+}
+
+/**
+ * printLoopInvariantStats - Print loop-invariant code motion statistics
+ * (--stats).
+ *
+ * @param stream Output stream
+ */
+void printLoopInvariantStats(FILE *stream) {
+    fprintf(stream, "Loop-invariant code motion: %zu instructions hoisted\n",
+            HoistedCount);
+}
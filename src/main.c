@@ -6,6 +6,7 @@
 #define extern_
 #include "data.h"
 #undef extern_
+#include "emit.h"
 
 #include <errno.h>
 #include <getopt.h>
@@ -17,12 +18,7 @@
 /**
  * initCompilerState - Initialize global compiler state variables.
  */
-static void initCompilerState(void) {
-    Line = 1;
-    Putback = '\n';
-    NextGlobalSymbolIndex = 0;           // Grow upward
-    NextLocalSymbolIndex = NSYMBOLS - 1; // Grow downward
-}
+static void initCompilerState(void) { Line = 1; }
 
 /**
  * dieUsage - Print usage message and exit.
@@ -35,8 +31,13 @@ static void dieUsage(const char *program) {
     fprintf(stderr,
             "Usage: %s [--output outfile | -o outfile] "
             "[--target [nasm|aarch64]|-t [nasm|aarch64]] "
+            "[--emit [asm|obj|exe]|-e [asm|obj|exe]] "
+            "[--runtime-dir dir] "
             "[--dump-ast|-a] "
             "[--dump-ast-compacted|-A] "
+            "[--dump-ir] "
+            "[--stats] "
+            "[-O0|-O1] "
             "infile\n",
             program);
     exit(1);
@@ -66,6 +67,59 @@ static int parseTargetOrDie(const char *targetName, const char *program) {
     return TARGET_NASM; // unreachable, but keeps compilers quiet
 }
 
+/**
+ * parseEmitOrDie - Parse the output kind name and return the corresponding
+ * EMIT_* constant. Exit if the kind is unsupported.
+ *
+ * @param emitName The name of the output kind (e.g., "asm", "exe").
+ * @param program Name of the program (typically argv[0]).
+ *
+ * @return The output kind constant.
+ */
+static int parseEmitOrDie(const char *emitName, const char *program) {
+    if (strcmp(emitName, "asm") == 0) {
+        return EMIT_ASM;
+    }
+    if (strcmp(emitName, "obj") == 0) {
+        return EMIT_OBJ;
+    }
+    if (strcmp(emitName, "exe") == 0) {
+        return EMIT_EXE;
+    }
+
+    fprintf(stderr,
+            "Unsupported output kind: %s (only 'asm', 'obj' or 'exe' "
+            "is supported)\n",
+            emitName);
+    dieUsage(program);
+    return EMIT_ASM; // unreachable, but keeps compilers quiet
+}
+
+/**
+ * parseOptimizationLevelOrDie - Parse the argument of -O and return the
+ * optimization level. Exit if the level is unsupported.
+ *
+ * @param level The level as given after -O (e.g., "1").
+ * @param program Name of the program (typically argv[0]).
+ *
+ * @return The optimization level.
+ */
+static int parseOptimizationLevelOrDie(const char *level, const char *program) {
+    if (strcmp(level, "0") == 0) {
+        return 0;
+    }
+    if (strcmp(level, "1") == 0) {
+        return 1;
+    }
+
+    fprintf(stderr,
+            "Unsupported optimization level: -O%s (only -O0 or -O1 is "
+            "supported)\n",
+            level);
+    dieUsage(program);
+    return 0; // unreachable, but keeps compilers quiet
+}
+
 /**
  * parseArgsOrDie - Parse command-line arguments and set output parameters.
  *
@@ -81,18 +135,23 @@ static void parseArgsOrDie(int argc, char **argv, const char **outTargetName,
     // Defaults
     const char *targetName = "nasm"; // TARGET_NASM
     const char *infilePath = NULL;
-    const char *outfilePath = "out.asm"; // default
+    const char *outfilePath = NULL; // default depends on --emit
 
     static struct option longopts[] = {
         {"target", required_argument, 0, 't'},
         {"output", required_argument, 0, 'o'},
+        {"emit", required_argument, 0, 'e'},
+        {"runtime-dir", required_argument, 0, 'R'},
         {"dump-ast", no_argument, 0, 'a'},
         {"dump-ast-compacted", no_argument, 0, 'A'},
+        {"dump-ir", no_argument, 0, 'I'},
+        {"stats", no_argument, 0, 'S'},
         {0, 0, 0, 0},
     };
 
     int opt;
-    while ((opt = getopt_long(argc, argv, "t:o:aA", longopts, NULL)) != -1) {
+    while ((opt = getopt_long(argc, argv, "t:o:e:aAO:", longopts, NULL)) !=
+           -1) {
         switch (opt) {
         case 't':
             targetName = optarg;
@@ -100,6 +159,12 @@ static void parseArgsOrDie(int argc, char **argv, const char **outTargetName,
         case 'o':
             outfilePath = optarg;
             break;
+        case 'e':
+            Option_emit = parseEmitOrDie(optarg, argv[0]);
+            break;
+        case 'R':
+            Option_runtimeDir = optarg;
+            break;
         case 'a':
             Option_dumpAST = true;
             Option_dumpASTCompacted = false;
@@ -108,6 +173,16 @@ static void parseArgsOrDie(int argc, char **argv, const char **outTargetName,
             Option_dumpAST = true;
             Option_dumpASTCompacted = true;
             break;
+        case 'I':
+            Option_dumpIR = true;
+            break;
+        case 'S':
+            Option_stats = true;
+            break;
+        case 'O':
+            Option_optimizationLevel =
+                parseOptimizationLevelOrDie(optarg, argv[0]);
+            break;
         default:
             dieUsage(argv[0]);
         }
@@ -119,6 +194,12 @@ static void parseArgsOrDie(int argc, char **argv, const char **outTargetName,
     }
     infilePath = argv[optind];
 
+    if (outfilePath == NULL) {
+        outfilePath = Option_emit == EMIT_EXE   ? "a.out"
+                      : Option_emit == EMIT_OBJ ? "out.o"
+                                                : "out.asm";
+    }
+
     *outTargetName = targetName;
     *outInfilePath = infilePath;
     *outOutfilePath = outfilePath;
@@ -126,20 +207,20 @@ static void parseArgsOrDie(int argc, char **argv, const char **outTargetName,
 
 /**
  * openFilesOrDie - Open input and output files, or exit on failure.
+ * The source text is mapped into memory for the scanner (see inputOpen).
+ * The emitter receives the generated assembly (see driverOpenOutput).
  *
  * @param infilePath Path to the input file.
  * @param outfilePath Path to the output file.
  */
 static void openFilesOrDie(const char *infilePath, const char *outfilePath) {
-    Infile = fopen(infilePath, "r");
-    if (Infile == NULL) {
+    if (!inputOpen(infilePath)) {
         fprintf(stderr, "Cannot open %s: %s\n", infilePath, strerror(errno));
         exit(1);
     }
 
-    Outfile = fopen(outfilePath, "w");
-    if (Outfile == NULL) {
-        fclose(Infile);
+    if (!driverOpenOutput(outfilePath)) {
+        inputClose();
         fprintf(stderr, "Cannot open %s for writing: %s\n", outfilePath,
                 strerror(errno));
         exit(1);
@@ -147,13 +228,14 @@ static void openFilesOrDie(const char *infilePath, const char *outfilePath) {
 }
 
 /**
- * closeFiles - Close input and output files if they are open.
+ * closeFiles - Flush the emitter, close the output file if it is open and
+ * release the source text.
  */
 static void closeFiles(void) {
+    emitClose();
     if (Outfile)
         fclose(Outfile);
-    if (Infile)
-        fclose(Infile);
+    inputClose();
 }
 
 int main(int argc, char **argv) {
@@ -162,8 +244,13 @@ int main(int argc, char **argv) {
     const char *outfilePath = NULL;
 
     // Defaults (may be overridden by CLI flags)
+    Option_emit = EMIT_ASM;
+    Option_runtimeDir = NULL;
     Option_dumpAST = false;
     Option_dumpASTCompacted = false;
+    Option_dumpIR = false;
+    Option_stats = false;
+    Option_optimizationLevel = 0;
 
     parseArgsOrDie(argc, argv, &targetName, &infilePath, &outfilePath);
 
@@ -187,5 +274,18 @@ int main(int argc, char **argv) {
     codegenPostamble();
 
     closeFiles();
+
+    if (Option_stats) {
+        printASTArenaStats(stderr);
+        printValueNumberingStats(stderr);
+        printLoopInvariantStats(stderr);
+        printInductionVariableStats(stderr);
+        printDeadCodeStats(stderr);
+        printPeepholeStats(stderr);
+        printRegisterStats(stderr);
+    }
+
+    // Assemble (and link) unless plain assembly was requested
+    driverFinishOutput(outfilePath);
     return 0;
 }
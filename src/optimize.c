@@ -0,0 +1,240 @@
+// src/optimize.c
+
+// AST optimization passes, run on every function's tree between parsing and
+// code generation when -O1 (or higher) is given.
+
+#include "data.h"
+#include "decl.h"
+#include "defs.h"
+
+#include <limits.h>
+
+/**
+ * NOTE:
+ * Constant folding.
+ * The backends evaluate every expression in 64-bit registers: char and int
+ * values are widened when they are loaded (A_WIDENTYPE emits no code) and
+ * only narrowed again when they are stored. Folding therefore computes in
+ * 64 bits as well, with the same wrap-around, logical right shift and
+ * truncating division as the generated code, and keeps the node's type, so
+ * that a store of the folded literal narrows it exactly like the store of
+ * the computed value would.
+ *
+ * A_INTEGERLITERAL holds an int, so a result outside the int range is left
+ * to be computed at run time, and so are divisions by zero and shifts that
+ * the hardware would mask.
+ */
+
+/**
+ * isIntegerLiteral - Check whether a node is an integer literal.
+ */
+static bool isIntegerLiteral(struct ASTnode *n) {
+    return n != NULL && n->op == A_INTEGERLITERAL;
+}
+
+/**
+ * foldBinaryOperation - Evaluate a binary operator on two constants.
+ *
+ * @param op The AST operation code
+ * @param a The left operand
+ * @param b The right operand
+ * @param result Receives the value
+ *
+ * @return true if the operator was folded
+ */
+static bool foldBinaryOperation(int op, int64_t a, int64_t b, int64_t *result) {
+    uint64_t ua = (uint64_t)a;
+    uint64_t ub = (uint64_t)b;
+
+    switch (op) {
+    case A_ADD:
+        *result = (int64_t)(ua + ub);
+        return true;
+    case A_SUBTRACT:
+        *result = (int64_t)(ua - ub);
+        return true;
+    case A_MULTIPLY:
+        *result = (int64_t)(ua * ub);
+        return true;
+    case A_DIVIDE:
+        if (b == 0 || (a == INT64_MIN && b == -1)) {
+            return false;
+        }
+        *result = a / b;
+        return true;
+    case A_BITWISEAND:
+        *result = a & b;
+        return true;
+    case A_BITWISEOR:
+        *result = a | b;
+        return true;
+    case A_BITWISEXOR:
+        *result = a ^ b;
+        return true;
+    case A_LSHIFT:
+        if (b < 0 || b > 63) {
+            return false;
+        }
+        *result = (int64_t)(ua << b);
+        return true;
+    case A_RSHIFT:
+        if (b < 0 || b > 63) {
+            return false;
+        }
+        *result = (int64_t)(ua >> b);
+        return true;
+    case A_EQ:
+        *result = a == b;
+        return true;
+    case A_NE:
+        *result = a != b;
+        return true;
+    case A_LT:
+        *result = a < b;
+        return true;
+    case A_GT:
+        *result = a > b;
+        return true;
+    case A_LE:
+        *result = a <= b;
+        return true;
+    case A_GE:
+        *result = a >= b;
+        return true;
+    case A_LOGICALAND:
+        *result = a && b;
+        return true;
+    case A_LOGICALOR:
+        *result = a || b;
+        return true;
+    default:
+        return false;
+    }
+}
+
+/**
+ * foldUnaryOperation - Evaluate a unary operator on a constant.
+ *
+ * @param n The operator node (A_SCALETYPE needs its scale size)
+ * @param a The operand
+ * @param result Receives the value
+ *
+ * @return true if the operator was folded
+ */
+static bool foldUnaryOperation(struct ASTnode *n, int64_t a, int64_t *result) {
+    switch (n->op) {
+    case A_ARITHMETICNEGATE:
+        *result = (int64_t)(0 - (uint64_t)a);
+        return true;
+    case A_LOGICALINVERT:
+        *result = ~a;
+        return true;
+    case A_LOGICALNOT:
+        *result = !a;
+        return true;
+    case A_TOBOOLEAN:
+        *result = a != 0;
+        return true;
+    case A_WIDENTYPE:
+        *result = a;
+        return true;
+    case A_SCALETYPE:
+        *result = (int64_t)((uint64_t)a * (uint64_t)n->v.size);
+        return true;
+    default:
+        return false;
+    }
+}
+
+/**
+ * replaceWithLiteral - Turn a node into an integer literal in place.
+ *
+ * @param n The node to replace (keeps its type and isRvalue)
+ * @param value The literal value
+ *
+ * @return true if the value fits in an integer literal
+ */
+static bool replaceWithLiteral(struct ASTnode *n, int64_t value) {
+    if (value < INT_MIN || value > INT_MAX) {
+        return false;
+    }
+
+    n->op = A_INTEGERLITERAL;
+    n->left = n->middle = n->right = astRefOf(NULL);
+    n->v.intvalue = (int)value;
+    return true;
+}
+
+static void foldConstants(struct ASTnode *n);
+
+/**
+ * foldOperands - Fold the subtrees of a node, but not the node itself.
+ */
+static void foldOperands(struct ASTnode *n) {
+    foldConstants(astLeft(n));
+    foldConstants(astMiddle(n));
+    foldConstants(astRight(n));
+}
+
+/**
+ * foldConstants - Replace the constant subtrees of a tree by literals
+ * (bottom-up).
+ *
+ * @param n The root of the tree
+ */
+static void foldConstants(struct ASTnode *n) {
+    struct ASTnode *left, *right;
+    int64_t value;
+
+    if (n == NULL) {
+        return;
+    }
+
+    switch (n->op) {
+    case A_IF:
+    case A_WHILE:
+        // NOTE:
+        // The condition must stay a comparison or an A_TOBOOLEAN, which
+        // codegenCondition() turns into conditional jumps; only its operands
+        // are folded.
+        foldOperands(astLeft(n));
+        foldConstants(astMiddle(n));
+        foldConstants(astRight(n));
+        return;
+    }
+
+    foldOperands(n);
+
+    left = astLeft(n);
+    right = astRight(n);
+    if (astMiddle(n) != NULL || !isIntegerLiteral(left)) {
+        return;
+    }
+
+    if (right == NULL) {
+        if (foldUnaryOperation(n, left->v.intvalue, &value)) {
+            replaceWithLiteral(n, value);
+        }
+    } else if (isIntegerLiteral(right)) {
+        if (foldBinaryOperation(n->op, left->v.intvalue, right->v.intvalue,
+                                &value)) {
+            replaceWithLiteral(n, value);
+        }
+    }
+}
+
+/**
+ * optimizeAST - Run the AST optimization passes selected by the
+ * optimization level on a function's tree.
+ *
+ * @param n The root of the tree (A_FUNCTION)
+ *
+ * @return The optimized tree
+ */
+struct ASTnode *optimizeAST(struct ASTnode *n) {
+    if (Option_optimizationLevel >= 1) {
+        foldConstants(n);
+    }
+
+    return n;
+}
@@ -0,0 +1,567 @@
+// src/peephole.c
+
+// Peephole optimization of the assembly generated for a function at -O1:
+// the target-independent part (see peephole.h and cgn/*/cgn_peephole.c).
+
+#include "peephole.h"
+#include "cgn/cg_ops.h"
+#include "data.h"
+#include "decl.h"
+#include "defs.h"
+#include "emit.h"
+
+#include <errno.h>
+
+/**
+ * NOTE:
+ * The code of a function is held back in the emitter while gen.c generates
+ * it (see beginPeepholeCapture()), then split into lines. Every rule of the
+ * backend's table is tried at every instruction, over and over until no
+ * rule changes anything; every rule removes lines or makes them simpler, so
+ * this ends. The lines left are emitted again, the untouched ones as they
+ * were generated.
+ *
+ * The code is lowered from the IR, so every value a rule removes is in a
+ * register the describe() of the backend knows about, and the flags are
+ * only ever read by the instruction right after the one setting them.
+ */
+
+// Most jumps followed from a jump to the final target
+#define PEEPHOLE_MAX_JUMP_CHAIN 8
+
+/**
+ * parseLabelNumber - Parse a numbered label ("L<n>").
+ *
+ * @return n, or -1 if the text is not such a label
+ */
+static int parseLabelNumber(const char *text, size_t length) {
+    int number = 0;
+
+    if (length < 2 || text[0] != 'L') {
+        return -1;
+    }
+    for (size_t k = 1; k < length; k++) {
+        if (text[k] < '0' || text[k] > '9' || number > 100000000) {
+            return -1;
+        }
+        number = number * 10 + (text[k] - '0');
+    }
+    return number;
+}
+
+/**
+ * peepholeParseLabel - Parse an operand naming a numbered label ("L<n>").
+ *
+ * @return n, or -1 if the operand is not such a label
+ */
+int peepholeParseLabel(const char *operand) {
+    return parseLabelNumber(operand, strlen(operand));
+}
+
+/**
+ * peepholeParseImmediate - Parse an immediate operand ("42", "#-3").
+ *
+ * @param value Receives the immediate
+ *
+ * @return true if the operand is an immediate
+ */
+bool peepholeParseImmediate(const char *operand, long long *value) {
+    char *end;
+
+    if (*operand == '#') {
+        operand++;
+    }
+    if (*operand != '-' && (*operand < '0' || *operand > '9')) {
+        return false;
+    }
+    errno = 0;
+    *value = strtoll(operand, &end, 10);
+    return *end == '\0' && errno == 0;
+}
+
+/**
+ * copyText - Copy text into a line's field.
+ *
+ * @return false if it does not fit
+ */
+static bool copyText(char *field, const char *text, size_t length) {
+    if (length >= PEEPHOLE_TEXT_SIZE) {
+        return false;
+    }
+    memcpy(field, text, length);
+    field[length] = '\0';
+    return true;
+}
+
+/**
+ * parseLine - Split a line into its mnemonic and operands. Operands are
+ * separated by ", " outside brackets (AArch64 addresses have commas).
+ */
+static void parseLine(struct peepholeLine *line) {
+    const char *s = line->text;
+    const char *end = s + line->length;
+    const char *start;
+    int depth = 0;
+
+    line->kind = PEEPHOLE_OTHER;
+    line->label = -1;
+    line->operandCount = 0;
+    if (end > s && end[-1] == '\n') {
+        end--;
+    }
+
+    if (*s != '\t') {
+        if (end > s && end[-1] == ':') {
+            line->kind = PEEPHOLE_LABEL;
+            line->label = parseLabelNumber(s, end - s - 1);
+        }
+        return;
+    }
+
+    start = ++s;
+    while (s < end && *s != '\t') {
+        s++;
+    }
+    if (!copyText(line->mnemonic, start, s - start)) {
+        return;
+    }
+
+    if (s < end) {
+        start = ++s;
+        for (; s <= end; s++) {
+            if (s < end && (*s == '[' || *s == '(')) {
+                depth++;
+            } else if (s < end && (*s == ']' || *s == ')')) {
+                depth--;
+            } else if (s == end || (depth == 0 && *s == ',')) {
+                if (line->operandCount == PEEPHOLE_MAX_OPERANDS ||
+                    !copyText(line->operands[line->operandCount], start,
+                              s - start)) {
+                    return;
+                }
+                line->operandCount++;
+                if (s < end && s + 1 < end && s[1] == ' ') {
+                    s++;
+                }
+                start = s + 1;
+            }
+        }
+    }
+    line->kind = PEEPHOLE_INSTRUCTION;
+}
+
+/**
+ * splitLines - Split a function's text into lines.
+ *
+ * @return The lines (count of them in *count)
+ */
+static struct peepholeLine *splitLines(const char *text, size_t length,
+                                       int *count) {
+    struct peepholeLine *lines;
+    int lineCount = 0;
+    const char *s = text, *end = text + length;
+
+    for (size_t k = 0; k < length; k++) {
+        lineCount += text[k] == '\n';
+    }
+    lines = calloc(lineCount + 1, sizeof(*lines));
+    if (lines == NULL) {
+        logFatal("Out of memory for peephole optimization");
+    }
+
+    *count = 0;
+    while (s < end) {
+        const char *newline = memchr(s, '\n', end - s);
+        const char *next = newline != NULL ? newline + 1 : end;
+        struct peepholeLine *line = &lines[(*count)++];
+
+        line->text = s;
+        line->length = next - s;
+        parseLine(line);
+        s = next;
+    }
+    return lines;
+}
+
+/**
+ * mapLabels - Record the line of every numbered label of the function.
+ */
+static void mapLabels(struct peepholeFunction *p) {
+    int last = -1;
+
+    p->firstLabel = -1;
+    for (int i = 0; i < p->count; i++) {
+        int label = p->lines[i].label;
+        if (label < 0) {
+            continue;
+        }
+        if (p->firstLabel < 0 || label < p->firstLabel) {
+            p->firstLabel = label;
+        }
+        if (label > last) {
+            last = label;
+        }
+    }
+
+    p->labelCount = p->firstLabel < 0 ? 0 : last - p->firstLabel + 1;
+    p->labelLines = malloc((p->labelCount + 1) * sizeof(int));
+    if (p->labelLines == NULL) {
+        logFatal("Out of memory for peephole optimization");
+    }
+    for (int k = 0; k < p->labelCount; k++) {
+        p->labelLines[k] = -1;
+    }
+    for (int i = 0; i < p->count; i++) {
+        if (p->lines[i].label >= 0) {
+            p->labelLines[p->lines[i].label - p->firstLabel] = i;
+        }
+    }
+}
+
+/**
+ * peepholeLabelLine - Find the line of a numbered label.
+ *
+ * @return The line, or -1 if the label is not in the function
+ */
+int peepholeLabelLine(const struct peepholeFunction *p, int label) {
+    if (label < p->firstLabel || label >= p->firstLabel + p->labelCount) {
+        return -1;
+    }
+    return p->labelLines[label - p->firstLabel];
+}
+
+/**
+ * peepholeNextInstruction - Find the instruction right after a line, with
+ * no label in between.
+ *
+ * @return Its line, or -1 if a label or the end of the function comes first
+ */
+int peepholeNextInstruction(const struct peepholeFunction *p, int i) {
+    for (int k = i + 1; k < p->count; k++) {
+        if (p->lines[k].removed) {
+            continue;
+        }
+        return p->lines[k].kind == PEEPHOLE_INSTRUCTION ? k : -1;
+    }
+    return -1;
+}
+
+/**
+ * peepholePreviousInstruction - Find the instruction right before a line,
+ * with no label in between.
+ *
+ * @return Its line, or -1 if a label or the start of the function comes
+ * first
+ */
+int peepholePreviousInstruction(const struct peepholeFunction *p, int i) {
+    for (int k = i - 1; k >= 0; k--) {
+        if (p->lines[k].removed) {
+            continue;
+        }
+        return p->lines[k].kind == PEEPHOLE_INSTRUCTION ? k : -1;
+    }
+    return -1;
+}
+
+/**
+ * peepholeRewrite - Replace a line's instruction.
+ *
+ * @param mnemonic The mnemonic (it may be the line's own)
+ * @param operands The operands (they may be the line's own)
+ * @param operandCount Number of operands
+ */
+void peepholeRewrite(struct peepholeLine *line, const char *mnemonic,
+                     const char *const *operands, int operandCount) {
+    char copies[PEEPHOLE_MAX_OPERANDS][PEEPHOLE_TEXT_SIZE];
+    char copy[PEEPHOLE_TEXT_SIZE];
+
+    for (int k = 0; k < operandCount; k++) {
+        snprintf(copies[k], PEEPHOLE_TEXT_SIZE, "%s", operands[k]);
+    }
+    snprintf(copy, PEEPHOLE_TEXT_SIZE, "%s", mnemonic);
+    memcpy(line->mnemonic, copy, PEEPHOLE_TEXT_SIZE);
+    for (int k = 0; k < operandCount; k++) {
+        memcpy(line->operands[k], copies[k], PEEPHOLE_TEXT_SIZE);
+    }
+    line->operandCount = operandCount;
+    line->rewritten = true;
+}
+
+/**
+ * peepholeRemove - Drop a line.
+ */
+void peepholeRemove(struct peepholeFunction *p, int i) {
+    p->lines[i].removed = true;
+}
+
+/**
+ * pushLine - Push a line control reaches onto the stack of lines to visit,
+ * unless it was visited already.
+ */
+static void pushLine(struct peepholeFunction *p, int i, int *depth) {
+    if (p->marks[i] != p->mark) {
+        p->marks[i] = p->mark;
+        p->stack[(*depth)++] = i;
+    }
+}
+
+/**
+ * pushSuccessors - Push the lines control may go to after a line.
+ *
+ * @return false if it may go somewhere unknown (a label outside the
+ * function, or past its end)
+ */
+static bool pushSuccessors(struct peepholeFunction *p, int i,
+                           const struct peepholeEffect *effect, int *depth) {
+    if (effect->flow == PEEPHOLE_JUMP || effect->flow == PEEPHOLE_BRANCH) {
+        int target = peepholeLabelLine(p, effect->label);
+        if (target < 0) {
+            return false;
+        }
+        pushLine(p, target, depth);
+    }
+    if (effect->flow == PEEPHOLE_JUMP || effect->flow == PEEPHOLE_RETURN) {
+        return true;
+    }
+    if (i + 1 >= p->count) {
+        return false;
+    }
+    pushLine(p, i + 1, depth);
+    return true;
+}
+
+/**
+ * peepholeRegisterDead - Tell whether the value of a register after an
+ * instruction is never used: on every path from it, the register is
+ * overwritten, clobbered by a call, or the function returns without
+ * reading it first.
+ *
+ * @param i The instruction's line
+ * @param reg The register, numbered by the backend
+ */
+bool peepholeRegisterDead(struct peepholeFunction *p, int i, int reg) {
+    uint64_t bit = 1ull << reg;
+    struct peepholeEffect effect;
+    int depth = 0;
+
+    if (p->mark == INT32_MAX) {
+        memset(p->marks, 0, p->count * sizeof(int));
+        p->mark = 0;
+    }
+    p->mark++;
+
+    p->target->describe(&p->lines[i], &effect);
+    if (!pushSuccessors(p, i, &effect, &depth)) {
+        return false;
+    }
+
+    while (depth > 0) {
+        int k = p->stack[--depth];
+        struct peepholeLine *line = &p->lines[k];
+
+        if (line->removed || line->kind == PEEPHOLE_LABEL) {
+            effect.flow = PEEPHOLE_NEXT;
+        } else if (line->kind == PEEPHOLE_OTHER) {
+            return false;
+        } else {
+            p->target->describe(line, &effect);
+            if (effect.reads & bit) {
+                return false;
+            }
+            if ((effect.writes & bit) || effect.flow == PEEPHOLE_RETURN ||
+                (effect.flow == PEEPHOLE_CALL &&
+                 !(p->target->preservedByCalls & bit))) {
+                continue;
+            }
+        }
+        if (!pushSuccessors(p, k, &effect, &depth)) {
+            return false;
+        }
+    }
+    return true;
+}
+
+/**
+ * peepholeJumpToNext - Rule removing a jump or branch to the label right
+ * after it.
+ */
+bool peepholeJumpToNext(struct peepholeFunction *p, int i) {
+    struct peepholeEffect effect;
+
+    p->target->describe(&p->lines[i], &effect);
+    if ((effect.flow != PEEPHOLE_JUMP && effect.flow != PEEPHOLE_BRANCH) ||
+        effect.label < 0) {
+        return false;
+    }
+    for (int k = i + 1; k < p->count; k++) {
+        if (p->lines[k].removed) {
+            continue;
+        }
+        if (p->lines[k].kind != PEEPHOLE_LABEL) {
+            return false;
+        }
+        if (p->lines[k].label == effect.label) {
+            peepholeRemove(p, i);
+            return true;
+        }
+    }
+    return false;
+}
+
+/**
+ * peepholeJumpToJump - Rule making a jump or branch to a jump go to the
+ * final target directly. The target is the last operand.
+ */
+bool peepholeJumpToJump(struct peepholeFunction *p, int i) {
+    struct peepholeLine *line = &p->lines[i];
+    struct peepholeEffect effect;
+    int target, first;
+
+    p->target->describe(line, &effect);
+    if ((effect.flow != PEEPHOLE_JUMP && effect.flow != PEEPHOLE_BRANCH) ||
+        effect.label < 0) {
+        return false;
+    }
+
+    first = target = effect.label;
+    for (int steps = 0; steps < PEEPHOLE_MAX_JUMP_CHAIN; steps++) {
+        int k = peepholeLabelLine(p, target);
+        struct peepholeEffect next;
+
+        while (k >= 0 && k < p->count &&
+               (p->lines[k].removed || p->lines[k].kind == PEEPHOLE_LABEL)) {
+            k++;
+        }
+        if (k < 0 || k >= p->count ||
+            p->lines[k].kind != PEEPHOLE_INSTRUCTION) {
+            break;
+        }
+        p->target->describe(&p->lines[k], &next);
+        if (next.flow != PEEPHOLE_JUMP || next.label < 0) {
+            break;
+        }
+        if (next.label == first) {
+            return false; // A loop of jumps
+        }
+        target = next.label;
+    }
+    if (target == first) {
+        return false;
+    }
+
+    snprintf(line->operands[line->operandCount - 1], PEEPHOLE_TEXT_SIZE, "L%d",
+             target);
+    line->rewritten = true;
+    return true;
+}
+
+/**
+ * applyRules - Apply the rules of a table until none changes anything.
+ */
+static void applyRules(struct peepholeFunction *p) {
+    struct peepholeRule *rules = p->target->rules;
+    bool changed = true;
+
+    while (changed) {
+        changed = false;
+        for (int i = 0; i < p->count; i++) {
+            for (int r = 0; r < p->target->ruleCount; r++) {
+                if (p->lines[i].removed ||
+                    p->lines[i].kind != PEEPHOLE_INSTRUCTION) {
+                    break;
+                }
+                if (rules[r].apply(p, i)) {
+                    rules[r].hits++;
+                    changed = true;
+                }
+            }
+        }
+    }
+}
+
+/**
+ * emitLines - Emit the lines left.
+ */
+static void emitLines(const struct peepholeFunction *p) {
+    for (int i = 0; i < p->count; i++) {
+        const struct peepholeLine *line = &p->lines[i];
+
+        if (line->removed) {
+            continue;
+        }
+        if (!line->rewritten) {
+            emitBytes(line->text, line->length);
+            continue;
+        }
+        emitBeginInstruction(line->mnemonic);
+        for (int k = 0; k < line->operandCount; k++) {
+            emitOperand(line->operands[k]);
+        }
+        emitEndInstruction();
+    }
+}
+
+/**
+ * beginPeepholeCapture - Hold back the code generated from now on, up to
+ * optimizeCapturedCode().
+ */
+void beginPeepholeCapture(void) { emitBeginCapture(); }
+
+/**
+ * optimizeCapturedCode - Apply the backend's peephole rules to the code
+ * generated since beginPeepholeCapture() and emit it (see the NOTE above).
+ */
+void optimizeCapturedCode(void) {
+    struct peepholeFunction p;
+    size_t length;
+    char *text = emitEndCapture(&length);
+
+    if (CG->peephole == NULL) {
+        emitBytes(text, length);
+        free(text);
+        return;
+    }
+
+    p.target = CG->peephole;
+    p.lines = splitLines(text, length, &p.count);
+    mapLabels(&p);
+    p.marks = calloc(p.count + 1, sizeof(int));
+    p.stack = malloc((p.count + 1) * sizeof(int));
+    p.mark = 0;
+    if (p.marks == NULL || p.stack == NULL) {
+        logFatal("Out of memory for peephole optimization");
+    }
+
+    applyRules(&p);
+    emitLines(&p);
+
+    free(p.lines);
+    free(p.labelLines);
+    free(p.marks);
+    free(p.stack);
+    free(text);
+}
+
+/**
+ * printPeepholeStats - Print peephole optimization statistics (--stats):
+ * how often each rule of the target's table rewrote code.
+ *
+ * @param stream Output stream
+ */
+void printPeepholeStats(FILE *stream) {
+    const struct peepholeTarget *target = CG->peephole;
+    size_t total = 0;
+
+    if (target == NULL) {
+        return;
+    }
+    for (int r = 0; r < target->ruleCount; r++) {
+        total += target->rules[r].hits;
+    }
+    fprintf(stream, "Peephole optimization: %zu rewrites (", total);
+    for (int r = 0; r < target->ruleCount; r++) {
+        fprintf(stream, "%s%s %zu", r > 0 ? ", " : "", target->rules[r].name,
+                target->rules[r].hits);
+    }
+    fprintf(stream, ")\n");
+}
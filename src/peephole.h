@@ -0,0 +1,95 @@
+// src/peephole.h
+#pragma once
+
+#include <stdbool.h>
+#include <stddef.h>
+#include <stdint.h>
+
+/**
+ * NOTE:
+ * Peephole optimization of the assembly generated for a function at -O1
+ * (see peephole.c). The function's text is split into lines, each backend
+ * rewrites them with the rules of its table (cgn_peephole.c) until none
+ * applies, and the lines left are emitted again.
+ *
+ * Rules see the lines as mnemonics and operands. To tell whether a register
+ * still holds a needed value, they ask peepholeRegisterDead(), which follows
+ * the jumps of the function using what the backend's describe() says each
+ * instruction reads, writes and where it goes next. Registers are numbered
+ * by the backend (at most 64), whatever the width of the name used.
+ */
+
+// Most operands of a line the rules look at
+#define PEEPHOLE_MAX_OPERANDS 4
+// Room for a mnemonic or an operand; longer lines are kept as they are
+#define PEEPHOLE_TEXT_SIZE 64
+
+// Kinds of lines
+enum {
+    PEEPHOLE_INSTRUCTION, // "\t<mnemonic>\t<operand>, ..." (or a directive)
+    PEEPHOLE_LABEL,       // "<name>:"
+    PEEPHOLE_OTHER,       // Anything else, never looked into
+};
+
+// Line of a function's assembly
+struct peepholeLine {
+    int kind;         // PEEPHOLE_INSTRUCTION, ...
+    int label;        // Number of an "L<n>:" label, else -1
+    bool removed;     // Dropped by a rule
+    bool rewritten;   // Emitted from mnemonic and operands, not text
+    const char *text; // The line as generated, with its newline
+    size_t length;
+    char mnemonic[PEEPHOLE_TEXT_SIZE];
+    char operands[PEEPHOLE_MAX_OPERANDS][PEEPHOLE_TEXT_SIZE];
+    int operandCount;
+};
+
+// Where control goes after an instruction
+enum {
+    PEEPHOLE_NEXT,   // The next line
+    PEEPHOLE_JUMP,   // The label only
+    PEEPHOLE_BRANCH, // The label or the next line
+    PEEPHOLE_CALL,   // The next line, once the callee returned
+    PEEPHOLE_RETURN, // Out of the function
+};
+
+// What an instruction does with the registers (bit n: register n)
+struct peepholeEffect {
+    uint64_t reads;  // Registers read (implicitly, too)
+    uint64_t writes; // Registers overwritten whole without being read
+    int flow;        // PEEPHOLE_NEXT, ...
+    int label;       // Jump or branch target "L<n>", or -1 if another
+};
+
+struct peepholeFunction;
+
+// Rewriting rule, tried at every line
+struct peepholeRule {
+    const char *name; // Reported by --stats
+    // Rewrites the lines starting at line i, returns true if it did
+    bool (*apply)(struct peepholeFunction *p, int i);
+    size_t hits;
+};
+
+// Peephole rules and instruction model of a backend (CG->peephole)
+struct peepholeTarget {
+    struct peepholeRule *rules;
+    int ruleCount;
+    void (*describe)(const struct peepholeLine *line,
+                     struct peepholeEffect *effect);
+    // Registers a call leaves unchanged
+    uint64_t preservedByCalls;
+};
+
+// A function's lines while rules run
+struct peepholeFunction {
+    const struct peepholeTarget *target;
+    struct peepholeLine *lines;
+    int count;
+    int *labelLines; // Line of label firstLabel + k, or -1
+    int firstLabel;
+    int labelCount;
+    int *marks; // Lines visited by peepholeRegisterDead() (== mark)
+    int *stack; // Lines it has yet to visit
+    int mark;
+};
@@ -0,0 +1,308 @@
+// src/regalloc.c
+
+// Register allocation for the IR (see ir.h): liveness analysis over the
+// function's basic blocks, then linear-scan allocation of the backend's
+// registers to the virtual registers.
+
+#include "cgn/cg_ops.h"
+#include "data.h"
+#include "decl.h"
+#include "defs.h"
+#include "ir.h"
+
+#include <limits.h>
+
+/**
+ * NOTE:
+ * Liveness and live intervals.
+ * Instruction i reads its operands at position 2i and writes its result at
+ * 2i + 1, so an instruction's result may take the register of an operand
+ * that dies there. Liveness is computed per basic block (a block starts at
+ * a label or after a jump or branch) with the usual backward data-flow
+ * equations, and every virtual register gets one interval from its first to
+ * its last live position, which also covers the loops it is live around.
+ *
+ * Linear scan (Poletto & Sarkar).
+ * Intervals are visited by increasing start; those that ended release their
+ * register. An interval live across a call must survive it and so gets a
+ * callee-saved register (saved and restored once by the function, see
+ * gen.c); the others prefer caller-saved registers, which cost nothing to
+ * use. When no suitable register is free, the interval ending last (the
+ * current one or one holding a suitable register) is spilled: it lives in a
+ * stack slot for its whole life and is loaded into a scratch register at
+ * every use.
+ */
+
+// Live interval of a virtual register
+struct irInterval {
+    int vreg;
+    int start, end;   // Positions (see above)
+    bool crossesCall; // Live across a call
+};
+
+/**
+ * computeLiveness - Compute the registers live on entry to and exit from
+ * every block of a function (also used by dce.c).
+ *
+ * @param f The function
+ * @param words Number of 64-bit words in a register set
+ *
+ * @return The liveness of each block, to be released with freeLiveness()
+ */
+struct irLiveness *computeLiveness(struct irFunction *f, int words) {
+    struct irLiveness *live = calloc(f->blockCount + 1, sizeof(*live));
+    uint64_t *sets =
+        calloc((size_t)f->blockCount * 4 * words + 1, sizeof(*sets));
+    bool changed = true;
+
+    if (live == NULL || sets == NULL) {
+        logFatal("Out of memory for the register allocator");
+    }
+
+    for (int b = 0; b < f->blockCount; b++) {
+        struct irBlock *block = &f->blocks[b];
+        live[b].use = sets + (size_t)b * 4 * words;
+        live[b].def = live[b].use + words;
+        live[b].liveIn = live[b].def + words;
+        live[b].liveOut = live[b].liveIn + words;
+
+        for (int i = block->first; i <= block->last; i++) {
+            struct irInstruction *in = &f->code[i];
+            if (in->src1 != IR_NOVREG && !testBit(live[b].def, in->src1)) {
+                setBit(live[b].use, in->src1);
+            }
+            if (in->src2 != IR_NOVREG && !testBit(live[b].def, in->src2)) {
+                setBit(live[b].use, in->src2);
+            }
+            if (in->dst != IR_NOVREG) {
+                setBit(live[b].def, in->dst);
+            }
+        }
+    }
+
+    // liveOut = union of the successors' liveIn,
+    // liveIn = use | (liveOut & ~def); iterated backwards until stable
+    while (changed) {
+        changed = false;
+        for (int b = f->blockCount - 1; b >= 0; b--) {
+            struct irBlock *block = &f->blocks[b];
+            for (int w = 0; w < words; w++) {
+                uint64_t out = 0;
+                for (int s = 0; s < block->successorCount; s++) {
+                    out |= live[block->successors[s]].liveIn[w];
+                }
+                uint64_t in = live[b].use[w] | (out & ~live[b].def[w]);
+                if (out != live[b].liveOut[w] || in != live[b].liveIn[w]) {
+                    live[b].liveOut[w] = out;
+                    live[b].liveIn[w] = in;
+                    changed = true;
+                }
+            }
+        }
+    }
+
+    return live;
+}
+
+/**
+ * freeLiveness - Release the result of computeLiveness().
+ */
+void freeLiveness(struct irLiveness *live) {
+    free(live[0].use);
+    free(live);
+}
+
+/**
+ * extendInterval - Make an interval cover a position.
+ */
+static void extendInterval(struct irInterval *interval, int position) {
+    if (position < interval->start) {
+        interval->start = position;
+    }
+    if (position > interval->end) {
+        interval->end = position;
+    }
+}
+
+/**
+ * compareIntervals - qsort() order of intervals: by start position.
+ */
+static int compareIntervals(const void *a, const void *b) {
+    const struct irInterval *x = a, *y = b;
+
+    if (x->start != y->start) {
+        return x->start < y->start ? -1 : 1;
+    }
+    return x->vreg - y->vreg;
+}
+
+/**
+ * buildIntervals - Compute the live interval of every virtual register that
+ * is used.
+ *
+ * @param f The function
+ * @param count Receives the number of intervals
+ *
+ * @return The intervals, sorted by start position
+ */
+static struct irInterval *buildIntervals(struct irFunction *f, int *count) {
+    int words = (f->vregCount + 63) / 64;
+    struct irLiveness *live = computeLiveness(f, words);
+    struct irInterval *all = malloc((f->vregCount + 1) * sizeof(*all));
+    int *callsBefore = malloc((f->count + 1) * sizeof(int));
+    int n = 0;
+
+    if (all == NULL || callsBefore == NULL) {
+        logFatal("Out of memory for the register allocator");
+    }
+
+    for (int v = 0; v < f->vregCount; v++) {
+        all[v].vreg = v;
+        all[v].start = INT_MAX;
+        all[v].end = -1;
+    }
+
+    for (int b = 0; b < f->blockCount; b++) {
+        struct irBlock *block = &f->blocks[b];
+        for (int w = 0; w < words; w++) {
+            for (uint64_t bits = live[b].liveIn[w]; bits; bits &= bits - 1) {
+                extendInterval(&all[w * 64 + __builtin_ctzll(bits)],
+                               2 * block->first);
+            }
+            for (uint64_t bits = live[b].liveOut[w]; bits; bits &= bits - 1) {
+                extendInterval(&all[w * 64 + __builtin_ctzll(bits)],
+                               2 * block->last + 1);
+            }
+        }
+        for (int i = block->first; i <= block->last; i++) {
+            struct irInstruction *in = &f->code[i];
+            if (in->src1 != IR_NOVREG) {
+                extendInterval(&all[in->src1], 2 * i);
+            }
+            if (in->src2 != IR_NOVREG) {
+                extendInterval(&all[in->src2], 2 * i);
+            }
+            if (in->dst != IR_NOVREG) {
+                extendInterval(&all[in->dst], 2 * i + 1);
+            }
+        }
+    }
+
+    // A call at instruction i clobbers the caller-saved registers between
+    // positions 2i and 2i + 1
+    callsBefore[0] = 0;
+    for (int i = 0; i < f->count; i++) {
+        callsBefore[i + 1] =
+            callsBefore[i] + (f->code[i].op == A_FUNCTIONCALL ? 1 : 0);
+    }
+
+    for (int v = 0; v < f->vregCount; v++) {
+        if (all[v].end < 0) {
+            continue; // Never used
+        }
+        int firstCall = (all[v].start + 1) / 2;
+        int lastCall = all[v].end > 0 ? (all[v].end - 1) / 2 : -1;
+        all[v].crossesCall = firstCall <= lastCall &&
+                             callsBefore[lastCall + 1] > callsBefore[firstCall];
+        all[n++] = all[v];
+    }
+    qsort(all, n, sizeof(*all), compareIntervals);
+
+    free(callsBefore);
+    freeLiveness(live);
+    *count = n;
+    return all;
+}
+
+/**
+ * spillInterval - Keep a virtual register in a new stack slot.
+ */
+static void spillInterval(struct irFunction *f, int vreg) {
+    f->locations[vreg].reg = NOREG;
+    f->locations[vreg].offset = CG->getLocalOffset(P_LONG, false);
+    f->spillCount++;
+}
+
+/**
+ * allocateRegisters - Assign a backend register or a stack slot to every
+ * virtual register of a function (see the NOTE above).
+ *
+ * NOTE:
+ * Spill slots are taken from the function's frame, so this runs before the
+ * function's preamble is generated.
+ *
+ * @param f The function; f->locations, f->calleeSavedUsed and
+ *          f->spillCount are filled in
+ */
+void allocateRegisters(struct irFunction *f) {
+    int calleeCount = CG->calleeSavedRegisterCount;
+    int registerCount = calleeCount + CG->callerSavedRegisterCount;
+    int intervalCount;
+    struct irInterval *intervals = buildIntervals(f, &intervalCount);
+    // Interval holding each register (index into intervals), or -1
+    int *owner = malloc((registerCount + 1) * sizeof(int));
+
+    f->locations = malloc((f->vregCount + 1) * sizeof(*f->locations));
+    f->calleeSavedUsed = calloc(calleeCount + 1, sizeof(bool));
+    if (owner == NULL || f->locations == NULL || f->calleeSavedUsed == NULL) {
+        logFatal("Out of memory for the register allocator");
+    }
+    for (int v = 0; v < f->vregCount; v++) {
+        f->locations[v].reg = NOREG;
+        f->locations[v].offset = 0;
+    }
+    for (int r = 0; r < registerCount; r++) {
+        owner[r] = -1;
+    }
+
+    for (int i = 0; i < intervalCount; i++) {
+        struct irInterval *current = &intervals[i];
+        // Callee-saved registers survive calls; the others are tried first
+        int first = current->crossesCall ? 0 : calleeCount;
+        int chosen = NOREG, victim = NOREG;
+
+        for (int r = 0; r < registerCount; r++) {
+            if (owner[r] >= 0 && intervals[owner[r]].end < current->start) {
+                owner[r] = -1; // Expired
+            }
+        }
+
+        for (int k = 0; k < registerCount && chosen == NOREG; k++) {
+            int r = (first + k) % registerCount;
+            if (current->crossesCall && r >= calleeCount) {
+                break;
+            }
+            if (owner[r] < 0) {
+                chosen = r;
+            }
+        }
+
+        if (chosen == NOREG) {
+            // Spill whichever of the current interval and the ones holding
+            // a suitable register ends last
+            int limit = current->crossesCall ? calleeCount : registerCount;
+            for (int r = 0; r < limit; r++) {
+                if (victim == NOREG ||
+                    intervals[owner[r]].end > intervals[owner[victim]].end) {
+                    victim = r;
+                }
+            }
+            if (victim == NOREG ||
+                intervals[owner[victim]].end <= current->end) {
+                spillInterval(f, current->vreg);
+                continue;
+            }
+            spillInterval(f, intervals[owner[victim]].vreg);
+            chosen = victim;
+        }
+
+        owner[chosen] = i;
+        f->locations[current->vreg].reg = chosen;
+        if (chosen < calleeCount) {
+            f->calleeSavedUsed[chosen] = true;
+        }
+    }
+
+    free(owner);
+    free(intervals);
+}
@@ -3,49 +3,47 @@
 #include "data.h"
 #include "decl.h"
 #include "defs.h"
+#include "keywords.h"
 
-/**
- * chrpos - return the position of character c in string scan s
- *
- * @param s The string to search
- * @param c The character to find
- *
- * @return The position of character c in string s, or -1 if not found
- */
-static int chrpos(char *s, int c) {
-    char *p;
-
-    p = strchr(s, c);
-    if (p == NULL) {
-        return -1;
-    } else {
-        return p - s;
-    }
-}
+// Furthest position read so far. Characters put back and read again must
+// not be counted twice when tracking line numbers.
+static const char *ReadLimit;
 
 /**
- * next - get the next character from input file
+ * next - get the next character from the source text
  *
- * @return The next character from input file
+ * @return The next character from the source text, or EOF at its end
  */
 static int next(void) {
     int c;
 
-    if (Putback) { // is there a putback character?
-        c = Putback;
-        Putback = 0;
-        return c;
-    }
+    if (InputCursor == InputEnd)
+        return EOF;
 
-    c = fgetc(Infile);
-    if (c == '\n') {
-        Line++;
+    c = (unsigned char)*InputCursor++;
+    if (InputCursor > ReadLimit) {
+        ReadLimit = InputCursor;
+        if (c == '\n') {
+            Line++;
+        }
     }
 
     return c;
 }
 
-static void putback(int c) { Putback = c; }
+/**
+ * putback - give back the character last returned by next()
+ *
+ * NOTE:
+ * The source text is in memory (see input.c), so this just moves the cursor
+ * back. EOF has nothing to give back.
+ *
+ * @param c The character to put back
+ */
+static void putback(int c) {
+    if (c != EOF)
+        InputCursor--;
+}
 
 /**
  * skip - skip whitespace characters and
@@ -105,21 +103,24 @@ static int scanCharacter(void) {
 /**
  * scanInteger - scan an integer literal from input
  *
+ * NOTE:
+ * The digits are read straight from the source text.
+ *
  * @param c The first character of the integer literal
  *
  * @return The integer value of the scanned integer literal
  */
 static int scanInteger(int c) {
-    int k = 0;
-    int value = 0;
+    const char *p = InputCursor;
+    int value = c - '0';
 
-    while ((k = chrpos("0123456789", c)) >= 0) {
-        value = value * 10 + k;
-        c = next();
+    while (p < InputEnd && isdigit((unsigned char)*p)) {
+        value = value * 10 + (*p - '0');
+        p++;
     }
 
-    // Hit a non-integer character, put it back for future processing
-    putback(c);
+    // Stop in front of the first non-digit, it is left for future processing
+    InputCursor = p;
     return value;
 }
 
@@ -153,96 +154,70 @@ static int scanString(char *buffer) {
 }
 
 /**
- * scanIdentifier - Scan an identifier from the input file and
- *                  store it in the provided buffer.
+ * keyword - check if a string is a keyword and return its token type.
+ *
+ * NOTE:
+ * The keywords are looked up in a minimal perfect hash (see keywords.h), so
+ * at most one memcmp() is needed.
+ *
+ * @param s The string to check (need not be NUL-terminated)
+ * @param length The length of the string
+ *
+ * @return The token type if the string is a keyword, 0 otherwise
+ */
+static int keyword(const char *s, int length) {
+    if (length < KEYWORD_MIN_LENGTH || length > KEYWORD_MAX_LENGTH)
+        return 0;
+
+    unsigned int slot = keywordHash(s, length);
+    if (KeywordTable[slot].length == length &&
+        !memcmp(KeywordTable[slot].name, s, length)) {
+        return KeywordTable[slot].token;
+    }
+    return 0;
+}
+
+/**
+ * scanIdentifier - Scan an identifier from the source text, store it in the
+ *                  provided buffer and tell whether it is a keyword.
+ *
+ * NOTE:
+ * The identifier is located in the source text first; the keyword lookup
+ * works on that span and it is then copied into the buffer at once.
  *
  * @param c The first character of the identifier
  * @param buf The buffer to store the scanned identifier
  * @param lengthLimit The maximum length of the identifier (including NULL
  * terminator, '\0')
  *
- * @return The length of the scanned identifier
+ * @return The keyword token type, or T_IDENTIFIER
  */
 static int scanIdentifier(int c, char *buf, int lengthLimit) {
-    int i = 0;
+    const char *start = InputCursor - 1; // c has already been read
+    const char *p = InputCursor;
+    int length;
+    int tokenType;
 
     // Allow digits, alphabets, and underscores
-    while (isalpha(c) || isdigit(c) || c == '_') {
-        if (lengthLimit - 1 == i) {
-            // Considering the NULL character, it's a signal of buffer overflow
-            printf("Identifier too long on line %d (Length limit: %d)\n", Line,
-                   lengthLimit);
-            exit(1);
-        } else if (i < lengthLimit - 1) {
-            buf[i++] = c;
-        }
-        c = next();
+    while (p < InputEnd && (isalnum((unsigned char)*p) || *p == '_')) {
+        p++;
     }
 
-    putback(c);
-    buf[i] = '\0'; // NULL terminate the string. Don't forget that! >_<
+    length = p - start;
+    if (length > lengthLimit - 1) {
+        // Considering the NULL character, it's a signal of buffer overflow
+        printf("Identifier too long on line %d (Length limit: %d)\n", Line,
+               lengthLimit);
+        exit(1);
+    }
 
-    return i;
-}
+    tokenType = keyword(start, length);
 
-/**
- * keyword - check if a string is a keyword and return its token type.
- *
- * NOTE:
- * Switch on the first character to reduce the number of expensive
- * string comparisons via strcmp().
- *
- * @param s The string to check
- *
- * @return The token type if the string is a keyword, 0 otherwise
- */
-static int keyword(char *s) {
-    switch (*s) {
-    case 'c':
-        if (!strcmp(s, "char")) {
-            return T_CHAR;
-        }
-        break;
-    case 'e':
-        if (!strcmp(s, "else")) {
-            return T_ELSE;
-        }
-        break;
-    case 'f':
-        if (!strcmp(s, "for")) {
-            return T_FOR;
-        }
-        break;
-    case 'i':
-        if (!strcmp(s, "if")) {
-            return T_IF;
-        }
-        if (!strcmp(s, "int")) {
-            return T_INT;
-        }
-        break;
-    case 'l':
-        if (!strcmp(s, "long")) {
-            return T_LONG;
-        }
-        break;
-    case 'r':
-        if (!strcmp(s, "return")) {
-            return T_RETURN;
-        }
-        break;
-    case 'w':
-        if (!strcmp(s, "while")) {
-            return T_WHILE;
-        }
-        break;
-    case 'v':
-        if (!strcmp(s, "void")) {
-            return T_VOID;
-        }
-        break;
-    }
-    return 0;
+    memcpy(buf, start, length);
+    buf[length] = '\0'; // NULL terminate the string. Don't forget that! >_<
+    InputCursor = p;
+
+    return tokenType ? tokenType : T_IDENTIFIER;
 }
 
 // A pointer to a rejected token
@@ -272,7 +247,6 @@ void rejectToken(struct token *t) {
  */
 bool scan(struct token *t) {
     int c;
-    int tokenType;
 
     // If we have any rejected token, return true,
     // assuming the token structure is already filled
@@ -429,17 +403,8 @@ bool scan(struct token *t) {
             t->token = T_INTEGERLITERAL;
             break;
         } else if (isalpha(c) || c == '_') {
-            // If it's supposed to be a keyword, return that token instead!
-            scanIdentifier(c, Text, TEXTLEN);
-
-            if ((tokenType = keyword(Text))) {
-                t->token = tokenType;
-                break;
-            }
-
-            // Not a recognized keyword, thus it's an identifier
-            // (e.g. variable name)
-            t->token = T_IDENTIFIER;
+            // A keyword, or otherwise an identifier (e.g. variable name)
+            t->token = scanIdentifier(c, Text, TEXTLEN);
             break;
         }
 
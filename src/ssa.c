@@ -0,0 +1,643 @@
+// src/ssa.c
+
+// Control-flow analysis of the IR (predecessors, reverse postorder,
+// dominators, loops) and construction of its SSA form (see ir.h) for the
+// passes that run before register allocation.
+
+#include "data.h"
+#include "decl.h"
+#include "defs.h"
+#include "ir.h"
+
+/**
+ * NOTE:
+ * Dominators are computed with the iterative algorithm of Cooper, Harvey
+ * and Kennedy ("A Simple, Fast Dominance Algorithm") over the blocks in
+ * reverse postorder. The SSA form is then built as by Cytron et al.:
+ * - every variable gets a phi at the iterated dominance frontier of the
+ *   blocks that define it;
+ * - a walk of the dominator tree renames the definitions, keeping the
+ *   current name of every variable and handing it to the phis of the
+ *   successors of each block.
+ * If the entry block starts a loop, its phis also merge the variable's
+ * entry name, which comes from no predecessor.
+ *
+ * Loops are found from the dominator tree: an edge from a block to one that
+ * dominates it is a back edge, the block it goes to is the loop's header,
+ * and the loop is the set of blocks that reach the back edge without going
+ * through the header.
+ */
+
+/**
+ * writesMemory - Check whether an instruction may change memory.
+ */
+static bool writesMemory(int op) {
+    return op == A_ASSIGN || op == IR_STOREINDIRECT || op == A_FUNCTIONCALL;
+}
+
+/**
+ * allocateArray - Allocate a zeroed array for the SSA form.
+ */
+static void *allocateArray(size_t count, size_t size) {
+    void *p = calloc(count + 1, size);
+
+    if (p == NULL) {
+        logFatal("Out of memory for the SSA form");
+    }
+    return p;
+}
+
+/**
+ * findPredecessors - Fill in the predecessors of every block.
+ */
+static void findPredecessors(struct irFunction *f, struct irSSA *ssa) {
+    int *fill = allocateArray(f->blockCount, sizeof(int));
+
+    ssa->predecessorStart = allocateArray(f->blockCount + 1, sizeof(int));
+    for (int b = 0; b < f->blockCount; b++) {
+        for (int s = 0; s < f->blocks[b].successorCount; s++) {
+            ssa->predecessorStart[f->blocks[b].successors[s] + 1]++;
+        }
+    }
+    for (int b = 0; b < f->blockCount; b++) {
+        ssa->predecessorStart[b + 1] += ssa->predecessorStart[b];
+        fill[b] = ssa->predecessorStart[b];
+    }
+
+    ssa->predecessors =
+        allocateArray(ssa->predecessorStart[f->blockCount], sizeof(int));
+    for (int b = 0; b < f->blockCount; b++) {
+        for (int s = 0; s < f->blocks[b].successorCount; s++) {
+            ssa->predecessors[fill[f->blocks[b].successors[s]]++] = b;
+        }
+    }
+
+    free(fill);
+}
+
+/**
+ * orderBlocks - List the blocks reachable from the entry in reverse
+ * postorder.
+ *
+ * @param rpoNumber Receives each block's position in that order, or -1
+ */
+static void orderBlocks(struct irFunction *f, struct irSSA *ssa,
+                        int *rpoNumber) {
+    int *stack = allocateArray(f->blockCount, sizeof(int));
+    int *postorder = allocateArray(f->blockCount, sizeof(int));
+    int *nextSuccessor = allocateArray(f->blockCount, sizeof(int));
+    int depth = 0, visited = 0;
+
+    ssa->order = allocateArray(f->blockCount, sizeof(int));
+    for (int b = 0; b < f->blockCount; b++) {
+        rpoNumber[b] = -1;
+    }
+
+    // Depth-first search; a block is finished once all its successors are
+    if (f->blockCount > 0) {
+        rpoNumber[0] = 0;
+        stack[depth++] = 0;
+    }
+    while (depth > 0) {
+        int b = stack[depth - 1];
+        if (nextSuccessor[b] < f->blocks[b].successorCount) {
+            int s = f->blocks[b].successors[nextSuccessor[b]++];
+            if (rpoNumber[s] < 0) {
+                rpoNumber[s] = 0; // On the stack
+                stack[depth++] = s;
+            }
+        } else {
+            depth--;
+            postorder[visited++] = b;
+        }
+    }
+
+    ssa->orderCount = visited;
+    for (int k = 0; k < visited; k++) {
+        ssa->order[k] = postorder[visited - 1 - k];
+        rpoNumber[ssa->order[k]] = k;
+    }
+
+    free(stack);
+    free(postorder);
+    free(nextSuccessor);
+}
+
+/**
+ * intersectDominators - The nearest common dominator of two blocks.
+ */
+static int intersectDominators(const int *idom, const int *rpoNumber, int a,
+                               int b) {
+    while (a != b) {
+        while (rpoNumber[a] > rpoNumber[b]) {
+            a = idom[a];
+        }
+        while (rpoNumber[b] > rpoNumber[a]) {
+            b = idom[b];
+        }
+    }
+    return a;
+}
+
+/**
+ * findDominators - Compute the immediate dominators and the dominator tree.
+ */
+static void findDominators(struct irFunction *f, struct irSSA *ssa,
+                           const int *rpoNumber) {
+    int *fill = allocateArray(f->blockCount, sizeof(int));
+    bool changed = true;
+
+    ssa->idom = allocateArray(f->blockCount, sizeof(int));
+    for (int b = 0; b < f->blockCount; b++) {
+        ssa->idom[b] = -1;
+    }
+
+    if (ssa->orderCount > 0) {
+        ssa->idom[0] = 0; // Until the end, to stop the intersections
+    }
+    while (changed) {
+        changed = false;
+        for (int k = 1; k < ssa->orderCount; k++) {
+            int b = ssa->order[k];
+            int newIdom = -1;
+            for (int p = ssa->predecessorStart[b];
+                 p < ssa->predecessorStart[b + 1]; p++) {
+                int pred = ssa->predecessors[p];
+                if (ssa->idom[pred] < 0) {
+                    continue; // Unreachable or not processed yet
+                }
+                newIdom = newIdom < 0
+                              ? pred
+                              : intersectDominators(ssa->idom, rpoNumber, pred,
+                                                    newIdom);
+            }
+            if (newIdom != ssa->idom[b]) {
+                ssa->idom[b] = newIdom;
+                changed = true;
+            }
+        }
+    }
+    if (ssa->orderCount > 0) {
+        ssa->idom[0] = -1;
+    }
+
+    // Children in reverse postorder
+    ssa->childStart = allocateArray(f->blockCount + 1, sizeof(int));
+    for (int b = 0; b < f->blockCount; b++) {
+        if (ssa->idom[b] >= 0) {
+            ssa->childStart[ssa->idom[b] + 1]++;
+        }
+    }
+    for (int b = 0; b < f->blockCount; b++) {
+        ssa->childStart[b + 1] += ssa->childStart[b];
+        fill[b] = ssa->childStart[b];
+    }
+    ssa->children = allocateArray(ssa->childStart[f->blockCount], sizeof(int));
+    for (int k = 1; k < ssa->orderCount; k++) {
+        int b = ssa->order[k];
+        ssa->children[fill[ssa->idom[b]]++] = b;
+    }
+
+    free(fill);
+}
+
+/**
+ * findDominanceFrontiers - Compute the dominance frontier of every block:
+ * the blocks where its dominance ends, which a definition in it reaches
+ * along with other definitions.
+ *
+ * @param words Number of 64-bit words in a set of blocks
+ *
+ * @return The frontiers, words words per block
+ */
+static uint64_t *findDominanceFrontiers(struct irFunction *f, struct irSSA *ssa,
+                                        const int *rpoNumber, int words) {
+    uint64_t *frontiers =
+        allocateArray((size_t)f->blockCount * words, sizeof(uint64_t));
+
+    for (int b = 0; b < f->blockCount; b++) {
+        // Control also enters the entry block from the caller
+        int joins = ssa->predecessorStart[b + 1] - ssa->predecessorStart[b] +
+                    (b == 0 ? 1 : 0);
+        if (rpoNumber[b] < 0 || joins < 2) {
+            continue;
+        }
+        for (int p = ssa->predecessorStart[b]; p < ssa->predecessorStart[b + 1];
+             p++) {
+            int runner = ssa->predecessors[p];
+            if (rpoNumber[runner] < 0) {
+                continue;
+            }
+            while (runner >= 0 && runner != ssa->idom[b]) {
+                setBit(frontiers + (size_t)runner * words, b);
+                runner = ssa->idom[runner];
+            }
+        }
+    }
+
+    return frontiers;
+}
+
+/**
+ * placePhis - Give every variable a phi at the iterated dominance frontier
+ * of the blocks defining it.
+ *
+ * @param frontiers The blocks' dominance frontiers
+ * @param words Number of 64-bit words in a set of blocks
+ */
+static void placePhis(struct irFunction *f, struct irSSA *ssa,
+                      const int *rpoNumber, const uint64_t *frontiers,
+                      int words) {
+    int variables = f->variableCount + 1;
+    // Per variable: blocks defining it, then blocks given a phi for it
+    uint64_t *defines =
+        allocateArray((size_t)variables * words, sizeof(uint64_t));
+    uint64_t *hasPhi =
+        allocateArray((size_t)variables * words, sizeof(uint64_t));
+    uint64_t *queued = allocateArray(words, sizeof(uint64_t));
+    int *worklist = allocateArray(f->blockCount, sizeof(int));
+    int argCount = 0, phi = 0;
+
+    for (int b = 0; b < f->blockCount; b++) {
+        if (rpoNumber[b] < 0) {
+            continue;
+        }
+        for (int i = f->blocks[b].first; i <= f->blocks[b].last; i++) {
+            struct irInstruction *in = &f->code[i];
+            if (in->dst != IR_NOVREG && in->dst < f->variableCount) {
+                setBit(defines + (size_t)in->dst * words, b);
+            }
+            if (writesMemory(in->op)) {
+                setBit(defines + (size_t)f->variableCount * words, b);
+            }
+        }
+    }
+
+    for (int v = 0; v < variables; v++) {
+        uint64_t *phis = hasPhi + (size_t)v * words;
+        int count = 0;
+
+        memcpy(queued, defines + (size_t)v * words, words * sizeof(uint64_t));
+        for (int b = 0; b < f->blockCount; b++) {
+            if (testBit(queued, b)) {
+                worklist[count++] = b;
+            }
+        }
+        while (count > 0) {
+            const uint64_t *frontier =
+                frontiers + (size_t)worklist[--count] * words;
+            for (int w = 0; w < words; w++) {
+                for (uint64_t bits = frontier[w] & ~phis[w]; bits;
+                     bits &= bits - 1) {
+                    int y = w * 64 + __builtin_ctzll(bits);
+                    setBit(phis, y);
+                    if (!testBit(queued, y)) {
+                        setBit(queued, y);
+                        worklist[count++] = y;
+                    }
+                }
+            }
+        }
+    }
+
+    // Lay the phis out by block
+    ssa->phiStart = allocateArray(f->blockCount + 1, sizeof(int));
+    for (int b = 0; b < f->blockCount; b++) {
+        for (int v = 0; v < variables; v++) {
+            if (testBit(hasPhi + (size_t)v * words, b)) {
+                ssa->phiCount++;
+                argCount +=
+                    ssa->predecessorStart[b + 1] - ssa->predecessorStart[b];
+            }
+        }
+    }
+    ssa->phis = allocateArray(ssa->phiCount, sizeof(*ssa->phis));
+    ssa->phiArgs = allocateArray(argCount, sizeof(int));
+    argCount = 0;
+    for (int b = 0; b < f->blockCount; b++) {
+        ssa->phiStart[b] = phi;
+        for (int v = 0; v < variables; v++) {
+            if (testBit(hasPhi + (size_t)v * words, b)) {
+                ssa->phis[phi].block = b;
+                ssa->phis[phi].variable = v;
+                ssa->phis[phi].name = IR_NOVREG;
+                ssa->phis[phi].args = ssa->phiArgs + argCount;
+                for (int p = ssa->predecessorStart[b];
+                     p < ssa->predecessorStart[b + 1]; p++) {
+                    ssa->phiArgs[argCount++] = IR_NOVREG;
+                }
+                phi++;
+            }
+        }
+    }
+    ssa->phiStart[f->blockCount] = phi;
+
+    free(defines);
+    free(hasPhi);
+    free(queued);
+    free(worklist);
+}
+
+/**
+ * renameBlock - Name the definitions of a block and of the blocks it
+ * dominates, and the operands reading them.
+ *
+ * @param current Current name of every variable, restored on return
+ * @param tempName Name of every temporary defined so far
+ */
+static void renameBlock(struct irFunction *f, struct irSSA *ssa, int b,
+                        int *current, int *tempName) {
+    int variables = f->variableCount + 1;
+    int *saved = allocateArray(variables, sizeof(int));
+    struct irBlock *block = &f->blocks[b];
+
+    memcpy(saved, current, variables * sizeof(int));
+
+    for (int p = ssa->phiStart[b]; p < ssa->phiStart[b + 1]; p++) {
+        ssa->phis[p].name = ssa->nameCount++;
+        current[ssa->phis[p].variable] = ssa->phis[p].name;
+    }
+
+    for (int i = block->first; i <= block->last; i++) {
+        struct irInstruction *in = &f->code[i];
+        int sources[2] = {in->src1, in->src2};
+        int *sourceNames[2] = {&ssa->src1Name[i], &ssa->src2Name[i]};
+
+        for (int k = 0; k < 2; k++) {
+            if (sources[k] != IR_NOVREG) {
+                *sourceNames[k] = sources[k] < f->variableCount
+                                      ? current[sources[k]]
+                                      : tempName[sources[k]];
+            }
+        }
+        if (in->dst != IR_NOVREG) {
+            ssa->dstName[i] = ssa->nameCount++;
+            if (in->dst < f->variableCount) {
+                current[in->dst] = ssa->dstName[i];
+            } else {
+                tempName[in->dst] = ssa->dstName[i];
+            }
+        }
+        if (writesMemory(in->op)) {
+            current[f->variableCount] = ssa->nameCount++;
+        }
+        ssa->memoryName[i] = current[f->variableCount];
+    }
+
+    // Hand the current names to the successors' phis
+    for (int s = 0; s < block->successorCount; s++) {
+        int successor = block->successors[s];
+        for (int p = ssa->predecessorStart[successor];
+             p < ssa->predecessorStart[successor + 1]; p++) {
+            if (ssa->predecessors[p] != b) {
+                continue;
+            }
+            for (int phi = ssa->phiStart[successor];
+                 phi < ssa->phiStart[successor + 1]; phi++) {
+                ssa->phis[phi].args[p - ssa->predecessorStart[successor]] =
+                    current[ssa->phis[phi].variable];
+            }
+        }
+    }
+
+    for (int c = ssa->childStart[b]; c < ssa->childStart[b + 1]; c++) {
+        renameBlock(f, ssa, ssa->children[c], current, tempName);
+    }
+
+    memcpy(current, saved, variables * sizeof(int));
+    free(saved);
+}
+
+/**
+ * buildSSA - Compute the dominator tree and the SSA form of a function.
+ *
+ * NOTE:
+ * Names are only given in reachable blocks; the tables hold IR_NOVREG for
+ * the instructions of the others.
+ *
+ * @param f The function, with its basic blocks
+ *
+ * @return The SSA form, to be released with freeSSA()
+ */
+struct irSSA *buildSSA(struct irFunction *f) {
+    struct irSSA *ssa = allocateArray(1, sizeof(*ssa));
+    int words = (f->blockCount + 63) / 64;
+    int *rpoNumber = allocateArray(f->blockCount, sizeof(int));
+    int *current = allocateArray(f->variableCount + 1, sizeof(int));
+    int *tempName = allocateArray(f->vregCount, sizeof(int));
+    uint64_t *frontiers;
+
+    findPredecessors(f, ssa);
+    orderBlocks(f, ssa, rpoNumber);
+    findDominators(f, ssa, rpoNumber);
+    frontiers = findDominanceFrontiers(f, ssa, rpoNumber, words);
+    placePhis(f, ssa, rpoNumber, frontiers, words);
+
+    ssa->src1Name = allocateArray(f->count, sizeof(int));
+    ssa->src2Name = allocateArray(f->count, sizeof(int));
+    ssa->dstName = allocateArray(f->count, sizeof(int));
+    ssa->memoryName = allocateArray(f->count, sizeof(int));
+    for (int i = 0; i < f->count; i++) {
+        ssa->src1Name[i] = ssa->src2Name[i] = IR_NOVREG;
+        ssa->dstName[i] = ssa->memoryName[i] = IR_NOVREG;
+    }
+    for (int v = 0; v < f->vregCount; v++) {
+        tempName[v] = IR_NOVREG;
+    }
+
+    // Names 0 ... variableCount: the variables on entry
+    for (int v = 0; v <= f->variableCount; v++) {
+        current[v] = v;
+    }
+    ssa->nameCount = f->variableCount + 1;
+    if (ssa->orderCount > 0) {
+        renameBlock(f, ssa, 0, current, tempName);
+    }
+
+    free(rpoNumber);
+    free(current);
+    free(tempName);
+    free(frontiers);
+    return ssa;
+}
+
+/**
+ * freeSSA - Release the result of buildSSA().
+ */
+void freeSSA(struct irSSA *ssa) {
+    free(ssa->predecessors);
+    free(ssa->predecessorStart);
+    free(ssa->order);
+    free(ssa->idom);
+    free(ssa->children);
+    free(ssa->childStart);
+    free(ssa->phis);
+    free(ssa->phiStart);
+    free(ssa->phiArgs);
+    free(ssa->src1Name);
+    free(ssa->src2Name);
+    free(ssa->dstName);
+    free(ssa->memoryName);
+    free(ssa);
+}
+
+/**
+ * blockDominates - Check whether block a dominates block b.
+ */
+bool blockDominates(const struct irSSA *ssa, int a, int b) {
+    for (; b >= 0; b = ssa->idom[b]) {
+        if (b == a) {
+            return true;
+        }
+    }
+    return false;
+}
+
+/**
+ * findLoop - Find the loop of a header, if some back edge reaches it.
+ *
+ * @param loop Filled in; loop->blocks and loop->latches are allocated
+ *
+ * @return true if the header has a back edge
+ */
+static bool findLoop(struct irFunction *f, const struct irSSA *ssa, int header,
+                     struct irLoop *loop) {
+    int *stack = allocateArray(f->blockCount, sizeof(int));
+    int depth = 0;
+
+    loop->header = header;
+    loop->blocks = allocateArray(f->blockCount, sizeof(bool));
+    loop->latches = allocateArray(f->blockCount, sizeof(int));
+    loop->latchCount = 0;
+    loop->size = 1;
+    loop->blocks[header] = true;
+
+    for (int p = ssa->predecessorStart[header];
+         p < ssa->predecessorStart[header + 1]; p++) {
+        int pred = ssa->predecessors[p];
+        if (ssa->idom[pred] < 0 && pred != 0) {
+            continue; // Unreachable
+        }
+        if (!blockDominates(ssa, header, pred)) {
+            continue; // Entry into the loop
+        }
+        loop->latches[loop->latchCount++] = pred;
+        if (!loop->blocks[pred]) {
+            loop->blocks[pred] = true;
+            loop->size++;
+            stack[depth++] = pred;
+        }
+    }
+
+    // The blocks reaching a latch without going through the header
+    while (depth > 0) {
+        int b = stack[--depth];
+        for (int p = ssa->predecessorStart[b]; p < ssa->predecessorStart[b + 1];
+             p++) {
+            int pred = ssa->predecessors[p];
+            if (!loop->blocks[pred] && (ssa->idom[pred] >= 0 || pred == 0)) {
+                loop->blocks[pred] = true;
+                loop->size++;
+                stack[depth++] = pred;
+            }
+        }
+    }
+
+    free(stack);
+    if (loop->latchCount == 0) {
+        freeLoop(loop);
+        return false;
+    }
+    return true;
+}
+
+/**
+ * findInnermostLoop - Find the smallest loop not handled yet.
+ *
+ * @param f The function, with its basic blocks
+ * @param ssa Its SSA form
+ * @param done Labels of the headers of the loops handled already
+ * @param doneCount Number of entries in done
+ * @param loop Filled in, to be released with freeLoop()
+ *
+ * @return true if a loop was found
+ */
+bool findInnermostLoop(struct irFunction *f, const struct irSSA *ssa,
+                       const int *done, int doneCount, struct irLoop *loop) {
+    struct irLoop candidate;
+    bool found = false;
+
+    for (int h = 0; h < f->blockCount; h++) {
+        struct irInstruction *first = &f->code[f->blocks[h].first];
+        bool isDone = false;
+
+        if (first->op != IR_LABEL || (h != 0 && ssa->idom[h] < 0)) {
+            continue;
+        }
+        for (int d = 0; d < doneCount; d++) {
+            isDone |= done[d] == first->value;
+        }
+        if (isDone || !findLoop(f, ssa, h, &candidate)) {
+            continue;
+        }
+        if (found && candidate.size >= loop->size) {
+            freeLoop(&candidate);
+            continue;
+        }
+        if (found) {
+            freeLoop(loop);
+        }
+        *loop = candidate;
+        found = true;
+    }
+
+    return found;
+}
+
+/**
+ * findPreheader - Find where code entering a loop can be inserted.
+ *
+ * NOTE:
+ * The loops are rotated (see ir.c), so the block before the header is the
+ * loop's guard and code inserted in front of the header's label runs once,
+ * only when the loop is entered.
+ *
+ * @return The index of the instruction to insert it before, or -1 if the
+ *         header is entered from elsewhere than the block before it
+ */
+int findPreheader(struct irFunction *f, const struct irSSA *ssa,
+                  const struct irLoop *loop) {
+    int header = loop->header;
+    int entries = 0;
+
+    for (int p = ssa->predecessorStart[header];
+         p < ssa->predecessorStart[header + 1]; p++) {
+        int pred = ssa->predecessors[p];
+        if (loop->blocks[pred]) {
+            continue;
+        }
+        if (pred != header - 1) {
+            return -1;
+        }
+        struct irInstruction *last = &f->code[f->blocks[pred].last];
+        if ((last->op == IR_JUMP || last->op == IR_BRANCH) &&
+            last->value == f->code[f->blocks[header].first].value) {
+            return -1; // Also jumps there
+        }
+        entries++;
+    }
+
+    // The entry block is also entered from the caller
+    if (entries == (header == 0 ? 0 : 1)) {
+        return f->blocks[header].first;
+    }
+    return -1;
+}
+
+/**
+ * freeLoop - Release the tables of a loop found by findInnermostLoop().
+ */
+void freeLoop(struct irLoop *loop) {
+    free(loop->blocks);
+    free(loop->latches);
+}
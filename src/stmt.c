@@ -187,7 +187,7 @@ static struct ASTnode *returnStatement(void) {
     struct ASTnode *treeNode;
 
     // Can't return a value if function returns P_VOID
-    if (SymbolTable[CurrentFunctionSymbolID].primitiveType == P_VOID) {
+    if (getSymbol(CurrentFunctionSymbolID)->primitiveType == P_VOID) {
         logFatal("Cannot return a value from a void function");
     }
 
@@ -200,8 +200,7 @@ static struct ASTnode *returnStatement(void) {
 
     // Ensure the two types are compatible
     treeNode = coerceASTTypeForOp(
-        treeNode, SymbolTable[CurrentFunctionSymbolID].primitiveType,
-        A_NOTHING);
+        treeNode, getSymbol(CurrentFunctionSymbolID)->primitiveType, A_NOTHING);
     if (treeNode == NULL) {
         logFatal("Type error: incompatible type in return statement");
     }
@@ -4,6 +4,183 @@
 #include "decl.h"
 #include "defs.h"
 
+#include <limits.h>
+
+/**
+ * NOTE:
+ * The symbol table has two regions that grow independently:
+ * - globals use slots 0, 1, 2, ... and live for the whole translation unit;
+ * - locals use slots LOCAL_SYMBOL_BASE, LOCAL_SYMBOL_BASE + 1, ... and only
+ *   belong to the current function: freeLocalSymbols() empties the region
+ *   once the function has been generated.
+ * Each region is a segmented array: a directory of fixed-size segments that
+ * doubles when it is full, so growth is amortised O(1) and entries never
+ * move (pointers from getSymbol() stay valid while symbols are added).
+ */
+
+#define SYMBOL_SEGMENT_SHIFT 10
+#define SYMBOL_SEGMENT_SIZE (1 << SYMBOL_SEGMENT_SHIFT)
+#define LOCAL_SYMBOL_BASE (1 << 30)
+
+struct symbolRegion {
+    struct symbolTable **segments; // Segment directory
+    int segmentCapacity;           // Entries in the directory
+    int segmentCount;              // Segments allocated
+    int count;                     // Symbols in use
+};
+
+static struct symbolRegion GlobalSymbols;
+static struct symbolRegion LocalSymbols;
+
+/**
+ * getSymbol - Get the symbol table entry of a slot.
+ *
+ * @param id The slot of the symbol (e.g. an AST node's v.identifierIndex)
+ *
+ * @return The symbol table entry
+ */
+struct symbolTable *getSymbol(int id) {
+    struct symbolRegion *region = &GlobalSymbols;
+
+    if (id >= LOCAL_SYMBOL_BASE) {
+        region = &LocalSymbols;
+        id -= LOCAL_SYMBOL_BASE;
+    }
+
+    return &region->segments[id >> SYMBOL_SEGMENT_SHIFT]
+                            [id & (SYMBOL_SEGMENT_SIZE - 1)];
+}
+
+/**
+ * newRegionPosition - Take the next free position of a region, allocating
+ * a new segment (and growing the directory) when needed.
+ *
+ * @param region The region to grow
+ *
+ * @return The position of the new entry within the region
+ */
+static int newRegionPosition(struct symbolRegion *region) {
+    int position = region->count;
+
+    if ((position >> SYMBOL_SEGMENT_SHIFT) == region->segmentCount) {
+        if (region->segmentCount == region->segmentCapacity) {
+            int capacity =
+                region->segmentCapacity ? region->segmentCapacity * 2 : 16;
+            struct symbolTable **segments = realloc(
+                region->segments, capacity * sizeof(struct symbolTable *));
+            if (segments == NULL) {
+                logFatal("Out of memory for the symbol table");
+            }
+            region->segments = segments;
+            region->segmentCapacity = capacity;
+        }
+
+        struct symbolTable *segment =
+            malloc(SYMBOL_SEGMENT_SIZE * sizeof(struct symbolTable));
+        if (segment == NULL) {
+            logFatal("Out of memory for the symbol table");
+        }
+        region->segments[region->segmentCount++] = segment;
+    }
+
+    region->count++;
+    return position;
+}
+
+/**
+ * NOTE:
+ * Both the global and the local region of SymbolTable have a hash index:
+ * an open-addressing (linear probing) table of slot numbers keyed by the
+ * symbol name. Names are interned (see intern.c), so a probe compares
+ * pointers instead of calling strcmp().
+ */
+
+#define SYMBOL_INDEX_INITIAL_CAPACITY 256 // Must be a power of two
+
+struct symbolIndex {
+    int *slots;      // SymbolTable slot numbers, -1 for an empty entry
+    size_t capacity; // Number of entries (power of two)
+    size_t count;    // Number of symbols indexed
+};
+
+static struct symbolIndex GlobalSymbolIndex;
+static struct symbolIndex LocalSymbolIndex;
+
+/**
+ * probeSymbolIndex - Find the entry holding the given name, or the empty
+ * entry where it belongs.
+ *
+ * @param index The index to search
+ * @param name  The interned name
+ *
+ * @return The entry position in index->slots
+ */
+static size_t probeSymbolIndex(struct symbolIndex *index, const char *name) {
+    size_t mask = index->capacity - 1;
+    size_t i = internPointerHash(name) & mask;
+
+    while (index->slots[i] != -1 && getSymbol(index->slots[i])->name != name) {
+        i = (i + 1) & mask;
+    }
+
+    return i;
+}
+
+/**
+ * lookupSymbolIndex - Find the slot of a symbol through an index.
+ *
+ * @param index The index to search
+ * @param s     The name of the symbol
+ *
+ * @return The slot of the symbol in the symbol table. -1 if not present
+ */
+static int lookupSymbolIndex(struct symbolIndex *index, char *s) {
+    const char *name;
+
+    // A name that was never interned cannot belong to any symbol
+    if (index->count == 0 || (name = findInternedString(s)) == NULL) {
+        return -1;
+    }
+
+    return index->slots[probeSymbolIndex(index, name)];
+}
+
+/**
+ * insertSymbolIndex - Add a symbol table slot to an index.
+ *
+ * @param index     The index to add to
+ * @param slotIndex The slot (its name must already be set)
+ */
+static void insertSymbolIndex(struct symbolIndex *index, int slotIndex) {
+    // Keep the load factor at or below 1/2
+    if ((index->count + 1) * 2 > index->capacity) {
+        struct symbolIndex grown;
+
+        grown.capacity = index->capacity ? index->capacity * 2
+                                         : SYMBOL_INDEX_INITIAL_CAPACITY;
+        grown.count = 0;
+        grown.slots = malloc(grown.capacity * sizeof(int));
+        if (grown.slots == NULL) {
+            logFatal("Out of memory for the symbol table index");
+        }
+        memset(grown.slots, 0xff, grown.capacity * sizeof(int)); // All -1
+
+        for (size_t i = 0; i < index->capacity; i++) {
+            if (index->slots[i] != -1) {
+                const char *name = getSymbol(index->slots[i])->name;
+                grown.slots[probeSymbolIndex(&grown, name)] = index->slots[i];
+                grown.count++;
+            }
+        }
+        free(index->slots);
+        *index = grown;
+    }
+
+    index->slots[probeSymbolIndex(index, getSymbol(slotIndex)->name)] =
+        slotIndex;
+    index->count++;
+}
+
 /**
  * findGlobalSymbol - Find a global symbol in the symbol table.
  *
@@ -12,12 +189,7 @@
  * @return The index of the symbol in the symbol table. -1 if not present
  */
 int findGlobalSymbol(char *s) {
-    for (int i = 0; i < NextGlobalSymbolIndex; i++) {
-        if (*s == *SymbolTable[i].name && !strcmp(s, SymbolTable[i].name)) {
-            return i;
-        }
-    }
-    return -1;
+    return lookupSymbolIndex(&GlobalSymbolIndex, s);
 }
 
 /**
@@ -28,16 +200,14 @@ int findGlobalSymbol(char *s) {
  *
  * @return The new index for the global symbol
  *
- * @note Logs a fatal error if the symbol table is full
+ * @note Logs a fatal error if the global region is exhausted
  */
 static int getNewGlobalSymbolIndex(void) {
-    int p;
-
-    if ((p = NextGlobalSymbolIndex++) >= NSYMBOLS) {
+    if (GlobalSymbols.count == LOCAL_SYMBOL_BASE) {
         logFatal("Too many global symbols");
     }
 
-    return p;
+    return newRegionPosition(&GlobalSymbols);
 }
 
 /**
@@ -47,34 +217,24 @@ static int getNewGlobalSymbolIndex(void) {
  *
  * @return The index of the symbol in the symbol table. -1 if not present
  */
-int findLocalSymbol(char *s) {
-    for (int i = NextLocalSymbolIndex + 1; i < NSYMBOLS; i++) {
-        if (*s == *SymbolTable[i].name && !strcmp(s, SymbolTable[i].name)) {
-            return i;
-        }
-    }
-
-    return -1;
-}
+int findLocalSymbol(char *s) { return lookupSymbolIndex(&LocalSymbolIndex, s); }
 
 /**
  * getNewLocalSymbolIndex - Get a new index for a local symbol.
  *
  * NOTE:
- * Local symbol index grows in a descending manner.
+ * Local symbol index grows in an ascending manner from LOCAL_SYMBOL_BASE.
  *
  * @return The new index for the local symbol
  *
- * @note Logs a fatal error if the symbol table is full
+ * @note Logs a fatal error if the local region is exhausted
  */
 static int getNewLocalSymbolIndex(void) {
-    int p;
-
-    if ((p = NextLocalSymbolIndex--) < NextGlobalSymbolIndex) {
+    if (LocalSymbols.count == INT_MAX - LOCAL_SYMBOL_BASE) {
         logFatal("Too many local symbols");
     }
 
-    return p;
+    return LOCAL_SYMBOL_BASE + newRegionPosition(&LocalSymbols);
 }
 
 /**
@@ -96,17 +256,20 @@ static int getNewLocalSymbolIndex(void) {
 static void updateSymbolTable(int slotIndex, char *name, int primitiveType,
                               int structuralType, int classType, int endLabel,
                               int size, int offsetPosition) {
-    if (slotIndex < 0 || slotIndex >= NSYMBOLS) {
+    struct symbolTable *symbol;
+
+    if (slotIndex < 0) {
         logFatal("Invalid symbol slot number in updatesym()");
     }
 
-    SymbolTable[slotIndex].name = strdup(name);
-    SymbolTable[slotIndex].primitiveType = primitiveType;
-    SymbolTable[slotIndex].structuralType = structuralType;
-    SymbolTable[slotIndex].class = classType;
-    SymbolTable[slotIndex].endLabel = endLabel;
-    SymbolTable[slotIndex].size = size;
-    SymbolTable[slotIndex].offset = offsetPosition;
+    symbol = getSymbol(slotIndex);
+    symbol->name = internString(name);
+    symbol->primitiveType = primitiveType;
+    symbol->structuralType = structuralType;
+    symbol->class = classType;
+    symbol->endLabel = endLabel;
+    symbol->size = size;
+    symbol->offset = offsetPosition;
 }
 
 /**
@@ -132,6 +295,7 @@ int addGlobalSymbol(char *name, int primitiveType, int structuralType,
     slotIndex = getNewGlobalSymbolIndex();
     updateSymbolTable(slotIndex, name, primitiveType, structuralType, C_GLOBAL,
                       endLabel, size, 0);
+    insertSymbolIndex(&GlobalSymbolIndex, slotIndex);
     codegenDeclareGlobalSymbol(slotIndex);
     return slotIndex;
 }
@@ -162,6 +326,7 @@ int addLocalSymbol(char *name, int primitiveType, int structuralType,
         codegenGetLocalOffset(primitiveType, false /* not a function param */);
     updateSymbolTable(slotIndex, name, primitiveType, structuralType, C_LOCAL,
                       endLabel, size, offsetPosition);
+    insertSymbolIndex(&LocalSymbolIndex, slotIndex);
     return slotIndex;
 }
 
@@ -188,3 +353,50 @@ int findSymbol(char *s) {
 
     return slotIndex;
 }
+
+/**
+ * freeLocalSymbols - Drop the local symbols of the function that has just
+ * been generated, so the next function starts with an empty local region.
+ *
+ * NOTE:
+ * The segments are kept for reuse. The local index is released when it grew
+ * past its initial size, so resetting it never costs more than the
+ * insertions that made it grow.
+ */
+void freeLocalSymbols(void) {
+    LocalSymbols.count = 0;
+
+    if (LocalSymbolIndex.capacity > SYMBOL_INDEX_INITIAL_CAPACITY) {
+        free(LocalSymbolIndex.slots);
+        LocalSymbolIndex.slots = NULL;
+        LocalSymbolIndex.capacity = 0;
+    } else if (LocalSymbolIndex.count != 0) {
+        memset(LocalSymbolIndex.slots, 0xff,
+               LocalSymbolIndex.capacity * sizeof(int)); // All -1
+    }
+    LocalSymbolIndex.count = 0;
+}
+
+/**
+ * countLocalSymbols - The number of local symbols of the current function.
+ */
+int countLocalSymbols(void) { return LocalSymbols.count; }
+
+/**
+ * localSymbolPosition - The position of a local symbol within the local
+ * region (0 for the function's first local), e.g. to index per-function
+ * tables.
+ *
+ * @param id The slot of the symbol
+ *
+ * @return The position, or -1 for a global symbol
+ */
+int localSymbolPosition(int id) {
+    return id >= LOCAL_SYMBOL_BASE ? id - LOCAL_SYMBOL_BASE : -1;
+}
+
+/**
+ * localSymbolId - The slot of the local symbol at a position within the
+ * local region (the inverse of localSymbolPosition()).
+ */
+int localSymbolId(int position) { return LOCAL_SYMBOL_BASE + position; }
@@ -4,9 +4,170 @@
 #include "decl.h"
 #include "defs.h"
 
+#include <sys/mman.h>
+
+/**
+ * NOTE:
+ * AST nodes are allocated with a bump pointer. A function's tree is not
+ * needed once its code has been generated, so resetASTArena() rewinds the
+ * allocator after every function and the memory is reused by the next one:
+ * peak memory is set by the largest function.
+ *
+ * Compact layout (default): the nodes of a function form one contiguous
+ * array, ASTnodes, and children are indices into it. The array is reserved
+ * once with mmap() for AST_MAX_NODES nodes; pages are only backed when they
+ * are touched, and the array never moves, so node pointers stay valid.
+ *
+ * Pointer layout (KECCC_POINTER_AST): nodes come from fixed-size chunks that
+ * are chained and reused across functions.
+ */
+
+// Allocation statistics (see --stats)
+static struct {
+    size_t nodes;          // Nodes allocated in total
+    size_t liveNodes;      // Nodes allocated since the last reset
+    size_t peakNodes;      // Largest liveNodes seen
+    size_t allocatorCalls; // malloc()/mmap() calls for node memory
+    size_t resets;         // Number of resetASTArena() calls
+} ArenaStats;
+
+#ifdef KECCC_POINTER_AST
+
+#define AST_ARENA_CHUNK_NODES 4096
+
+struct ASTchunk {
+    struct ASTchunk *next;
+    size_t used; // Nodes handed out from this chunk
+    struct ASTnode nodes[AST_ARENA_CHUNK_NODES];
+};
+
+static struct ASTchunk *FirstChunk;   // All chunks, in allocation order
+static struct ASTchunk *CurrentChunk; // Chunk being filled
+
+/**
+ * takeASTNode - Take the next node from the chunks, adding a chunk when
+ * every existing one is full.
+ */
+static struct ASTnode *takeASTNode(void) {
+    if (CurrentChunk == NULL || CurrentChunk->used == AST_ARENA_CHUNK_NODES) {
+        struct ASTchunk *chunk = CurrentChunk ? CurrentChunk->next : FirstChunk;
+
+        if (chunk == NULL) {
+            chunk = malloc(sizeof(struct ASTchunk));
+            if (chunk == NULL) {
+                fprintf(stderr, "out of memory in makeASTNode()\n");
+                exit(1);
+            }
+            chunk->next = NULL;
+            if (CurrentChunk) {
+                CurrentChunk->next = chunk;
+            } else {
+                FirstChunk = chunk;
+            }
+            ArenaStats.allocatorCalls++;
+        }
+        chunk->used = 0;
+        CurrentChunk = chunk;
+    }
+
+    return &CurrentChunk->nodes[CurrentChunk->used++];
+}
+
+static void rewindASTNodes(void) { CurrentChunk = NULL; }
+
+#else
+
+// Largest number of AST nodes in one function
+#define AST_MAX_NODES (1u << 24)
+
+struct ASTnode *ASTnodes;
+static size_t NextASTNode; // Index of the next free node
+
+/**
+ * takeASTNode - Take the next node from the node array, reserving the array
+ * on first use.
+ */
+static struct ASTnode *takeASTNode(void) {
+    if (ASTnodes == NULL) {
+        void *map = mmap(NULL, AST_MAX_NODES * sizeof(struct ASTnode),
+                         PROT_READ | PROT_WRITE,
+                         MAP_PRIVATE | MAP_ANONYMOUS | MAP_NORESERVE, -1, 0);
+        if (map == MAP_FAILED) {
+            fprintf(stderr, "out of memory in makeASTNode()\n");
+            exit(1);
+        }
+        ASTnodes = map;
+        NextASTNode = 1; // Index 0 stands for "no child"
+        ArenaStats.allocatorCalls++;
+    }
+
+    if (NextASTNode == AST_MAX_NODES) {
+        fprintf(stderr, "Function too large: more than %u AST nodes, line %d\n",
+                AST_MAX_NODES - 1, Line);
+        exit(1);
+    }
+    return &ASTnodes[NextASTNode++];
+}
+
+static void rewindASTNodes(void) { NextASTNode = 1; }
+
+#endif
+
+/**
+ * allocateASTNode - Take a node from the arena.
+ *
+ * @return pointer to an uninitialised AST node
+ */
+static struct ASTnode *allocateASTNode(void) {
+    ArenaStats.nodes++;
+    if (++ArenaStats.liveNodes > ArenaStats.peakNodes) {
+        ArenaStats.peakNodes = ArenaStats.liveNodes;
+    }
+    return takeASTNode();
+}
+
+/**
+ * resetASTArena - Release every AST node at once.
+ *
+ * NOTE:
+ * All nodes made so far become invalid; their memory is reused.
+ */
+void resetASTArena(void) {
+    rewindASTNodes();
+    ArenaStats.liveNodes = 0;
+    ArenaStats.resets++;
+}
+
+/**
+ * printASTArenaStats - Print AST allocation statistics (--stats).
+ *
+ * @param stream The stream to print to
+ */
+void printASTArenaStats(FILE *stream) {
+#ifdef KECCC_POINTER_AST
+    const char *layout = "pointer";
+#else
+    const char *layout = "compact";
+#endif
+
+    fprintf(stream,
+            "AST arena: %zu nodes allocated (%s layout, %zu bytes each), "
+            "%zu resets\n",
+            ArenaStats.nodes, layout, sizeof(struct ASTnode),
+            ArenaStats.resets);
+    fprintf(stream,
+            "AST arena: peak %zu live nodes (%zu KiB), %zu allocator calls\n",
+            ArenaStats.peakNodes,
+            ArenaStats.peakNodes * sizeof(struct ASTnode) / 1024,
+            ArenaStats.allocatorCalls);
+}
+
 /**
  * makeASTNode - Build and return a generic ASt node
  *
+ * NOTE:
+ * The node lives in the AST arena until the next resetASTArena().
+ *
  * @param op              the operator
  * @param primitiveType   the primitive data type
  * @param left            pointer to left subtree
@@ -21,18 +182,15 @@ struct ASTnode *makeASTNode(int op, int primitiveType, struct ASTnode *left,
                             int intvalue) {
     struct ASTnode *n;
 
-    n = (struct ASTnode *)malloc(sizeof(struct ASTnode));
-    if (n == NULL) {
-        fprintf(stderr, "out of memory in makeASTNode()\n");
-        exit(1);
-    }
+    n = allocateASTNode();
 
     n->op = op;
     n->primitiveType = primitiveType;
     n->isRvalue = false; // default to lvalue until context sets rvalue
-    n->left = left;
-    n->middle = middle;
-    n->right = right;
+    n->registerNeed = 0;
+    n->left = astRefOf(left);
+    n->middle = astRefOf(middle);
+    n->right = astRefOf(right);
     n->v.intvalue = intvalue;
 
     return n;
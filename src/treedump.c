@@ -52,7 +52,7 @@ static void dumpIndent(int level) {
  *
  * @return String representation of the operation.
  */
-static const char *astOpToString(int op) {
+const char *astOpToString(int op) {
     switch (op) {
     case A_NOTHING:
         return "A_NOTHING";
@@ -146,7 +146,7 @@ static const char *astOpToString(int op) {
  *
  * @return String representation of the primitive type.
  */
-static const char *primitiveTypeToString(int primitiveType) {
+const char *primitiveTypeToString(int primitiveType) {
     switch (primitiveType) {
     case P_NONE:
         return "P_NONE";
@@ -202,15 +202,16 @@ static void dumpASTNodeHeader(struct ASTnode *n, int label, int level) {
     case A_PREDECREMENT:
     case A_POSTINCREMENT:
     case A_POSTDECREMENT:
-        printf(" name=%s", SymbolTable[n->v.identifierIndex].name);
+        printf(" name=%s", getSymbol(n->v.identifierIndex)->name);
         break;
     case A_SCALETYPE:
         printf(" size=%d", n->v.size);
         break;
     case A_WIDENTYPE:
     case A_TOBOOLEAN:
-        if (n->left) {
-            printf(" from=%s", primitiveTypeToString(n->left->primitiveType));
+        if (astLeft(n)) {
+            printf(" from=%s",
+                   primitiveTypeToString(astLeft(n)->primitiveType));
         }
         break;
     default:
@@ -288,10 +289,10 @@ static void dumpGlueStatements(struct ASTnode *n, int level, bool compacted) {
     NodeVec rights = {0};
 
     while (current && current->op == A_GLUE) {
-        if (current->right) {
-            nodeVecPush(&rights, current->right);
+        if (astRight(current)) {
+            nodeVecPush(&rights, astRight(current));
         }
-        current = current->left;
+        current = astLeft(current);
     }
 
     // Dump the left-most (oldest) statement first
@@ -328,38 +329,38 @@ static void dumpASTInternal(struct ASTnode *n, int label, int level,
 
     switch (n->op) {
     case A_IF:
-        if (n->left) {
+        if (astLeft(n)) {
             leftLabel = gendumpLabel();
             dumpIndent(level + 1);
             printf("cond -> L%03d\n", leftLabel);
-            dumpASTInternal(n->left, leftLabel, level + 2, compacted);
+            dumpASTInternal(astLeft(n), leftLabel, level + 2, compacted);
         }
-        if (n->middle) {
+        if (astMiddle(n)) {
             middleLabel = gendumpLabel();
             dumpIndent(level + 1);
             printf("then -> L%03d\n", middleLabel);
-            dumpASTInternal(n->middle, middleLabel, level + 2, compacted);
+            dumpASTInternal(astMiddle(n), middleLabel, level + 2, compacted);
         }
-        if (n->right) {
+        if (astRight(n)) {
             rightLabel = gendumpLabel();
             dumpIndent(level + 1);
             printf("else -> L%03d\n", rightLabel);
-            dumpASTInternal(n->right, rightLabel, level + 2, compacted);
+            dumpASTInternal(astRight(n), rightLabel, level + 2, compacted);
         }
         return;
 
     case A_WHILE:
-        if (n->left) {
+        if (astLeft(n)) {
             leftLabel = gendumpLabel();
             dumpIndent(level + 1);
             printf("cond -> L%03d\n", leftLabel);
-            dumpASTInternal(n->left, leftLabel, level + 2, compacted);
+            dumpASTInternal(astLeft(n), leftLabel, level + 2, compacted);
         }
-        if (n->right) {
+        if (astRight(n)) {
             rightLabel = gendumpLabel();
             dumpIndent(level + 1);
             printf("body -> L%03d\n", rightLabel);
-            dumpASTInternal(n->right, rightLabel, level + 2, compacted);
+            dumpASTInternal(astRight(n), rightLabel, level + 2, compacted);
         }
         return;
 
@@ -368,22 +369,22 @@ static void dumpASTInternal(struct ASTnode *n, int label, int level,
             // Flatten the entire glue ladder under this node
             dumpGlueStatements(n, level + 1, compacted);
         } else {
-            if (n->left) {
+            if (astLeft(n)) {
                 leftLabel = gendumpLabel();
-                dumpASTInternal(n->left, leftLabel, level + 1, compacted);
+                dumpASTInternal(astLeft(n), leftLabel, level + 1, compacted);
             }
-            if (n->right) {
+            if (astRight(n)) {
                 rightLabel = gendumpLabel();
-                dumpASTInternal(n->right, rightLabel, level + 1, compacted);
+                dumpASTInternal(astRight(n), rightLabel, level + 1, compacted);
             }
         }
         return;
 
     case A_FUNCTION:
         // Typical layout: FUNCTION(left=body)
-        if (n->left) {
+        if (astLeft(n)) {
             leftLabel = gendumpLabel();
-            dumpASTInternal(n->left, leftLabel, level + 1, compacted);
+            dumpASTInternal(astLeft(n), leftLabel, level + 1, compacted);
         }
         return;
 
@@ -392,17 +393,17 @@ static void dumpASTInternal(struct ASTnode *n, int label, int level,
     }
 
     // General AST node: dump children (left, middle, right)
-    if (n->left) {
+    if (astLeft(n)) {
         leftLabel = gendumpLabel();
-        dumpASTInternal(n->left, leftLabel, level + 1, compacted);
+        dumpASTInternal(astLeft(n), leftLabel, level + 1, compacted);
     }
-    if (n->middle) {
+    if (astMiddle(n)) {
         middleLabel = gendumpLabel();
-        dumpASTInternal(n->middle, middleLabel, level + 1, compacted);
+        dumpASTInternal(astMiddle(n), middleLabel, level + 1, compacted);
     }
-    if (n->right) {
+    if (astRight(n)) {
         rightLabel = gendumpLabel();
-        dumpASTInternal(n->right, rightLabel, level + 1, compacted);
+        dumpASTInternal(astRight(n), rightLabel, level + 1, compacted);
     }
 }
 
@@ -424,7 +425,7 @@ void dumpASTTree(struct ASTnode *n) {
 
     printf("\n============= AST dump (full) =============\n");
     if (n->op == A_FUNCTION) {
-        printf("function: %s\n", SymbolTable[n->v.identifierIndex].name);
+        printf("function: %s\n", getSymbol(n->v.identifierIndex)->name);
     }
     dumpASTInternal(n, gendumpLabel(), 0, false);
     printf("============= end AST dump =============\n");
@@ -444,7 +445,7 @@ void dumpASTTreeCompacted(struct ASTnode *n) {
 
     printf("\n============= AST dump (compacted) =============\n");
     if (n->op == A_FUNCTION) {
-        printf("function: %s\n", SymbolTable[n->v.identifierIndex].name);
+        printf("function: %s\n", getSymbol(n->v.identifierIndex)->name);
     }
     dumpASTInternal(n, gendumpLabel(), 0, true);
     printf("============= end AST dump =============\n");
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Compares the instructions keccc emits at -O0 and -O1.
+
+Every test case is compiled to assembly at both levels for each target and
+the instruction counts are reported. The check fails if one of the cases
+named with --expect-fewer does not get strictly shorter at -O1, or if a
+mnemonic named with --forbid still appears in a case's -O1 code.
+"""
+from __future__ import annotations
+
+import argparse
+import subprocess
+import sys
+import tempfile
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set
+
+# Assembler directives, which are not counted as instructions (NASM spells
+# them without a leading '.')
+NASM_DIRECTIVES = {
+    "extern", "global", "section", "align",
+    "db", "dw", "dd", "dq",
+    "resb", "resw", "resd", "resq",
+}
+
+
+@dataclass(frozen=True)
+class InstructionCount:
+    name: str
+    target: str
+    unoptimized: Counter[str]
+    optimized: Counter[str]
+
+
+def count_instructions(assembly: str) -> Counter[str]:
+    """
+    Counts the instruction lines ("\\t<mnemonic>\\t<operands>") of a listing
+    by mnemonic.
+    """
+    counts: Counter[str] = Counter()
+    for line in assembly.splitlines():
+        if not line.startswith("\t"):
+            continue  # label or blank line
+        mnemonic = line.split()[0]
+        if mnemonic.startswith(".") or mnemonic in NASM_DIRECTIVES:
+            continue
+        counts[mnemonic] += 1
+    return counts
+
+
+def compile_to_assembly(
+    keccc: Path, target: str, level: str, source: Path, output: Path
+) -> Optional[str]:
+    command = [
+        str(keccc),
+        f"-O{level}",
+        "--target", target,
+        "--emit", "asm",
+        "--output", str(output),
+        str(source),
+    ]
+    process = subprocess.run(command, capture_output=True, text=True)
+    if process.returncode != 0:
+        print(f"[FAIL] {' '.join(command)}", file=sys.stderr)
+        print(process.stderr, file=sys.stderr)
+        return None
+    return output.read_text()
+
+
+def main(argv: Sequence[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--target",
+        action="append",
+        choices=["nasm", "aarch64"],
+        help="target to check (repeatable; default: both)",
+    )
+    parser.add_argument(
+        "--expect-fewer",
+        action="append",
+        default=[],
+        metavar="NAME",
+        help="test case that -O1 must make strictly shorter (repeatable)",
+    )
+    parser.add_argument(
+        "--forbid",
+        action="append",
+        default=[],
+        metavar="NAME:MNEMONIC",
+        help="mnemonic that must not appear in a test case at -O1 (repeatable)",
+    )
+    parser.add_argument("source_root", type=Path)
+    parser.add_argument("build_root", type=Path)
+    args = parser.parse_args(list(argv))
+
+    keccc = args.build_root / "src" / "keccc"
+    if not keccc.exists():
+        print(f"[FATAL] keccc not found at {keccc}")
+        return 1
+
+    sources = sorted((args.source_root / "tests" / "testcases").glob("*.c"))
+    names = {source.stem for source in sources}
+    forbidden: Dict[str, Set[str]] = {}
+    for rule in args.forbid:
+        name, _, mnemonic = rule.partition(":")
+        forbidden.setdefault(name, set()).add(mnemonic)
+    for name in [*args.expect_fewer, *forbidden]:
+        if name not in names:
+            print(f"[FATAL] no test case named {name}")
+            return 1
+
+    counts: List[InstructionCount] = []
+    with tempfile.TemporaryDirectory(prefix="keccc-count-") as tmp:
+        output = Path(tmp) / "out.s"
+        for target in args.target or ["nasm", "aarch64"]:
+            for source in sources:
+                listings = [
+                    compile_to_assembly(keccc, target, level, source, output)
+                    for level in ("0", "1")
+                ]
+                if listings[0] is None or listings[1] is None:
+                    return 1
+                counts.append(
+                    InstructionCount(
+                        source.stem,
+                        target,
+                        count_instructions(listings[0]),
+                        count_instructions(listings[1]),
+                    )
+                )
+
+    all_ok = True
+    for count in counts:
+        unoptimized = sum(count.unoptimized.values())
+        optimized = sum(count.optimized.values())
+        present = sorted(
+            mnemonic
+            for mnemonic in forbidden.get(count.name, set())
+            if count.optimized[mnemonic]
+        )
+        status = "OK"
+        if count.name in args.expect_fewer and optimized >= unoptimized:
+            status = "FAIL: -O1 is not shorter"
+        elif present:
+            status = f"FAIL: -O1 still uses {', '.join(present)}"
+        all_ok = all_ok and status == "OK"
+        print(
+            f"[{status}] {count.name} ({count.target}): "
+            f"-O0 {unoptimized} -> -O1 {optimized} instructions"
+        )
+
+    return 0 if all_ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -3,12 +3,16 @@ from __future__ import annotations
 
 import argparse
 import difflib
+import hashlib
+import io
+import os
 import shutil
 import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Sequence, Tuple
+from typing import Sequence, TextIO, Tuple
 
 
 @dataclass(frozen=True)
@@ -18,16 +22,24 @@ class TestCase:
     expected: Path
 
 
+@dataclass(frozen=True)
+class TestResult:
+    test_case: TestCase
+    ok: bool
+    log: str
+
+
 def run_command(
     command: Sequence[str],
     cwd: Path,
     description: str,
+    log: TextIO,
     allow_nonzero_exit: bool = False,
 ) -> Tuple[bool, str, str]:
     """
     Runs a command in a subprocess, capturing stdout and stderr.
     If the command fails (non-zero exit code) and allow_nonzero_exit is False,
-    prints an error message and returns False.
+    writes an error message to log and returns False.
     Otherwise, returns True along with stdout and stderr.
     """
     process = subprocess.run(
@@ -39,13 +51,13 @@ def run_command(
     )
 
     if process.returncode != 0 and not allow_nonzero_exit:
-        print(f"[FAIL] {description}")
-        print("  Command:", " ".join(command))
-        print("  Exit code:", process.returncode)
+        print(f"[FAIL] {description}", file=log)
+        print("  Command:", " ".join(command), file=log)
+        print("  Exit code:", process.returncode, file=log)
         if process.stdout:
-            print("  STDOUT:\n" + process.stdout)
+            print("  STDOUT:\n" + process.stdout, file=log)
         if process.stderr:
-            print("  STDERR:\n" + process.stderr)
+            print("  STDERR:\n" + process.stderr, file=log)
         return False, process.stdout, process.stderr
 
     return True, process.stdout, process.stderr
@@ -63,22 +75,24 @@ def find_required_executable(name: str) -> str:
     return path
 
 
-def print_output_diff(expected_text: str, actual_text: str, test_name: str) -> None:
+def print_output_diff(
+    expected_text: str, actual_text: str, test_name: str, log: TextIO
+) -> None:
     """
-    Prints a unified diff between expected and actual output texts.
+    Writes a unified diff between expected and actual output texts to log.
     """
-    print(f"[FAIL] {test_name}: output mismatch")
+    print(f"[FAIL] {test_name}: output mismatch", file=log)
 
-    print("\n=== Expected output ===")
-    print(expected_text if expected_text else "<empty>")
+    print("\n=== Expected output ===", file=log)
+    print(expected_text if expected_text else "<empty>", file=log)
 
-    print("\n=== Actual output ===")
-    print(actual_text if actual_text else "<empty>")
+    print("\n=== Actual output ===", file=log)
+    print(actual_text if actual_text else "<empty>", file=log)
 
     expected_lines = expected_text.splitlines(keepends=False)
     actual_lines = actual_text.splitlines(keepends=False)
 
-    print("\n=== Unified diff (expected vs actual) ===")
+    print("\n=== Unified diff (expected vs actual) ===", file=log)
     diff = difflib.unified_diff(
         expected_lines,
         actual_lines,
@@ -87,8 +101,8 @@ def print_output_diff(expected_text: str, actual_text: str, test_name: str) -> N
         lineterm="",
     )
     for line in diff:
-        print(line)
-    print()
+        print(line, file=log)
+    print(file=log)
 
 
 def discover_tests(tests_dir: Path) -> list[TestCase]:
@@ -114,13 +128,76 @@ def ensure_empty_dir(path: Path) -> None:
     path.mkdir(parents=True, exist_ok=True)
 
 
+# Runtime modules linked into every test program (src/rt/<arch>/<module>.<ext>)
+RUNTIME_MODULES = ("start", "printint", "printchar", "printstring")
+
+
+def tool_version(command: Sequence[str]) -> str:
+    """
+    Returns the first line a tool prints when asked for its version.
+    Used as part of the runtime cache key, so that upgrading the assembler
+    invalidates objects it produced.
+    """
+    process = subprocess.run(
+        command,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+    )
+    lines = process.stdout.splitlines()
+    return lines[0] if lines else ""
+
+
+def build_runtime_objects(
+    rt_dir: Path,
+    suffix: str,
+    cache_dir: Path,
+    assemble: Sequence[str],
+    assembler_version: str,
+) -> list[Path] | None:
+    """
+    Assembles the runtime modules once per run instead of once per test case.
+    Each object is cached under cache_dir, keyed by the content hash of its
+    source and the assembler version, so later runs reuse it as well.
+    Returns the object paths, or None (after printing why) on failure.
+    """
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    objects: list[Path] = []
+    for module in RUNTIME_MODULES:
+        source = rt_dir / (module + suffix)
+        digest = hashlib.sha256()
+        digest.update(assembler_version.encode())
+        digest.update(b"\0")
+        digest.update(source.read_bytes())
+        obj = cache_dir / f"{module}-{digest.hexdigest()[:16]}.o"
+
+        if not obj.exists():
+            # Assemble into a private file first, then rename it into place,
+            # so concurrent runs never observe a half-written object.
+            tmp = cache_dir / f"{obj.name}.{os.getpid()}.tmp"
+            ok, _, _ = run_command(
+                [*assemble, str(source), "-o", str(tmp)],
+                cwd=cache_dir,
+                log=sys.stdout,
+                description=f"runtime: assemble {source.name}",
+            )
+            if not ok:
+                return None
+            os.replace(tmp, obj)
+
+        objects.append(obj)
+    return objects
+
+
 def run_single_test_nasm(
     test_case: TestCase,
     workdir: Path,
     keccc_path: Path,
-    source_root: Path,
+    keccc_flags: Sequence[str],
     nasm: str,
     ld: str,
+    runtime_link_args: Sequence[str],
+    log: TextIO,
 ) -> Tuple[bool, str]:
     """
     Runs a single test case targeting x86_64 using nasm and ld.
@@ -129,87 +206,53 @@ def run_single_test_nasm(
     # Build artifacts in workdir
     out_asm = workdir / "out.asm"
     out_o = workdir / "out.o"
-    start_o = workdir / "start.o"
-    printint_o = workdir / "printint.o"
-    printchar_o = workdir / "printchar.o"
-    printstring_o = workdir / "printstring.o"
     out_bin = workdir / "out"
 
-    rt_dir = source_root / "src" / "rt" / "x86_64"
-    start_asm = rt_dir / "start.asm"
-    printint_asm = rt_dir / "printint.asm"
-    printchar_asm = rt_dir / "printchar.asm"
-    printstring_asm = rt_dir / "printstring.asm"
-
-    # 1) Compile to assembly (keccc writes out.s in cwd)
+    # 1) Compile to assembly (keccc writes out.asm in cwd)
     ok, _, _ = run_command(
-        [str(keccc_path), "--output", "out.asm", "--target", "nasm", str(test_case.source)],
+        [
+            str(keccc_path),
+            *keccc_flags,
+            "--output", "out.asm",
+            "--target", "nasm",
+            str(test_case.source),
+        ],
         cwd=workdir,
+        log=log,
         description=f"{test_case.name}: keccc(nasm)",
     )
     if not ok:
         return False, ""
 
-    # keccc wrote "out.s" into workdir; keep it as out.s already
-    if not (workdir / "out.asm").exists():
-        print(f"[FAIL] {test_case.name}: keccc did not produce out.s in {workdir}")
+    if not out_asm.exists():
+        print(f"[FAIL] {test_case.name}: keccc did not produce out.asm in {workdir}", file=log)
         return False, ""
 
     # 2) Assemble program
     ok, _, _ = run_command(
         [nasm, "-felf64", str(out_asm), "-o", str(out_o)],
         cwd=workdir,
+        log=log,
         description=f"{test_case.name}: nasm out.asm",
     )
     if not ok:
         return False, ""
 
-    # 3) Assemble runtime objects
-    ok, _, _ = run_command(
-        [nasm, "-felf64", str(start_asm), "-o", str(start_o)],
-        cwd=workdir,
-        description=f"{test_case.name}: nasm start.asm",
-    )
-    if not ok:
-        return False, ""
-
+    # 3) Link against the runtime archive or objects (no libc)
     ok, _, _ = run_command(
-        [nasm, "-felf64", str(printint_asm), "-o", str(printint_o)],
-        cwd=workdir,
-        description=f"{test_case.name}: nasm printint.asm",
-    )
-    if not ok:
-        return False, ""
-
-    ok, _, _ = run_command(
-        [nasm, "-felf64", str(printchar_asm), "-o", str(printchar_o)],
-        cwd=workdir,
-        description=f"{test_case.name}: nasm printchar.asm",
-    )
-    if not ok:
-        return False, ""
-
-    ok, _, _ = run_command(
-        [nasm, "-felf64", str(printstring_asm), "-o", str(printstring_o)],
-        cwd=workdir,
-        description=f"{test_case.name}: nasm printstring.asm",
-    )
-    if not ok:
-        return False, ""
-
-    # 4) Link (no libc)
-    ok, _, _ = run_command(
-        [ld, "-o", str(out_bin), str(out_o), str(start_o), str(printint_o), str(printchar_o), str(printstring_o)],
+        [ld, "-o", str(out_bin), str(out_o), *runtime_link_args],
         cwd=workdir,
+        log=log,
         description=f"{test_case.name}: ld",
     )
     if not ok:
         return False, ""
 
-    # 5) Run
+    # 4) Run
     ok, stdout, _ = run_command(
         [str(out_bin)],
         cwd=workdir,
+        log=log,
         description=f"{test_case.name}: run x86_64",
         allow_nonzero_exit=True,
     )
@@ -220,10 +263,12 @@ def run_single_test_aarch64(
     test_case: TestCase,
     workdir: Path,
     keccc_path: Path,
-    source_root: Path,
+    keccc_flags: Sequence[str],
     as_path: str,
     ld_path: str,
     qemu: str,
+    runtime_link_args: Sequence[str],
+    log: TextIO,
 ) -> Tuple[bool, str]:
     """
     Runs a single test case targeting aarch64 using GNU assembler and linker,
@@ -232,95 +277,263 @@ def run_single_test_aarch64(
     """
     out_s = workdir / "out.s"
     out_o = workdir / "out.o"
-    start_o = workdir / "start.o"
-    printint_o = workdir / "printint.o"
-    printchar_o = workdir / "printchar.o"
-    printstring_o = workdir / "printstring.o"
     out_bin = workdir / "out_aarch64"
 
-    rt_dir = source_root / "src" / "rt" / "aarch64"
-    start_s = rt_dir / "start.s"
-    printint_s = rt_dir / "printint.s"
-    printchar_s = rt_dir / "printchar.s"
-    printstring_s = rt_dir / "printstring.s"
-
     # 1) Compile to assembly (keccc writes out.s in cwd)
     ok, _, _ = run_command(
-        [str(keccc_path), "--output", "out.s", "--target", "aarch64", str(test_case.source)],
+        [
+            str(keccc_path),
+            *keccc_flags,
+            "--output", "out.s",
+            "--target", "aarch64",
+            str(test_case.source),
+        ],
         cwd=workdir,
+        log=log,
         description=f"{test_case.name}: keccc(aarch64)",
     )
     if not ok:
         return False, ""
 
-    if not (workdir / "out.s").exists():
-        print(f"[FAIL] {test_case.name}: keccc did not produce out.s in {workdir}")
+    if not out_s.exists():
+        print(f"[FAIL] {test_case.name}: keccc did not produce out.s in {workdir}", file=log)
         return False, ""
 
     # 2) Assemble program
     ok, _, _ = run_command(
         [as_path, str(out_s), "-o", str(out_o)],
         cwd=workdir,
+        log=log,
         description=f"{test_case.name}: aarch64 as out.s",
     )
     if not ok:
         return False, ""
 
-    # 3) Assemble runtime objects
+    # 3) Link against the runtime archive or objects (no libc)
     ok, _, _ = run_command(
-        [as_path, str(start_s), "-o", str(start_o)],
+        [ld_path, "-o", str(out_bin), str(out_o), *runtime_link_args],
         cwd=workdir,
-        description=f"{test_case.name}: aarch64 as start.asm",
+        log=log,
+        description=f"{test_case.name}: aarch64 ld",
     )
     if not ok:
         return False, ""
 
-    ok, _, _ = run_command(
-        [as_path, str(printint_s), "-o", str(printint_o)],
+    # 4) Run via qemu-user
+    ok, stdout, _ = run_command(
+        [qemu, str(out_bin)],
         cwd=workdir,
-        description=f"{test_case.name}: aarch64 as printint.s",
+        log=log,
+        description=f"{test_case.name}: run aarch64 via qemu",
+        allow_nonzero_exit=True,
     )
-    if not ok:
-        return False, ""
+    return True, stdout
+
+
+def run_single_test_object(
+    test_case: TestCase,
+    workdir: Path,
+    keccc_path: Path,
+    keccc_flags: Sequence[str],
+    target: str,
+    ld: str,
+    runtime_link_args: Sequence[str],
+    runner: Sequence[str],
+    log: TextIO,
+) -> Tuple[bool, str]:
+    """
+    Runs a single test case using keccc's built-in assembler (--emit obj),
+    then links the object with ld.
+    Returns a tuple of (success: bool, stdout: str).
+    """
+    out_o = workdir / "out.o"
+    out_bin = workdir / "out"
 
+    # 1) Compile straight to an object file
     ok, _, _ = run_command(
-        [as_path, str(printchar_s), "-o", str(printchar_o)],
+        [
+            str(keccc_path),
+            *keccc_flags,
+            "--emit", "obj",
+            "--output", str(out_o),
+            "--target", target,
+            str(test_case.source),
+        ],
         cwd=workdir,
-        description=f"{test_case.name}: aarch64 as printchar.s",
+        log=log,
+        description=f"{test_case.name}: keccc --emit obj ({target})",
     )
     if not ok:
         return False, ""
 
+    # 2) Link against the runtime archive or objects (no libc)
     ok, _, _ = run_command(
-        [as_path, str(printstring_s), "-o", str(printstring_o)],
+        [ld, "-o", str(out_bin), str(out_o), *runtime_link_args],
         cwd=workdir,
-        description=f"{test_case.name}: aarch64 as printstring.s",
+        log=log,
+        description=f"{test_case.name}: ld",
     )
     if not ok:
         return False, ""
 
-    # 4) Link (no libc)
+    # 3) Run (natively or via qemu-user)
+    ok, stdout, _ = run_command(
+        [*runner, str(out_bin)],
+        cwd=workdir,
+        log=log,
+        description=f"{test_case.name}: run {target}",
+        allow_nonzero_exit=True,
+    )
+    return True, stdout
+
+
+def run_single_test_driver(
+    test_case: TestCase,
+    workdir: Path,
+    keccc_path: Path,
+    keccc_flags: Sequence[str],
+    target: str,
+    runner: Sequence[str],
+    log: TextIO,
+) -> Tuple[bool, str]:
+    """
+    Runs a single test case through keccc's integrated driver (--emit exe),
+    which assembles and links the program itself.
+    Returns a tuple of (success: bool, stdout: str).
+    """
+    out_bin = workdir / "out"
+
+    # 1) Compile, assemble and link in one invocation
     ok, _, _ = run_command(
-        [ld_path, "-o", str(out_bin), str(out_o), str(start_o), str(printint_o), str(printchar_o), str(printstring_o)],
+        [
+            str(keccc_path),
+            *keccc_flags,
+            "--emit", "exe",
+            "--output", str(out_bin),
+            "--target", target,
+            str(test_case.source),
+        ],
         cwd=workdir,
-        description=f"{test_case.name}: aarch64 ld",
+        log=log,
+        description=f"{test_case.name}: keccc --emit exe ({target})",
     )
     if not ok:
         return False, ""
 
-    # 5) Run via qemu-user
+    # 2) Run (natively or via qemu-user)
     ok, stdout, _ = run_command(
-        [qemu, str(out_bin)],
+        [*runner, str(out_bin)],
         cwd=workdir,
-        description=f"{test_case.name}: run aarch64 via qemu",
+        log=log,
+        description=f"{test_case.name}: run {target}",
         allow_nonzero_exit=True,
     )
     return True, stdout
 
 
+def run_test_case(
+    test_case: TestCase,
+    target: str,
+    work_root: Path,
+    keccc_path: Path,
+    keccc_flags: Sequence[str],
+    tools: dict[str, str],
+    runtime_link_args: Sequence[str],
+    emit: str,
+) -> TestResult:
+    """
+    Builds, runs and checks a single test case in its own work directory.
+    Everything the test would print is collected into the result's log, so
+    that test cases can run concurrently and still be reported in order.
+    """
+    log = io.StringIO()
+    print(f"== Running {target} test: {test_case.name}", file=log)
+
+    workdir = work_root / test_case.name
+    ensure_empty_dir(workdir)
+
+    if emit == "obj":
+        ok, stdout = run_single_test_object(
+            test_case=test_case,
+            workdir=workdir,
+            keccc_path=keccc_path,
+            keccc_flags=keccc_flags,
+            target=target,
+            ld=tools["ld"],
+            runtime_link_args=runtime_link_args,
+            runner=[tools["qemu"]] if target == "aarch64" else [],
+            log=log,
+        )
+    elif emit == "exe":
+        ok, stdout = run_single_test_driver(
+            test_case=test_case,
+            workdir=workdir,
+            keccc_path=keccc_path,
+            keccc_flags=keccc_flags,
+            target=target,
+            runner=[tools["qemu"]] if target == "aarch64" else [],
+            log=log,
+        )
+    elif target == "nasm":
+        ok, stdout = run_single_test_nasm(
+            test_case=test_case,
+            workdir=workdir,
+            keccc_path=keccc_path,
+            keccc_flags=keccc_flags,
+            nasm=tools["nasm"],
+            ld=tools["ld"],
+            runtime_link_args=runtime_link_args,
+            log=log,
+        )
+    else:
+        ok, stdout = run_single_test_aarch64(
+            test_case=test_case,
+            workdir=workdir,
+            keccc_path=keccc_path,
+            keccc_flags=keccc_flags,
+            as_path=tools["as"],
+            ld_path=tools["ld"],
+            qemu=tools["qemu"],
+            runtime_link_args=runtime_link_args,
+            log=log,
+        )
+
+    if ok:
+        expected_text = test_case.expected.read_text()
+        if stdout.strip() != expected_text.strip():
+            print_output_diff(
+                expected_text, stdout, f"{test_case.name} ({target})", log
+            )
+            ok = False
+        else:
+            print(f"[PASS] {test_case.name} ({target})", file=log)
+
+    return TestResult(test_case=test_case, ok=ok, log=log.getvalue())
+
+
 def main(argv: Sequence[str]) -> int:
     parser = argparse.ArgumentParser()
     parser.add_argument("--target", required=True, choices=["nasm", "aarch64"])
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        help="number of test cases to run concurrently (0: one per CPU)",
+    )
+    parser.add_argument(
+        "--emit",
+        choices=["asm", "obj", "exe"],
+        default="asm",
+        help="asm: assemble and link here; obj: use keccc's built-in "
+        "assembler; exe: let keccc's driver assemble and link",
+    )
+    parser.add_argument(
+        "--opt-level",
+        choices=["0", "1"],
+        default="0",
+        help="optimization level passed to keccc (-O0, -O1)",
+    )
     parser.add_argument("source_root")
     parser.add_argument("build_root")
     args = parser.parse_args(list(argv))
@@ -340,74 +553,111 @@ def main(argv: Sequence[str]) -> int:
         print(f"No *.kc tests found under {tests_dir}")
         return 1
 
+    for tc in test_cases:
+        if not tc.expected.exists():
+            print(f"[FATAL] Missing expected output file: {tc.expected}")
+            return 1
+
+    keccc_flags = [f"-O{args.opt_level}"]
+
     # Workspace per target to avoid filename clashes
-    work_root = build_root / "tests-work" / args.target
+    work_name = args.target if args.emit == "asm" else f"{args.target}-{args.emit}"
+    if args.opt_level != "0":
+        work_name += f"-O{args.opt_level}"
+    work_root = build_root / "tests-work" / work_name
     work_root.mkdir(parents=True, exist_ok=True)
 
-    # Tool discovery
+    # Tool discovery. An external assembler is only needed to assemble
+    # keccc's --emit asm output, or below to rebuild the runtime; --emit obj
+    # and --emit exe go through keccc's built-in assembler.
     if args.target == "nasm":
-        nasm = find_required_executable("nasm")
-        ld = find_required_executable("ld")
+        tools = {}
+        if args.emit != "exe":
+            tools["ld"] = find_required_executable("ld")
+        assembler_key = "nasm"
+        assembler_name = "nasm"
+        rt_arch = "x86_64"
+        rt_dir = source_root / "src" / "rt" / "x86_64"
+        rt_suffix = ".asm"
+        assemble_flags = ["-felf64"]
+        version_flag = "-v"
     else:
-        as_path = find_required_executable("aarch64-linux-gnu-as")
-        ld_path = find_required_executable("aarch64-linux-gnu-ld")
-        qemu = find_required_executable("qemu-aarch64")
+        tools = {"qemu": find_required_executable("qemu-aarch64")}
+        if args.emit != "exe":
+            tools["ld"] = find_required_executable("aarch64-linux-gnu-ld")
+        assembler_key = "as"
+        assembler_name = "aarch64-linux-gnu-as"
+        rt_arch = "aarch64"
+        rt_dir = source_root / "src" / "rt" / "aarch64"
+        rt_suffix = ".s"
+        assemble_flags = []
+        version_flag = "--version"
+
+    if args.emit == "asm":
+        tools[assembler_key] = find_required_executable(assembler_name)
+
+    # Prefer the runtime archive meson built (src/rt/meson.build). Nothing
+    # in a program references _start, so force it out of the archive.
+    # Without the archive, assemble the runtime once and reuse the objects.
+    runtime_link_args: list[str] = []
+    rt_archive = build_root / "src" / "rt" / f"libkecrt-{rt_arch}.a"
+    if args.emit == "exe":
+        pass  # keccc's driver links the runtime itself
+    elif rt_archive.exists():
+        runtime_link_args = ["-u", "_start", str(rt_archive)]
+    else:
+        assembler = tools.get(assembler_key) or find_required_executable(
+            assembler_name
+        )
+        runtime_objects = build_runtime_objects(
+            rt_dir=rt_dir,
+            suffix=rt_suffix,
+            cache_dir=build_root / "tests-work" / "rt-cache" / args.target,
+            assemble=[assembler, *assemble_flags],
+            assembler_version=tool_version([assembler, version_flag]),
+        )
+        if runtime_objects is None:
+            return 1
+        runtime_link_args = [str(obj) for obj in runtime_objects]
 
-    all_ok = True
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
 
     """
     For each test case:
     1) Compile with keccc to assembly
     2) Assemble with nasm/as
-    3) Link with ld
+    3) Link with ld against the runtime archive (or cached objects)
     4) Run the binary (directly or via qemu)
     5) Compare output to expected
     6) Report results
-    """
-    for tc in test_cases:
-        print(f"== Running {args.target} test: {tc.name}")
-
-        if not tc.expected.exists():
-            print(f"[FATAL] Missing expected output file: {tc.expected}")
-            return 1
-
-        workdir = work_root / tc.name
-        ensure_empty_dir(workdir)
 
-        if args.target == "nasm":
-            ok, stdout = run_single_test_nasm(
-                test_case=tc,
-                workdir=workdir,
-                keccc_path=keccc_path,
-                source_root=source_root,
-                nasm=nasm, # type: ignore
-                ld=ld, # type: ignore
-            )
-        else:
-            ok, stdout = run_single_test_aarch64(
+    Each test case has its own work directory, so they can be dispatched to
+    a pool of workers. The workers spend their time waiting on subprocesses,
+    so threads are enough. Results are reported in discovery order.
+    """
+    all_ok = True
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        results = executor.map(
+            lambda tc: run_test_case(
                 test_case=tc,
-                workdir=workdir,
+                target=args.target,
+                work_root=work_root,
                 keccc_path=keccc_path,
-                source_root=source_root,
-                as_path=as_path, # type: ignore
-                ld_path=ld_path, # type: ignore
-                qemu=qemu, # type: ignore
-            )
-
-        if not ok:
-            all_ok = False
-            continue
-
-        expected_text = tc.expected.read_text()
-        if stdout.strip() != expected_text.strip():
-            print_output_diff(expected_text, stdout, f"{tc.name} ({args.target})")
-            all_ok = False
-        else:
-            print(f"[PASS] {tc.name} ({args.target})")
+                keccc_flags=keccc_flags,
+                tools=tools,
+                runtime_link_args=runtime_link_args,
+                emit=args.emit,
+            ),
+            test_cases,
+        )
+        for result in results:
+            sys.stdout.write(result.log)
+            sys.stdout.flush()
+            if not result.ok:
+                all_ok = False
 
     return 0 if all_ok else 1
 
 
 if __name__ == "__main__":
     raise SystemExit(main(sys.argv[1:]))
-
@@ -0,0 +1,27 @@
+int first() {
+    char x;
+    int y;
+    x = 65;
+    y = 7;
+    printint(x);
+    printint(y);
+    return (0);
+}
+
+int second() {
+    long y;
+    int x;
+    x = 1000;
+    y = 30000;
+    printint(x);
+    printint(y);
+    return (0);
+}
+
+int main() {
+    int r;
+    r = first(0);
+    r = second(0);
+    r = first(0);
+    return (0);
+}
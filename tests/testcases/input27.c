@@ -0,0 +1,30 @@
+char c;
+int  i;
+long l;
+int  a[10];
+
+int main() {
+  printint(2 + 3 * 4 - 6 / 2);
+  printint((100 - 1) * (7 + 3) / 9);
+  printint(-7 / 2);
+  printint(1 << 20);
+  printint(300000 >> 4);
+  printint((255 & 60) | (1 ^ 3));
+  printint(~0 + -(5 - 12));
+  printint(!0 + !7 + (3 < 4) + (4 <= 3) + (5 == 5) + (5 != 5));
+  printint((9 > 2) * 10 + (2 >= 2));
+
+  c = 200 + 100; printint(c);
+  i = 70000 * 3; printint(i);
+  l = 123456 * 1000; printint(l);
+  i = 100000 * 100000; printint(i);
+
+  i = 6; c = 'A' + 2; printint(i * (2 + 3) + c);
+  if (2 * 3 > 5) { printint(1); } else { printint(0); }
+  while (i < 2 * 5) { i = i + 1 * 2; }
+  printint(i);
+
+  a[2 * 2] = 44; printint(a[4]);
+  a[3 + 2] = 55; printint(a[10 / 2] + a[8 >> 1]);
+  return(0);
+}
@@ -0,0 +1,42 @@
+int  i;
+long l;
+char c;
+
+int main() {
+  for (i = -25; i <= 25; i = i + 5) {
+    printint(i * 8);
+    printint(i * -4);
+    printint(i * 10);
+    printint(i * 7);
+    printint(-12 * i);
+    printint(i * 1);
+    printint(i * 0);
+    printint(i / 1);
+    printint(i / -1);
+    printint(i / 4);
+    printint(i / 2);
+    printint(i / -8);
+    printint(i / 3);
+    printint(i / 7);
+    printint(i / -10);
+  }
+
+  l = 123456789;
+  l = l * 1000;
+  printint(l / 7);
+  printint(l / 1000);
+  printint(l / -641);
+  printint(l / 2147483647);
+  l = 0 - l;
+  printint(l / 7);
+  printint(l / 1024);
+  printint(l / 1000003);
+  printint(l * 24);
+
+  c = 250;
+  printint(c / 3);
+  printint(c * 6);
+  c = c * 3;
+  printint(c);
+  return(0);
+}
@@ -0,0 +1,36 @@
+long a;
+long b;
+long c;
+long d;
+long e;
+long f;
+long g;
+long h;
+long x;
+
+long twice() {
+  return (g + g);
+}
+
+int main() {
+  a = 1; b = 2; c = 3; d = 5; e = 8; f = 13; g = 21; h = 34;
+
+  x = a - (b - (c - (d - (e - (f - (g - (h - (a - (b - (c - (d - (e - (f - (g - (h - a)))))))))))))));
+  printint(x);
+  x = a * (b + (c * (d + (e * (f + (g * (h + (a * (b + (c * (d + (e * (f + (g * (h + b)))))))))))))));
+  printint(x);
+
+  x = ((((((a + b) | (e + c)) + ((b - c) ^ (g - d))) - (((c + e) | (h + e)) + ((e - f) ^ (a - g)))) + ((((f + g) | (c + h)) + ((g - a) ^ (d - a))) - (((a + b) | (e + c)) + ((b - c) ^ (g - d))))) | (((((c + e) | (h + e)) + ((e - f) ^ (a - g))) - (((f + g) | (c + h)) + ((g - a) ^ (d - a)))) + ((((a + b) | (e + c)) + ((b - c) ^ (g - d))) - (((c + e) | (h + e)) + ((e - f) ^ (a - g))))));
+  printint(x);
+  x = (((((((c | b) - (c + g)) | ((d ^ c) + (e - h))) - (((e | e) - (f + a)) | ((g ^ f) + (g - c)))) + ((((h | g) - (a + d)) | ((a ^ a) + (b - e))) - (((c | b) - (c + g)) | ((d ^ c) + (e - h))))) - (((((e | e) - (f + a)) | ((g ^ f) + (g - c))) - (((h | g) - (a + d)) | ((a ^ a) + (b - e)))) + ((((c | b) - (c + g)) | ((d ^ c) + (e - h))) - (((e | e) - (f + a)) | ((g ^ f) + (g - c)))))) ^ ((((((h | g) - (a + d)) | ((a ^ a) + (b - e))) - (((c | b) - (c + g)) | ((d ^ c) + (e - h)))) + ((((e | e) - (f + a)) | ((g ^ f) + (g - c))) - (((h | g) - (a + d)) | ((a ^ a) + (b - e))))) - (((((c | b) - (c + g)) | ((d ^ c) + (e - h))) - (((e | e) - (f + a)) | ((g ^ f) + (g - c)))) + ((((h | g) - (a + d)) | ((a ^ a) + (b - e))) - (((c | b) - (c + g)) | ((d ^ c) + (e - h)))))));
+  printint(x);
+
+  x = a + twice(0) * b;
+  printint(x);
+  x = (a + b) * twice(1) + (c - twice(2)) * (d + e) - (f ^ (g - twice(3)));
+  printint(x);
+  x = h - (g - (f - (e - (d - (c - (b - (a - twice(4))))))));
+  printint(x);
+  return (0);
+}
+
@@ -0,0 +1,56 @@
+int  g[8];
+long total;
+
+long square() {
+  return (total * total);
+}
+
+int main() {
+  int  i;
+  int  j;
+  char c;
+  int  n;
+  int *p;
+  long s0;
+  long s1;
+  long s2;
+  long s3;
+  long s4;
+  long s5;
+  long s6;
+  long s7;
+  long s8;
+  long s9;
+
+  i = 0;
+  while (i < 8) {
+    g[i] = i * i + 3;
+    i = i + 1;
+  }
+  total = 0;
+  for (i = 0; i < 8; i = i + 1) {
+    total = total + g[i];
+    printint(square(0) - i);
+  }
+
+  s0 = 1; s1 = 2; s2 = 3; s3 = 4; s4 = 5;
+  s5 = 6; s6 = 7; s7 = 8; s8 = 9; s9 = 10;
+  for (j = 0; j < 4; j++) {
+    total = j + s9;
+    printint(square(0));
+    s0 = s0 + s1; s1 = s1 + s2; s2 = s2 + s3; s3 = s3 + s4; s4 = s4 + s5;
+    s5 = s5 + s6; s6 = s6 + s7; s7 = s7 + s8; s8 = s8 + s9; s9 = s9 + s0;
+  }
+  printint(s0); printint(s1); printint(s2); printint(s3); printint(s4);
+  printint(s5); printint(s6); printint(s7); printint(s8); printint(s9);
+
+  c = 250; c = c + 10; printint(c);
+  c = 255; n = c++; printint(n); printint(c);
+  c = 0; n = --c; printint(n); printint(c);
+  i = 2147483647; i = i + 1; printint(i);
+  j = 5; n = j++ + ++j; printint(n); printint(j);
+
+  p = &n; *p = 40; n = n + 2; printint(*p);
+  s0 = -7; printint(s0 / 2); printint(s0 / 3); printint(s0 * 10);
+  return (0);
+}
@@ -0,0 +1,73 @@
+int  a[10];
+int  b[10];
+long g;
+long h;
+int  w;
+
+long bump() {
+  g = g + 1;
+  return (g);
+}
+
+int main() {
+  int  i;
+  int  k;
+  long x;
+  long y;
+  long t;
+  int *p;
+
+  for (i = 0; i < 10; i = i + 1) {
+    a[i] = i * 3;
+    b[i] = a[i] + a[i];
+  }
+  for (i = 1; i < 9; i = i + 1) {
+    a[i] = a[i] + a[i - 1] + a[i + 1] + b[i];
+  }
+  for (i = 0; i < 10; i = i + 1) {
+    printint(a[i]);
+  }
+
+  g = 5;
+  h = 7;
+  x = g * h + g * h;
+  printint(x);
+  y = g * h;
+  g = 6;
+  y = y + g * h;
+  printint(y);
+  x = g + g;
+  t = bump(0);
+  x = x + g + g + t;
+  printint(x);
+
+  k = 4;
+  if (k > 3) {
+    x = k * 8;
+    y = k * 8 + 1;
+  } else {
+    x = k * 16;
+    y = k * 16 + 1;
+  }
+  printint(x + y + k * 8);
+
+  t = 0;
+  x = 3;
+  while (x < 40) {
+    t = t + x * 5;
+    x = x + x * 5;
+  }
+  printint(t);
+  printint(x);
+
+  p = &w;
+  w = 2;
+  k = *p + *p;
+  w = 5;
+  k = k + *p + *p;
+  *p = 50;
+  printint(k + w + w);
+  a[2] = 11;
+  printint(a[2] + a[2]);
+  return (0);
+}
@@ -0,0 +1,59 @@
+int  calls;
+long unused;
+
+int tick() {
+  calls = calls + 1;
+  return (calls);
+  calls = calls + 100;
+  printint(999);
+  return (0);
+}
+
+int early() {
+  int n;
+
+  n = 0;
+  while (1) {
+    n = n + 3;
+    if (n > 10) {
+      return (n);
+    }
+  }
+  return (0);
+}
+
+int main() {
+  int  i;
+  int  x;
+  long y;
+
+  x = 5;
+  x = 6;
+  y = x * 7;
+  y = x + 1;
+  if (0) {
+    printint(111);
+    x = tick(0);
+  }
+  while (0) {
+    printint(222);
+  }
+  if (1 > 2) {
+    printint(333);
+  } else {
+    printint(x);
+  }
+  tick(0);
+  tick(0);
+  unused = tick(0) * 2;
+  for (i = 0; i < 3; i = i + 1) {
+    y = y + i;
+    x = i * 4;
+  }
+  printint(y);
+  printint(calls);
+  printint(unused);
+  printint(early(0));
+  return (0);
+  printint(444);
+}
@@ -0,0 +1,80 @@
+int  m[64];
+long n;
+long d;
+long limit;
+
+long spin() {
+  long k;
+
+  k = 0;
+  while (1) {
+    k = k + limit * 2;
+    if (k > 50) {
+      return (k);
+    }
+  }
+  return (0);
+}
+
+long total() {
+  int  i;
+  long s;
+
+  s = 0;
+  for (i = 0; i < 64; i = i + 1) {
+    s = s + m[i];
+  }
+  return (s);
+}
+
+int main() {
+  int  i;
+  int  j;
+  long s;
+  long q;
+
+  n = 8;
+  for (i = 0; i < n; i = i + 1) {
+    for (j = 0; j < n; j = j + 1) {
+      m[i * 8 + j] = i * 10 + j;
+    }
+  }
+  printint(total(0));
+
+  s = 0;
+  for (i = 0; i < 8; i = i + 1) {
+    for (j = 0; j < 8; j = j + 1) {
+      s = s + m[i * 8 + j] * (n + 1);
+    }
+  }
+  printint(s);
+
+  d = 0;
+  q = 0;
+  for (i = 0; i < 5; i = i + 1) {
+    if (d != 0) {
+      q = q + n / d;
+    }
+    q = q + n * 2;
+  }
+  printint(q);
+
+  s = 0;
+  i = 0;
+  while (i < 4) {
+    s = s + n;
+    n = n + 1;
+    i = i + 1;
+  }
+  printint(s);
+
+  limit = 7;
+  printint(spin(0));
+  s = 0;
+  for (i = 0; i < 3; i = i + 1) {
+    s = s + limit;
+    limit = spin(0);
+  }
+  printint(s);
+  return (0);
+}
@@ -0,0 +1,90 @@
+int  a[40];
+int  w[40];
+char c[40];
+int  g[64];
+
+int fill() {
+  int  i;
+  char ch;
+  i = 0;
+  ch = 65;
+  while (i < 40) {
+    a[i] = i * 3 + 1;
+    w[i] = i * i;
+    c[i] = ch;
+    ch = ch + 1;
+    i = i + 1;
+  }
+  return (0);
+}
+
+int main() {
+  int  i;
+  int  j;
+  long k;
+  char ch;
+  long s;
+  long t;
+
+  fill(0);
+  s = 0;
+  for (i = 1; i < 39; i = i + 1) {
+    s = s + a[i - 1] + a[i] * 2 + a[i + 1];
+  }
+  printint(s);
+
+  s = 0;
+  for (i = 38; i >= 0; i = i - 2) {
+    s = s + w[i] - a[i + 1];
+  }
+  printint(s);
+
+  t = 0;
+  for (k = 0; k < 40; k = k + 1) {
+    t = t + w[k] + c[k];
+  }
+  printint(t);
+
+  s = 0;
+  ch = 250;
+  while (ch != 4) {
+    s = s + a[ch / 8];
+    ch = ch + 3;
+  }
+  printint(s);
+
+  s = 0;
+  for (i = 0; i < 40; i = i + 1) {
+    if (i / 3 * 3 == i) {
+      s = s + a[i];
+    } else {
+      s = s - a[i];
+    }
+  }
+  printint(s);
+
+  for (i = 0; i < 8; i = i + 1) {
+    for (j = 0; j < 8; j = j + 1) {
+      g[i * 8 + j] = i * 2 + j;
+    }
+  }
+  s = 0;
+  for (j = 0; j < 8; j = j + 1) {
+    for (i = 0; i < 8; i = i + 1) {
+      s = s + g[i * 8 + j] * (j + 1);
+    }
+  }
+  printint(s);
+
+  s = 0;
+  for (i = 0; i < 40; i = i + 1) {
+    j = a[i];
+    if (j > 50) {
+      a[i] = j - 50;
+    }
+    s = s + a[i];
+  }
+  printint(s);
+  printint(a[0] + a[38] + a[39]);
+  return (0);
+}
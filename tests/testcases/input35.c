@@ -0,0 +1,85 @@
+int  g;
+long big;
+char cv;
+
+int check() {
+  int i;
+  int n;
+  n = 0;
+  for (i = 0; i < 20; i = i + 1) {
+    if (!(i < 10)) {
+      n = n + 1;
+    }
+    if (!(i == 3)) {
+      n = n + 2;
+    }
+  }
+  return (n);
+}
+
+int flags() {
+  int i;
+  int n;
+  int f;
+  n = 0;
+  for (i = 0; i < 12; i = i + 1) {
+    f = !(i > 4);
+    n = n * 2 + f;
+  }
+  return (n);
+}
+
+int main() {
+  int  i;
+  long s;
+  long t;
+  int  a;
+  int  b;
+
+  printint(check(0));
+  printint(flags(0));
+
+  s = 0;
+  for (i = 0; i < 10; i = i + 1) {
+    g = i * 7;
+    s = s + g;
+  }
+  printint(s);
+  printint(g);
+
+  t = 0;
+  for (i = 0; i < 500; i = i + 1) {
+    t = t + 4095;
+    t = t - 4096;
+    t = t + 4097;
+    t = t - 70000;
+  }
+  printint(t);
+
+  big = 2147483647;
+  big = big + 1;
+  if (big > 2147483647) {
+    printint(big);
+  }
+  big = big * 4;
+  printint(big / 3);
+
+  cv = 200;
+  cv = cv + 100;
+  printint(cv);
+
+  a = -5;
+  b = 0 - a;
+  printint(a * b);
+  s = 0;
+  for (i = -3; i < 4; i = i + 1) {
+    s = s + i * -2 + 1;
+  }
+  printint(s);
+
+  while (!(s > 100)) {
+    s = s + 9;
+  }
+  printint(s);
+  return (0);
+}
@@ -0,0 +1,104 @@
+int  calls;
+int  tv;
+long total;
+
+int probe() {
+  calls = calls + 1;
+  return (tv);
+}
+
+int shortCircuit() {
+  int n;
+  n = 0;
+  calls = 0;
+  tv = 0;
+  if (probe(0) && probe(0)) {
+    n = n + 1;
+  }
+  if (probe(0) || probe(0)) {
+    n = n + 2;
+  }
+  tv = 5;
+  if (probe(0) || probe(0)) {
+    n = n + 4;
+  }
+  if (probe(0) && probe(0)) {
+    n = n + 8;
+  }
+  return (n * 100 + calls);
+}
+
+int nested() {
+  int i;
+  int j;
+  int n;
+  n = 0;
+  for (i = 0; i < 10; i = i + 1) {
+    for (j = 0; j < 10; j = j + 1) {
+      if ((i < 3 || i > 7) && !(j == 4 || j == 5)) {
+        n = n + 1;
+      }
+      if (!(i < j && j < 8) || i == 9) {
+        n = n + 100;
+      }
+      if (i && j && !(i - j)) {
+        n = n + 10000;
+      } else {
+        n = n + 0;
+      }
+    }
+  }
+  return (n);
+}
+
+int values() {
+  int a;
+  int b;
+  int c;
+  int n;
+  n = 0;
+  for (a = 0; a < 3; a = a + 1) {
+    for (b = 0; b < 3; b = b + 1) {
+      c = (a && b) + (a || b) * 2 + !(a && b - 1) * 4;
+      n = n * 3 + c;
+    }
+  }
+  return (n);
+}
+
+int main() {
+  int  i;
+  int  k;
+  long s;
+
+  printint(shortCircuit(0));
+  printint(nested(0));
+  printint(values(0));
+
+  s = 0;
+  i = 0;
+  while (i < 100 && s < 200) {
+    s = s + i;
+    i = i + 1;
+  }
+  printint(i);
+  printint(s);
+
+  k = 0;
+  i = 0;
+  while ((i < 5 || k) && !(i > 20)) {
+    i = i + 1;
+    k = i < 12 && k + 1;
+  }
+  printint(i);
+  printint(k);
+
+  total = 0;
+  for (i = 0; i < 64; i = i + 1) {
+    if (i > 10 && i < 50 || i == 60) {
+      total = total + i;
+    }
+  }
+  printint(total);
+  return (0);
+}
@@ -0,0 +1,38 @@
+int  cc;
+long lt;
+char ge;
+int  lsl[4];
+int  lo;
+
+int eq() {
+  cc = cc + 1;
+  return (cc);
+}
+
+long hs() {
+  lt = lt * 2 + cc;
+  return (lt);
+}
+
+int main() {
+  int i;
+
+  cc = 5;
+  lt = 1;
+  ge = 65;
+  lo = 0;
+  for (i = 0; i < 4; i = i + 1) {
+    lsl[i] = eq(0) * 10;
+    lo = lo + lsl[i];
+  }
+  printint(cc);
+  printint(hs(0));
+  printint(hs(0));
+  printint(ge);
+  printint(lsl[3]);
+  printint(lo);
+  if (eq(0) > 9 && lt > 20) {
+    printint(lt);
+  }
+  return (0);
+}
@@ -0,0 +1,27 @@
+long l;
+int i;
+char c;
+
+long negate() {
+  return (-l);
+}
+
+int main() {
+  long z;
+  z = 5;
+  z = -z;
+  printint(z);
+  l = 2000000000;
+  l = l * 3;
+  l = -l;
+  printint(l);
+  printint(-l + 1);
+  i = 7;
+  printint(-i);
+  c = 200;
+  printint(-c);
+  z = -z * 3;
+  printint(z);
+  printint(negate(0));
+  return (0);
+}
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Generates src/keywords.h, the minimal perfect hash used by the scanner to
+recognise keywords.
+
+The hash only looks at the identifier length and its first and last
+characters:
+
+    hash = (length + AssociatedValues[first] + AssociatedValues[last]) % N
+
+where N is the number of keywords, so every keyword owns exactly one slot of
+the table. The associated values are found with a small backtracking search.
+
+Run after editing KEYWORDS:
+    python3 tools/gen_keywords.py src/keywords.h
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# (keyword, token) pairs recognised by the scanner (see defs.h)
+KEYWORDS: Sequence[Tuple[str, str]] = (
+    ("void", "T_VOID"),
+    ("char", "T_CHAR"),
+    ("int", "T_INT"),
+    ("long", "T_LONG"),
+    ("if", "T_IF"),
+    ("else", "T_ELSE"),
+    ("while", "T_WHILE"),
+    ("for", "T_FOR"),
+    ("return", "T_RETURN"),
+)
+
+# Give up after this many search steps (the current set needs a few dozen)
+SEARCH_STEP_LIMIT = 5_000_000
+
+
+def key_characters(word: str) -> Tuple[str, str]:
+    return word[0], word[-1]
+
+
+def keyword_hash(word: str, values: Dict[str, int], slots: int) -> int:
+    first, last = key_characters(word)
+    return (len(word) + values[first] + values[last]) % slots
+
+
+def find_associated_values(words: Sequence[str]) -> Optional[Dict[str, int]]:
+    """
+    Searches associated values that make the hash collision-free.
+
+    Characters are assigned most frequent first; a keyword is checked as soon
+    as both of its key characters have a value, which prunes early.
+    """
+    slots = len(words)
+    frequency: Dict[str, int] = {}
+    for word in words:
+        for c in key_characters(word):
+            frequency[c] = frequency.get(c, 0) + 1
+    order = sorted(frequency, key=lambda c: (-frequency[c], c))
+    position = {c: index for index, c in enumerate(order)}
+
+    # Keywords that become fully determined when order[i] gets its value
+    decided: List[List[str]] = [[] for _ in order]
+    for word in words:
+        last_assigned = max(position[c] for c in key_characters(word))
+        decided[last_assigned].append(word)
+
+    values: Dict[str, int] = {}
+    used: set[int] = set()
+    steps = 0
+
+    def assign(index: int) -> bool:
+        nonlocal steps
+        if index == len(order):
+            return True
+        for value in range(slots):
+            steps += 1
+            if steps > SEARCH_STEP_LIMIT:
+                return False
+            values[order[index]] = value
+            hashes = [keyword_hash(w, values, slots) for w in decided[index]]
+            if len(set(hashes)) != len(hashes) or used.intersection(hashes):
+                continue
+            used.update(hashes)
+            if assign(index + 1):
+                return True
+            used.difference_update(hashes)
+        del values[order[index]]
+        return False
+
+    return values if assign(0) else None
+
+
+def c_char(c: str) -> str:
+    return "'\\''" if c == "'" else f"'{c}'"
+
+
+def render_header(values: Dict[str, int]) -> str:
+    words = [word for word, _ in KEYWORDS]
+    slots = len(words)
+    table: List[Tuple[str, str]] = [("", "")] * slots
+    for word, token in KEYWORDS:
+        table[keyword_hash(word, values, slots)] = (word, token)
+
+    lines = [
+        "// src/keywords.h",
+        "// Generated by tools/gen_keywords.py - do not edit by hand.",
+        "#pragma once",
+        "",
+        '#include "defs.h"',
+        "",
+        "/**",
+        " * NOTE:",
+        " * Minimal perfect hash of the keywords: every keyword owns one slot of",
+        " * KeywordTable, found from its length and first and last characters.",
+        " */",
+        "",
+        "// clang-format off",
+        f"#define KEYWORD_COUNT {slots}",
+        f"#define KEYWORD_MIN_LENGTH {min(len(w) for w in words)}",
+        f"#define KEYWORD_MAX_LENGTH {max(len(w) for w in words)}",
+        "",
+        "static const unsigned char KeywordAssociatedValues[256] = {",
+    ]
+    for c in sorted(values):
+        if values[c] != 0:
+            lines.append(f"    [{c_char(c)}] = {values[c]},")
+    lines += [
+        "};",
+        "",
+        "static const struct {",
+        "    const char *name;",
+        "    int length;",
+        "    int token;",
+        "} KeywordTable[KEYWORD_COUNT] = {",
+    ]
+    for word, token in table:
+        lines.append(f'    {{"{word}", {len(word)}, {token}}},')
+    lines += [
+        "};",
+        "// clang-format on",
+        "",
+        "/**",
+        " * keywordHash - Slot of KeywordTable that may hold the identifier.",
+        " *",
+        " * @param s The identifier (need not be NUL-terminated)",
+        " * @param length Its length, between KEYWORD_MIN_LENGTH and",
+        " * KEYWORD_MAX_LENGTH",
+        " *",
+        " * @return The slot index",
+        " */",
+        "static inline unsigned int keywordHash(const char *s, int length) {",
+        "    return (length + KeywordAssociatedValues[(unsigned char)s[0]] +",
+        "            KeywordAssociatedValues[(unsigned char)s[length - 1]]) %",
+        "           KEYWORD_COUNT;",
+        "}",
+        "",
+    ]
+    return "\n".join(lines)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="only verify that the header is up to date",
+    )
+    parser.add_argument("header", type=Path)
+    args = parser.parse_args()
+
+    values = find_associated_values([word for word, _ in KEYWORDS])
+    if values is None:
+        print("[FATAL] no perfect hash found for the keyword set", file=sys.stderr)
+        return 1
+    header = render_header(values)
+
+    if args.check:
+        if not args.header.exists() or args.header.read_text() != header:
+            print(
+                f"[FAIL] {args.header} is stale, rerun tools/gen_keywords.py",
+                file=sys.stderr,
+            )
+            return 1
+        print(f"[OK] {args.header} is up to date")
+        return 0
+
+    args.header.write_text(header)
+    print(f"Wrote {args.header} ({len(KEYWORDS)} keywords)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())